@@ -1,27 +1,114 @@
 from django.contrib import admin
-from .models import Proveedores, Inventario, Menu # Asegúrate de importar todos
+from .models import Proveedores, Inventario, Menu, Receta, Preparacion, ComponentePreparacion, RecetaPreparacion, Pedido, DetallePedido, MovimientoInventario, Sucursal, Trabajo # Asegúrate de importar todos
+from . import busqueda
 
 # Registramos los modelos para que aparezcan en el panel de admin
 
+# El buscador del admin usa el índice de búsqueda (busqueda.py) en lugar de
+# un icontains por cada campo de search_fields (LIKE '%...%' sin índice).
+# Con menos de 3 letras, o sin FTS5, se usa el buscador normal de Django.
+class BusquedaIndexadaMixin:
+    def get_search_results(self, request, queryset, search_term):
+        termino = busqueda.normalizar(search_term)
+        if not busqueda.disponible() or len(termino) < busqueda.LONGITUD_MINIMA:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=busqueda.ids(self.model, search_term)), False
+
+# Las sucursales (el admin, como las vistas, sólo muestra el inventario, el
+# menú y los pedidos de la sucursal de la petición: ver sucursales.py)
+@admin.register(Sucursal)
+class SucursalAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'clave', 'activa')
+    list_filter = ('activa',)
+    prepopulated_fields = {'clave': ('nombre',)}
+
 # Configuración básica para Proveedores
 @admin.register(Proveedores)
-class ProveedoresAdmin(admin.ModelAdmin):
+class ProveedoresAdmin(BusquedaIndexadaMixin, admin.ModelAdmin):
     list_display = ('nombre_proveedor', 'telefono_contacto', 'email_contacto', 'activo')
     list_filter = ('activo', 'tipo_producto')
     search_fields = ('nombre_proveedor', 'rfc')
 
 # Configuración básica para Inventario (¡NUEVO!)
 @admin.register(Inventario)
-class InventarioAdmin(admin.ModelAdmin):
+class InventarioAdmin(BusquedaIndexadaMixin, admin.ModelAdmin):
     list_display = ('nombre_articulo', 'stock', 'unidad', 'costo_unitario', 'proveedor', 'fecha_ultima_compra')
     list_filter = ('unidad', 'proveedor')
     search_fields = ('nombre_articulo',)
 
+# La receta (artículos + cantidad) se edita dentro del producto
+class RecetaInline(admin.TabularInline):
+    model = Receta
+    extra = 1
+    autocomplete_fields = ('inventario',)
+
+# Las preparaciones (masa, salsa...) que lleva el producto
+class RecetaPreparacionInline(admin.TabularInline):
+    model = RecetaPreparacion
+    extra = 0
+    autocomplete_fields = ('preparacion',)
+
 # Configuración básica para Menu (¡NUEVO!)
 @admin.register(Menu)
-class MenuAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'categoria', 'precio', 'tamaño', 'disponible')
-    list_filter = ('categoria', 'disponible', 'tamaño')
+class MenuAdmin(BusquedaIndexadaMixin, admin.ModelAdmin):
+    list_display = ('nombre', 'categoria', 'precio', 'costo_receta', 'margen', 'tamaño', 'habilitado', 'disponible')
+    readonly_fields = ('costo_receta', 'disponible')
+    list_filter = ('categoria', 'habilitado', 'disponible', 'tamaño')
     search_fields = ('nombre',)
-    # Para campos ManyToMany, se recomienda filter_horizontal
-    filter_horizontal = ('articulos',)
\ No newline at end of file
+    # 'articulos' usa una tabla intermedia con cantidad, por eso va como inline
+    inlines = (RecetaInline, RecetaPreparacionInline)
+
+# Los componentes (artículos o sub-preparaciones) se editan dentro de la preparación
+class ComponentePreparacionInline(admin.TabularInline):
+    model = ComponentePreparacion
+    fk_name = 'preparacion'
+    extra = 1
+    autocomplete_fields = ('articulo', 'subpreparacion')
+
+@admin.register(Preparacion)
+class PreparacionAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'unidad')
+    search_fields = ('nombre',)
+    inlines = (ComponentePreparacionInline,)
+
+# Los renglones del pedido se muestran dentro del pedido
+class DetallePedidoInline(admin.TabularInline):
+    model = DetallePedido
+    extra = 0
+    raw_id_fields = ('producto',)
+
+# Configuración básica para Pedido (¡NUEVO!)
+@admin.register(Pedido)
+class PedidoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'fecha', 'cliente', 'estado', 'total')
+    list_filter = ('estado',)
+    search_fields = ('cliente',)
+    inlines = (DetallePedidoInline,)
+
+# La bitácora de movimientos sólo se consulta: los renglones no se editan ni se borran
+@admin.register(MovimientoInventario)
+class MovimientoInventarioAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'inventario', 'tipo', 'cantidad')
+    list_filter = ('tipo',)
+    raw_id_fields = ('inventario',)
+    # Con millones de renglones, contar el total en cada página es caro
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# La cola de trabajos (trabajos.py) sólo se consulta; se encolan desde /trabajos/
+@admin.register(Trabajo)
+class TrabajoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'sucursal', 'estado', 'intentos', 'creado', 'terminado')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = [f.name for f in Trabajo._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
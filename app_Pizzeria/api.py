@@ -0,0 +1,468 @@
+import gzip
+import json
+from collections import defaultdict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import busqueda, disponibilidad, movimientos, sincronizacion
+from .cache_menu import invalidar_menu
+from .costos import recalculo_agrupado, recalcular_por_articulos
+from .listados import LISTADO_PROVEEDORES, LISTADO_INVENTARIO, LISTADO_MENU
+from .models import Proveedores, Inventario, Menu
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional: sin ella se usa gzip
+    brotli = None
+
+# ==========================================
+# API JSON (terminales de venta y pantallas de cocina)
+# ==========================================
+# GET  /api/<modelo>/        -> página de resultados (mismos filtros, órdenes y
+#                              cursores que las vistas HTML, ver listados.py)
+#                              ?campos=id,nombre (o ?fields=) limita las columnas
+#                              ?total=1 agrega el número de resultados del filtro
+# GET  /api/<modelo>/<id>/   -> un registro
+# GET  /api/buscar/?q=       -> búsqueda para autocompletar (busqueda.py)
+# GET  /api/cambios/?desde=  -> lo que cambió desde un seq (o ?since=), para
+#                              las terminales sin conexión (sincronizacion.py);
+#                              ?modelos=menu,inventario y ?limite= por respuesta
+# POST /api/<modelo>/lote/   -> {"crear": [...], "actualizar": [...], "borrar": [ids]}
+#                              todo en una sola transacción: si algo falla,
+#                              no se guarda nada
+#
+# Las respuestas se arman con .values() (diccionarios, sin instancias de
+# modelo) y se comprimen con brotli si está instalado o con gzip. Las vistas
+# de lectura son async (ORM asíncrono) para servirse bajo ASGI.
+
+# Máximo de operaciones (crear + actualizar + borrar) por petición
+MAXIMO_LOTE = 1000
+
+# Respuestas más chicas que esto no se comprimen (no vale la pena)
+TAMAÑO_MINIMO_COMPRESION = 200
+
+# Objetos por respuesta de /api/cambios/ (predeterminado y máximo)
+LIMITE_CAMBIOS = 500
+MAXIMO_CAMBIOS = 5000
+
+# Ids por consulta al leer los objetos que cambiaron (límite de parámetros de SQLite)
+TAMAÑO_LOTE_IDS = 500
+
+
+class ErrorApi(Exception):
+    """Error que se regresa al cliente como {"error": ..., "detalles": ...}."""
+
+    def __init__(self, mensaje, detalles=None, estado=400):
+        super().__init__(mensaje)
+        self.detalles = detalles
+        self.estado = estado
+
+
+class Recurso:
+    """
+    Un modelo expuesto en la API: su listado, las columnas que se pueden leer
+    y las que se pueden escribir (con el nombre de la columna, ej: proveedor_id).
+    """
+
+    def __init__(self, modelo, listado, lectura, escritura):
+        self.modelo = modelo
+        self.listado = listado
+        self.lectura = lectura
+        self.escritura = escritura
+
+
+RECURSOS = {
+    'proveedores': Recurso(
+        Proveedores, LISTADO_PROVEEDORES,
+        lectura=('id', 'nombre_proveedor', 'telefono_contacto', 'email_contacto', 'direccion',
+                 'tipo_producto', 'rfc', 'fecha_registro', 'activo'),
+        escritura=('nombre_proveedor', 'telefono_contacto', 'email_contacto', 'direccion',
+                   'tipo_producto', 'rfc', 'activo'),
+    ),
+    'inventario': Recurso(
+        Inventario, LISTADO_INVENTARIO,
+        lectura=('id', 'nombre_articulo', 'stock', 'unidad', 'fecha_ultima_compra', 'stock_minimo',
+                 'costo_unitario', 'proveedor_id', 'bajo_minimo'),
+        escritura=('nombre_articulo', 'stock', 'unidad', 'fecha_ultima_compra', 'stock_minimo',
+                   'costo_unitario', 'proveedor_id'),
+    ),
+    'menu': Recurso(
+        Menu, LISTADO_MENU,
+        lectura=('id', 'nombre', 'descripcion', 'precio', 'categoria', 'tamaño', 'habilitado',
+                 'disponible', 'costo_receta', 'num_articulos'),
+        escritura=('nombre', 'descripcion', 'precio', 'categoria', 'tamaño', 'habilitado'),
+    ),
+}
+
+
+# ---------- Respuestas ----------
+
+def respuesta_json(datos, estado=200):
+    return JsonResponse(
+        datos, status=estado, encoder=DjangoJSONEncoder,
+        json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False},
+    )
+
+
+def _comprimir_respuesta(request, respuesta):
+    if respuesta.has_header('Content-Encoding') or len(respuesta.content) < TAMAÑO_MINIMO_COMPRESION:
+        return respuesta
+    patch_vary_headers(respuesta, ('Accept-Encoding',))
+    aceptadas = {
+        parte.split(';')[0].strip()
+        for parte in request.headers.get('Accept-Encoding', '').split(',')
+    }
+    if brotli is not None and 'br' in aceptadas:
+        respuesta.content = brotli.compress(respuesta.content, quality=4)
+        respuesta['Content-Encoding'] = 'br'
+    elif 'gzip' in aceptadas:
+        respuesta.content = gzip.compress(respuesta.content, compresslevel=6)
+        respuesta['Content-Encoding'] = 'gzip'
+    else:
+        return respuesta
+    respuesta['Content-Length'] = str(len(respuesta.content))
+    return respuesta
+
+
+def comprimir(vista):
+    """Comprime la respuesta con brotli (si está instalado y el cliente lo acepta) o gzip."""
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            return _comprimir_respuesta(request, await vista(request, *args, **kwargs))
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        return _comprimir_respuesta(request, vista(request, *args, **kwargs))
+    return envoltura
+
+
+def obtener_recurso(modelo):
+    recurso = RECURSOS.get(modelo)
+    if recurso is None:
+        raise ErrorApi(f"Modelo desconocido: {modelo}", estado=404)
+    return recurso
+
+
+# ---------- Lectura ----------
+
+def campos_pedidos(recurso, parametros):
+    """Columnas de ?campos= (o ?fields=) validadas; todas si no se indica."""
+    texto = parametros.get('campos') or parametros.get('fields') or ''
+    campos = [c.strip() for c in texto.split(',') if c.strip()]
+    if not campos:
+        return list(recurso.lectura)
+    desconocidos = [c for c in campos if c not in recurso.lectura]
+    if desconocidos:
+        raise ErrorApi("Campos desconocidos", {'campos': desconocidos})
+    return campos
+
+
+async def listar(recurso, parametros):
+    """Una página de resultados como diccionarios (una sola consulta, más el total si se pide)."""
+    campos = campos_pedidos(recurso, parametros)
+    consulta, campo_orden, *resto = recurso.listado.preparar(parametros)
+    # El cursor necesita el id y el campo de orden aunque no se hayan pedido
+    columnas = list(dict.fromkeys(campos + ['id', campo_orden]))
+    filas = [fila async for fila in consulta.values(*columnas).aiterator()]
+    pagina = recurso.listado.construir_pagina(parametros, filas, campo_orden, *resto)
+    sobrantes = set(columnas) - set(campos)
+    filas = pagina.objetos
+    if sobrantes:
+        filas = [{c: fila[c] for c in campos} for fila in filas]
+    datos = {
+        'resultados': filas,
+        'anterior': pagina.cursor_anterior,
+        'siguiente': pagina.cursor_siguiente,
+    }
+    if parametros.get('total') in ('1', 'si', 'true'):
+        # COUNT sobre los mismos filtros (sin cursor): tiene costo, sólo si se pide
+        datos['total'] = await recurso.listado.filtrar(parametros).acount()
+    return datos
+
+
+async def detalle(recurso, id, parametros):
+    campos = campos_pedidos(recurso, parametros)
+    try:
+        return await recurso.listado.consulta().values(*campos).aget(id=id)
+    except recurso.modelo.DoesNotExist:
+        raise ErrorApi("No existe", estado=404)
+
+
+# ---------- Cambios para las terminales ----------
+
+def _entero(parametros, *nombres, predeterminado=0):
+    texto = next((parametros[n] for n in nombres if parametros.get(n)), '')
+    if not texto:
+        return predeterminado
+    if not texto.isdigit():
+        raise ErrorApi("Se esperaba un número", {nombres[0]: texto})
+    return int(texto)
+
+
+def cambios(parametros):
+    """
+    Objetos que cambiaron después del seq ?desde=, en orden de seq y hasta
+    ?limite= por respuesta: su estado actual (las mismas columnas que
+    /api/<modelo>/) y los ids de los que se borraron. 'hasta' es el seq a
+    pedir la próxima vez y 'mas' indica que quedan cambios por pedir. Sólo
+    llegan los de la sucursal de la terminal (y los proveedores).
+
+    Sin ?desde=, o con uno anterior a la última compactación, responde 410
+    con el seq desde el cual seguir: la terminal lo guarda, descarga todo con
+    /api/<modelo>/ y después pide los cambios desde ese seq.
+    """
+    desde = _entero(parametros, 'desde', 'since')
+    limite = max(1, min(_entero(parametros, 'limite', 'limit', predeterminado=LIMITE_CAMBIOS), MAXIMO_CAMBIOS))
+    texto = parametros.get('modelos') or ''
+    modelos = [m.strip() for m in texto.split(',') if m.strip()] or list(sincronizacion.MODELOS)
+    desconocidos = [m for m in modelos if m not in sincronizacion.MODELOS]
+    if desconocidos:
+        raise ErrorApi("Modelos desconocidos", {'modelos': desconocidos})
+
+    # El contador se lee antes que la bitácora: todo cambio con seq <= valor
+    # ya estaba confirmado (ver sincronizacion.py), así que 'hasta' no se salta nada
+    estado = sincronizacion.secuencia() if sincronizacion.disponible() else None
+    valor, compactado = estado or (0, 0)
+    if estado is None or desde == 0 or desde < compactado or desde > valor:
+        raise ErrorApi("Descargue todos los datos de nuevo", {'hasta': valor}, estado=410)
+
+    filas = list(
+        sincronizacion.bitacora().filter(seq__gt=desde, modelo__in=modelos)
+        .order_by('seq').values_list('seq', 'modelo', 'objeto_id')[:limite + 1]
+    )
+    mas = len(filas) > limite
+    filas = filas[:limite]
+    ids = defaultdict(list)
+    for _, modelo, objeto_id in filas:
+        ids[modelo].append(objeto_id)
+
+    if mas:
+        hasta = filas[-1][0]
+    else:
+        # Una transacción confirmada después de leer el contador pudo dejar seq mayores
+        hasta = max(valor, filas[-1][0]) if filas else valor
+    datos = {'desde': desde, 'hasta': hasta, 'mas': mas, 'cambios': {}, 'borrados': {}}
+    for modelo, pendientes in ids.items():
+        recurso = RECURSOS[modelo]
+        leidos = []
+        for inicio in range(0, len(pendientes), TAMAÑO_LOTE_IDS):
+            lote = pendientes[inicio:inicio + TAMAÑO_LOTE_IDS]
+            leidos.extend(recurso.listado.consulta().filter(id__in=lote).values(*recurso.lectura))
+        existentes = {fila['id'] for fila in leidos}
+        if leidos:
+            datos['cambios'][modelo] = leidos
+        # Lápidas: ya no existen
+        borrados = [i for i in pendientes if i not in existentes]
+        if borrados:
+            datos['borrados'][modelo] = borrados
+    return datos
+
+
+# ---------- Escritura por lotes ----------
+
+def _validar(recurso, datos, creando):
+    """Convierte un diccionario del cliente en una instancia validada (sin consultas)."""
+    if not isinstance(datos, dict):
+        raise ValidationError("Se esperaba un objeto")
+    desconocidos = set(datos) - set(recurso.escritura) - {'id'}
+    if desconocidos:
+        raise ValidationError(f"Campos no permitidos: {', '.join(sorted(desconocidos))}")
+    campos = {c: v for c, v in datos.items() if c != 'id'}
+    objeto = recurso.modelo(id=datos.get('id'), **campos)
+
+    # Al crear se validan todos los campos; al actualizar sólo los enviados.
+    # Las llaves foráneas se validan aparte, todas juntas en una consulta.
+    excluir = [
+        f.name for f in recurso.modelo._meta.concrete_fields
+        if f.is_relation or f.attname not in recurso.escritura
+        or (not creando and f.attname not in campos)
+    ]
+    objeto.clean_fields(exclude=excluir)
+    return objeto, list(campos)
+
+
+def _verificar_proveedores(objetos):
+    ids = {o.proveedor_id for o in objetos if getattr(o, 'proveedor_id', None) is not None}
+    if not ids:
+        return
+    existentes = set(Proveedores.objects.filter(id__in=ids).values_list('id', flat=True))
+    faltantes = sorted(ids - existentes)
+    if faltantes:
+        raise ErrorApi("Proveedores inexistentes", {'proveedor_id': faltantes})
+
+
+def aplicar_lote(recurso, operaciones):
+    """
+    Aplica {"crear", "actualizar", "borrar"} en una transacción. Crear y
+    actualizar usan bulk_create / bulk_update (una sentencia por lote), así que
+    el número de consultas no depende del número de filas.
+    """
+    if not isinstance(operaciones, dict):
+        raise ErrorApi("El cuerpo debe ser un objeto JSON")
+    crear = operaciones.get('crear') or []
+    actualizar = operaciones.get('actualizar') or []
+    borrar = operaciones.get('borrar') or []
+    if not all(isinstance(x, list) for x in (crear, actualizar, borrar)):
+        raise ErrorApi("'crear', 'actualizar' y 'borrar' deben ser listas")
+    if len(crear) + len(actualizar) + len(borrar) > MAXIMO_LOTE:
+        raise ErrorApi(f"Máximo {MAXIMO_LOTE} operaciones por petición")
+
+    errores = {}
+    nuevos, cambios = [], {}
+    for seccion, filas, creando in (('crear', crear, True), ('actualizar', actualizar, False)):
+        for i, datos in enumerate(filas):
+            try:
+                if not creando and not str((datos or {}).get('id', '')).isdigit():
+                    raise ValidationError("Falta 'id'")
+                objeto, campos = _validar(recurso, datos, creando)
+            except ValidationError as e:
+                errores[f'{seccion}[{i}]'] = e.messages if not hasattr(e, 'message_dict') else e.message_dict
+                continue
+            if creando:
+                objeto.id = None
+                nuevos.append(objeto)
+            else:
+                cambios.setdefault(tuple(sorted(campos)), []).append(objeto)
+    try:
+        borrar = [int(i) for i in borrar]
+    except (TypeError, ValueError):
+        errores['borrar'] = ["Se esperaba una lista de ids"]
+    if errores:
+        raise ErrorApi("Datos no válidos", errores)
+
+    modelo = recurso.modelo
+    actualizados = [o for grupo in cambios.values() for o in grupo]
+    if modelo is Inventario:
+        _verificar_proveedores(nuevos + actualizados)
+
+    ids = {o.id for o in actualizados}
+    if ids:
+        existentes = set(modelo.objects.filter(id__in=ids).values_list('id', flat=True))
+        if ids - existentes:
+            raise ErrorApi("Registros inexistentes", {'actualizar': sorted(ids - existentes)}, estado=404)
+
+    try:
+        with transaction.atomic(using=router.db_for_write(modelo)), recalculo_agrupado():
+            con_stock = []
+            if modelo is Inventario:
+                con_stock = [o for campos, objetos in cambios.items() if 'stock' in campos for o in objetos]
+                anteriores = movimientos.stocks_actuales(o.id for o in con_stock)
+            creados = modelo.objects.bulk_create(nuevos)
+            for campos, objetos in cambios.items():
+                if campos:
+                    # Sube la versión para que los formularios abiertos
+                    # detecten el cambio (ver edicion.py)
+                    for objeto in objetos:
+                        objeto.version = F('version') + 1
+                    modelo.objects.bulk_update(objetos, [*campos, 'version'], batch_size=500)
+            borrados = modelo.objects.filter(id__in=borrar).delete()[1].get(modelo._meta.label, 0) if borrar else 0
+
+            # bulk_create / bulk_update no envían señales
+            if modelo is Inventario:
+                costos = [o.id for campos, objetos in cambios.items() if 'costo_unitario' in campos for o in objetos]
+                if costos:
+                    recalcular_por_articulos(costos)
+                movimientos.registrar_diferencias(anteriores, con_stock + creados)
+                disponibilidad.por_diferencias(anteriores, con_stock)
+            if modelo is Menu and (creados or actualizados or borrados):
+                invalidar_menu()
+                disponibilidad.actualizar_disponibilidad(
+                    [o.id for o in creados]
+                    + [o.id for campos, objetos in cambios.items() if 'habilitado' in campos for o in objetos]
+                )
+            if creados:
+                busqueda.indexar_objetos(creados)
+            if actualizados:
+                # bulk_update sólo trae los campos enviados: se releen de la base
+                busqueda.indexar(modelo, [o.id for o in actualizados])
+    except IntegrityError as e:
+        raise ErrorApi("Conflicto de integridad", str(e), estado=409)
+
+    return {
+        'creados': [o.id for o in creados],
+        'actualizados': len(actualizados),
+        'borrados': borrados,
+    }
+
+
+# ---------- Vistas ----------
+
+@require_GET
+@comprimir
+async def api_listar(request, modelo):
+    """Página de resultados en JSON (acepta los mismos filtros que la vista HTML)."""
+    try:
+        return respuesta_json(await listar(obtener_recurso(modelo), request.GET))
+    except ErrorApi as e:
+        return respuesta_json({'error': str(e), 'detalles': e.detalles}, e.estado)
+
+
+@require_GET
+@comprimir
+async def api_detalle(request, modelo, id):
+    """Un registro en JSON (acepta ?campos=)."""
+    try:
+        return respuesta_json(await detalle(obtener_recurso(modelo), id, request.GET))
+    except ErrorApi as e:
+        return respuesta_json({'error': str(e), 'detalles': e.detalles}, e.estado)
+
+
+@csrf_exempt
+@require_POST
+@comprimir
+def api_lote(request, modelo):
+    """
+    Crear / actualizar / borrar por lotes. Exenta de CSRF porque la usan
+    terminales, no formularios; a cambio exige Content-Type application/json,
+    que un formulario de otro sitio no puede enviar sin permiso (CORS).
+    """
+    try:
+        recurso = obtener_recurso(modelo)
+        if request.content_type != 'application/json':
+            raise ErrorApi("Se esperaba Content-Type: application/json", estado=415)
+        try:
+            operaciones = json.loads(request.body)
+        except ValueError:
+            raise ErrorApi("JSON no válido")
+        return respuesta_json(aplicar_lote(recurso, operaciones))
+    except ErrorApi as e:
+        return respuesta_json({'error': str(e), 'detalles': e.detalles}, e.estado)
+
+
+@require_GET
+@comprimir
+def api_cambios(request):
+    """Cambios desde ?desde=<seq> para las terminales sin conexión (ver cambios())."""
+    try:
+        return respuesta_json(cambios(request.GET))
+    except ErrorApi as e:
+        return respuesta_json({'error': str(e), 'detalles': e.detalles}, e.estado)
+
+
+@require_GET
+@comprimir
+def api_buscar(request):
+    """
+    Autocompletado: ?q=texto (mínimo 3 letras), ?tipo=proveedor|articulo|producto
+    y ?limite= (máximo 50). Sin acentos y tolerante a errores de dedo.
+    """
+    tipos = {nombre: tipo for tipo, nombre in busqueda.NOMBRES_TIPO.items()}
+    tipo = request.GET.get('tipo') or None
+    if tipo is not None and tipo not in tipos:
+        return respuesta_json({'error': "Tipo desconocido", 'detalles': {'tipo': sorted(tipos)}}, 400)
+    limite = request.GET.get('limite', '')
+    limite = min(int(limite), 50) if limite.isdigit() and int(limite) > 0 else busqueda.LIMITE
+    resultados = busqueda.buscar(request.GET.get('q', ''), tipos.get(tipo), limite)
+    return respuesta_json({'resultados': resultados})
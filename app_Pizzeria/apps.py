@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppPizzeriaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_Pizzeria'
+
+    def ready(self):
+        # Registra los receptores de señales (caché, índices, etc.)
+        from . import signals  # noqa: F401
@@ -0,0 +1,330 @@
+import difflib
+import unicodedata
+
+from django.db import connections, router
+from django.urls import reverse
+
+from .models import Proveedores, Inventario, Menu, sucursal_actual
+
+# ==========================================
+# BÚSQUEDA (índice FTS5 con trigramas)
+# ==========================================
+# Los nombres de proveedores, artículos y productos se copian a la tabla
+# virtual busqueda_fts (SQLite FTS5, tokenizador trigram). Un trigrama es
+# cada grupo de 3 letras seguidas, así que "jamon" se encuentra escribiendo
+# "amo" y la búsqueda usa el índice en lugar de un LIKE '%...%' que recorre
+# toda la tabla.
+#
+# - Acentos y mayúsculas: el texto se guarda normalizado ("Jamón" -> "jamon")
+#   y la búsqueda se normaliza igual, así que "jamon" encuentra "Jamón".
+# - Errores de dedo: si no hay coincidencia exacta, cada palabra se compara
+#   (difflib) con las palabras parecidas del vocabulario y se busca otra vez
+#   con ellas, así "peperoni" encuentra "Pepperoni".
+# - rowid = id * 4 + tipo, para guardar los tres modelos en una sola tabla.
+# - Se mantiene al día con señales (signals.py); las escrituras masivas
+#   (importación, API) llaman a indexar() directamente.
+#
+# En bases que no son SQLite no existe la tabla y buscar() usa icontains.
+#
+# El índice es de todas las sucursales (con archivos separados, cada base
+# tiene el suyo). Cada fila guarda su sucursal_id (vacío en los proveedores,
+# que son de toda la cadena) en una columna UNINDEXED, y el MATCH filtra por
+# la sucursal activa: el LIMIT cuenta sólo sus filas, así que las otras
+# sucursales no le quitan lugar.
+
+TABLA = 'busqueda_fts'
+# Palabras distintas de todos los nombres, con su propio índice de trigramas
+# (busqueda_palabras_fts) para corregir errores de dedo
+TABLA_VOCABULARIO = 'busqueda_palabras'
+
+PROVEEDOR, ARTICULO, PRODUCTO = 1, 2, 3
+TIPOS = {
+    Proveedores: PROVEEDOR,
+    Inventario: ARTICULO,
+    Menu: PRODUCTO,
+}
+NOMBRES_TIPO = {PROVEEDOR: 'proveedor', ARTICULO: 'articulo', PRODUCTO: 'producto'}
+URLS = {PROVEEDOR: 'actualizar_proveedor', ARTICULO: 'actualizar_inventario', PRODUCTO: 'actualizar_menu'}
+
+# El tokenizador trigram no puede usar el índice con menos de 3 letras
+LONGITUD_MINIMA = 3
+LIMITE = 10
+# Coincidencias que se leen del índice antes de ordenarlas
+CANDIDATOS = 50
+# Parecido mínimo (0-1) para aceptar una palabra corregida, y cuántas se prueban
+PARECIDO_MINIMO = 0.6
+CORRECCIONES = 3
+MARGEN_CORRECCION = 0.1
+# Filas por INSERT al reconstruir el índice
+TAMAÑO_LOTE = 2000
+
+INSERTAR = f'INSERT INTO {TABLA} (rowid, texto, nombre, sucursal_id) VALUES (%s, %s, %s, %s)'
+
+
+def normalizar(texto):
+    """'Jamón Serrano' -> 'jamon serrano' (sin acentos, minúsculas, espacios simples)."""
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+def _conexion():
+    # La base de la sucursal activa (ver sucursales.RouterSucursales)
+    return connections[router.db_for_write(Inventario)]
+
+
+def disponible():
+    return _conexion().vendor == 'sqlite'
+
+
+# ---------- Mantenimiento del índice ----------
+
+def _fila(tipo, objeto_id, sucursal_id, nombre, *extras):
+    texto = ' '.join(normalizar(t) for t in (nombre, *extras) if t)
+    return (objeto_id * 4 + tipo, texto, nombre, sucursal_id)
+
+
+def _filas(modelo, queryset):
+    """(rowid, texto, nombre, sucursal_id) para cada registro del queryset."""
+    tipo = TIPOS[modelo]
+    if modelo is Proveedores:
+        # Los proveedores son de toda la cadena: sin sucursal
+        for objeto_id, nombre, rfc in queryset.values_list('id', 'nombre_proveedor', 'rfc').iterator(
+            chunk_size=TAMAÑO_LOTE
+        ):
+            yield _fila(tipo, objeto_id, None, nombre, rfc)
+        return
+    if modelo is Inventario:
+        valores = queryset.values_list('id', 'sucursal_id', 'nombre_articulo')
+    else:
+        valores = queryset.values_list('id', 'sucursal_id', 'nombre', 'categoria')
+    for objeto_id, sucursal_id, nombre, *extras in valores.iterator(chunk_size=TAMAÑO_LOTE):
+        yield _fila(tipo, objeto_id, sucursal_id, nombre, *extras)
+
+
+def _palabras(filas):
+    """Palabras de 3+ letras (sin números sueltos) de los textos normalizados."""
+    return {
+        (p,) for _, texto, *_ in filas for p in texto.split()
+        if len(p) >= LONGITUD_MINIMA and not p.isdigit()
+    }
+
+
+def _agregar_vocabulario(cursor, filas):
+    # Las palabras nunca se borran: una palabra vieja sólo produce una
+    # corrección sin resultados. reconstruir() limpia el vocabulario.
+    cursor.executemany(
+        f'INSERT OR IGNORE INTO {TABLA_VOCABULARIO} (palabra) VALUES (%s)', sorted(_palabras(filas))
+    )
+
+
+def _escribir(filas):
+    filas = list(filas)
+    if not filas:
+        return
+    with _conexion().cursor() as cursor:
+        # FTS5 no tiene UPSERT: se borra y se vuelve a insertar
+        for inicio in range(0, len(filas), TAMAÑO_LOTE):
+            lote = filas[inicio:inicio + TAMAÑO_LOTE]
+            marcas = ','.join(['%s'] * len(lote))
+            cursor.execute(f'DELETE FROM {TABLA} WHERE rowid IN ({marcas})', [f[0] for f in lote])
+            cursor.executemany(INSERTAR, lote)
+            _agregar_vocabulario(cursor, lote)
+
+
+def _fila_objeto(objeto):
+    if isinstance(objeto, Proveedores):
+        return _fila(PROVEEDOR, objeto.id, None, objeto.nombre_proveedor, objeto.rfc)
+    if isinstance(objeto, Inventario):
+        return _fila(ARTICULO, objeto.id, objeto.sucursal_id, objeto.nombre_articulo)
+    return _fila(PRODUCTO, objeto.id, objeto.sucursal_id, objeto.nombre, objeto.categoria)
+
+
+def indexar_objetos(objetos):
+    """Agrega o actualiza registros ya cargados (sin volver a leerlos de la base)."""
+    if not disponible():
+        return
+    _escribir(_fila_objeto(o) for o in objetos if o.id is not None)
+
+
+def indexar(modelo, ids):
+    """Agrega o actualiza en el índice los registros indicados."""
+    if not disponible() or not ids:
+        return
+    _escribir(_filas(modelo, modelo.objects.filter(id__in=list(ids))))
+
+
+def desindexar(modelo, ids):
+    """Quita del índice los registros indicados (borrados)."""
+    if not disponible() or not ids:
+        return
+    tipo = TIPOS[modelo]
+    rowids = [i * 4 + tipo for i in ids]
+    marcas = ','.join(['%s'] * len(rowids))
+    with _conexion().cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA} WHERE rowid IN ({marcas})', rowids)
+
+
+def reconstruir():
+    """Vacía el índice y lo vuelve a llenar con todos los registros. Regresa el total."""
+    if not disponible():
+        return 0
+    total = 0
+    with _conexion().cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA}')
+        cursor.execute(f'DELETE FROM {TABLA_VOCABULARIO}')
+        for modelo in TIPOS:
+            lote = []
+            for fila in _filas(modelo, modelo.objects.all()):
+                lote.append(fila)
+                if len(lote) == TAMAÑO_LOTE:
+                    cursor.executemany(INSERTAR, lote)
+                    _agregar_vocabulario(cursor, lote)
+                    total += len(lote)
+                    lote = []
+            if lote:
+                cursor.executemany(INSERTAR, lote)
+                _agregar_vocabulario(cursor, lote)
+                total += len(lote)
+        # Junta los segmentos del índice para que las búsquedas sean rápidas
+        cursor.execute(f"INSERT INTO {TABLA} ({TABLA}) VALUES ('optimize')")
+        cursor.execute(f"INSERT INTO {TABLA_VOCABULARIO}_fts ({TABLA_VOCABULARIO}_fts) VALUES ('optimize')")
+    return total
+
+
+# ---------- Consultas ----------
+
+def _frase(texto):
+    """Texto como frase FTS5 (entre comillas, escapando comillas internas)."""
+    return '"' + texto.replace('"', '""') + '"'
+
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2) if ' ' not in texto[i:i + 3]}
+
+
+def _consultar(expresion, tipo, limite):
+    """
+    Filas (rowid, nombre, texto) que cumplen el MATCH y son de la sucursal
+    activa (o de toda la cadena). Sin ORDER BY rank: así FTS5 se detiene en
+    las primeras `limite` coincidencias en lugar de calificar todas (con
+    500,000 nombres, "queso" coincide con miles).
+    """
+    sql = f'SELECT rowid, nombre, texto FROM {TABLA} WHERE {TABLA} MATCH %s'
+    parametros = [expresion]
+    sucursal_id = sucursal_actual.get()
+    if sucursal_id is not None:
+        sql += ' AND (sucursal_id IS NULL OR sucursal_id = %s)'
+        parametros.append(sucursal_id)
+    if tipo is not None:
+        # rowid % 4 == tipo (el filtro se aplica sobre los resultados del MATCH)
+        sql += ' AND rowid %% 4 = %s'
+        parametros.append(tipo)
+    sql += ' LIMIT %s'
+    parametros.append(limite)
+    with _conexion().cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return cursor.fetchall()
+
+
+def _vocabulario(expresion, limite):
+    with _conexion().cursor() as cursor:
+        cursor.execute(
+            f'SELECT palabra FROM {TABLA_VOCABULARIO}_fts WHERE {TABLA_VOCABULARIO}_fts MATCH %s '
+            'ORDER BY rank LIMIT %s',
+            [expresion, limite],
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _corregir(palabra):
+    """
+    Palabras del vocabulario con las que se debe buscar `palabra`: ella misma
+    si aparece en algún nombre, o si no las más parecidas (errores de dedo).
+    El vocabulario es chico (palabras distintas, no registros), así que
+    comparar con difflib es barato.
+    """
+    trigramas = _trigramas(palabra)
+    if not trigramas or _vocabulario(_frase(palabra), 1):
+        return [palabra]
+    parecidas = []
+    for candidata in _vocabulario(' OR '.join(_frase(t) for t in sorted(trigramas)), CANDIDATOS):
+        parecido = difflib.SequenceMatcher(None, palabra, candidata).ratio()
+        if parecido >= PARECIDO_MINIMO:
+            parecidas.append((-parecido, candidata))
+    if not parecidas:
+        return [palabra]
+    parecidas.sort()
+    # Sólo las que están casi tan cerca como la mejor ("serano" -> "serrano", no "rancho")
+    mejor = -parecidas[0][0]
+    return [c for p, c in parecidas[:CORRECCIONES] if -p >= mejor - MARGEN_CORRECCION]
+
+
+def _resultado(rowid, nombre):
+    tipo, objeto_id = rowid % 4, rowid // 4
+    return {
+        'tipo': NOMBRES_TIPO[tipo],
+        'id': objeto_id,
+        'nombre': nombre,
+        'url': reverse(URLS[tipo], args=[objeto_id]),
+    }
+
+
+def _ordenar(filas, consulta):
+    """Primero los nombres que empiezan con lo escrito, luego los más cortos."""
+    return sorted(filas, key=lambda f: (not f[2].startswith(consulta), len(f[2]), f[0]))
+
+
+def buscar(texto, tipo=None, limite=LIMITE):
+    """
+    Regresa hasta `limite` resultados [{'tipo', 'id', 'nombre', 'url'}, ...].
+    Primero busca el texto tal cual (sin acentos); si no alcanza, completa
+    corrigiendo las palabras que no aparecen tal cual (errores de dedo).
+    """
+    consulta = normalizar(texto)
+    if len(consulta) < LONGITUD_MINIMA:
+        return []
+    if not disponible():
+        return _buscar_sin_indice(texto, tipo, limite)
+
+    # Se leen unos cuantos de más para poder ordenarlos (el admin pide muchos)
+    candidatos = max(limite, CANDIDATOS)
+    # Todas las palabras deben aparecer (en cualquier orden)
+    palabras = [p for p in consulta.split() if len(p) >= LONGITUD_MINIMA] or [consulta]
+    filas = _ordenar(_consultar(' AND '.join(_frase(p) for p in palabras), tipo, candidatos), consulta)
+    if len(filas) < limite:
+        # Aproximada: las palabras que no aparecen en ningún nombre se cambian
+        # por las más parecidas del vocabulario
+        correcciones = [_corregir(palabra) for palabra in palabras]
+        if correcciones != [[palabra] for palabra in palabras]:
+            expresion = ' AND '.join(
+                '(' + ' OR '.join(_frase(o) for o in opciones) + ')' for opciones in correcciones
+            )
+            vistos = {fila[0] for fila in filas}
+            aproximadas = [fila for fila in _consultar(expresion, tipo, candidatos) if fila[0] not in vistos]
+            filas += _ordenar(aproximadas, consulta)
+    return [_resultado(rowid, nombre) for rowid, nombre, _ in filas[:limite]]
+
+
+def ids(modelo, texto, limite=1000):
+    """Ids del modelo que coinciden con el texto (para el buscador del admin)."""
+    tipo = TIPOS[modelo]
+    return [r['id'] for r in buscar(texto, tipo, limite)]
+
+
+def _buscar_sin_indice(texto, tipo, limite):
+    """Respaldo para bases sin FTS5: icontains (recorre la tabla, sin acentos ni errores)."""
+    campos = {PROVEEDOR: 'nombre_proveedor', ARTICULO: 'nombre_articulo', PRODUCTO: 'nombre'}
+    resultados = []
+    for modelo, t in TIPOS.items():
+        if tipo is not None and t != tipo:
+            continue
+        for objeto_id, nombre in modelo.objects.filter(
+            **{f'{campos[t]}__icontains': texto.strip()}
+        ).values_list('id', campos[t])[:limite - len(resultados)]:
+            resultados.append(_resultado(objeto_id * 4 + t, nombre))
+        if len(resultados) >= limite:
+            break
+    return resultados
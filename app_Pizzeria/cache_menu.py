@@ -0,0 +1,120 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .sucursales import etiqueta
+
+# ==========================================
+# CACHÉ DEL MENÚ PÚBLICO
+# ==========================================
+# Todo lo que se guarda del menú lleva en la clave una "versión". Cuando el
+# menú cambia (señales en signals.py) sólo se escribe una versión nueva: las
+# entradas viejas dejan de usarse y expiran solas, sin tener que buscarlas.
+#
+# La versión se genera con el reloj (nanosegundos) en lugar de cache.incr():
+# el backend de archivos no tiene incr atómico entre procesos, y dos procesos
+# que invalidan al mismo tiempo podrían terminar con el mismo número. Con el
+# reloj cada invalidación produce un valor distinto. Si la caché se vacía, la
+# versión nueva tampoco puede repetir una anterior (y con ella un ETag viejo).
+#
+# La versión es una para toda la cadena, pero cada sucursal tiene su menú:
+# las claves y el ETag llevan además la sucursal de la petición.
+#
+# La versión vive en la caché, así que sólo la ve quien comparte la caché:
+# los trabajos en segundo plano invalidan el menú desde otro proceso, y con
+# la caché local de cada proceso (PIZZERIA_CACHE=memoria) los workers web
+# seguirían respondiendo 304 con el ETag viejo. Por eso el trabajador exige
+# una caché compartida (ver compartida()).
+
+CLAVE_VERSION = 'menu:version'
+CLAVE_MODIFICADO = 'menu:modificado'
+DURACION = 60 * 60  # segundos que vive cada página renderizada
+
+
+def _nueva_version():
+    ahora = time.time_ns()
+    cache.set_many({
+        CLAVE_VERSION: ahora,
+        CLAVE_MODIFICADO: ahora // 1_000_000_000,
+    }, timeout=None)
+    return ahora
+
+
+def version_menu():
+    """Versión actual del menú (la crea si la caché está vacía)."""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        version = _nueva_version()
+    return version
+
+
+def ultima_modificacion():
+    """Fecha (UTC, al segundo) del último cambio del menú, para Last-Modified."""
+    segundos = cache.get(CLAVE_MODIFICADO)
+    if segundos is None:
+        segundos = _nueva_version() // 1_000_000_000
+    return datetime.fromtimestamp(segundos, tz=timezone.utc)
+
+
+def invalidar_menu():
+    """
+    Marca el menú como modificado. Se ejecuta al confirmar la transacción:
+    si se hiciera antes, otra petición podría guardar en la versión nueva
+    datos que todavía no están confirmados.
+    """
+    transaction.on_commit(_nueva_version)
+
+
+def compartida():
+    """¿La caché la comparten todos los procesos? (La local de cada proceso no.)"""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def clave(tipo, parametros, version=None):
+    """Clave de caché para una variante (filtros/cursor) del menú."""
+    if version is None:
+        version = version_menu()
+    variante = hashlib.md5(parametros.urlencode().encode()).hexdigest()
+    return f'menu:{tipo}:{etiqueta()}:{version}:{variante}'
+
+
+def obtener(tipo, parametros, calcular, version=None):
+    """Regresa el valor en caché o lo calcula y lo guarda."""
+    llave = clave(tipo, parametros, version)
+    valor = cache.get(llave)
+    if valor is None:
+        valor = calcular()
+        cache.set(llave, valor, DURACION)
+    return valor
+
+
+async def aversion_menu():
+    """version_menu() para vistas async."""
+    version = await cache.aget(CLAVE_VERSION)
+    if version is None:
+        version = _nueva_version()
+    return version
+
+
+async def aobtener(tipo, parametros, calcular, version=None):
+    """obtener() para vistas async: calcular es una función async."""
+    llave = clave(tipo, parametros, version)
+    valor = await cache.aget(llave)
+    if valor is None:
+        valor = await calcular()
+        await cache.aset(llave, valor, DURACION)
+    return valor
+
+
+# ---------- Funciones para @condition (ETag / Last-Modified) ----------
+
+def etag_menu(request, *args, **kwargs):
+    return f'menu-{etiqueta()}-{version_menu()}'
+
+
+def last_modified_menu(request, *args, **kwargs):
+    return ultima_modificacion()
@@ -0,0 +1,12 @@
+import datetime
+
+# ==========================================
+# PROCESADORES DE CONTEXTO
+# ==========================================
+# Se registran en settings.TEMPLATES y agregan sus variables a toda
+# plantilla que se renderiza con un request (render()).
+
+
+def fecha_actual(request):
+    """La fecha del sistema para el pie de página ('fecha_actual')."""
+    return {'fecha_actual': datetime.date.today()}
@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import recetas
+from .cache_menu import invalidar_menu
+from .disponibilidad import actualizar_disponibilidad
+from .models import Menu, RecetaExpandida
+
+# ==========================================
+# SERVICIO: Costo de receta y margen de los productos
+# ==========================================
+# Menu.costo_receta guarda el costo de los ingredientes de cada producto.
+# Se recalcula con un UPDATE ... SET costo_receta = (SELECT SUM(...)) que
+# corre por completo dentro de la base de datos, y sólo para los productos
+# afectados: si cambia el costo del queso, únicamente los productos cuya
+# receta lo usa, directamente o dentro de una preparación (RecetaExpandida,
+# ver recetas.py).
+#
+# Un cambio en la receta también cambia su expansión y puede cambiar la
+# disponibilidad del producto (disponibilidad.py): marcar_productos() vuelve
+# a expandir la receta y recalcula las dos cosas.
+
+# Máximo de ids por sentencia (límite de parámetros de SQLite)
+TAMAÑO_LOTE = 500
+
+DECIMAL = DecimalField(max_digits=12, decimal_places=2)
+
+# Productos pendientes de recalcular dentro de recalculo_agrupado()
+_pendientes = ContextVar('costos_pendientes', default=None)
+
+
+def costo_por_producto():
+    """Expresión con el costo de la receta del producto (OuterRef 'pk')."""
+    suma = (
+        RecetaExpandida.objects.filter(menu_id=OuterRef('pk'))
+        .values('menu_id')
+        .annotate(total=Sum(F('cantidad') * F('inventario__costo_unitario'), output_field=DECIMAL))
+        .values('total')
+    )
+    return Coalesce(Subquery(suma, output_field=DECIMAL), Value(Decimal('0')), output_field=DECIMAL)
+
+
+def con_costos(queryset=None):
+    """
+    Productos con el costo y el margen calculados al momento (costo_actual,
+    margen_actual) en una sola consulta agregada. Sirve para reportes y para
+    verificar que costo_receta está al día.
+    """
+    if queryset is None:
+        queryset = Menu.objects.all()
+    return queryset.annotate(
+        costo_actual=Coalesce(
+            Sum(
+                F('receta_expandida__cantidad') * F('receta_expandida__inventario__costo_unitario'),
+                output_field=DECIMAL,
+            ),
+            Value(Decimal('0')),
+            output_field=DECIMAL,
+        ),
+    ).annotate(margen_actual=F('precio') - F('costo_actual'))
+
+
+def recalcular_costos(menu_ids=None):
+    """
+    Recalcula costo_receta de los productos indicados (todos si es None).
+    Regresa el número de productos actualizados.
+    """
+    if menu_ids is None:
+        actualizados = Menu.objects.update(costo_receta=costo_por_producto())
+    else:
+        menu_ids = sorted(set(menu_ids))
+        actualizados = 0
+        for inicio in range(0, len(menu_ids), TAMAÑO_LOTE):
+            lote = menu_ids[inicio:inicio + TAMAÑO_LOTE]
+            actualizados += Menu.objects.filter(id__in=lote).update(costo_receta=costo_por_producto())
+    if actualizados:
+        invalidar_menu()
+    return actualizados
+
+
+def recalcular_por_articulos(inventario_ids):
+    """
+    Recalcula sólo los productos que usan alguno de los artículos indicados.
+    Los productos se buscan con una subconsulta sobre RecetaExpandida, así
+    que es una sola sentencia UPDATE por lote de artículos.
+    """
+    inventario_ids = sorted(set(inventario_ids))
+    actualizados = 0
+    for inicio in range(0, len(inventario_ids), TAMAÑO_LOTE):
+        lote = inventario_ids[inicio:inicio + TAMAÑO_LOTE]
+        afectados = RecetaExpandida.objects.filter(inventario_id__in=lote).values('menu_id')
+        actualizados += Menu.objects.filter(id__in=afectados).update(costo_receta=costo_por_producto())
+    if actualizados:
+        invalidar_menu()
+    return actualizados
+
+
+def _recalcular_recetas(menu_ids):
+    recetas.expandir_productos(menu_ids)
+    recalcular_costos(menu_ids)
+    actualizar_disponibilidad(menu_ids)
+
+
+def marcar_productos(menu_ids):
+    """
+    Pide recalcular costo y disponibilidad de los productos indicados (les
+    cambió la receta): de inmediato, o al final de recalculo_agrupado() si hay
+    uno activo.
+    """
+    pendientes = _pendientes.get()
+    if pendientes is None:
+        _recalcular_recetas(menu_ids)
+    else:
+        pendientes.update(menu_ids)
+
+
+@contextmanager
+def recalculo_agrupado():
+    """
+    Junta los recálculos que piden las señales (por ejemplo, al borrar muchas
+    recetas) y los hace con un solo UPDATE al salir del bloque.
+    """
+    pendientes = set()
+    token = _pendientes.set(pendientes)
+    try:
+        yield pendientes
+    finally:
+        _pendientes.reset(token)
+    if pendientes:
+        _recalcular_recetas(pendientes)
@@ -0,0 +1,133 @@
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q
+from django.db.models.functions import Round
+
+from . import eventos
+from .cache_menu import invalidar_menu
+from .models import Inventario, Menu, RecetaExpandida
+
+# ==========================================
+# SERVICIO: Disponibilidad de los productos según el stock
+# ==========================================
+# Menu.disponible ya no se marca a mano: un producto está disponible si el
+# gerente lo tiene a la venta (Menu.habilitado) y hay stock de cada artículo
+# de su receta para al menos una pieza (stock >= cantidad). Se guarda
+# desnormalizado para que el menú, los pedidos y la cocina sólo lo lean. La
+# receta que cuenta es la expandida (RecetaExpandida, ver recetas.py): los
+# artículos de la masa o la salsa también pueden dejar sin stock la pizza.
+#
+# Cuando cambia el stock de un artículo sólo pueden cambiar los productos que
+# lo usan (el índice de RecetaExpandida por artículo) y, de ésos, sólo
+# aquéllos cuya cantidad en la receta quedó entre el stock anterior y el
+# nuevo. Si el queso baja de 3 a 2.5 kg, la pizza que lleva 0.25 kg no se
+# toca; si llega a 0.2 kg, sólo las recetas que piden más de 0.2 y hasta 2.5.
+# RecetaExpandida tiene un índice (inventario, cantidad): los umbrales
+# cruzados son un rango del índice aunque el artículo esté en miles de
+# recetas. Los productos que sí cambian se escriben con un UPDATE por lote de
+# artículos (la condición se evalúa en la base, como en costos.py) y se avisa
+# a la caché del menú y a las pantallas de cocina.
+
+# Máximo de artículos por sentencia (límite de parámetros de SQLite)
+TAMAÑO_LOTE = 400
+
+# SQLite resta los decimales como REAL (1 - 0.8 queda en 0.19999999999999996):
+# el stock se compara redondeado a sus decimales, como lo lee el ORM
+DECIMALES_STOCK = Inventario._meta.get_field('stock').decimal_places
+
+
+def disponible_por_producto():
+    """Expresión: habilitado y sin artículos con menos stock del que pide la receta (OuterRef 'pk')."""
+    faltante = RecetaExpandida.objects.filter(
+        menu_id=OuterRef('pk'), cantidad__gt=Round('inventario__stock', DECIMALES_STOCK),
+    )
+    return ExpressionWrapper(Q(habilitado=True) & ~Exists(faltante), output_field=BooleanField())
+
+
+def _aplicar(productos):
+    """
+    Escribe la disponibilidad calculada en los productos del queryset cuyo
+    valor guardado ya no coincide. Regresa cuántos cambiaron.
+    """
+    calculada = disponible_por_producto()
+    cambian = productos.exclude(disponible=calculada)
+    if eventos.activo():
+        # Con pantallas conectadas hay que saber cuáles cambiaron
+        ids = list(cambian.values_list('id', flat=True))
+        if not ids:
+            return 0
+        cambiados = Menu.objects.filter(id__in=ids).update(disponible=calculada)
+        eventos.disponibilidad_modificada(ids)
+    else:
+        cambiados = cambian.update(disponible=calculada)
+    if cambiados:
+        invalidar_menu()
+    return cambiados
+
+
+def actualizar_disponibilidad(menu_ids=None):
+    """
+    Recalcula la disponibilidad de los productos indicados (todos si es None).
+    Regresa el número de productos que cambiaron.
+    """
+    if menu_ids is None:
+        return _aplicar(Menu.objects.all())
+    menu_ids = sorted(set(menu_ids))
+    cambiados = 0
+    for inicio in range(0, len(menu_ids), TAMAÑO_LOTE):
+        cambiados += _aplicar(Menu.objects.filter(id__in=menu_ids[inicio:inicio + TAMAÑO_LOTE]))
+    return cambiados
+
+
+def _cruce(articulo_id, stock, diferencia):
+    """
+    Recetas del artículo cuyo umbral cruzó el stock: con el stock nuevo y el
+    anterior (nuevo - diferencia), las que piden una cantidad en (menor, mayor].
+    Con el índice (inventario, cantidad) de RecetaExpandida es un rango del índice.
+    """
+    anterior = stock - diferencia
+    return Q(inventario_id=articulo_id, cantidad__gt=min(stock, anterior), cantidad__lte=max(stock, anterior))
+
+
+def por_ajustes(ajustes, stocks=None):
+    """
+    Recalcula sólo los productos a los que pudo cambiarles la disponibilidad
+    después de sumar {inventario_id: diferencia} al stock. Debe llamarse
+    después del UPDATE del stock (en la misma transacción); `stocks` es
+    {inventario_id: stock nuevo} si quien llama ya lo leyó.
+    """
+    cambios = {i: Decimal(str(d)) for i, d in ajustes.items() if d}
+    ids = sorted(cambios)
+    afectados = set()
+    for inicio in range(0, len(ids), TAMAÑO_LOTE):
+        lote = ids[inicio:inicio + TAMAÑO_LOTE]
+        if stocks is None:
+            # Leído como lo lee el ORM (redondeado a sus decimales)
+            nuevos = Inventario.objects.filter(id__in=lote).values_list('id', 'stock')
+        else:
+            nuevos = [(i, stocks[i]) for i in lote if i in stocks]
+        cruces = [_cruce(i, stock, cambios[i]) for i, stock in nuevos]
+        if cruces:
+            afectados.update(RecetaExpandida.objects.filter(reduce(or_, cruces)).values_list('menu_id', flat=True))
+    # Casi siempre vacío: ningún umbral quedó entre el stock anterior y el nuevo
+    return actualizar_disponibilidad(afectados) if afectados else 0
+
+
+def por_diferencias(anteriores, articulos):
+    """
+    por_ajustes() a partir del stock anterior {inventario_id: stock} y de los
+    artículos ya guardados (como movimientos.registrar_diferencias). Los que
+    no estaban en `anteriores` son nuevos y todavía no están en ninguna receta.
+    """
+    stocks = {a.id: Decimal(str(a.stock)) for a in articulos if a.id in anteriores}
+    return por_ajustes({i: stock - anteriores[i] for i, stock in stocks.items()}, stocks)
+
+
+def diferencias():
+    """Productos cuyo 'disponible' guardado no coincide con el stock: [(id, nombre, guardado), ...]."""
+    return list(
+        Menu.objects.exclude(disponible=disponible_por_producto())
+        .order_by('id').values_list('id', 'nombre', 'disponible')
+    )
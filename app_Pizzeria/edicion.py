@@ -0,0 +1,123 @@
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import F
+
+# ==========================================
+# EDICIÓN CON CONTROL DE CONCURRENCIA OPTIMISTA
+# ==========================================
+# El formulario de edición lleva un campo oculto 'original' con el id, la
+# versión y los valores que se mostraron, firmado (django.core.signing) para
+# que no se pueda alterar. Al guardar:
+#
+#   1. Se comparan los valores enviados con los originales: sólo se escriben
+#      los campos que el usuario cambió.
+#   2. Se escriben con un solo UPDATE ... SET <cambios>, version = version + 1
+#      WHERE id = %s AND version = %s. Sin get() previo, y si otro usuario
+#      guardó mientras tanto (la versión ya no coincide) no se actualiza
+#      ninguna fila y se lanza Conflicto: el cambio del otro no se pierde.
+#
+# La firma lleva el modelo (en la sal): el 'original' de un producto no sirve
+# para guardar el artículo de inventario con el mismo id.
+#
+# queryset.update() no envía señales, así que quien guarda se encarga de la
+# bitácora, los costos, el índice de búsqueda y la caché (ver views.py).
+
+SAL = 'pizzeria.edicion'
+
+
+def _sal(modelo):
+    return f'{SAL}:{modelo._meta.label}'
+
+
+class Conflicto(Exception):
+    """Otro usuario guardó el registro después de que se abrió el formulario."""
+
+
+class EdicionInvalida(Exception):
+    """El formulario no trae un 'original' válido o algún valor no se puede convertir."""
+
+
+def _a_json(valor):
+    if valor is None or isinstance(valor, (bool, int, str)):
+        return valor
+    return str(valor)  # Decimal, date
+
+
+def firmar(objeto, campos, **extras):
+    """Valor del campo oculto 'original' para el formulario de `objeto`."""
+    opciones = objeto._meta
+    datos = {
+        'id': objeto.pk,
+        'version': objeto.version,
+        'campos': {c: _a_json(opciones.get_field(c).value_from_object(objeto)) for c in campos},
+    }
+    datos.update(extras)
+    return signing.dumps(datos, salt=_sal(type(objeto)), compress=True)
+
+
+def valor_formulario(campo, datos):
+    """Convierte lo que envió el formulario al tipo del campo del modelo."""
+    if isinstance(campo, models.BooleanField):
+        return campo.name in datos  # checkbox: sólo llega si está marcado
+    valor = datos.get(campo.name, '')
+    if valor == '':
+        if campo.null:
+            return None
+        return campo.to_python(campo.get_default()) if campo.has_default() else ''
+    return campo.to_python(valor)
+
+
+class Edicion:
+    """
+    Cambios de un formulario de edición de `modelo` respecto a lo que se
+    mostró. Lanza EdicionInvalida si el 'original' fue alterado o algún
+    valor no es válido.
+    """
+
+    def __init__(self, modelo, campos, datos):
+        self.modelo = modelo
+        try:
+            self.original = signing.loads(datos.get('original', ''), salt=_sal(modelo))
+        except signing.BadSignature:
+            raise EdicionInvalida("El formulario no es válido, vuelva a abrirlo.")
+        self.id = self.original['id']
+        self.version = self.original['version']
+        self.originales = {}
+        self.nuevos = {}
+        try:
+            for nombre in campos:
+                campo = modelo._meta.get_field(nombre)
+                anterior = self.original['campos'].get(nombre)
+                self.originales[nombre] = None if anterior is None else campo.to_python(anterior)
+                self.nuevos[nombre] = valor_formulario(campo, datos)
+        except ValidationError as e:
+            raise EdicionInvalida(f"'{campo.verbose_name}': {' '.join(e.messages)}")
+        # Nombre del campo -> valor nuevo, sólo los que cambiaron
+        self.cambios = {c: v for c, v in self.nuevos.items() if v != self.originales[c]}
+
+    def guardar(self, forzar=False, **expresiones):
+        """
+        UPDATE con los campos cambiados y version + 1, condicionado a la
+        versión leída. `expresiones` (p. ej. un F()) reemplazan el valor de
+        un campo cambiado. Con forzar=True sube la versión aunque no cambie
+        ningún campo (p. ej. sólo cambió la receta).
+        Regresa False si no había nada que guardar; lanza Conflicto o
+        modelo.DoesNotExist.
+        """
+        opciones = self.modelo._meta
+        valores = {opciones.get_field(c).attname: v for c, v in {**self.cambios, **expresiones}.items()}
+        if not valores and not forzar:
+            return False
+        actualizadas = (
+            self.modelo.objects.filter(pk=self.id, version=self.version)
+            .update(version=F('version') + 1, **valores)
+        )
+        if not actualizadas:
+            if self.modelo.objects.filter(pk=self.id).exists():
+                raise Conflicto(
+                    "Otro usuario guardó este registro mientras usted lo editaba. "
+                    "Estos son los datos actuales; vuelva a aplicar sus cambios."
+                )
+            raise self.modelo.DoesNotExist
+        return True
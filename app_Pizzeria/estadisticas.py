@@ -0,0 +1,238 @@
+from decimal import Decimal
+
+from django.db import connection as conexion_predeterminada, transaction
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Proveedores, Inventario, EstadisticasProveedor, sucursal_actual
+
+# ==========================================
+# SERVICIO: Estadísticas por proveedor (contadores desnormalizados)
+# ==========================================
+# EstadisticasProveedor guarda, por proveedor y sucursal, cuántos artículos
+# tiene, el valor de su stock (stock * costo_unitario) y cuántos están bajo el
+# mínimo, para que ver_proveedores los muestre sin agregar todo el
+# inventario. Los proveedores son de toda la cadena pero el inventario es de
+# cada sucursal: la lista de proveedores muestra los de la sucursal activa
+# (con_estadisticas(), sumados si no hay ninguna).
+#
+# Los mantienen triggers de la base de datos y no señales: el stock cambia
+# casi siempre por UPDATE masivos con F() (pedidos, importación, API, edición
+# concurrente) que no envían señales, y el SET_NULL de los artículos al borrar
+# un proveedor también es un UPDATE directo. Cada INSERT/UPDATE/DELETE de un
+# artículo resta lo que aportaba antes a su (proveedor, sucursal) y suma lo
+# que aporta ahora (si cambió de proveedor, uno resta y el otro suma).
+#
+# Los triggers se (re)instalan después de cada `migrate` (señal post_migrate):
+# en SQLite, una migración que reconstruye la tabla de inventario los borra.
+# El comando estadisticas_proveedores reconstruye todo desde cero o, con
+# --verificar, compara lo guardado contra el cálculo completo.
+#
+# Sólo SQLite y PostgreSQL: en otras bases no hay triggers y la tabla queda vacía.
+
+DECIMAL = DecimalField(max_digits=18, decimal_places=4)
+
+TABLAS = {
+    'inventario': Inventario._meta.db_table,
+    'proveedores': Proveedores._meta.db_table,
+    'estadisticas': EstadisticasProveedor._meta.db_table,
+}
+PROVEEDOR = Inventario._meta.get_field('proveedor').column
+
+# SQLite: decimales como REAL; ROUND evita que se acumule el error de redondeo.
+# (estadisticas_proveedor_alta creaba el renglón en ceros de cada proveedor
+# cuando había uno por proveedor; se sigue borrando al reinstalar.)
+_SQLITE = [
+    'DROP TRIGGER IF EXISTS estadisticas_proveedor_alta',
+    'DROP TRIGGER IF EXISTS estadisticas_articulo_alta',
+    'DROP TRIGGER IF EXISTS estadisticas_articulo_baja',
+    'DROP TRIGGER IF EXISTS estadisticas_articulo_cambio',
+    '''
+    CREATE TRIGGER estadisticas_articulo_alta AFTER INSERT ON {inventario}
+    WHEN new.{proveedor} IS NOT NULL BEGIN
+        {sumar};
+    END
+    ''',
+    '''
+    CREATE TRIGGER estadisticas_articulo_baja AFTER DELETE ON {inventario}
+    WHEN old.{proveedor} IS NOT NULL BEGIN
+        {restar};
+    END
+    ''',
+    '''
+    CREATE TRIGGER estadisticas_articulo_cambio
+    AFTER UPDATE OF stock, stock_minimo, costo_unitario, {proveedor}, sucursal_id ON {inventario}
+    WHEN old.{proveedor} IS NOT new.{proveedor} OR old.sucursal_id IS NOT new.sucursal_id
+        OR old.stock IS NOT new.stock OR old.costo_unitario IS NOT new.costo_unitario
+        OR old.bajo_minimo IS NOT new.bajo_minimo
+    BEGIN
+        {restar};
+        {sumar};
+    END
+    ''',
+]
+_SQLITE_SUMAR = '''
+    INSERT INTO {estadisticas} (proveedor_id, sucursal_id, articulos, valor_stock, articulos_bajo_minimo)
+    SELECT new.{proveedor}, new.sucursal_id, 1, ROUND(new.stock * new.costo_unitario, 4), new.bajo_minimo
+    WHERE new.{proveedor} IS NOT NULL
+    ON CONFLICT (proveedor_id, sucursal_id) DO UPDATE SET
+        articulos = articulos + 1,
+        valor_stock = ROUND(valor_stock + excluded.valor_stock, 4),
+        articulos_bajo_minimo = articulos_bajo_minimo + excluded.articulos_bajo_minimo
+'''
+_SQLITE_RESTAR = '''
+    UPDATE {estadisticas} SET
+        articulos = articulos - 1,
+        valor_stock = ROUND(valor_stock - old.stock * old.costo_unitario, 4),
+        articulos_bajo_minimo = articulos_bajo_minimo - old.bajo_minimo
+    WHERE proveedor_id = old.{proveedor} AND sucursal_id = old.sucursal_id
+'''
+
+# PostgreSQL: una función y triggers FOR EACH ROW
+_POSTGRES = [
+    '''
+    CREATE OR REPLACE FUNCTION estadisticas_articulo() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' AND OLD.{proveedor} IS NOT NULL THEN
+            UPDATE {estadisticas} SET
+                articulos = articulos - 1,
+                valor_stock = valor_stock - OLD.stock * OLD.costo_unitario,
+                articulos_bajo_minimo = articulos_bajo_minimo - OLD.bajo_minimo::int
+            WHERE proveedor_id = OLD.{proveedor} AND sucursal_id = OLD.sucursal_id;
+        END IF;
+        IF TG_OP <> 'DELETE' AND NEW.{proveedor} IS NOT NULL THEN
+            INSERT INTO {estadisticas} AS e (proveedor_id, sucursal_id, articulos, valor_stock, articulos_bajo_minimo)
+            VALUES (NEW.{proveedor}, NEW.sucursal_id, 1, NEW.stock * NEW.costo_unitario, NEW.bajo_minimo::int)
+            ON CONFLICT (proveedor_id, sucursal_id) DO UPDATE SET
+                articulos = e.articulos + 1,
+                valor_stock = e.valor_stock + EXCLUDED.valor_stock,
+                articulos_bajo_minimo = e.articulos_bajo_minimo + EXCLUDED.articulos_bajo_minimo;
+        END IF;
+        RETURN NULL;
+    END $$
+    ''',
+    'DROP TRIGGER IF EXISTS estadisticas_proveedor_alta ON {proveedores}',
+    'DROP FUNCTION IF EXISTS estadisticas_proveedor_alta()',
+    'DROP TRIGGER IF EXISTS estadisticas_articulo_alta_baja ON {inventario}',
+    'DROP TRIGGER IF EXISTS estadisticas_articulo_cambio ON {inventario}',
+    '''
+    CREATE TRIGGER estadisticas_articulo_alta_baja AFTER INSERT OR DELETE ON {inventario}
+    FOR EACH ROW EXECUTE FUNCTION estadisticas_articulo()
+    ''',
+    '''
+    CREATE TRIGGER estadisticas_articulo_cambio
+    AFTER UPDATE OF stock, stock_minimo, costo_unitario, {proveedor}, sucursal_id ON {inventario}
+    FOR EACH ROW WHEN (
+        OLD.{proveedor} IS DISTINCT FROM NEW.{proveedor} OR OLD.sucursal_id IS DISTINCT FROM NEW.sucursal_id
+        OR OLD.stock IS DISTINCT FROM NEW.stock OR OLD.costo_unitario IS DISTINCT FROM NEW.costo_unitario
+        OR OLD.bajo_minimo IS DISTINCT FROM NEW.bajo_minimo
+    ) EXECUTE FUNCTION estadisticas_articulo()
+    ''',
+]
+
+# Recálculo completo (un renglón por proveedor y sucursal con artículos)
+_RECONSTRUIR = '''
+    INSERT INTO {estadisticas} (proveedor_id, sucursal_id, articulos, valor_stock, articulos_bajo_minimo)
+    SELECT i.{proveedor}, i.sucursal_id, COUNT(*), ROUND(SUM(i.stock * i.costo_unitario), 4),
+           COUNT(CASE WHEN i.bajo_minimo THEN 1 END)
+    FROM {inventario} i
+    WHERE i.{proveedor} IS NOT NULL
+    GROUP BY i.{proveedor}, i.sucursal_id
+'''
+
+
+def disponible(conexion=None):
+    return (conexion or conexion_predeterminada).vendor in ('sqlite', 'postgresql')
+
+
+def _sql(plantilla, conexion):
+    nombres = {clave: conexion.ops.quote_name(tabla) for clave, tabla in TABLAS.items()}
+    nombres['proveedor'] = conexion.ops.quote_name(PROVEEDOR)
+    if conexion.vendor == 'sqlite':
+        nombres['sumar'] = _SQLITE_SUMAR.format(**nombres)
+        nombres['restar'] = _SQLITE_RESTAR.format(**nombres)
+    return plantilla.format(**nombres)
+
+
+def instalar(conexion=None):
+    """
+    (Re)crea los triggers. Regresa False si la base no los soporta o todavía
+    no existen las tablas (migración parcial).
+    """
+    conexion = conexion or conexion_predeterminada
+    if not disponible(conexion) or not set(TABLAS.values()) <= set(conexion.introspection.table_names()):
+        return False
+    sentencias = _SQLITE if conexion.vendor == 'sqlite' else _POSTGRES
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        for plantilla in sentencias:
+            cursor.execute(_sql(plantilla, conexion))
+    return True
+
+
+def reconstruir():
+    """Vuelve a calcular las estadísticas de todos los proveedores. Regresa cuántos renglones (proveedor, sucursal)."""
+    conexion = conexion_predeterminada
+    with transaction.atomic(), conexion.cursor() as cursor:
+        if conexion.vendor == 'postgresql':
+            # Sin escrituras al inventario mientras tanto: se perderían sus cambios
+            cursor.execute(_sql('LOCK TABLE {inventario} IN SHARE MODE', conexion))
+        # (En SQLite el DELETE toma el candado de escritura hasta el final)
+        cursor.execute(_sql('DELETE FROM {estadisticas}', conexion))
+        cursor.execute(_sql(_RECONSTRUIR, conexion))
+        return cursor.rowcount
+
+
+def con_estadisticas(queryset):
+    """
+    Agrega a los proveedores de `queryset` num_articulos, valor_stock y
+    articulos_bajo_minimo de sus artículos en la sucursal activa (de toda la
+    cadena si no hay ninguna): subconsultas sobre el índice único
+    (proveedor, sucursal), en la misma consulta que la página.
+    """
+    renglones = EstadisticasProveedor.objects.filter(proveedor=OuterRef('pk'))
+    sucursal_id = sucursal_actual.get()
+    if sucursal_id is not None:
+        renglones = renglones.filter(sucursal_id=sucursal_id)
+
+    def suma(campo, tipo):
+        total = renglones.order_by().values('proveedor').annotate(total=Sum(campo)).values('total')
+        return Coalesce(Subquery(total, output_field=tipo), Value(0), output_field=tipo)
+
+    return queryset.annotate(
+        num_articulos=suma('articulos', IntegerField()),
+        valor_stock=suma('valor_stock', DECIMAL),
+        articulos_bajo_minimo=suma('articulos_bajo_minimo', IntegerField()),
+    )
+
+
+def diferencias():
+    """
+    Renglones (proveedor, sucursal) cuyas estadísticas guardadas no coinciden
+    con el cálculo completo, como [(proveedor_id, sucursal_id, guardadas,
+    calculadas), ...] con tuplas (artículos, valor del stock, bajo el mínimo).
+    Un renglón que falta cuenta como ceros. Para verificar los triggers.
+    """
+    ceros = (0, Decimal('0'), 0)
+    calculadas = {
+        (proveedor_id, sucursal_id): (total, valor, bajo)
+        for proveedor_id, sucursal_id, total, valor, bajo in Inventario._base_manager.filter(
+            proveedor__isnull=False,
+        ).values_list('proveedor', 'sucursal').annotate(
+            total=Count('id'),
+            valor=Sum(F('stock') * F('costo_unitario'), output_field=DECIMAL),
+            bajo=Count('id', filter=Q(bajo_minimo=True)),
+        ).order_by().iterator(chunk_size=2000)
+    }
+    guardadas = {
+        (proveedor_id, sucursal_id): tuple(valores)
+        for proveedor_id, sucursal_id, *valores in EstadisticasProveedor.objects.values_list(
+            'proveedor_id', 'sucursal_id', 'articulos', 'valor_stock', 'articulos_bajo_minimo',
+        ).iterator(chunk_size=2000)
+    }
+    distintas = []
+    for clave in sorted(calculadas.keys() | guardadas.keys()):
+        # Se compara en Python: SQLite suma los decimales como punto flotante
+        guardada, calculada = guardadas.get(clave, ceros), calculadas.get(clave, ceros)
+        if guardada != calculada:
+            distintas.append((*clave, guardada, calculada))
+    return distintas
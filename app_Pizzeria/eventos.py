@@ -0,0 +1,483 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+from collections import deque
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.http import HttpResponse, QueryDict, StreamingHttpResponse
+from django.http.cookie import parse_cookie
+from django.http.request import split_domain_port, validate_host
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from . import sucursales
+from .models import Menu, Pedido, DetallePedido, Sucursal
+
+# ==========================================
+# EVENTOS EN VIVO (pantallas de cocina, server-sent events)
+# ==========================================
+# GET /eventos/cocina/ es un flujo SSE (text/event-stream): al conectarse la
+# pantalla recibe el estado completo ('estado': pedidos en cocina y productos
+# no disponibles) y después sólo los cambios ('pedido', 'menu'), en lugar de
+# pedir la página cada pocos segundos.
+#
+# - Los cambios se publican al confirmar la transacción (señales, vistas,
+#   API, importación) en un canal dentro del proceso. Cada conexión tiene su
+#   propia cola acotada (settings.EVENTOS_BUFFER): si una pantalla no lee a
+#   tiempo se descarta lo pendiente y se le vuelve a mandar el estado
+#   completo, así que una pantalla lenta nunca acumula memoria.
+# - Un evento se serializa una sola vez y todas las colas comparten los mismos
+#   bytes; cada conexión sólo cuesta su cola y su tarea de asyncio.
+# - Con varios procesos (uvicorn --workers N) cada uno tiene sus pantallas:
+#   con settings.EVENTOS_BROKER (un socket Unix, comando broker_eventos) los
+#   eventos pasan por el broker y llegan a las pantallas de todos.
+# - Bajo ASGI (backend_Pizzeria/asgi.py) el flujo se atiende antes de llegar
+#   al manejador de Django, que ocupa un hilo y una conexión a la base por
+#   petición mientras ésta dure: las pantallas sólo ocupan una tarea.
+# - Bajo WSGI no hay conexiones largas: se manda el estado y 'retry' hace que
+#   el navegador vuelva a pedirlo (EventSource se reconecta solo).
+# - Cada pantalla es de una sucursal (?sucursal=, X-Sucursal o la cookie, como
+#   en SucursalMiddleware): su estado sólo trae lo de ella y cada evento lleva
+#   la clave de la sucursal de su pedido o producto, así que una pantalla no
+#   recibe los de otras. Se usa la clave y no el id: con una base por
+#   sucursal los ids de las sucursales se repiten.
+
+registro = logging.getLogger('pizzeria.eventos')
+
+# Estados que se muestran en la cocina y máximo de pedidos en el estado inicial
+EN_COCINA = ('pendiente', 'preparando')
+MAXIMO_COCINA = 200
+
+# Milisegundos que espera EventSource para reconectarse (bajo WSGI, cada cuánto
+# vuelve a pedir el estado)
+REINTENTO_MS = 3000
+REINTENTO_WSGI_MS = 10000
+
+# Primera línea con la que un proceso se suscribe al broker
+SUSCRIBIR = b'SUSCRIBIR\n'
+# Bytes pendientes de enviar a un proceso antes de que el broker lo desconecte
+LIMITE_BROKER = 1 << 20
+
+
+class Evento:
+    """
+    Un evento ya serializado: `trama` es lo que se escribe en el flujo SSE.
+    `sucursal` es la clave de la sucursal a la que va (None = a todas).
+    """
+    __slots__ = ('tipo', 'texto', 'sucursal', 'trama')
+
+    def __init__(self, tipo, texto, sucursal=None):
+        self.tipo = tipo
+        self.texto = texto
+        self.sucursal = sucursal
+        self.trama = f'event: {tipo}\ndata: {texto}\n\n'.encode()
+
+    @classmethod
+    def crear(cls, tipo, datos, sucursal=None):
+        texto = json.dumps(datos, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False)
+        return cls(tipo, texto, sucursal)
+
+    def linea(self):
+        """Forma en que viaja por el broker (una línea por evento; '*' = todas las sucursales)."""
+        return f'{self.tipo} {self.sucursal or "*"} {self.texto}\n'.encode()
+
+    @classmethod
+    def desde_linea(cls, linea):
+        tipo, sucursal, texto = linea.decode().rstrip('\n').split(' ', 2)
+        return cls(tipo, texto, None if sucursal == '*' else sucursal)
+
+
+class Suscriptor:
+    """
+    La cola acotada de una conexión. Sólo se usa desde el hilo de su loop.
+    `sucursal` es la clave de la sucursal de la pantalla (None = todas).
+    """
+    __slots__ = ('loop', 'pendientes', 'limite', 'atrasado', 'aviso', 'sucursal')
+
+    def __init__(self, loop, limite, sucursal=None):
+        self.loop = loop
+        self.sucursal = sucursal
+        self.pendientes = deque()
+        self.limite = limite
+        self.atrasado = False
+        self.aviso = asyncio.Event()
+
+    def entregar(self, evento):
+        if self.atrasado:
+            return  # ya va a recibir el estado completo
+        if len(self.pendientes) >= self.limite:
+            # Pantalla lenta: en lugar de acumular, se descarta lo pendiente
+            self.pendientes.clear()
+            self.atrasado = True
+        else:
+            self.pendientes.append(evento)
+        self.aviso.set()
+
+
+def _entregar(suscriptores, evento):
+    for suscriptor in suscriptores:
+        # Cada pantalla sólo recibe lo de su sucursal
+        if evento.sucursal is None or suscriptor.sucursal in (None, evento.sucursal):
+            suscriptor.entregar(evento)
+
+
+class Canal:
+    """Suscriptores de este proceso, agrupados por event loop."""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._por_loop = {}
+
+    def suscribir(self, limite=None, sucursal=None):
+        """Registra una conexión (de la sucursal `sucursal`) en el loop actual."""
+        loop = asyncio.get_running_loop()
+        suscriptor = Suscriptor(loop, limite or settings.EVENTOS_BUFFER, sucursal)
+        with self._candado:
+            self._por_loop.setdefault(loop, set()).add(suscriptor)
+        if settings.EVENTOS_BROKER:
+            _escuchar_broker(loop)
+        return suscriptor
+
+    def cancelar(self, suscriptor):
+        with self._candado:
+            grupo = self._por_loop.get(suscriptor.loop)
+            if grupo is not None:
+                grupo.discard(suscriptor)
+                if not grupo:
+                    del self._por_loop[suscriptor.loop]
+
+    def del_loop(self, loop):
+        with self._candado:
+            return tuple(self._por_loop.get(loop, ()))
+
+    def total(self):
+        with self._candado:
+            return sum(len(grupo) for grupo in self._por_loop.values())
+
+    def repartir(self, evento):
+        """Entrega el evento a las conexiones de este proceso (desde cualquier hilo)."""
+        with self._candado:
+            grupos = [(loop, tuple(grupo)) for loop, grupo in self._por_loop.items()]
+        for loop, suscriptores in grupos:
+            try:
+                # Una sola llamada por loop, no una por conexión
+                loop.call_soon_threadsafe(_entregar, suscriptores, evento)
+            except RuntimeError:
+                pass  # el loop ya se cerró
+
+
+canal = Canal()
+
+
+# ---------- Broker (varios procesos) ----------
+
+class _Publicador:
+    """Conexión (síncrona, una por proceso) para enviar eventos al broker."""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._socket = None
+
+    def enviar(self, evento):
+        with self._candado:
+            try:
+                if self._socket is None:
+                    conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    conexion.settimeout(1)
+                    conexion.connect(settings.EVENTOS_BROKER)
+                    self._socket = conexion
+                self._socket.sendall(evento.linea())
+                return True
+            except OSError as e:
+                registro.warning("No se pudo enviar al broker de eventos: %s", e)
+                if self._socket is not None:
+                    self._socket.close()
+                self._socket = None
+                return False
+
+
+_publicador = _Publicador()
+_escuchas = {}
+
+
+def _escuchar_broker(loop):
+    """Arranca (una vez por loop) la tarea que recibe los eventos del broker."""
+    tarea = _escuchas.get(loop)
+    if tarea is None or tarea.done():
+        _escuchas[loop] = loop.create_task(_recibir_del_broker(loop))
+
+
+async def _recibir_del_broker(loop):
+    while True:
+        try:
+            lector, escritor = await asyncio.open_unix_connection(settings.EVENTOS_BROKER)
+            escritor.write(SUSCRIBIR)
+            await escritor.drain()
+            while linea := await lector.readline():
+                _entregar(canal.del_loop(loop), Evento.desde_linea(linea))
+            escritor.close()
+        except OSError as e:
+            registro.warning("Sin conexión con el broker de eventos: %s", e)
+        # Lo publicado mientras tanto se perdió: las pantallas piden el estado
+        for suscriptor in canal.del_loop(loop):
+            suscriptor.atrasado = True
+            suscriptor.aviso.set()
+        await asyncio.sleep(1)
+
+
+async def servir_broker(ruta):
+    """
+    Broker local: reenvía cada línea que recibe a todos los procesos
+    suscritos. Un proceso que no lee (más de LIMITE_BROKER bytes pendientes)
+    se desconecta; al reconectarse sus pantallas reciben el estado completo.
+    """
+    oyentes = set()
+
+    async def atender(lector, escritor):
+        linea = await lector.readline()
+        if linea == SUSCRIBIR:
+            oyentes.add(escritor)
+            try:
+                await lector.read()  # hasta que el proceso se desconecte
+            finally:
+                oyentes.discard(escritor)
+                escritor.close()
+            return
+        while linea:
+            for oyente in list(oyentes):
+                if oyente.transport.get_write_buffer_size() > LIMITE_BROKER:
+                    oyentes.discard(oyente)
+                    oyente.close()
+                else:
+                    oyente.write(linea)
+            linea = await lector.readline()
+        escritor.close()
+
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    servidor = await asyncio.start_unix_server(atender, path=ruta)
+    async with servidor:
+        await servidor.serve_forever()
+
+
+# ---------- Publicación ----------
+
+def activo():
+    """¿Hay a quién avisarle? Sin pantallas (ni broker) no se consulta nada."""
+    return bool(settings.EVENTOS_BROKER) or canal.total() > 0
+
+
+def publicar(tipo, datos, sucursal=None):
+    evento = Evento.crear(tipo, datos, sucursal)
+    if settings.EVENTOS_BROKER and _publicador.enviar(evento):
+        return
+    canal.repartir(evento)
+
+
+def _pedidos(pedidos, detalles):
+    """Arma los pedidos con sus líneas a partir de los values() de las dos consultas."""
+    lineas = {}
+    for pedido_id, producto, cantidad in detalles:
+        lineas.setdefault(pedido_id, []).append({'producto': producto, 'cantidad': cantidad})
+    return [{**p, 'lineas': lineas.get(p['id'], [])} for p in pedidos]
+
+
+def _consulta_detalles(ids):
+    return DetallePedido.objects.filter(pedido_id__in=ids).order_by('id').values_list(
+        'pedido_id', 'producto__nombre', 'cantidad',
+    )
+
+
+def _claves(sucursal_ids):
+    """{sucursal_id: clave} de las sucursales de los registros (en su misma base)."""
+    return dict(Sucursal.objects.filter(id__in=set(sucursal_ids)).values_list('id', 'clave'))
+
+
+def _publicar_pedidos(ids):
+    pedidos = list(Pedido.objects.filter(id__in=ids).order_by('id').values(
+        'id', 'estado', 'cliente', 'fecha', 'total', 'sucursal_id',
+    ))
+    claves = _claves(p['sucursal_id'] for p in pedidos)
+    for pedido in _pedidos(pedidos, _consulta_detalles(ids)):
+        publicar('pedido', pedido, claves.get(pedido.pop('sucursal_id')))
+    # De un pedido borrado ya no se sabe la sucursal: la activa (o todas)
+    for borrado in set(ids) - {p['id'] for p in pedidos}:
+        publicar('pedido', {'id': borrado, 'estado': None, 'lineas': []}, sucursales.clave_actual())
+
+
+def _publicar_disponibilidad(ids):
+    productos = list(Menu.objects.filter(id__in=ids).order_by('id').values('id', 'nombre', 'disponible', 'sucursal_id'))
+    claves = _claves(p['sucursal_id'] for p in productos)
+    por_sucursal = {}
+    for producto in productos:
+        por_sucursal.setdefault(claves.get(producto.pop('sucursal_id')), []).append(producto)
+    for clave, cambiados in por_sucursal.items():
+        publicar('menu', {'productos': cambiados}, clave)
+
+
+def pedidos_modificados(ids):
+    """Avisa a las pantallas de los pedidos creados, cambiados o borrados (al confirmar)."""
+    if activo() and ids:
+        ids = list(ids)
+        transaction.on_commit(lambda: _publicar_pedidos(ids))
+
+
+def disponibilidad_modificada(ids):
+    """Avisa a las pantallas de productos que cambiaron de disponibilidad (al confirmar)."""
+    if activo() and ids:
+        ids = list(ids)
+        transaction.on_commit(lambda: _publicar_disponibilidad(ids))
+
+
+# ---------- Flujo SSE ----------
+
+def estado_cocina():
+    """Evento 'estado': pedidos en cocina y productos no disponibles (de la sucursal activa)."""
+    pedidos = list(Pedido.objects.filter(estado__in=EN_COCINA).order_by('id').values(
+        'id', 'estado', 'cliente', 'fecha', 'total',
+    )[:MAXIMO_COCINA])
+    detalles = _consulta_detalles([p['id'] for p in pedidos])
+    no_disponibles = list(Menu.objects.filter(disponible=False).order_by('id').values('id', 'nombre'))
+    return Evento.crear('estado', {'pedidos': _pedidos(pedidos, detalles), 'no_disponibles': no_disponibles})
+
+
+@sync_to_async
+def _estado_sin_conexion(clave):
+    """
+    estado_cocina() de la sucursal `clave` y cierra la conexión a la base, que
+    de otro modo quedaría abierta (con su caché de páginas) mientras la
+    pantalla esté conectada.
+    """
+    try:
+        if clave is None:
+            return estado_cocina()
+        with sucursales.activar(clave):
+            return estado_cocina()
+    finally:
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def flujo_cocina(clave=None):
+    """Flujo de la pantalla de la sucursal `clave` (None = todas)."""
+    suscriptor = canal.suscribir(sucursal=clave)
+    try:
+        yield f'retry: {REINTENTO_MS}\n\n'.encode()
+        yield (await _estado_sin_conexion(clave)).trama
+        while True:
+            try:
+                await asyncio.wait_for(suscriptor.aviso.wait(), settings.EVENTOS_LATIDO)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión en proxies y balanceadores
+                yield b': latido\n\n'
+                continue
+            suscriptor.aviso.clear()
+            if suscriptor.atrasado:
+                suscriptor.atrasado = False
+                yield (await _estado_sin_conexion(clave)).trama
+            while suscriptor.pendientes:
+                yield suscriptor.pendientes.popleft().trama
+    finally:
+        canal.cancelar(suscriptor)
+
+
+@require_GET
+async def eventos_cocina(request):
+    """GET /eventos/cocina/: flujo SSE de pedidos y disponibilidad del menú."""
+    if not isinstance(request, ASGIRequest):
+        # Bajo WSGI cada conexión ocuparía un hilo: sólo el estado y reintento
+        cuerpo = f'retry: {REINTENTO_WSGI_MS}\n\n'.encode() + (await sync_to_async(estado_cocina)()).trama
+        return HttpResponse(cuerpo, content_type='text/event-stream')
+    # Sólo si la aplicación ASGI no pasa por con_eventos()
+    respuesta = StreamingHttpResponse(flujo_cocina(sucursales.clave_actual()), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'  # nginx: no acumular el flujo
+    return respuesta
+
+
+# ---------- Aplicación ASGI ----------
+
+ENCABEZADOS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+def _host_valido(scope):
+    """La misma validación de ALLOWED_HOSTS que hace HttpRequest.get_host()."""
+    host = next((v.decode('latin-1') for k, v in scope['headers'] if k == b'host'), '')
+    dominio, _ = split_domain_port(host)
+    permitidos = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not permitidos:
+        permitidos = ['.localhost', '127.0.0.1', '[::1]']
+    return bool(dominio) and validate_host(dominio, permitidos)
+
+
+def _clave(scope):
+    """La sucursal de la pantalla, elegida como en SucursalMiddleware (el flujo no pasa por él)."""
+    encabezados = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope['headers']}
+    parametros = QueryDict(scope.get('query_string', b''))
+    cookies = parse_cookie(encabezados.get('cookie', ''))
+    clave, _ = sucursales.elegir_clave(
+        parametros.get('sucursal'), encabezados.get('x-sucursal'), cookies.get(sucursales.COOKIE),
+    )
+    return clave
+
+
+async def _escribir(send, clave):
+    async for trama in flujo_cocina(clave):
+        await send({'type': 'http.response.body', 'body': trama, 'more_body': True})
+
+
+async def _esperar_desconexion(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def servir_flujo(receive, send, clave=None):
+    """Envía flujo_cocina(clave) hasta que la pantalla se desconecte."""
+    await send({'type': 'http.response.start', 'status': 200, 'headers': ENCABEZADOS})
+    escritura = asyncio.ensure_future(_escribir(send, clave))
+    desconexion = asyncio.ensure_future(_esperar_desconexion(receive))
+    try:
+        await asyncio.wait((escritura, desconexion), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Cancelar la escritura cierra el generador (y cancela la suscripción)
+        escritura.cancel()
+        desconexion.cancel()
+        error, _ = await asyncio.gather(escritura, desconexion, return_exceptions=True)
+    if isinstance(error, Exception):
+        raise error
+
+
+def con_eventos(aplicacion):
+    """
+    Envuelve la aplicación ASGI de Django: GET /eventos/cocina/ se atiende
+    aquí y todo lo demás pasa a `aplicacion`.
+    """
+    ruta = reverse('eventos_cocina')
+
+    async def aplicacion_con_eventos(scope, receive, send):
+        if (scope['type'] == 'http' and scope['path'] == ruta
+                and scope['method'] == 'GET' and _host_valido(scope)):
+            clave = _clave(scope)
+            if await sync_to_async(sucursales.resolver)(clave) is None:
+                # Como SucursalMiddleware: 404 si la clave no existe
+                await send({'type': 'http.response.start', 'status': 404,
+                            'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+                await send({'type': 'http.response.body', 'body': f"No existe la sucursal '{clave}'.".encode()})
+                return
+            await servir_flujo(receive, send, clave)
+        else:
+            await aplicacion(scope, receive, send)
+
+    return aplicacion_con_eventos
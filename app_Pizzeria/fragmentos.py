@@ -0,0 +1,69 @@
+import hashlib
+
+from django.conf import settings
+
+from .models import Proveedores, Inventario, Menu
+from .sucursales import etiqueta
+
+# ==========================================
+# CACHÉ DE FRAGMENTOS DE LAS TABLAS (ver_*)
+# ==========================================
+# Las tablas de ver_proveedores, ver_inventario y ver_menu se guardan con
+# {% cache %} en dos niveles:
+#
+#   - cada renglón, con una clave que cambia cuando cambia lo que muestra:
+#     el id, la versión del registro (que sube en cada edición, ver
+#     edicion.py) y los valores que se escriben sin pasar por la versión
+#     (el stock que descuentan los pedidos, el costo de receta de costos.py,
+#     la disponibilidad de disponibilidad.py, las estadísticas de
+#     estadisticas.py);
+#   - la tabla completa, con el hash de las claves de sus renglones.
+#
+# Si nada cambió la tabla sale de una sola lectura de la caché; si cambió un
+# renglón, sólo ese se vuelve a renderizar. Las claves nunca se invalidan:
+# un cambio produce una clave nueva y las viejas expiran solas.
+#
+# Las claves empiezan con la sucursal (sucursales.etiqueta()): con una base
+# por sucursal dos artículos distintos pueden tener el mismo id y versión.
+
+
+def _proveedor(p):
+    # Los contadores de artículos (de la sucursal, ver estadisticas.py)
+    # cambian sin que cambie la versión del proveedor
+    if not hasattr(p, 'num_articulos'):
+        return (p.id, p.version)
+    return (p.id, p.version, p.num_articulos, p.valor_stock, p.articulos_bajo_minimo)
+
+
+def _articulo(a):
+    # La tabla muestra el nombre del proveedor (viene con select_related)
+    proveedor = a.proveedor.version if a.proveedor_id else None
+    return (a.id, a.version, a.stock, a.fecha_ultima_compra, a.proveedor_id, proveedor)
+
+
+def _producto(m):
+    return (m.id, m.version, m.costo_receta, m.num_articulos, m.disponible)
+
+
+CLAVES = {
+    Proveedores: _proveedor,
+    Inventario: _articulo,
+    Menu: _producto,
+}
+
+
+def preparar(objetos):
+    """
+    Asigna `clave_fragmento` a cada renglón y regresa el contexto de la
+    tabla: {'clave_tabla', 'fragmentos_segundos'}.
+    """
+    claves = []
+    prefijo = etiqueta()
+    for objeto in objetos:
+        objeto.clave_fragmento = ':'.join([prefijo, *(str(v) for v in CLAVES[type(objeto)](objeto))])
+        claves.append(objeto.clave_fragmento)
+    clave_tabla = hashlib.md5('|'.join(claves).encode(), usedforsecurity=False).hexdigest()
+    return {
+        'clave_tabla': clave_tabla,
+        'fragmentos_segundos': settings.FRAGMENTOS_SEGUNDOS,
+    }
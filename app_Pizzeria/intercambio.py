@@ -0,0 +1,518 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.utils.dateparse import parse_date
+
+from . import busqueda, disponibilidad, movimientos
+from .cache_menu import invalidar_menu
+from .costos import marcar_productos, recalculo_agrupado, recalcular_por_articulos
+from .models import Proveedores, Inventario, Menu, Receta, sucursal_actual
+
+# ==========================================
+# IMPORTACIÓN / EXPORTACIÓN MASIVA (CSV y JSON Lines)
+# ==========================================
+# - Los archivos se leen fila por fila (nunca completos en memoria).
+# - Las filas se guardan por lotes con bulk_create(update_conflicts=True):
+#   una sentencia INSERT ... ON CONFLICT DO UPDATE por lote.
+# - ON CONFLICT DO UPDATE no puede sumar a la versión (edicion.py): se sube
+#   con un UPDATE más por lote, para que los formularios abiertos y la caché
+#   de fragmentos vean el cambio.
+# - Sólo se actualizan las columnas que trae el archivo: una lista de precios
+#   (nombre_articulo,proveedor,costo_unitario) no toca el stock ni el mínimo.
+# - Los proveedores se resuelven con un solo diccionario nombre/RFC -> id
+#   cargado una vez, en lugar de un Proveedores.objects.get por fila.
+# - La exportación genera el archivo por partes con .iterator(), así que
+#   exportar un millón de filas usa la misma memoria que exportar diez.
+#
+# Formato JSON: un objeto por línea (JSON Lines), para poder leerlo y
+# escribirlo en streaming.
+
+FORMATOS = ('csv', 'json')
+TAMAÑO_LOTE = 1000
+
+COLUMNAS = {
+    'proveedores': [
+        'id', 'nombre_proveedor', 'telefono_contacto', 'email_contacto',
+        'direccion', 'tipo_producto', 'rfc', 'activo',
+    ],
+    'inventario': [
+        'id', 'nombre_articulo', 'stock', 'unidad', 'fecha_ultima_compra',
+        'stock_minimo', 'costo_unitario', 'proveedor',
+    ],
+    # articulos: "inventario_id:cantidad|inventario_id:cantidad"
+    'menu': [
+        'id', 'nombre', 'descripcion', 'precio', 'categoria', 'tamaño',
+        'habilitado', 'articulos',
+    ],
+}
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se pudo importar (formato o modelo no válido)."""
+
+
+class ResultadoImportacion:
+    """Cuenta las filas guardadas y guarda los errores por número de línea."""
+
+    MAXIMO_ERRORES = 100
+
+    def __init__(self):
+        self.guardadas = 0
+        self.errores = []
+        self.total_errores = 0
+
+    def error(self, linea, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < self.MAXIMO_ERRORES:
+            self.errores.append(f"Línea {linea}: {mensaje}")
+
+
+# ---------- Lectura ----------
+
+def detectar_formato(nombre_archivo, formato=None):
+    """Usa el formato indicado o lo deduce de la extensión (.csv, .json, .jsonl)."""
+    if not formato:
+        extension = nombre_archivo.rsplit('.', 1)[-1].lower() if '.' in nombre_archivo else ''
+        formato = 'json' if extension in ('json', 'jsonl', 'ndjson') else 'csv'
+    if formato not in FORMATOS:
+        raise ErrorImportacion(f"Formato no soportado: {formato}")
+    return formato
+
+
+def leer_filas(archivo, formato):
+    """
+    Genera (numero_linea, dict) desde un archivo binario, sin cargarlo completo.
+    """
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            yield lector.line_num, fila
+    else:
+        for numero, linea in enumerate(texto, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                fila = None
+            yield numero, fila if isinstance(fila, dict) else None
+
+
+def lotes(filas, tamaño=TAMAÑO_LOTE):
+    """Agrupa un iterador en listas de 'tamaño' elementos."""
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamaño:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# ---------- Conversión de valores ----------
+
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _decimal(fila, campo, predeterminado=Decimal('0')):
+    valor = _texto(fila, campo)
+    if valor is None:
+        return predeterminado
+    try:
+        return Decimal(valor)
+    except InvalidOperation:
+        raise ValueError(f"'{campo}' no es un número: {valor}")
+
+
+def _booleano(fila, campo, predeterminado=True):
+    valor = fila.get(campo)
+    if isinstance(valor, bool):
+        return valor
+    valor = _texto(fila, campo)
+    if valor is None:
+        return predeterminado
+    return valor.lower() in ('1', 'si', 'sí', 'true', 'verdadero')
+
+
+def _id(fila):
+    valor = _texto(fila, 'id')
+    return int(valor) if valor and valor.isdigit() else None
+
+
+def _columnas(fila, campos, alias=None):
+    """Los campos de `campos` que trae la fila (o su nombre anterior en `alias`)."""
+    alias = alias or {}
+    return tuple(c for c in campos if c in fila or alias.get(c) in fila)
+
+
+def _guardar(modelo, nuevos, columnas):
+    """
+    Upsert por id de los objetos del lote, actualizando sólo las columnas que
+    trae cada fila: un INSERT ... ON CONFLICT DO UPDATE por cada combinación
+    de columnas (una sola en un CSV, que tiene el mismo encabezado en todas).
+    """
+    grupos = {}
+    for clave, objeto in nuevos.items():
+        grupos.setdefault(columnas[clave], []).append(objeto)
+    for campos, objetos in grupos.items():
+        modelo.objects.bulk_create(objetos, update_conflicts=True, unique_fields=['id'], update_fields=list(campos))
+
+
+# ---------- Importación por modelo ----------
+
+def _importar_proveedores(filas, resultado):
+    campos = COLUMNAS['proveedores'][2:]
+    for lote in lotes(filas):
+        # Clave natural: nombre_proveedor (único). La última fila gana.
+        por_nombre = {}
+        for linea, fila in lote:
+            nombre = _texto(fila, 'nombre_proveedor') if fila else None
+            if not nombre:
+                resultado.error(linea, "falta 'nombre_proveedor'")
+                continue
+            por_nombre[nombre] = Proveedores(
+                nombre_proveedor=nombre,
+                telefono_contacto=_texto(fila, 'telefono_contacto'),
+                email_contacto=_texto(fila, 'email_contacto'),
+                direccion=_texto(fila, 'direccion'),
+                tipo_producto=_texto(fila, 'tipo_producto'),
+                rfc=_texto(fila, 'rfc'),
+                activo=_booleano(fila, 'activo'),
+            )
+        try:
+            with transaction.atomic(using=router.db_for_write(Proveedores)):
+                Proveedores.objects.bulk_create(
+                    por_nombre.values(),
+                    update_conflicts=True,
+                    unique_fields=['nombre_proveedor'],
+                    update_fields=campos,
+                )
+                Proveedores.objects.filter(nombre_proveedor__in=list(por_nombre)).update(version=F('version') + 1)
+        except IntegrityError as e:
+            # Ej: un RFC repetido con otro nombre. Se rechaza el lote completo.
+            resultado.error(lote[0][0], f"lote rechazado ({e})")
+            continue
+        resultado.guardadas += len(por_nombre)
+        busqueda.indexar_objetos(por_nombre.values())
+
+
+def mapa_proveedores():
+    """Diccionario nombre (minúsculas) / RFC (mayúsculas) -> id, en una consulta."""
+    mapa = {}
+    for id_proveedor, nombre, rfc in Proveedores.objects.values_list('id', 'nombre_proveedor', 'rfc'):
+        mapa[nombre.lower()] = id_proveedor
+        if rfc:
+            mapa[rfc.upper()] = id_proveedor
+    return mapa
+
+
+def _quitar_de_otra_sucursal(modelo, nuevos, lineas, resultado, *relacionados):
+    """
+    Descarta las filas que traen el id de un registro de otra sucursal: el
+    upsert por id lo sobrescribiría. Sin sucursal activa se aceptan todas.
+    """
+    sucursal_id = sucursal_actual.get()
+    con_id = {objeto.id: clave for clave, objeto in nuevos.items() if objeto.id is not None}
+    if sucursal_id is None or not con_id:
+        return
+    ajenos = modelo._base_manager.filter(id__in=list(con_id)).exclude(sucursal_id=sucursal_id)
+    for objeto_id in ajenos.values_list('id', flat=True):
+        clave = con_id[objeto_id]
+        resultado.error(lineas[clave], f"el id {objeto_id} es de otra sucursal")
+        for diccionario in (nuevos, *relacionados):
+            diccionario.pop(clave, None)
+
+
+def _importar_inventario(filas, resultado):
+    proveedores = mapa_proveedores()
+    campos = COLUMNAS['inventario'][1:]
+    for lote in lotes(filas):
+        nuevos, lineas, columnas = {}, {}, {}
+        for linea, fila in lote:
+            try:
+                nombre = _texto(fila, 'nombre_articulo') if fila else None
+                if not nombre:
+                    raise ValueError("falta 'nombre_articulo'")
+                proveedor = _texto(fila, 'proveedor')
+                proveedor_id = None
+                if proveedor:
+                    proveedor_id = proveedores.get(proveedor.upper()) or proveedores.get(proveedor.lower())
+                    if proveedor_id is None:
+                        raise ValueError(f"proveedor desconocido: {proveedor}")
+                fecha = _texto(fila, 'fecha_ultima_compra')
+                articulo = Inventario(
+                    id=_id(fila),
+                    nombre_articulo=nombre,
+                    stock=_decimal(fila, 'stock'),
+                    unidad=_texto(fila, 'unidad') or '',
+                    fecha_ultima_compra=parse_date(fecha) if fecha else None,
+                    stock_minimo=_decimal(fila, 'stock_minimo'),
+                    costo_unitario=_decimal(fila, 'costo_unitario'),
+                    proveedor_id=proveedor_id,
+                )
+            except ValueError as e:
+                resultado.error(linea, str(e))
+                continue
+            clave = articulo.id or (proveedor_id, nombre)
+            nuevos[clave] = articulo
+            lineas[clave] = linea
+            columnas[clave] = _columnas(fila, campos)
+        _quitar_de_otra_sucursal(Inventario, nuevos, lineas, resultado)
+
+        # Inventario no tiene clave natural única: las filas sin id se
+        # emparejan con (proveedor, nombre) existentes con UNA consulta por lote
+        sin_id = [a for a in nuevos.values() if a.id is None]
+        if sin_id:
+            existentes = Inventario.objects.filter(
+                nombre_articulo__in={a.nombre_articulo for a in sin_id}
+            ).values_list('proveedor_id', 'nombre_articulo', 'id')
+            ids = {(p, n): i for p, n, i in existentes}
+            for articulo in sin_id:
+                articulo.id = ids.get((articulo.proveedor_id, articulo.nombre_articulo))
+
+        try:
+            with transaction.atomic(using=router.db_for_write(Inventario)):
+                # Stock previo, para registrar la diferencia en la bitácora
+                anteriores = movimientos.stocks_actuales(a.id for a in nuevos.values() if a.id)
+                _guardar(Inventario, nuevos, columnas)
+                Inventario.objects.filter(id__in=[a.id for a in nuevos.values()]).update(version=F('version') + 1)
+                # Las filas sin 'stock' no lo cambiaron
+                con_stock = [a for clave, a in nuevos.items() if 'stock' in columnas[clave]]
+                movimientos.registrar_diferencias(anteriores, con_stock)
+                disponibilidad.por_diferencias(anteriores, con_stock)
+        except IntegrityError as e:
+            resultado.error(lote[0][0], f"lote rechazado ({e})")
+            continue
+        resultado.guardadas += len(nuevos)
+        # bulk_create no envía señales: el costo de las recetas y el índice
+        # de búsqueda se actualizan aquí
+        recalcular_por_articulos([a.id for a in nuevos.values()])
+        busqueda.indexar_objetos(nuevos.values())
+
+
+def _leer_receta(texto):
+    """'12:0.25|15' -> {12: Decimal('0.25'), 15: Decimal('1')}"""
+    receta = {}
+    for parte in texto.split('|'):
+        parte = parte.strip()
+        if not parte:
+            continue
+        articulo, _, cantidad = parte.partition(':')
+        if not articulo.strip().isdigit():
+            raise ValueError(f"artículo no válido en la receta: {parte}")
+        try:
+            receta[int(articulo)] = Decimal(cantidad.strip() or '1')
+        except InvalidOperation:
+            raise ValueError(f"cantidad no válida en la receta: {parte}")
+    return receta
+
+
+def _importar_menu(filas, resultado):
+    campos = COLUMNAS['menu'][1:-1]
+    for lote in lotes(filas):
+        nuevos, lineas, columnas = {}, {}, {}
+        recetas = {}
+        for linea, fila in lote:
+            try:
+                nombre = _texto(fila, 'nombre') if fila else None
+                if not nombre:
+                    raise ValueError("falta 'nombre'")
+                producto = Menu(
+                    id=_id(fila),
+                    nombre=nombre,
+                    descripcion=_texto(fila, 'descripcion'),
+                    precio=_decimal(fila, 'precio'),
+                    categoria=_texto(fila, 'categoria') or '',
+                    tamaño=_texto(fila, 'tamaño'),
+                    # Archivos anteriores a 'habilitado' traen la casilla como 'disponible'
+                    habilitado=_booleano(fila, 'habilitado' if 'habilitado' in fila else 'disponible'),
+                )
+                articulos = _texto(fila, 'articulos')
+                receta = _leer_receta(articulos) if articulos is not None else None
+            except ValueError as e:
+                resultado.error(linea, str(e))
+                continue
+            clave = producto.id or (nombre, producto.tamaño)
+            nuevos[clave] = producto
+            lineas[clave] = linea
+            columnas[clave] = _columnas(fila, campos, {'habilitado': 'disponible'})
+            if receta is not None:
+                recetas[clave] = receta
+        _quitar_de_otra_sucursal(Menu, nuevos, lineas, resultado, recetas)
+
+        # Igual que inventario: emparejar (nombre, tamaño) con una consulta
+        sin_id = [p for p in nuevos.values() if p.id is None]
+        if sin_id:
+            existentes = Menu.objects.filter(
+                nombre__in={p.nombre for p in sin_id}
+            ).values_list('nombre', 'tamaño', 'id')
+            ids = {(n, t): i for n, t, i in existentes}
+            for producto in sin_id:
+                producto.id = ids.get((producto.nombre, producto.tamaño))
+
+        try:
+            with transaction.atomic(using=router.db_for_write(Menu)):
+                # update_conflicts asigna el id también a los productos nuevos
+                _guardar(Menu, nuevos, columnas)
+                Menu.objects.filter(id__in=[p.id for p in nuevos.values()]).update(version=F('version') + 1)
+                if recetas:
+                    menu_ids = [nuevos[clave].id for clave in recetas]
+                    # Las señales de borrado de Receta sólo marcan productos;
+                    # el costo se recalcula con un solo UPDATE al final
+                    with recalculo_agrupado():
+                        Receta.objects.filter(menu_id__in=menu_ids).delete()
+                        validos = set(
+                            Inventario.objects.filter(
+                                id__in={i for receta in recetas.values() for i in receta}
+                            ).values_list('id', flat=True)
+                        )
+                        # Con sucursal activa, los de otra sucursal tampoco se encuentran
+                        for clave, receta in recetas.items():
+                            for articulo_id in sorted(set(receta) - validos):
+                                resultado.error(lineas[clave], f"artículo desconocido en la receta: {articulo_id}")
+                        Receta.objects.bulk_create([
+                            Receta(menu_id=nuevos[clave].id, inventario_id=articulo_id, cantidad=cantidad)
+                            for clave, receta in recetas.items()
+                            for articulo_id, cantidad in receta.items()
+                            if articulo_id in validos
+                        ])
+                        marcar_productos(menu_ids)
+        except IntegrityError as e:
+            resultado.error(lote[0][0], f"lote rechazado ({e})")
+            continue
+        resultado.guardadas += len(nuevos)
+        # Sin 'categoria' en la fila, la del índice se lee de la base
+        busqueda.indexar_objetos(p for clave, p in nuevos.items() if 'categoria' in columnas[clave])
+        busqueda.indexar(Menu, [p.id for clave, p in nuevos.items() if 'categoria' not in columnas[clave]])
+        # 'habilitado' pudo cambiar en cualquiera del lote; sólo se avisa a
+        # las pantallas de los que cambiaron de disponibilidad
+        disponibilidad.actualizar_disponibilidad([p.id for p in nuevos.values()])
+    # bulk_create no envía señales: invalidamos la caché del menú a mano
+    invalidar_menu()
+
+
+IMPORTADORES = {
+    'proveedores': _importar_proveedores,
+    'inventario': _importar_inventario,
+    'menu': _importar_menu,
+}
+
+
+def _con_avance(filas, archivo, avance):
+    """Deja pasar las filas y cada TAMAÑO_LOTE llama avance(bytes leídos)."""
+    for numero, fila in enumerate(filas, start=1):
+        yield fila
+        if numero % TAMAÑO_LOTE == 0:
+            avance(archivo.tell())
+
+
+def importar(modelo, archivo, formato, avance=None):
+    """
+    Importa un archivo binario (CSV o JSON Lines) al modelo indicado.
+    Con `avance`, lo llama con los bytes leídos del archivo cada lote.
+    Regresa un ResultadoImportacion.
+    """
+    if modelo not in IMPORTADORES:
+        raise ErrorImportacion(f"Modelo no soportado: {modelo}")
+    resultado = ResultadoImportacion()
+    filas = leer_filas(archivo, formato)
+    if avance is not None:
+        filas = _con_avance(filas, archivo, avance)
+    IMPORTADORES[modelo](filas, resultado)
+    return resultado
+
+
+# ---------- Exportación ----------
+
+class _Eco:
+    """Objeto tipo archivo que regresa lo que se le escribe (para csv.writer)."""
+
+    def write(self, valor):
+        return valor
+
+
+def _filas_proveedores():
+    yield from Proveedores.objects.order_by('id').values_list(
+        *COLUMNAS['proveedores']
+    ).iterator(chunk_size=TAMAÑO_LOTE)
+
+
+def _filas_inventario():
+    columnas = COLUMNAS['inventario'][:-1] + ['proveedor__nombre_proveedor']
+    yield from Inventario.objects.order_by('id').values_list(
+        *columnas
+    ).iterator(chunk_size=TAMAÑO_LOTE)
+
+
+def _filas_menu():
+    # Se avanza por id en bloques para leer las recetas de cada bloque en una
+    # sola consulta (con .iterator() no se puede hacer prefetch de values_list)
+    columnas = COLUMNAS['menu'][:-1]
+    ultimo_id = 0
+    while True:
+        bloque = list(
+            Menu.objects.filter(id__gt=ultimo_id).order_by('id')
+            .values_list(*columnas)[:TAMAÑO_LOTE]
+        )
+        if not bloque:
+            return
+        recetas = {}
+        for menu_id, inventario_id, cantidad in Receta.objects.filter(
+            menu_id__in=[fila[0] for fila in bloque]
+        ).order_by('inventario_id').values_list('menu_id', 'inventario_id', 'cantidad'):
+            recetas.setdefault(menu_id, []).append(f"{inventario_id}:{cantidad.normalize():f}")
+        for fila in bloque:
+            yield fila + ('|'.join(recetas.get(fila[0], [])),)
+        ultimo_id = bloque[-1][0]
+
+
+FILAS_EXPORTACION = {
+    'proveedores': _filas_proveedores,
+    'inventario': _filas_inventario,
+    'menu': _filas_menu,
+}
+
+
+def _valor_json(valor):
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def exportar(modelo, formato):
+    """
+    Generador de texto (CSV o JSON Lines) con todas las filas del modelo.
+    Pensado para StreamingHttpResponse o para escribir a un archivo.
+    """
+    if modelo not in FILAS_EXPORTACION:
+        raise ErrorImportacion(f"Modelo no soportado: {modelo}")
+    if formato not in FORMATOS:
+        raise ErrorImportacion(f"Formato no soportado: {formato}")
+    columnas = COLUMNAS[modelo]
+    filas = FILAS_EXPORTACION[modelo]()
+
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(columnas)
+        for fila in filas:
+            yield escritor.writerow(fila)
+    else:
+        for fila in filas:
+            yield json.dumps(
+                {c: _valor_json(v) for c, v in zip(columnas, fila)},
+                ensure_ascii=False,
+            ) + '\n'
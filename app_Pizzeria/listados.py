@@ -0,0 +1,316 @@
+import base64
+import json
+
+from django.db.models import Count, Q
+from django.http import QueryDict
+
+from .estadisticas import con_estadisticas
+from .models import Proveedores, Inventario, Menu, Pedido, PorSucursalQuerySet
+
+# ==========================================
+# MOTOR DE LISTADOS (paginación por cursor)
+# ==========================================
+# En lugar de OFFSET (que obliga a la base de datos a recorrer todas las filas
+# anteriores), cada página recuerda el último valor visto del orden y del id.
+# La siguiente consulta arranca justo ahí usando el índice, así que la página
+# 1 y la página 5,000 cuestan lo mismo.
+
+TAMAÑO_PAGINA = 50
+TAMAÑO_MAXIMO = 200
+
+
+def codificar_cursor(valores):
+    """Convierte la lista [valor_orden, id] en un texto seguro para la URL."""
+    texto = json.dumps(valores, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Inverso de codificar_cursor. Regresa None si el cursor no es válido."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or not valores:
+        return None
+    return valores
+
+
+# ---------- Filtros reutilizables ----------
+
+def filtro_exacto(campo):
+    """Filtra por igualdad simple (ej: ?unidad=kg)."""
+    def aplicar(queryset, valor):
+        return queryset.filter(**{campo: valor})
+    return aplicar
+
+
+def filtro_id(campo):
+    """Filtra por una llave foránea; ignora valores que no son números."""
+    def aplicar(queryset, valor):
+        if not valor.isdigit():
+            return queryset
+        return queryset.filter(**{f'{campo}_id': int(valor)})
+    return aplicar
+
+
+def filtro_booleano(campo):
+    """Acepta 1/0, si/no, true/false."""
+    def aplicar(queryset, valor):
+        valor = valor.lower()
+        if valor in ('1', 'si', 'sí', 'true'):
+            return queryset.filter(**{campo: True})
+        if valor in ('0', 'no', 'false'):
+            return queryset.filter(**{campo: False})
+        return queryset
+    return aplicar
+
+
+# ---------- Página de resultados ----------
+
+class Pagina:
+    """Resultado de Listado.paginar(): los objetos y los enlaces de navegación."""
+
+    def __init__(self, objetos, parametros, cursor_anterior, cursor_siguiente):
+        self.objetos = objetos
+        self.parametros = parametros
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+    @property
+    def hay_anterior(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def hay_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    def _url(self, clave, cursor):
+        parametros = self.parametros.copy()
+        parametros.pop('antes', None)
+        parametros.pop('despues', None)
+        parametros[clave] = cursor
+        return '?' + parametros.urlencode()
+
+    @property
+    def url_anterior(self):
+        return self._url('antes', self.cursor_anterior) if self.hay_anterior else ''
+
+    @property
+    def url_siguiente(self):
+        return self._url('despues', self.cursor_siguiente) if self.hay_siguiente else ''
+
+
+# ---------- Listado ----------
+
+class Listado:
+    """
+    Describe cómo listar un modelo: consulta base, filtros permitidos
+    (parámetro GET -> función) y órdenes permitidos (clave -> campo).
+
+    El orden siempre se desempata con 'id', por lo que cada orden debería
+    tener un índice compuesto (campo, id) para que la paginación no tenga
+    que ordenar la tabla completa; en los modelos por sucursal,
+    (sucursal, campo, id).
+
+    `anotar` (opcional) completa la consulta en cada petición, para lo que
+    depende de la sucursal activa en modelos que no son por sucursal.
+    """
+
+    def __init__(self, queryset, filtros=None, ordenes=None, tamaño=TAMAÑO_PAGINA,
+                 orden_predeterminado='id', anotar=None):
+        self.queryset = queryset
+        self.anotar = anotar
+        self.filtros = filtros or {}
+        self.ordenes = {'id': 'id', **(ordenes or {})}
+        self.tamaño = tamaño
+        self.orden_predeterminado = orden_predeterminado
+
+    def consulta(self):
+        """
+        La consulta base para la petición actual. Se armó al importar el
+        módulo, sin sucursal activa: aquí se limita a la de la petición.
+        """
+        queryset = self.queryset.all()
+        if isinstance(queryset, PorSucursalQuerySet):
+            queryset = queryset.de_sucursal()
+        if self.anotar is not None:
+            queryset = self.anotar(queryset)
+        return queryset
+
+    def filtrar(self, parametros, queryset=None):
+        """Aplica los filtros presentes en los parámetros GET."""
+        if queryset is None:
+            queryset = self.consulta()
+        for clave, aplicar in self.filtros.items():
+            valor = parametros.get(clave, '').strip()
+            if valor:
+                queryset = aplicar(queryset, valor)
+        return queryset
+
+    def orden(self, parametros):
+        """Regresa (clave, campo, descendente) validando contra self.ordenes."""
+        clave = parametros.get('orden') or self.orden_predeterminado
+        descendente = clave.startswith('-')
+        clave = clave.lstrip('-')
+        if clave not in self.ordenes:
+            clave, descendente = 'id', False
+        return clave, self.ordenes[clave], descendente
+
+    def tamaño_pagina(self, parametros):
+        try:
+            tamaño = int(parametros.get('por_pagina', self.tamaño))
+        except ValueError:
+            tamaño = self.tamaño
+        return max(1, min(tamaño, TAMAÑO_MAXIMO))
+
+    def _condicion(self, campo, valores, hacia_adelante):
+        """Construye el WHERE (campo, id) > (v, i) (o < según la dirección)."""
+        comparador = 'gt' if hacia_adelante else 'lt'
+        ultimo_id = valores[-1]
+        if campo == 'id':
+            return Q(**{f'id__{comparador}': ultimo_id})
+        valor = valores[0]
+        return (
+            Q(**{f'{campo}__{comparador}': valor})
+            | Q(**{campo: valor, f'id__{comparador}': ultimo_id})
+        )
+
+    def _cursor(self, objeto, campo):
+        # Las filas pueden ser instancias o diccionarios de .values() (api.py)
+        if isinstance(objeto, dict):
+            valor, objeto_id = objeto.get(campo), objeto['id']
+        else:
+            valor, objeto_id = getattr(objeto, campo), objeto.id
+        if campo == 'id':
+            return codificar_cursor([objeto_id])
+        return codificar_cursor([valor, objeto_id])
+
+    def preparar(self, parametros, queryset=None):
+        """
+        Arma la consulta de una página sin ejecutarla.
+        Regresa (queryset, campo, tamaño, retrocediendo, hay_cursor).
+        """
+        queryset = self.filtrar(parametros, queryset)
+        _, campo, descendente = self.orden(parametros)
+        tamaño = self.tamaño_pagina(parametros)
+
+        retrocediendo = False
+        valores = None
+        if parametros.get('antes'):
+            valores = decodificar_cursor(parametros['antes'])
+            retrocediendo = valores is not None
+        if valores is None and parametros.get('despues'):
+            valores = decodificar_cursor(parametros['despues'])
+
+        # Ascendente hacia adelante == descendente hacia atrás
+        hacia_adelante = (not descendente) != retrocediendo
+        if valores is not None:
+            queryset = queryset.filter(self._condicion(campo, valores, hacia_adelante))
+
+        prefijo = '' if hacia_adelante else '-'
+        if campo == 'id':
+            queryset = queryset.order_by(f'{prefijo}id')
+        else:
+            queryset = queryset.order_by(f'{prefijo}{campo}', f'{prefijo}id')
+
+        # Pedimos una fila extra para saber si existe otra página
+        return queryset[:tamaño + 1], campo, tamaño, retrocediendo, valores is not None
+
+    def construir_pagina(self, parametros, filas, campo, tamaño, retrocediendo, hay_cursor):
+        """Convierte las filas leídas (tamaño + 1) en una Pagina."""
+        hay_mas = len(filas) > tamaño
+        filas = filas[:tamaño]
+        if retrocediendo:
+            filas.reverse()
+
+        cursor_anterior = cursor_siguiente = None
+        if filas:
+            if retrocediendo:
+                cursor_siguiente = self._cursor(filas[-1], campo)
+                if hay_mas:
+                    cursor_anterior = self._cursor(filas[0], campo)
+            else:
+                if hay_mas:
+                    cursor_siguiente = self._cursor(filas[-1], campo)
+                if hay_cursor:
+                    cursor_anterior = self._cursor(filas[0], campo)
+
+        if not isinstance(parametros, QueryDict):
+            copia = QueryDict(mutable=True)
+            copia.update(parametros)
+            parametros = copia
+        return Pagina(filas, parametros.copy(), cursor_anterior, cursor_siguiente)
+
+    def paginar(self, parametros, queryset=None):
+        """Ejecuta la consulta de una página (una sola consulta SQL)."""
+        consulta, *resto = self.preparar(parametros, queryset)
+        return self.construir_pagina(parametros, list(consulta), *resto)
+
+    async def apaginar(self, parametros, queryset=None):
+        """Igual que paginar(), para vistas async (ORM asíncrono)."""
+        consulta, *resto = self.preparar(parametros, queryset)
+        filas = [fila async for fila in consulta.aiterator()]
+        return self.construir_pagina(parametros, filas, *resto)
+
+
+# ==========================================
+# LISTADOS DE LA APLICACIÓN
+# ==========================================
+
+LISTADO_PROVEEDORES = Listado(
+    Proveedores.objects.all(),
+    filtros={
+        'activo': filtro_booleano('activo'),
+    },
+    ordenes={
+        'nombre': 'nombre_proveedor',
+    },
+    # Contadores de artículos de la sucursal en la misma consulta (ver estadisticas.py)
+    anotar=con_estadisticas,
+)
+
+LISTADO_INVENTARIO = Listado(
+    # select_related: el proveedor viene en el mismo JOIN (sin N+1 en la tabla)
+    Inventario.objects.select_related('proveedor'),
+    filtros={
+        'proveedor': filtro_id('proveedor'),
+        'unidad': filtro_exacto('unidad'),
+        'stock_bajo': filtro_booleano('bajo_minimo'),
+    },
+    ordenes={
+        'nombre': 'nombre_articulo',
+    },
+)
+
+LISTADO_MENU = Listado(
+    # num_articulos se calcula en la misma consulta (antes: un COUNT por fila)
+    Menu.objects.annotate(num_articulos=Count('articulos')),
+    filtros={
+        'categoria': filtro_exacto('categoria'),
+        'disponible': filtro_booleano('disponible'),
+    },
+    ordenes={
+        'nombre': 'nombre',
+        'precio': 'precio',
+    },
+)
+
+LISTADO_PEDIDOS = Listado(
+    Pedido.objects.annotate(num_productos=Count('detalles')),
+    filtros={
+        'estado': filtro_exacto('estado'),
+    },
+    # Los pedidos más recientes primero
+    orden_predeterminado='-id',
+)
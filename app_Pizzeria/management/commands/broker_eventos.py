@@ -0,0 +1,26 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria.eventos import servir_broker
+
+
+class Command(BaseCommand):
+    help = "Reparte los eventos de las pantallas de cocina entre varios procesos (socket Unix)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            help="Ruta del socket; por defecto settings.EVENTOS_BROKER (PIZZERIA_EVENTOS_BROKER)",
+        )
+
+    def handle(self, *args, **opciones):
+        ruta = opciones['socket'] or settings.EVENTOS_BROKER
+        if not ruta:
+            raise CommandError("Indique --socket o defina PIZZERIA_EVENTOS_BROKER.")
+        self.stdout.write(f"Broker de eventos en {ruta} (Ctrl+C para terminar).")
+        try:
+            asyncio.run(servir_broker(ruta))
+        except KeyboardInterrupt:
+            pass
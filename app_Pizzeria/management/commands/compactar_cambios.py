@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria import sincronizacion
+
+
+class Command(BaseCommand):
+    help = ("Borra de la bitácora de las terminales las lápidas (objetos borrados) más viejas "
+            "que SINCRONIZACION_DIAS; las terminales que pidan desde antes descargan todo.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=settings.SINCRONIZACION_DIAS,
+            help="Antigüedad mínima de las lápidas a borrar (por defecto SINCRONIZACION_DIAS)",
+        )
+
+    def handle(self, *args, **opciones):
+        if sincronizacion.secuencia() is None:
+            raise CommandError("La bitácora de cambios no está instalada (requiere SQLite o PostgreSQL).")
+        borradas = sincronizacion.compactar(opciones['dias'])
+        _, hasta = sincronizacion.secuencia()
+        self.stdout.write(self.style.SUCCESS(f"{borradas} lápidas borradas; compactado hasta el seq {hasta}."))
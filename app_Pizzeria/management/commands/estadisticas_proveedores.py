@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria import estadisticas
+
+
+class Command(BaseCommand):
+    help = ("Reinstala los triggers y recalcula las estadísticas de cada proveedor en cada sucursal "
+            "(artículos, valor del stock, bajo el mínimo).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help="Sólo reporta los proveedores (por sucursal) cuyas estadísticas no coinciden con el inventario",
+        )
+
+    def handle(self, *args, **opciones):
+        if not estadisticas.disponible():
+            raise CommandError("Las estadísticas por proveedor requieren SQLite o PostgreSQL.")
+
+        if opciones['verificar']:
+            distintas = estadisticas.diferencias()
+            for proveedor_id, sucursal_id, guardadas, calculadas in distintas:
+                self.stdout.write(
+                    f"  [{proveedor_id} en la sucursal {sucursal_id}] guardado {guardadas} / calculado {calculadas}"
+                )
+            self.stdout.write(f"{len(distintas)} proveedores con estadísticas distintas al inventario.")
+            return
+
+        estadisticas.instalar()
+        total = estadisticas.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas de {total} proveedores por sucursal recalculadas."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria.recetas import RecetaCiclica, reconstruir
+
+
+class Command(BaseCommand):
+    help = ("Vuelve a aplanar las preparaciones y a expandir la receta de todos los productos "
+            "(artículos crudos por pieza). Después conviene correr recalcular_costos y "
+            "recalcular_disponibilidad.")
+
+    def handle(self, *args, **opciones):
+        try:
+            escritos = reconstruir()
+        except RecetaCiclica as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{escritos} renglones de receta expandida."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria import intercambio
+
+
+class Command(BaseCommand):
+    help = "Exporta proveedores, inventario o menú a CSV o JSON Lines (en streaming)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=sorted(intercambio.COLUMNAS))
+        parser.add_argument('--formato', choices=intercambio.FORMATOS, default='csv')
+        parser.add_argument('--salida', help="Archivo de salida (por defecto, la salida estándar)")
+
+    def handle(self, *args, **opciones):
+        partes = intercambio.exportar(opciones['modelo'], opciones['formato'])
+        try:
+            if opciones['salida']:
+                with open(opciones['salida'], 'w', encoding='utf-8', newline='') as salida:
+                    salida.writelines(partes)
+            else:
+                for parte in partes:
+                    self.stdout.write(parte, ending='')
+        except OSError as e:
+            raise CommandError(e)
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria import sinteticos
+
+
+class Command(BaseCommand):
+    help = ("Genera proveedores, artículos y productos con recetas de prueba. "
+            "Úselo sobre una base aparte (PIZZERIA_DB_NAME), no sobre la de producción.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proveedores', type=int, default=100)
+        parser.add_argument('--articulos', type=int, default=1000)
+        parser.add_argument('--productos', type=int, default=200)
+        parser.add_argument('--ingredientes', default='3-8',
+                            help="Rango de artículos por receta, p. ej. 3-8")
+        parser.add_argument('--lote', type=int, default=sinteticos.TAMAÑO_LOTE,
+                            help="Renglones por bulk_create")
+        parser.add_argument('--semilla', type=int, default=1,
+                            help="La misma semilla genera los mismos datos")
+
+    def handle(self, *args, **opciones):
+        try:
+            minimo, _, maximo = opciones['ingredientes'].partition('-')
+            ingredientes = (int(minimo), int(maximo or minimo))
+        except ValueError:
+            raise CommandError("--ingredientes debe ser un número o un rango, p. ej. 3-8")
+        if min(opciones['proveedores'], opciones['articulos'], opciones['productos']) < 0 \
+                or opciones['lote'] < 1 or not 0 <= ingredientes[0] <= ingredientes[1]:
+            raise CommandError("Las cantidades no pueden ser negativas y el lote debe ser mayor que 0.")
+
+        totales = sinteticos.generar(
+            proveedores=opciones['proveedores'],
+            articulos=opciones['articulos'],
+            productos=opciones['productos'],
+            ingredientes=ingredientes,
+            semilla=opciones['semilla'],
+            tamaño=opciones['lote'],
+            progreso=lambda mensaje: self.stdout.write(f"  {mensaje}") if opciones['verbosity'] > 0 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generados {totales['proveedores']} proveedores, {totales['articulos']} artículos, "
+            f"{totales['productos']} productos y {totales['recetas']} renglones de receta."
+        ))
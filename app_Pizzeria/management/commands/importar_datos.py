@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria import intercambio
+
+
+class Command(BaseCommand):
+    help = "Importa proveedores, inventario o menú desde un archivo CSV o JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=sorted(intercambio.COLUMNAS))
+        parser.add_argument('archivo', help="Ruta del archivo a importar")
+        parser.add_argument('--formato', choices=intercambio.FORMATOS,
+                            help="Por defecto se deduce de la extensión")
+
+    def handle(self, *args, **opciones):
+        try:
+            formato = intercambio.detectar_formato(opciones['archivo'], opciones['formato'])
+            with open(opciones['archivo'], 'rb') as archivo:
+                resultado = intercambio.importar(opciones['modelo'], archivo, formato)
+        except (OSError, intercambio.ErrorImportacion) as e:
+            raise CommandError(e)
+
+        for error in resultado.errores:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Filas guardadas: {resultado.guardadas}. Filas con error: {resultado.total_errores}."
+        ))
@@ -0,0 +1,41 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from app_Pizzeria.movimientos import diferencias, tomar_instantanea
+
+
+class Command(BaseCommand):
+    help = "Guarda el saldo de stock de cada artículo (instantánea) para las consultas por fecha."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fecha',
+            help="Día (AAAA-MM-DD) a cuyo cierre se toma el saldo; por defecto ayer",
+        )
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help="Sólo reporta los artículos cuyo stock no coincide con la suma de sus movimientos",
+        )
+
+    def handle(self, *args, **opciones):
+        if opciones['verificar']:
+            distintos = diferencias()
+            for articulo, suma in distintos:
+                self.stdout.write(
+                    f"  [{articulo.id}] {articulo.nombre_articulo}: stock {articulo.stock} / movimientos {suma}"
+                )
+            self.stdout.write(f"{len(distintos)} artículos con stock distinto a su bitácora.")
+            return
+
+        if opciones['fecha']:
+            fecha = parse_date(opciones['fecha'])
+            if fecha is None:
+                raise CommandError("Fecha no válida, use AAAA-MM-DD.")
+        else:
+            # Por defecto el cierre de ayer: los movimientos de ese día ya terminaron
+            fecha = timezone.localdate() - datetime.timedelta(days=1)
+        guardados = tomar_instantanea(fecha)
+        self.stdout.write(self.style.SUCCESS(f"{guardados} saldos guardados al cierre del {fecha}."))
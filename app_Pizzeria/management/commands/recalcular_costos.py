@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from app_Pizzeria.costos import con_costos, recalcular_costos
+
+
+class Command(BaseCommand):
+    help = "Recalcula el costo de receta de todos los productos del menú."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help="Sólo reporta los productos cuyo costo guardado no coincide, sin modificarlos",
+        )
+
+    def handle(self, *args, **opciones):
+        if opciones['verificar']:
+            distintos = [
+                p for p in con_costos().only('id', 'nombre', 'precio', 'costo_receta')
+                if p.costo_receta != round(p.costo_actual, 2)
+            ]
+            for producto in distintos:
+                self.stdout.write(
+                    f"  [{producto.id}] {producto.nombre}: guardado {producto.costo_receta}"
+                    f" / real {producto.costo_actual}"
+                )
+            self.stdout.write(f"{len(distintos)} productos con costo desactualizado.")
+            return
+
+        actualizados = recalcular_costos()
+        self.stdout.write(self.style.SUCCESS(f"{actualizados} productos recalculados."))
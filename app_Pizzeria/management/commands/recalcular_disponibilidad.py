@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from app_Pizzeria.disponibilidad import actualizar_disponibilidad, diferencias
+
+
+class Command(BaseCommand):
+    help = "Recalcula la disponibilidad de todos los productos del menú según el stock de sus recetas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help="Sólo reporta los productos cuya disponibilidad guardada no coincide, sin modificarlos",
+        )
+
+    def handle(self, *args, **opciones):
+        if opciones['verificar']:
+            distintos = diferencias()
+            for producto_id, nombre, guardado in distintos:
+                self.stdout.write(f"  [{producto_id}] {nombre}: guardado {'sí' if guardado else 'no'} disponible")
+            self.stdout.write(f"{len(distintos)} productos con disponibilidad desactualizada.")
+            return
+
+        cambiados = actualizar_disponibilidad()
+        self.stdout.write(self.style.SUCCESS(f"{cambiados} productos cambiaron de disponibilidad."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria import busqueda
+
+
+class Command(BaseCommand):
+    help = "Vuelve a llenar el índice de búsqueda con todos los proveedores, artículos y productos."
+
+    def handle(self, *args, **opciones):
+        if not busqueda.disponible():
+            raise CommandError("El índice de búsqueda sólo existe en SQLite (FTS5).")
+        total = busqueda.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"{total} registros indexados."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app_Pizzeria.reorden import sugerencias_reorden
+
+
+class Command(BaseCommand):
+    help = "Muestra los artículos con stock por debajo del mínimo, agrupados por proveedor."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proveedor', type=int, help="ID de un proveedor específico")
+
+    def handle(self, *args, **opciones):
+        grupos = sugerencias_reorden(opciones['proveedor'])
+        if not grupos:
+            self.stdout.write(self.style.SUCCESS("Todo el inventario está por encima del mínimo."))
+            return
+
+        for grupo in grupos:
+            nombre = grupo.proveedor.nombre_proveedor if grupo.proveedor else "Sin proveedor"
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{nombre} ({len(grupo)} artículos)"))
+            for art in grupo.articulos:
+                self.stdout.write(
+                    f"  [{art.id}] {art.nombre_articulo}: stock {art.stock} / mínimo {art.stock_minimo}"
+                    f" -> pedir {art.cantidad_sugerida} {art.unidad} (${art.costo_sugerido})"
+                )
+            self.stdout.write(f"  Total: ${grupo.total}")
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria import reportes
+
+
+class Command(BaseCommand):
+    help = ("Borra de los resúmenes de ventas los renglones por hora más viejos que "
+            f"REPORTES_DIAS_POR_HORA ({settings.REPORTES_DIAS_POR_HORA} días); sus días completos "
+            "se conservan (para cron, cada noche).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reconstruir', action='store_true',
+            help="Vuelve a calcular los resúmenes desde los pedidos y la bitácora antes de compactar",
+        )
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help="Compara los totales de los resúmenes con los de los pedidos",
+        )
+
+    def handle(self, *args, **opciones):
+        if opciones['reconstruir']:
+            escritos = reportes.reconstruir()
+            self.stdout.write(f"{escritos} renglones calculados desde los pedidos.")
+        quitados = reportes.compactar()
+        self.stdout.write(self.style.SUCCESS(f"{quitados} renglones por hora borrados."))
+
+        if opciones['verificar']:
+            distintas = reportes.diferencias()
+            for sucursal_id, resumen, resumido, calculado in distintas:
+                self.stdout.write(self.style.ERROR(
+                    f"Sucursal {sucursal_id}, {resumen}: {resumido[0]} piezas / ${resumido[1]}, "
+                    f"pedidos {calculado[0]} piezas / ${calculado[1]}"
+                ))
+            if distintas:
+                raise CommandError("Los resúmenes no coinciden con los pedidos; use --reconstruir.")
+            self.stdout.write(self.style.SUCCESS("Los resúmenes coinciden con los pedidos."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app_Pizzeria.models import Inventario
+from app_Pizzeria.movimientos import con_stock_en, stock_en
+
+
+class Command(BaseCommand):
+    help = "Muestra el stock que había al cierre de un día (a partir de la bitácora de movimientos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('fecha', help="Día en formato AAAA-MM-DD")
+        parser.add_argument('--articulo', type=int, help="ID de un artículo específico")
+
+    def handle(self, *args, **opciones):
+        fecha = parse_date(opciones['fecha'])
+        if fecha is None:
+            raise CommandError("Fecha no válida, use AAAA-MM-DD.")
+
+        if opciones['articulo']:
+            try:
+                articulo = Inventario.objects.get(id=opciones['articulo'])
+            except Inventario.DoesNotExist:
+                raise CommandError(f"No existe el artículo {opciones['articulo']}.")
+            self.stdout.write(
+                f"[{articulo.id}] {articulo.nombre_articulo}: {stock_en(articulo.id, fecha)} {articulo.unidad}"
+                f" (hoy {articulo.stock})"
+            )
+            return
+
+        for articulo in con_stock_en(fecha).order_by('nombre_articulo', 'id'):
+            self.stdout.write(
+                f"  [{articulo.id}] {articulo.nombre_articulo}: {articulo.stock_en_fecha} {articulo.unidad}"
+            )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria import pronostico
+
+
+class Command(BaseCommand):
+    help = "Pronostica el consumo de cada artículo y ajusta su stock mínimo (requiere NumPy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=pronostico.DIAS_HISTORIAL,
+                            help="Días de historial de consumo a considerar")
+        parser.add_argument('--reabasto', type=int, default=pronostico.DIAS_REABASTO,
+                            help="Días que tarda en llegar un pedido al proveedor")
+        parser.add_argument('--alfa', type=float, default=pronostico.ALFA,
+                            help="Peso de los días recientes en el suavizamiento (0-1)")
+        parser.add_argument('--nivel-servicio', type=float, default=pronostico.NIVEL_SERVICIO,
+                            help="Factor z del stock de seguridad")
+        parser.add_argument('--procesos', type=int, default=1,
+                            help="Procesos para el cálculo (para inventarios muy grandes)")
+        parser.add_argument('--sin-guardar', action='store_true',
+                            help="Sólo muestra los cambios, no los escribe")
+
+    def handle(self, *args, **opciones):
+        if not pronostico.disponible():
+            raise CommandError("Se necesita NumPy: pip install numpy")
+        if opciones['dias'] < 7 or opciones['reabasto'] < 1 or not 0 < opciones['alfa'] <= 1:
+            raise CommandError("Use --dias >= 7, --reabasto >= 1 y 0 < --alfa <= 1.")
+        cambios = pronostico.sugerir_minimos(
+            dias=opciones['dias'],
+            dias_reabasto=opciones['reabasto'],
+            alfa=opciones['alfa'],
+            nivel_servicio=opciones['nivel_servicio'],
+            procesos=opciones['procesos'],
+            guardar=not opciones['sin_guardar'],
+        )
+        if opciones['verbosity'] > 1 or opciones['sin_guardar']:
+            for inventario_id, (actual, sugerido) in sorted(cambios.items()):
+                self.stdout.write(f"  [{inventario_id}] mínimo {actual} -> {sugerido}")
+        accion = "por cambiar" if opciones['sin_guardar'] else "actualizados"
+        self.stdout.write(self.style.SUCCESS(f"{len(cambios)} stocks mínimos {accion}."))
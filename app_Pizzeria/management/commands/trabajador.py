@@ -0,0 +1,56 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Pizzeria import cache_menu, trabajos
+
+
+class Command(BaseCommand):
+    help = ("Atiende la cola de trabajos en segundo plano (importaciones, reconstrucciones) "
+            "con varios hilos o procesos, hasta Ctrl+C / SIGTERM.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=1, help="Hilos por proceso (por defecto 1)")
+        parser.add_argument(
+            '--procesos', type=int, default=0,
+            help="Procesos hijos de --hilos hilos cada uno; 0 (por defecto) = sólo este proceso",
+        )
+        parser.add_argument(
+            '--espera', type=float, default=settings.TRABAJOS_ESPERA,
+            help="Segundos entre consultas a la cola vacía (por defecto TRABAJOS_ESPERA)",
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help="Termina cuando la cola queda vacía (para cron o pruebas)",
+        )
+
+    def handle(self, *args, **opciones):
+        if opciones['hilos'] < 1 or opciones['procesos'] < 0:
+            raise CommandError("--hilos debe ser al menos 1 y --procesos no puede ser negativo.")
+        if opciones['procesos'] and not hasattr(os, 'fork'):
+            raise CommandError("--procesos requiere un sistema con fork (Linux, macOS); use --hilos.")
+        # Los trabajos invalidan el menú en la caché y avisan a la pantalla de
+        # cocina desde este proceso: con la caché local de cada proceso los
+        # workers web nunca se enteran (y siguen respondiendo 304)
+        if not cache_menu.compartida():
+            raise CommandError(
+                "El trabajador necesita la misma caché que el sitio: use PIZZERIA_CACHE=archivo "
+                "(con la caché local de cada proceso el menú no se invalida en la web)."
+            )
+        if not settings.EVENTOS_BROKER:
+            self.stderr.write(self.style.WARNING(
+                "Sin PIZZERIA_EVENTOS_BROKER los cambios que hagan los trabajos no se envían a las "
+                "pantallas de cocina abiertas (las ven hasta que se reconectan)."
+            ))
+
+        if opciones['procesos']:
+            forma = f"{opciones['procesos']} procesos de {opciones['hilos']} hilos"
+        else:
+            forma = f"{opciones['hilos']} hilos"
+        self.stdout.write(f"Trabajador con {forma} (Ctrl+C para terminar).")
+        trabajos.servir(
+            hilos=opciones['hilos'], procesos=opciones['procesos'],
+            espera=opciones['espera'], una_vez=opciones['una_vez'],
+        )
+        self.stdout.write(self.style.SUCCESS("Trabajador detenido."))
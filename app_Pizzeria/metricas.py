@@ -0,0 +1,347 @@
+import logging
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.views.decorators.http import require_GET
+
+# ==========================================
+# MÉTRICAS DE RENDIMIENTO (formato de texto de Prometheus)
+# ==========================================
+# MetricasMiddleware mide cada petición y la acumula por nombre de URL
+# (ver_menu, agregar_inventario, admin:index...):
+#   - latencia (histograma),
+#   - número y tiempo de las consultas SQL,
+#   - tiempo de render de las plantillas,
+#   - tamaño de la respuesta (histograma).
+# GET /metrics las expone para Prometheus.
+#
+# Costo bajo con muchos hilos: cada hilo acumula en su propio fragmento, sin
+# candados; sólo /metrics recorre y suma los fragmentos de todos los hilos.
+# Los fragmentos de los hilos que ya terminaron (servidores que crean un hilo
+# por petición o reciclan los de su pool) se suman una vez a un total de
+# retirados y se sueltan, así que la lista no crece con los hilos que pasan.
+# Cada proceso (gunicorn -w N) tiene sus propias métricas.
+#
+# Las consultas se miden con un execute_wrapper que signals.py instala en
+# cada conexión nueva (así también se miden las de las vistas async, que
+# corren en otro hilo); la medición de la petición en curso viaja en una
+# ContextVar. Las consultas que pasan de settings.CONSULTA_LENTA_MS se
+# escriben en el logger 'pizzeria.consultas_lentas', con o sin petición.
+
+# Límites superiores (segundos / bytes) de los histogramas
+CUBETAS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CUBETAS_BYTES = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+
+SIN_RUTA = 'sin_ruta'
+
+registro_lentas = logging.getLogger('pizzeria.consultas_lentas')
+
+# Medición de la petición en curso (None fuera de una petición)
+_actual = ContextVar('metricas_peticion', default=None)
+
+
+class Medicion:
+    """Lo que se acumula durante una petición."""
+    __slots__ = ('consultas', 'tiempo_bd', 'tiempo_plantillas', 'vista')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.tiempo_plantillas = 0.0
+        self.vista = None
+
+
+class Acumulado:
+    """Totales de una vista dentro del fragmento de un hilo."""
+    __slots__ = (
+        'peticiones', 'latencia', 'cubetas_latencia', 'consultas', 'tiempo_bd',
+        'tiempo_plantillas', 'bytes', 'cubetas_bytes', 'codigos',
+    )
+
+    def __init__(self):
+        self.peticiones = 0
+        self.latencia = 0.0
+        self.cubetas_latencia = [0] * (len(CUBETAS_LATENCIA) + 1)
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.tiempo_plantillas = 0.0
+        self.bytes = 0
+        self.cubetas_bytes = [0] * (len(CUBETAS_BYTES) + 1)
+        self.codigos = {}
+
+
+# ---------- Registro por hilo ----------
+
+_local = threading.local()
+# [(weakref al hilo, fragmento), ...] de los hilos que pueden seguir escribiendo
+_fragmentos = []
+# {vista: Acumulado} de los hilos que ya terminaron
+_retirados = {}
+_candado_fragmentos = threading.Lock()
+
+
+def _fragmento():
+    """Fragmento {vista: Acumulado} del hilo actual (se crea una vez por hilo)."""
+    try:
+        return _local.fragmento
+    except AttributeError:
+        fragmento = _local.fragmento = {}
+        with _candado_fragmentos:
+            _fragmentos.append((weakref.ref(threading.current_thread()), fragmento))
+        return fragmento
+
+
+def _terminado(hilo):
+    hilo = hilo()
+    return hilo is None or not hilo.is_alive()
+
+
+def registrar(vista, segundos, medicion, codigo, tamaño):
+    fragmento = _fragmento()
+    acumulado = fragmento.get(vista)
+    if acumulado is None:
+        acumulado = fragmento[vista] = Acumulado()
+    acumulado.peticiones += 1
+    acumulado.latencia += segundos
+    acumulado.cubetas_latencia[bisect_left(CUBETAS_LATENCIA, segundos)] += 1
+    acumulado.consultas += medicion.consultas
+    acumulado.tiempo_bd += medicion.tiempo_bd
+    acumulado.tiempo_plantillas += medicion.tiempo_plantillas
+    acumulado.codigos[codigo] = acumulado.codigos.get(codigo, 0) + 1
+    if tamaño is not None:
+        acumulado.bytes += tamaño
+        acumulado.cubetas_bytes[bisect_left(CUBETAS_BYTES, tamaño)] += 1
+
+
+def reiniciar():
+    """Borra todo lo acumulado (para las pruebas)."""
+    with _candado_fragmentos:
+        for _, fragmento in _fragmentos:
+            fragmento.clear()
+        _retirados.clear()
+
+
+def _sumar(suma, fragmento):
+    """Suma un fragmento {vista: Acumulado} a `suma`."""
+    # dict() copia de una vez: el hilo dueño puede estar agregando vistas
+    for vista, acumulado in dict(fragmento).items():
+        total = suma.get(vista)
+        if total is None:
+            total = suma[vista] = Acumulado()
+        total.peticiones += acumulado.peticiones
+        total.latencia += acumulado.latencia
+        total.consultas += acumulado.consultas
+        total.tiempo_bd += acumulado.tiempo_bd
+        total.tiempo_plantillas += acumulado.tiempo_plantillas
+        total.bytes += acumulado.bytes
+        for i, n in enumerate(acumulado.cubetas_latencia):
+            total.cubetas_latencia[i] += n
+        for i, n in enumerate(acumulado.cubetas_bytes):
+            total.cubetas_bytes[i] += n
+        for codigo, n in dict(acumulado.codigos).items():
+            total.codigos[codigo] = total.codigos.get(codigo, 0) + n
+
+
+def totales():
+    """{vista: Acumulado} sumando los fragmentos de todos los hilos."""
+    suma = {}
+    with _candado_fragmentos:
+        # Un hilo terminado ya no escribe: su fragmento pasa a los retirados
+        vivos = []
+        for hilo, fragmento in _fragmentos:
+            if _terminado(hilo):
+                _sumar(_retirados, fragmento)
+            else:
+                vivos.append((hilo, fragmento))
+        _fragmentos[:] = vivos
+        _sumar(suma, _retirados)
+    for _, fragmento in vivos:
+        _sumar(suma, fragmento)
+    return suma
+
+
+# ---------- Consultas SQL ----------
+
+def medir_consulta(execute, sql, params, many, context):
+    """execute_wrapper: suma la consulta a la petición y registra las lentas."""
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        segundos = time.perf_counter() - inicio
+        medicion = _actual.get()
+        if medicion is not None:
+            medicion.consultas += 1
+            medicion.tiempo_bd += segundos
+        if segundos * 1000 >= settings.CONSULTA_LENTA_MS:
+            registro_lentas.warning(
+                "%.1f ms [%s] %s", segundos * 1000,
+                (medicion and medicion.vista) or '-', sql,
+                extra={'duracion': segundos, 'sql': sql, 'params': params},
+            )
+
+
+def instalar(connection):
+    """Agrega medir_consulta a los execute_wrappers de la conexión (una vez)."""
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+# ---------- Plantillas ----------
+
+class PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        medicion = _actual.get()
+        if medicion is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion.tiempo_plantillas += time.perf_counter() - inicio
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """Backend de plantillas de Django que mide el tiempo de render."""
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return PlantillaMedida(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# ---------- Middleware ----------
+
+def _tamaño(respuesta):
+    if respuesta.streaming:
+        return None  # no se conoce sin consumir el contenido
+    return len(respuesta.content)
+
+
+def _terminar(request, respuesta, inicio, medicion):
+    coincidencia = getattr(request, 'resolver_match', None)
+    vista = coincidencia.view_name if coincidencia else SIN_RUTA
+    registrar(vista, time.perf_counter() - inicio, medicion, respuesta.status_code, _tamaño(respuesta))
+
+
+class MetricasMiddleware:
+    """Mide cada petición (sync o async) y la acumula por nombre de URL."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        _terminar(request, respuesta, inicio, medicion)
+        return respuesta
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        _terminar(request, respuesta, inicio, medicion)
+        return respuesta
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Para el registro de consultas lentas
+        medicion = _actual.get()
+        if medicion is not None:
+            medicion.vista = request.resolver_match.view_name
+
+
+# ---------- Exportación ----------
+
+def _etiquetas(**valores):
+    partes = []
+    for nombre, valor in valores.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def _histograma(lineas, nombre, ayuda, cubetas, datos):
+    """datos: [(vista, conteos por cubeta, suma, total), ...]"""
+    lineas.append(f'# HELP {nombre} {ayuda}')
+    lineas.append(f'# TYPE {nombre} histogram')
+    for vista, conteos, suma, total in datos:
+        acumulado = 0
+        for limite, n in zip((*cubetas, '+Inf'), conteos):
+            acumulado += n
+            lineas.append(f'{nombre}_bucket{_etiquetas(vista=vista, le=limite)} {acumulado}')
+        lineas.append(f'{nombre}_sum{_etiquetas(vista=vista)} {suma}')
+        lineas.append(f'{nombre}_count{_etiquetas(vista=vista)} {total}')
+
+
+def _contador(lineas, nombre, ayuda, datos):
+    """datos: [(etiquetas, valor), ...]"""
+    lineas.append(f'# HELP {nombre} {ayuda}')
+    lineas.append(f'# TYPE {nombre} counter')
+    for etiquetas, valor in datos:
+        lineas.append(f'{nombre}{_etiquetas(**etiquetas)} {valor}')
+
+
+def exportar():
+    """Todas las métricas en el formato de texto de Prometheus."""
+    datos = sorted(totales().items())
+    lineas = []
+    _contador(lineas, 'pizzeria_peticiones_total', 'Peticiones por vista y código de respuesta', [
+        ({'vista': vista, 'codigo': codigo}, n)
+        for vista, a in datos for codigo, n in sorted(a.codigos.items())
+    ])
+    _histograma(lineas, 'pizzeria_peticion_segundos', 'Latencia de la petición', CUBETAS_LATENCIA, [
+        (vista, a.cubetas_latencia, a.latencia, a.peticiones) for vista, a in datos
+    ])
+    _contador(lineas, 'pizzeria_consultas_total', 'Consultas SQL ejecutadas', [
+        ({'vista': vista}, a.consultas) for vista, a in datos
+    ])
+    _contador(lineas, 'pizzeria_consultas_segundos_total', 'Tiempo en consultas SQL', [
+        ({'vista': vista}, a.tiempo_bd) for vista, a in datos
+    ])
+    _contador(lineas, 'pizzeria_plantillas_segundos_total', 'Tiempo de render de plantillas', [
+        ({'vista': vista}, a.tiempo_plantillas) for vista, a in datos
+    ])
+    _histograma(lineas, 'pizzeria_respuesta_bytes', 'Tamaño del cuerpo de la respuesta', CUBETAS_BYTES, [
+        (vista, a.cubetas_bytes, a.bytes, sum(a.cubetas_bytes)) for vista, a in datos
+    ])
+    return '\n'.join(lineas) + '\n'
+
+
+@require_GET
+def ver_metricas(request):
+    """
+    GET /metrics para Prometheus. Si settings.METRICAS_TOKEN está definido
+    se exige 'Authorization: Bearer <token>'.
+    """
+    token = settings.METRICAS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
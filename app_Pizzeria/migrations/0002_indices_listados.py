@@ -0,0 +1,49 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['proveedor', 'id'], name='inv_proveedor_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['unidad', 'id'], name='inv_unidad_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['nombre_articulo', 'id'], name='inv_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(condition=models.Q(('stock__lt', models.F('stock_minimo'))), fields=['id'], name='inv_stock_bajo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['categoria', 'id'], name='menu_categoria_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['disponible', 'id'], name='menu_disponible_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['nombre', 'id'], name='menu_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['precio', 'id'], name='menu_precio_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proveedores',
+            index=models.Index(fields=['activo', 'id'], name='prov_activo_id_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0002_indices_listados'),
+    ]
+
+    operations = [
+        # La tabla app_Pizzeria_menu_articulos ya existe (la creó el ManyToMany),
+        # así que sólo se registra el modelo Receta en el estado de Django.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Receta',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('menu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app_Pizzeria.menu')),
+                        ('inventario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app_Pizzeria.inventario')),
+                    ],
+                    options={
+                        'db_table': 'app_Pizzeria_menu_articulos',
+                        'unique_together': {('menu', 'inventario')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='menu',
+                    name='articulos',
+                    field=models.ManyToManyField(blank=True, related_name='productos_menu', through='app_Pizzeria.Receta', to='app_Pizzeria.inventario'),
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.AddField(
+            model_name='receta',
+            name='cantidad',
+            field=models.DecimalField(decimal_places=3, default=1, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='Pedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('cliente', models.CharField(blank=True, max_length=100, null=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('preparando', 'En preparación'), ('entregado', 'Entregado'), ('cancelado', 'Cancelado')], default='pendiente', max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'id'], name='pedido_estado_id_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DetallePedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField(default=1)),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='app_Pizzeria.pedido')),
+                ('producto', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='detalles_pedido', to='app_Pizzeria.menu')),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0003_receta_pedidos'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inventario',
+            name='inv_stock_bajo_idx',
+        ),
+        migrations.AddField(
+            model_name='inventario',
+            name='bajo_minimo',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('stock__lt', models.F('stock_minimo'))), output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(condition=models.Q(('bajo_minimo', True)), fields=['proveedor', 'id'], name='inv_reorden_idx'),
+        ),
+    ]
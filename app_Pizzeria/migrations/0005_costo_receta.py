@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_costos(apps, schema_editor):
+    """Llena costo_receta de los productos que ya existen (un solo UPDATE)."""
+    Menu = apps.get_model('app_Pizzeria', 'Menu')
+    Receta = apps.get_model('app_Pizzeria', 'Receta')
+    decimal = models.DecimalField(max_digits=12, decimal_places=2)
+    suma = (
+        Receta.objects.filter(menu_id=OuterRef('pk'))
+        .values('menu_id')
+        .annotate(total=Sum(F('cantidad') * F('inventario__costo_unitario'), output_field=decimal))
+        .values('total')
+    )
+    Menu.objects.update(
+        costo_receta=Coalesce(Subquery(suma, output_field=decimal), Value(Decimal('0')), output_field=decimal)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0004_reorden'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='costo_receta',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(calcular_costos, migrations.RunPython.noop),
+    ]
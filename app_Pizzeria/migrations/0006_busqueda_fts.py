@@ -0,0 +1,68 @@
+import unicodedata
+
+from django.db import migrations
+
+
+def _normalizar(texto):
+    descompuesto = unicodedata.normalize('NFKD', str(texto or ''))
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+def crear_indice(apps, schema_editor):
+    """Crea las tablas FTS5 de búsqueda (sólo SQLite) y las llena con lo que ya existe."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE busqueda_fts USING fts5(texto, nombre UNINDEXED, tokenize='trigram')"
+    )
+    # Vocabulario (palabras distintas) con su índice de trigramas para los errores de dedo
+    schema_editor.execute(
+        'CREATE TABLE busqueda_palabras (id INTEGER PRIMARY KEY, palabra TEXT NOT NULL UNIQUE)'
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE busqueda_palabras_fts USING fts5("
+        "palabra, content='busqueda_palabras', content_rowid='id', tokenize='trigram')"
+    )
+    schema_editor.execute(
+        'CREATE TRIGGER busqueda_palabras_ai AFTER INSERT ON busqueda_palabras BEGIN '
+        'INSERT INTO busqueda_palabras_fts (rowid, palabra) VALUES (new.id, new.palabra); END'
+    )
+    fuentes = [
+        (1, apps.get_model('app_Pizzeria', 'Proveedores'), ('nombre_proveedor', 'rfc')),
+        (2, apps.get_model('app_Pizzeria', 'Inventario'), ('nombre_articulo',)),
+        (3, apps.get_model('app_Pizzeria', 'Menu'), ('nombre', 'categoria')),
+    ]
+    filas = []
+    for tipo, modelo, campos in fuentes:
+        for objeto_id, nombre, *extras in modelo.objects.values_list('id', *campos).iterator():
+            texto = ' '.join(_normalizar(t) for t in (nombre, *extras) if t)
+            filas.append((objeto_id * 4 + tipo, texto, nombre))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO busqueda_fts (rowid, texto, nombre) VALUES (%s, %s, %s)', filas
+        )
+        palabras = {
+            p for _, texto, _ in filas for p in texto.split() if len(p) >= 3 and not p.isdigit()
+        }
+        cursor.executemany(
+            'INSERT INTO busqueda_palabras (palabra) VALUES (%s)', [(p,) for p in sorted(palabras)]
+        )
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS busqueda_fts')
+        schema_editor.execute('DROP TABLE IF EXISTS busqueda_palabras_fts')
+        schema_editor.execute('DROP TABLE IF EXISTS busqueda_palabras')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0005_costo_receta'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,54 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def saldo_inicial(apps, schema_editor):
+    """Un movimiento de ajuste con el stock actual de cada artículo (saldo de apertura)."""
+    Inventario = apps.get_model('app_Pizzeria', 'Inventario')
+    MovimientoInventario = apps.get_model('app_Pizzeria', 'MovimientoInventario')
+    ahora = timezone.now()
+    MovimientoInventario.objects.bulk_create(
+        (
+            MovimientoInventario(inventario_id=articulo_id, fecha=ahora, tipo=3, cantidad=stock)
+            for articulo_id, stock in Inventario.objects.exclude(stock=0).values_list('id', 'stock').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0006_busqueda_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tipo', models.PositiveSmallIntegerField(choices=[(1, 'Compra'), (2, 'Consumo'), (3, 'Ajuste')])),
+                ('cantidad', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('inventario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='app_Pizzeria.inventario')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['inventario', 'fecha'], name='mov_inventario_fecha_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('stock', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('inventario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='app_Pizzeria.inventario')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('inventario', 'fecha'), name='saldo_inventario_fecha_uniq')],
+            },
+        ),
+        migrations.RunPython(saldo_inicial, migrations.RunPython.noop),
+    ]
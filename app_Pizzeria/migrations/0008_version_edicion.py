@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0007_movimientos_inventario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventario',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='proveedores',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def calcular(apps, schema_editor):
+    """Estadísticas iniciales de cada proveedor. Los triggers se instalan en post_migrate (estadisticas.py)."""
+    conexion = schema_editor.connection
+    tablas = {
+        'estadisticas': apps.get_model('app_Pizzeria', 'EstadisticasProveedor')._meta.db_table,
+        'proveedores': apps.get_model('app_Pizzeria', 'Proveedores')._meta.db_table,
+        'inventario': apps.get_model('app_Pizzeria', 'Inventario')._meta.db_table,
+    }
+    e, p, i = (conexion.ops.quote_name(tablas[t]) for t in ('estadisticas', 'proveedores', 'inventario'))
+    schema_editor.execute(
+        f'INSERT INTO {e} (proveedor_id, articulos, valor_stock, articulos_bajo_minimo) '
+        f'SELECT p.id, COUNT(i.id), ROUND(COALESCE(SUM(i.stock * i.costo_unitario), 0), 4), '
+        f'COUNT(CASE WHEN i.bajo_minimo THEN 1 END) '
+        f'FROM {p} p LEFT JOIN {i} i ON i.fk_id_proveedor = p.id GROUP BY p.id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0008_version_edicion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticasProveedor',
+            fields=[
+                ('proveedor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadisticas', serialize=False, to='app_Pizzeria.proveedores')),
+                ('articulos', models.PositiveIntegerField(default=0)),
+                ('valor_stock', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+                ('articulos_bajo_minimo', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(calcular, migrations.RunPython.noop),
+    ]
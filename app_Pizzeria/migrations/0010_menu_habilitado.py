@@ -0,0 +1,45 @@
+from django.db import migrations, models
+from django.db.models import Exists, F, OuterRef
+from django.db.models.functions import Round
+
+
+def derivar(apps, schema_editor):
+    """
+    Lo que estaba marcado a mano pasa a 'habilitado'; 'disponible' queda
+    apagado en los productos sin stock para su receta (ver disponibilidad.py).
+    """
+    Menu = apps.get_model('app_Pizzeria', 'Menu')
+    Receta = apps.get_model('app_Pizzeria', 'Receta')
+    Menu.objects.update(habilitado=F('disponible'))
+    faltante = Receta.objects.filter(menu_id=OuterRef('pk'), cantidad__gt=Round(F('inventario__stock'), 2))
+    Menu.objects.filter(Exists(faltante)).update(disponible=False)
+
+
+def restaurar(apps, schema_editor):
+    Menu = apps.get_model('app_Pizzeria', 'Menu')
+    Menu.objects.update(disponible=F('habilitado'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0009_estadisticas_proveedor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='habilitado',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='menu',
+            name='disponible',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='receta',
+            index=models.Index(fields=['inventario', 'cantidad'], name='receta_inventario_cantidad_idx'),
+        ),
+        migrations.RunPython(derivar, restaurar),
+    ]
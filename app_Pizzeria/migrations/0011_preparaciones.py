@@ -0,0 +1,148 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def expandir(apps, schema_editor):
+    """Sin preparaciones todavía, la receta expandida es la receta directa (ver recetas.py)."""
+    Receta = apps.get_model('app_Pizzeria', 'Receta')
+    RecetaExpandida = apps.get_model('app_Pizzeria', 'RecetaExpandida')
+    RecetaExpandida.objects.bulk_create(
+        (
+            RecetaExpandida(menu_id=menu_id, inventario_id=inventario_id, cantidad=cantidad)
+            for menu_id, inventario_id, cantidad in
+            Receta.objects.values_list('menu_id', 'inventario_id', 'cantidad').iterator(chunk_size=2000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0010_menu_habilitado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComponentePreparacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=3, default=1, max_digits=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Preparacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('unidad', models.CharField(max_length=20)),
+                ('descripcion', models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PreparacionExpandida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=6, max_digits=16)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecetaExpandida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=3, max_digits=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecetaPreparacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=3, default=1, max_digits=10)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='receta',
+            name='receta_inventario_cantidad_idx',
+        ),
+        migrations.AddField(
+            model_name='componentepreparacion',
+            name='articulo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='componente_de', to='app_Pizzeria.inventario'),
+        ),
+        migrations.AddField(
+            model_name='componentepreparacion',
+            name='preparacion',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='componentes', to='app_Pizzeria.preparacion'),
+        ),
+        migrations.AddField(
+            model_name='componentepreparacion',
+            name='subpreparacion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='usada_en', to='app_Pizzeria.preparacion'),
+        ),
+        migrations.AddField(
+            model_name='preparacionexpandida',
+            name='inventario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_Pizzeria.inventario'),
+        ),
+        migrations.AddField(
+            model_name='preparacionexpandida',
+            name='preparacion',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expansion', to='app_Pizzeria.preparacion'),
+        ),
+        migrations.AddField(
+            model_name='recetaexpandida',
+            name='inventario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_Pizzeria.inventario'),
+        ),
+        migrations.AddField(
+            model_name='recetaexpandida',
+            name='menu',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receta_expandida', to='app_Pizzeria.menu'),
+        ),
+        migrations.AddField(
+            model_name='recetapreparacion',
+            name='menu',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app_Pizzeria.menu'),
+        ),
+        migrations.AddField(
+            model_name='recetapreparacion',
+            name='preparacion',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='app_Pizzeria.preparacion'),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='preparaciones',
+            field=models.ManyToManyField(blank=True, related_name='productos_menu', through='app_Pizzeria.RecetaPreparacion', to='app_Pizzeria.preparacion'),
+        ),
+        migrations.AddConstraint(
+            model_name='componentepreparacion',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('articulo__isnull', False), ('subpreparacion__isnull', True)), models.Q(('articulo__isnull', True), ('subpreparacion__isnull', False)), _connector='OR'), name='componente_articulo_o_preparacion'),
+        ),
+        migrations.AddConstraint(
+            model_name='componentepreparacion',
+            constraint=models.UniqueConstraint(fields=('preparacion', 'articulo'), name='componente_articulo_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='componentepreparacion',
+            constraint=models.UniqueConstraint(fields=('preparacion', 'subpreparacion'), name='componente_subpreparacion_uniq'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='preparacionexpandida',
+            unique_together={('preparacion', 'inventario')},
+        ),
+        migrations.AddIndex(
+            model_name='recetaexpandida',
+            index=models.Index(fields=['inventario', 'cantidad'], name='receta_exp_inventario_cant_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recetaexpandida',
+            unique_together={('menu', 'inventario')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='recetapreparacion',
+            unique_together={('menu', 'preparacion')},
+        ),
+        migrations.RunPython(expandir, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:56
+
+import app_Pizzeria.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def crear_principal(apps, schema_editor):
+    # Los datos que ya existían quedan en la sucursal principal
+    Sucursal = apps.get_model('app_Pizzeria', 'Sucursal')
+    Sucursal.objects.using(schema_editor.connection.alias).get_or_create(
+        id=app_Pizzeria.models.SUCURSAL_PRINCIPAL, defaults={'nombre': 'Principal', 'clave': 'principal'},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0012_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sucursal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('clave', models.SlugField(max_length=30, unique=True)),
+                ('activa', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name_plural': 'sucursales',
+            },
+        ),
+        migrations.RunPython(crear_principal, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='inventario',
+            name='inv_proveedor_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inventario',
+            name='inv_unidad_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inventario',
+            name='inv_nombre_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inventario',
+            name='inv_reorden_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='menu',
+            name='menu_categoria_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='menu',
+            name='menu_disponible_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='menu',
+            name='menu_nombre_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='menu',
+            name='menu_precio_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pedido',
+            name='pedido_estado_id_idx',
+        ),
+        migrations.AddField(
+            model_name='inventario',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=app_Pizzeria.models.sucursal_actual_id, on_delete=django.db.models.deletion.PROTECT, related_name='inventario', to='app_Pizzeria.sucursal'),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=app_Pizzeria.models.sucursal_actual_id, on_delete=django.db.models.deletion.PROTECT, related_name='menu', to='app_Pizzeria.sucursal'),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=app_Pizzeria.models.sucursal_actual_id, on_delete=django.db.models.deletion.PROTECT, related_name='pedidos', to='app_Pizzeria.sucursal'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['sucursal', 'id'], name='inv_sucursal_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['sucursal', 'proveedor', 'id'], name='inv_proveedor_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['sucursal', 'unidad', 'id'], name='inv_unidad_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['sucursal', 'nombre_articulo', 'id'], name='inv_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(condition=models.Q(('bajo_minimo', True)), fields=['sucursal', 'proveedor', 'id'], name='inv_reorden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['sucursal', 'id'], name='menu_sucursal_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['sucursal', 'categoria', 'id'], name='menu_categoria_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['sucursal', 'disponible', 'id'], name='menu_disponible_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['sucursal', 'nombre', 'id'], name='menu_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['sucursal', 'precio', 'id'], name='menu_precio_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['sucursal', 'id'], name='pedido_sucursal_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['sucursal', 'estado', 'id'], name='pedido_estado_id_idx'),
+        ),
+    ]
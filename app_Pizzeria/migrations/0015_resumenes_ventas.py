@@ -0,0 +1,63 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:30
+
+import app_Pizzeria.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0014_trabajos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCategoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('hora', models.PositiveSmallIntegerField()),
+                ('categoria', models.CharField(max_length=50)),
+                ('piezas', models.BigIntegerField(default=0)),
+                ('importe', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sucursal', models.ForeignKey(db_index=False, default=app_Pizzeria.models.sucursal_actual_id, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='app_Pizzeria.sucursal')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sucursal', 'hora', 'dia', 'categoria'), name='resumen_categoria_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenConsumo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('inventario_id', models.BigIntegerField()),
+                ('nombre', models.CharField(max_length=100)),
+                ('unidad', models.CharField(max_length=20)),
+                ('proveedor_id', models.BigIntegerField(blank=True, null=True)),
+                ('cantidad', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+                ('costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sucursal', models.ForeignKey(db_index=False, default=app_Pizzeria.models.sucursal_actual_id, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='app_Pizzeria.sucursal')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sucursal', 'dia', 'inventario_id'), name='resumen_consumo_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenVenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('producto_id', models.BigIntegerField()),
+                ('nombre', models.CharField(max_length=100)),
+                ('categoria', models.CharField(max_length=50)),
+                ('piezas', models.BigIntegerField(default=0)),
+                ('importe', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sucursal', models.ForeignKey(db_index=False, default=app_Pizzeria.models.sucursal_actual_id, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='app_Pizzeria.sucursal')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sucursal', 'dia', 'producto_id'), name='resumen_venta_uniq')],
+            },
+        ),
+    ]
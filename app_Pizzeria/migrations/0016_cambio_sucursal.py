@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+def asignar_sucursal(apps, schema_editor):
+    """La sucursal de los artículos y productos que ya estaban en la bitácora. Los triggers se reinstalan en post_migrate."""
+    conexion = schema_editor.connection
+    q = conexion.ops.quote_name
+    cambios = q(apps.get_model('app_Pizzeria', 'CambioSincronizacion')._meta.db_table)
+    for modelo, nombre in (('inventario', 'Inventario'), ('menu', 'Menu')):
+        tabla = q(apps.get_model('app_Pizzeria', nombre)._meta.db_table)
+        schema_editor.execute(
+            f'UPDATE {cambios} SET sucursal_id = (SELECT t.sucursal_id FROM {tabla} t WHERE t.id = {cambios}.objeto_id) '
+            f"WHERE modelo = '{modelo}'"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0015_resumenes_ventas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cambiosincronizacion',
+            name='sucursal_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(asignar_sucursal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:49
+
+import app_Pizzeria.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def asignar_sucursal(apps, schema_editor):
+    """Cada preparación queda en la sucursal de sus artículos (la principal si no lleva ninguno)."""
+    q = schema_editor.connection.ops.quote_name
+    preparacion, componente, inventario = (
+        q(apps.get_model('app_Pizzeria', nombre)._meta.db_table)
+        for nombre in ('Preparacion', 'ComponentePreparacion', 'Inventario')
+    )
+    schema_editor.execute(
+        f'UPDATE {preparacion} SET sucursal_id = COALESCE(('
+        f'SELECT MIN(i.sucursal_id) FROM {componente} c JOIN {inventario} i ON i.id = c.articulo_id '
+        f'WHERE c.preparacion_id = {preparacion}.id), sucursal_id)'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0016_cambio_sucursal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='preparacion',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=app_Pizzeria.models.sucursal_actual_id, on_delete=django.db.models.deletion.PROTECT, related_name='preparaciones', to='app_Pizzeria.sucursal'),
+        ),
+        migrations.RunPython(asignar_sucursal, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='preparacion',
+            name='nombre',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='preparacion',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'nombre'), name='preparacion_sucursal_nombre_uniq'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Los triggers que escriben en la tabla: se quitan antes de rehacerla y se
+# vuelven a instalar en post_migrate (estadisticas.py)
+TRIGGERS = {
+    'proveedores': ['estadisticas_proveedor_alta'],
+    'inventario': ['estadisticas_articulo_alta', 'estadisticas_articulo_baja', 'estadisticas_articulo_cambio',
+                   'estadisticas_articulo_alta_baja'],
+}
+
+
+def quitar_triggers(apps, schema_editor):
+    conexion = schema_editor.connection
+    if conexion.vendor not in ('sqlite', 'postgresql'):
+        return
+    for nombre, triggers in TRIGGERS.items():
+        tabla = conexion.ops.quote_name(apps.get_model('app_Pizzeria', nombre.capitalize())._meta.db_table)
+        for trigger in triggers:
+            en = f' ON {tabla}' if conexion.vendor == 'postgresql' else ''
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}{en}')
+    if conexion.vendor == 'postgresql':
+        schema_editor.execute('DROP FUNCTION IF EXISTS estadisticas_proveedor_alta()')
+
+
+def calcular(apps, schema_editor):
+    """Estadísticas iniciales por proveedor y sucursal. Los triggers se instalan en post_migrate (estadisticas.py)."""
+    q = schema_editor.connection.ops.quote_name
+    e, i = (
+        q(apps.get_model('app_Pizzeria', nombre)._meta.db_table) for nombre in ('EstadisticasProveedor', 'Inventario')
+    )
+    schema_editor.execute(
+        f'INSERT INTO {e} (proveedor_id, sucursal_id, articulos, valor_stock, articulos_bajo_minimo) '
+        f'SELECT i.fk_id_proveedor, i.sucursal_id, COUNT(*), ROUND(SUM(i.stock * i.costo_unitario), 4), '
+        f'COUNT(CASE WHEN i.bajo_minimo THEN 1 END) '
+        f'FROM {i} i WHERE i.fk_id_proveedor IS NOT NULL GROUP BY i.fk_id_proveedor, i.sucursal_id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0017_preparacion_sucursal'),
+    ]
+
+    operations = [
+        migrations.RunPython(quitar_triggers, migrations.RunPython.noop),
+        # Son datos derivados: se rehace la tabla y se calcula de nuevo
+        migrations.DeleteModel(
+            name='EstadisticasProveedor',
+        ),
+        migrations.CreateModel(
+            name='EstadisticasProveedor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('articulos', models.PositiveIntegerField(default=0)),
+                ('valor_stock', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+                ('articulos_bajo_minimo', models.PositiveIntegerField(default=0)),
+                ('proveedor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas', to='app_Pizzeria.proveedores')),
+                ('sucursal', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_Pizzeria.sucursal')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('proveedor', 'sucursal'), name='estadisticas_proveedor_sucursal_uniq')],
+            },
+        ),
+        migrations.RunPython(calcular, migrations.RunPython.noop),
+    ]
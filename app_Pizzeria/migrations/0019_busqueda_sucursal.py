@@ -0,0 +1,57 @@
+import unicodedata
+
+from django.db import migrations
+
+
+def _normalizar(texto):
+    descompuesto = unicodedata.normalize('NFKD', str(texto or ''))
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+def _rehacer(apps, schema_editor, con_sucursal):
+    """Vuelve a crear busqueda_fts (con o sin la columna sucursal_id) y la llena. El vocabulario no cambia."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    columnas = 'texto, nombre UNINDEXED' + (', sucursal_id UNINDEXED' if con_sucursal else '')
+    schema_editor.execute('DROP TABLE IF EXISTS busqueda_fts')
+    schema_editor.execute(f"CREATE VIRTUAL TABLE busqueda_fts USING fts5({columnas}, tokenize='trigram')")
+    # (tipo, modelo, columna de la sucursal, campos del texto); los proveedores son de toda la cadena
+    fuentes = [
+        (1, apps.get_model('app_Pizzeria', 'Proveedores'), None, ('nombre_proveedor', 'rfc')),
+        (2, apps.get_model('app_Pizzeria', 'Inventario'), 'sucursal_id', ('nombre_articulo',)),
+        (3, apps.get_model('app_Pizzeria', 'Menu'), 'sucursal_id', ('nombre', 'categoria')),
+    ]
+    filas = []
+    for tipo, modelo, sucursal, campos in fuentes:
+        for objeto_id, nombre, *extras in modelo.objects.values_list('id', *campos).iterator():
+            texto = ' '.join(_normalizar(t) for t in (nombre, *extras) if t)
+            filas.append((objeto_id * 4 + tipo, texto, nombre))
+        if con_sucursal:
+            sucursales = dict(modelo.objects.values_list('id', sucursal)) if sucursal else {}
+            filas = [f + (sucursales.get(f[0] // 4),) if f[0] % 4 == tipo else f for f in filas]
+    marcas = ', '.join(['%s'] * (4 if con_sucursal else 3))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO busqueda_fts (rowid, texto, nombre{", sucursal_id" if con_sucursal else ""}) '
+            f'VALUES ({marcas})', filas
+        )
+
+
+def con_sucursal(apps, schema_editor):
+    _rehacer(apps, schema_editor, True)
+
+
+def sin_sucursal(apps, schema_editor):
+    _rehacer(apps, schema_editor, False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Pizzeria', '0018_estadisticas_por_sucursal'),
+    ]
+
+    operations = [
+        migrations.RunPython(con_sucursal, sin_sucursal),
+    ]
@@ -1,9 +1,116 @@
+from contextvars import ContextVar
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import models
+from django.utils import timezone
+
+# ==========================================
+# BASE: Versión para control de concurrencia optimista
+# ==========================================
+class Versionado(models.Model):
+    # Sube en cada escritura. Los formularios de edición sólo guardan si la
+    # versión sigue siendo la que leyeron (ver edicion.py), así que dos
+    # cajeros que editan el mismo registro no se pisan los cambios.
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version = (self.version or 0) + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+
+# ==========================================
+# BASE: Datos por sucursal
+# ==========================================
+# El inventario, el menú y los pedidos son de una sucursal. La sucursal de la
+# petición la fija sucursales.SucursalMiddleware en `sucursal_actual`; el
+# manager de esos modelos filtra por ella, así que cualquier consulta de una
+# vista sólo ve los datos de su sucursal. Sin sucursal activa (comandos,
+# pruebas, el shell) se ven todas.
+
+# id de la sucursal activa (None = todas)
+sucursal_actual = ContextVar('sucursal_actual', default=None)
+
+# La sucursal que crea la migración 0013 (datos anteriores a las sucursales)
+SUCURSAL_PRINCIPAL = 1
+
+
+def sucursal_actual_id():
+    """Sucursal de los registros nuevos: la activa o la principal."""
+    return sucursal_actual.get() or SUCURSAL_PRINCIPAL
+
+
+class PorSucursalQuerySet(models.QuerySet):
+    # Sucursal por la que ya se filtró (para no repetir la condición)
+    _sucursal = None
+
+    def _clone(self):
+        copia = super()._clone()
+        copia._sucursal = self._sucursal
+        return copia
+
+    def de_sucursal(self, sucursal_id=None):
+        """
+        Sólo los registros de la sucursal indicada (la activa si es None);
+        todos si no hay ninguna. Sirve para las consultas armadas antes de
+        la petición (los listados de listados.py).
+        """
+        if sucursal_id is None:
+            sucursal_id = sucursal_actual.get()
+        if sucursal_id is None or sucursal_id == self._sucursal:
+            return self
+        consulta = self.filter(sucursal_id=sucursal_id)
+        consulta._sucursal = sucursal_id
+        return consulta
+
+
+class PorSucursalManager(models.Manager.from_queryset(PorSucursalQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().de_sucursal()
+
+
+def _sucursal_de(registro, campo):
+    """sucursal_id del objeto al que apunta `campo` (None si no se indicó)."""
+    try:
+        relacionado = getattr(registro, campo)
+    except ObjectDoesNotExist:
+        return None
+    return relacionado.sucursal_id if relacionado is not None else None
+
+
+def validar_misma_sucursal(registro, campo, otro, mensaje):
+    """
+    Un renglón de receta sólo une objetos de la misma sucursal: si no, el
+    pedido de una sucursal descontaría el stock de otra.
+    """
+    sucursal_id = _sucursal_de(registro, campo)
+    otra_id = _sucursal_de(registro, otro)
+    if sucursal_id is not None and otra_id is not None and sucursal_id != otra_id:
+        raise ValidationError({otro: mensaje})
+
+# ==========================================
+# MODELO: Sucursal
+# ==========================================
+class Sucursal(models.Model):
+    nombre = models.CharField(max_length=100, unique=True)
+    # Se usa en ?sucursal=, el encabezado X-Sucursal y PIZZERIA_SUCURSALES_BD
+    clave = models.SlugField(max_length=30, unique=True)
+    activa = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name_plural = 'sucursales'
+
+    def __str__(self):
+        return self.nombre
 
 # ==========================================
 # MODELO: Proveedores (Actualizado)
 # ==========================================
-class Proveedores(models.Model):
+class Proveedores(Versionado):
     # id_proveedor es automático (AutoField)
     nombre_proveedor = models.CharField(max_length=100, unique=True)
     telefono_contacto = models.CharField(max_length=15, blank=True, null=True)
@@ -14,13 +121,19 @@ class Proveedores(models.Model):
     fecha_registro = models.DateField(auto_now_add=True) # auto_now_add es útil para la fecha de registro
     activo = models.BooleanField(default=True) # Conservado del modelo original
 
+    class Meta:
+        indexes = [
+            # Filtro por activo + paginación por id (ver listados.py)
+            models.Index(fields=['activo', 'id'], name='prov_activo_id_idx'),
+        ]
+
     def __str__(self):
         return self.nombre_proveedor # Actualizado para que coincida con el nuevo nombre de campo
 
 # ==========================================
 # MODELO: Inventario (Nuevo)
 # ==========================================
-class Inventario(models.Model):
+class Inventario(Versionado):
     # id_articulo es automático (AutoField)
     nombre_articulo = models.CharField(max_length=100)
     stock = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
@@ -38,6 +151,54 @@ class Inventario(models.Model):
         related_name="articulos_inventario",
         db_column="fk_id_proveedor" # Coincide con tu diagrama
     )
+    # Cada sucursal tiene su propio stock de cada artículo. Sin índice
+    # propio: (sucursal, id) va al principio de los índices de abajo
+    sucursal = models.ForeignKey(
+        Sucursal,
+        on_delete=models.PROTECT,
+        default=sucursal_actual_id,
+        related_name="inventario",
+        db_index=False,
+    )
+
+    # Bandera materializada "stock por debajo del mínimo". Es una columna
+    # generada (STORED): la base de datos la recalcula en cada INSERT/UPDATE
+    # que toca stock o stock_minimo, incluidos los UPDATE con F() de los
+    # pedidos y las importaciones masivas, sin recorrer la tabla.
+    bajo_minimo = models.GeneratedField(
+        expression=models.Q(stock__lt=models.F('stock_minimo')),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+
+    objects = PorSucursalManager()
+
+    class Meta:
+        indexes = [
+            # Índices compuestos (sucursal, filtro/orden, id) para la paginación
+            # por cursor: cada sucursal lee sólo su parte del índice, así que
+            # su listado cuesta lo mismo sin importar cuántas sucursales haya
+            models.Index(fields=['sucursal', 'id'], name='inv_sucursal_id_idx'),
+            models.Index(fields=['sucursal', 'proveedor', 'id'], name='inv_proveedor_id_idx'),
+            models.Index(fields=['sucursal', 'unidad', 'id'], name='inv_unidad_id_idx'),
+            models.Index(fields=['sucursal', 'nombre_articulo', 'id'], name='inv_nombre_id_idx'),
+            # Índice parcial: sólo contiene los artículos por reordenar,
+            # agrupados por proveedor (ver reorden.py)
+            models.Index(
+                fields=['sucursal', 'proveedor', 'id'],
+                condition=models.Q(bajo_minimo=True),
+                name='inv_reorden_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Costo y stock leídos de la base, para saber en post_save si cambiaron
+        # (ver costos.py y movimientos.py)
+        instancia._costo_original = instancia.__dict__.get('costo_unitario')
+        instancia._stock_original = instancia.__dict__.get('stock')
+        return instancia
 
     def __str__(self):
         return f"{self.nombre_articulo} ({self.stock} {self.unidad})"
@@ -45,23 +206,546 @@ class Inventario(models.Model):
 # ==========================================
 # MODELO: Menu (Nuevo)
 # ==========================================
-class Menu(models.Model):
+class Menu(Versionado):
     # id_producto es automático (AutoField)
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True, null=True)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     categoria = models.CharField(max_length=50) # Ej: 'Bebida', 'Postre', 'Plato Fuerte'
     tamaño = models.CharField(max_length=50, blank=True, null=True) # Ej: 'Chico', 'Grande'
-    disponible = models.BooleanField(default=True)
+    # El gerente lo ofrece o lo retira de la venta (casilla del formulario)
+    habilitado = models.BooleanField(default=True)
+    # Habilitado y con stock de todos los artículos de su receta. Es un valor
+    # desnormalizado que mantiene disponibilidad.py
+    disponible = models.BooleanField(default=True, editable=False)
+    # Costo de los ingredientes de UNA pieza (suma de cantidad * costo_unitario
+    # de su receta). Es un valor desnormalizado que mantiene costos.py
+    costo_receta = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    # El menú (y con él la disponibilidad) es de cada sucursal
+    sucursal = models.ForeignKey(
+        Sucursal,
+        on_delete=models.PROTECT,
+        default=sucursal_actual_id,
+        related_name="menu",
+        db_index=False,
+    )
 
     # Relación (Como solicitaste):
     # Un producto del menú (ej: Hamburguesa) usa VARIOS artículos del inventario (ej: Pan, Carne, Queso)
     # Y un artículo del inventario (ej: Queso) puede ser usado en VARIOS productos del menú (ej: Hamburguesa, Nachos)
+    # La tabla intermedia (Receta) guarda cuánto de cada artículo lleva el producto
     articulos = models.ManyToManyField(
         Inventario,
+        through='Receta',
         related_name="productos_menu",
         blank=True # Un producto puede existir sin artículos de inventario definidos
     )
+    # Y también preparaciones (masa, salsa...) hechas a su vez de artículos
+    preparaciones = models.ManyToManyField(
+        'Preparacion',
+        through='RecetaPreparacion',
+        related_name="productos_menu",
+        blank=True
+    )
+
+    objects = PorSucursalManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sucursal', 'id'], name='menu_sucursal_id_idx'),
+            models.Index(fields=['sucursal', 'categoria', 'id'], name='menu_categoria_id_idx'),
+            models.Index(fields=['sucursal', 'disponible', 'id'], name='menu_disponible_id_idx'),
+            models.Index(fields=['sucursal', 'nombre', 'id'], name='menu_nombre_id_idx'),
+            models.Index(fields=['sucursal', 'precio', 'id'], name='menu_precio_id_idx'),
+        ]
+
+    @property
+    def margen(self):
+        """Ganancia por pieza: precio - costo de la receta."""
+        return self.precio - self.costo_receta
+
+    @property
+    def margen_porcentaje(self):
+        """Margen como porcentaje del precio (None si el precio es 0)."""
+        if not self.precio:
+            return None
+        return self.margen * 100 / self.precio
+
+    def __str__(self):
+        return f"{self.nombre} - ${self.precio}"
+
+# ==========================================
+# MODELO: Receta (tabla intermedia Menu <-> Inventario)
+# ==========================================
+class Receta(models.Model):
+    # Reutiliza la tabla que Django creó para el ManyToMany original,
+    # sólo se le agregó la columna 'cantidad'
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE)
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE)
+    # Cantidad del artículo (en su 'unidad') que consume UNA pieza del producto
+    cantidad = models.DecimalField(max_digits=10, decimal_places=3, default=1)
+
+    class Meta:
+        db_table = 'app_Pizzeria_menu_articulos'
+        unique_together = [('menu', 'inventario')]
+
+    def clean(self):
+        validar_misma_sucursal(self, 'menu', 'inventario', "El artículo es de otra sucursal.")
+
+    def __str__(self):
+        return f"{self.menu_id} usa {self.cantidad} de {self.inventario_id}"
+
+# ==========================================
+# MODELO: Preparacion (sub-receta: masa, salsa...)
+# ==========================================
+class Preparacion(models.Model):
+    # Lo que la cocina prepara con artículos del inventario (u otras
+    # preparaciones) y los productos usan como un ingrediente más. No tiene
+    # stock propio: al vender se descuentan los artículos de los que está
+    # hecha (ver recetas.py)
+    nombre = models.CharField(max_length=100)
+    unidad = models.CharField(max_length=20) # En la que se miden las cantidades (kg, litro...)
+    descripcion = models.TextField(blank=True, null=True)
+    # Como los artículos de los que está hecha: cada sucursal tiene las suyas
+    sucursal = models.ForeignKey(
+        Sucursal,
+        on_delete=models.PROTECT,
+        default=sucursal_actual_id,
+        related_name="preparaciones",
+        db_index=False,
+    )
+
+    objects = PorSucursalManager()
+
+    class Meta:
+        constraints = [
+            # También es el índice de la sucursal
+            models.UniqueConstraint(fields=['sucursal', 'nombre'], name='preparacion_sucursal_nombre_uniq'),
+        ]
+
+    def __str__(self):
+        return self.nombre
+
+# ==========================================
+# MODELO: ComponentePreparacion (artículo o sub-preparación)
+# ==========================================
+class ComponentePreparacion(models.Model):
+    preparacion = models.ForeignKey(Preparacion, on_delete=models.CASCADE, related_name="componentes")
+    # Exactamente uno de los dos
+    articulo = models.ForeignKey(
+        Inventario, on_delete=models.CASCADE, null=True, blank=True, related_name="componente_de"
+    )
+    # No se puede borrar una preparación que otra usa
+    subpreparacion = models.ForeignKey(
+        Preparacion, on_delete=models.PROTECT, null=True, blank=True, related_name="usada_en"
+    )
+    # Cantidad del artículo o de la sub-preparación por UNA unidad de la preparación
+    cantidad = models.DecimalField(max_digits=10, decimal_places=3, default=1)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(articulo__isnull=False, subpreparacion__isnull=True)
+                    | models.Q(articulo__isnull=True, subpreparacion__isnull=False)
+                ),
+                name='componente_articulo_o_preparacion',
+            ),
+            models.UniqueConstraint(fields=['preparacion', 'articulo'], name='componente_articulo_uniq'),
+            models.UniqueConstraint(fields=['preparacion', 'subpreparacion'], name='componente_subpreparacion_uniq'),
+        ]
+
+    def clean(self):
+        if (self.articulo_id is None) == (self.subpreparacion_id is None):
+            raise ValidationError("Indique un artículo o una preparación (sólo uno).")
+        validar_misma_sucursal(self, 'preparacion', 'articulo', "El artículo es de otra sucursal.")
+        validar_misma_sucursal(self, 'preparacion', 'subpreparacion', "La preparación es de otra sucursal.")
+        if self.subpreparacion_id and self.preparacion_id:
+            from .recetas import formaria_ciclo
+            if formaria_ciclo(self.preparacion_id, self.subpreparacion_id):
+                raise ValidationError({'subpreparacion': "La preparación ya se usa (directa o indirectamente) dentro de ésta."})
+
+    def __str__(self):
+        componente = self.articulo_id or f"preparación {self.subpreparacion_id}"
+        return f"{self.preparacion_id} usa {self.cantidad} de {componente}"
+
+# ==========================================
+# MODELO: RecetaPreparacion (tabla intermedia Menu <-> Preparacion)
+# ==========================================
+class RecetaPreparacion(models.Model):
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE)
+    # No se puede borrar una preparación que algún producto usa
+    preparacion = models.ForeignKey(Preparacion, on_delete=models.PROTECT)
+    # Unidades de la preparación que lleva UNA pieza del producto
+    cantidad = models.DecimalField(max_digits=10, decimal_places=3, default=1)
+
+    class Meta:
+        unique_together = [('menu', 'preparacion')]
+
+    def clean(self):
+        validar_misma_sucursal(self, 'menu', 'preparacion', "La preparación es de otra sucursal.")
+
+    def __str__(self):
+        return f"{self.menu_id} usa {self.cantidad} de la preparación {self.preparacion_id}"
+
+# ==========================================
+# MODELO: PreparacionExpandida (sub-receta aplanada, memoizada)
+# ==========================================
+class PreparacionExpandida(models.Model):
+    # Artículos crudos que lleva UNA unidad de la preparación, con todas sus
+    # sub-preparaciones ya aplanadas. No se escribe a mano: lo mantiene recetas.py
+    preparacion = models.ForeignKey(Preparacion, on_delete=models.CASCADE, related_name="expansion")
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE, related_name="+")
+    # Más decimales que la receta: el redondeo se hace una sola vez, por producto
+    cantidad = models.DecimalField(max_digits=16, decimal_places=6)
+
+    class Meta:
+        unique_together = [('preparacion', 'inventario')]
+
+# ==========================================
+# MODELO: RecetaExpandida (artículos crudos por pieza de cada producto)
+# ==========================================
+class RecetaExpandida(models.Model):
+    # Receta directa + preparaciones expandidas, sumadas por artículo. Es lo
+    # que leen los pedidos, los costos y la disponibilidad (ver recetas.py)
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, related_name="receta_expandida")
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE, related_name="+")
+    cantidad = models.DecimalField(max_digits=10, decimal_places=3)
+
+    class Meta:
+        unique_together = [('menu', 'inventario')]
+        indexes = [
+            # Índice inverso con umbral: qué productos deja sin stock un
+            # cambio del artículo (ver disponibilidad.py)
+            models.Index(fields=['inventario', 'cantidad'], name='receta_exp_inventario_cant_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.nombre} - ${self.precio}"
\ No newline at end of file
+        return f"{self.menu_id} consume {self.cantidad} de {self.inventario_id}"
+
+# ==========================================
+# MODELO: Pedido (Nuevo)
+# ==========================================
+class Pedido(models.Model):
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('preparando', 'En preparación'),
+        ('entregado', 'Entregado'),
+        ('cancelado', 'Cancelado'),
+    ]
+
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+    cliente = models.CharField(max_length=100, blank=True, null=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+    # La de sus productos (ver pedidos.registrar_pedido)
+    sucursal = models.ForeignKey(
+        Sucursal,
+        on_delete=models.PROTECT,
+        default=sucursal_actual_id,
+        related_name="pedidos",
+        db_index=False,
+    )
+
+    objects = PorSucursalManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sucursal', 'id'], name='pedido_sucursal_id_idx'),
+            models.Index(fields=['sucursal', 'estado', 'id'], name='pedido_estado_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pedido #{self.id} - ${self.total}"
+
+# ==========================================
+# MODELO: DetallePedido (Nuevo)
+# ==========================================
+class DetallePedido(models.Model):
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name="detalles")
+    # Si el producto se borra del menú, el historial del pedido se conserva
+    producto = models.ForeignKey(
+        Menu,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="detalles_pedido",
+    )
+    cantidad = models.PositiveIntegerField(default=1)
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2) # Precio al momento de la venta
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.producto_id} (pedido {self.pedido_id})"
+
+# ==========================================
+# MODELO: MovimientoInventario (bitácora de stock)
+# ==========================================
+class MovimientoInventario(models.Model):
+    # Sólo se agregan renglones, nunca se modifican: la suma de 'cantidad' de
+    # un artículo es su stock (ver movimientos.py)
+    COMPRA, CONSUMO, AJUSTE = 1, 2, 3
+    TIPOS = [
+        (COMPRA, 'Compra'),
+        (CONSUMO, 'Consumo'),
+        (AJUSTE, 'Ajuste'),
+    ]
+
+    # Sin índice propio: lo cubre el índice (inventario, fecha)
+    inventario = models.ForeignKey(
+        Inventario, on_delete=models.CASCADE, related_name="movimientos", db_index=False
+    )
+    fecha = models.DateTimeField(default=timezone.now)
+    tipo = models.PositiveSmallIntegerField(choices=TIPOS)
+    # Con signo: positivo entra, negativo sale
+    cantidad = models.DecimalField(max_digits=12, decimal_places=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['inventario', 'fecha'], name='mov_inventario_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.cantidad} de {self.inventario_id} ({self.fecha:%Y-%m-%d %H:%M})"
+
+# ==========================================
+# MODELO: SaldoInventario (instantáneas de stock)
+# ==========================================
+class SaldoInventario(models.Model):
+    # Stock del artículo justo antes de 'fecha' (suma de sus movimientos con
+    # fecha < 'fecha'). El stock en cualquier momento es el saldo anterior más
+    # cercano + los movimientos desde entonces.
+    inventario = models.ForeignKey(
+        Inventario, on_delete=models.CASCADE, related_name="saldos", db_index=False
+    )
+    fecha = models.DateTimeField()
+    stock = models.DecimalField(max_digits=12, decimal_places=3)
+
+    class Meta:
+        constraints = [
+            # El índice único también sirve para buscar el saldo más cercano
+            models.UniqueConstraint(fields=['inventario', 'fecha'], name='saldo_inventario_fecha_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.inventario_id}: {self.stock} al {self.fecha:%Y-%m-%d %H:%M}"
+
+# ==========================================
+# MODELO: EstadisticasProveedor (contadores desnormalizados)
+# ==========================================
+class EstadisticasProveedor(models.Model):
+    # Resumen de los artículos de cada proveedor en cada sucursal. No se
+    # escribe desde Python: lo mantienen triggers de la base de datos en cada
+    # INSERT, UPDATE y DELETE de Inventario (ver estadisticas.py), así que
+    # incluye los UPDATE masivos con F() de los pedidos y el SET_NULL al
+    # borrar un proveedor. Sin renglón = sin artículos en esa sucursal.
+    # Sin índice propio: el único (proveedor, sucursal) lo cubre
+    proveedor = models.ForeignKey(
+        Proveedores, on_delete=models.CASCADE, related_name="estadisticas", db_index=False
+    )
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.CASCADE, related_name="+", db_index=False)
+    articulos = models.PositiveIntegerField(default=0)
+    # Suma de stock * costo_unitario
+    valor_stock = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+    articulos_bajo_minimo = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['proveedor', 'sucursal'], name='estadisticas_proveedor_sucursal_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.proveedor_id} en {self.sucursal_id}: {self.articulos} artículos, ${self.valor_stock}"
+
+# ==========================================
+# MODELO: CambioSincronizacion (bitácora compactada para las terminales)
+# ==========================================
+class CambioSincronizacion(models.Model):
+    # El último cambio de cada proveedor, artículo o producto, con un número
+    # de secuencia que sólo crece. No se escribe desde Python: lo mantienen
+    # triggers de la base de datos (ver sincronizacion.py). Un renglón cuyo
+    # objeto ya no existe es una lápida (se borró).
+    seq = models.BigIntegerField(unique=True)
+    modelo = models.CharField(max_length=20) # Como en la API: proveedores, inventario, menu
+    objeto_id = models.BigIntegerField()
+    # La del artículo o producto (None = de toda la cadena, como los
+    # proveedores): cada terminal sólo recibe los cambios de su sucursal
+    sucursal_id = models.BigIntegerField(null=True, blank=True)
+    fecha = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['modelo', 'objeto_id'], name='cambio_modelo_objeto_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.seq}: {self.modelo} {self.objeto_id}"
+
+# ==========================================
+# MODELO: SecuenciaSincronizacion (un solo renglón)
+# ==========================================
+class SecuenciaSincronizacion(models.Model):
+    # Último número de secuencia asignado y hasta cuál se compactaron las
+    # lápidas: una terminal que se quedó antes debe descargar todo de nuevo
+    valor = models.BigIntegerField(default=0)
+    compactado_hasta = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"seq {self.valor} (compactado hasta {self.compactado_hasta})"
+
+# ==========================================
+# MODELOS: Resúmenes de ventas y consumos (para los reportes)
+# ==========================================
+# Lo vendido de cada producto y lo consumido de cada artículo por sucursal y
+# día, y lo vendido de cada categoría por hora y por día completo (hora =
+# DIA_COMPLETO). Los escribe registrar_pedido en la misma transacción que el
+# pedido, sumando sobre los renglones existentes (ver reportes.py); los
+# reportes leen sólo estas tablas, nunca los renglones de los pedidos. La
+# compactación nocturna borra las horas de los días viejos.
+
+# Valor de 'hora' de los renglones que resumen el día completo
+DIA_COMPLETO = 24
+
+
+class ResumenVenta(models.Model):
+    sucursal = models.ForeignKey(
+        Sucursal, on_delete=models.PROTECT, default=sucursal_actual_id, related_name="+", db_index=False
+    )
+    dia = models.DateField()
+    # Sin llave foránea: el resumen se conserva aunque el producto se borre.
+    # Nombre y categoría del producto en su última venta.
+    producto_id = models.BigIntegerField()
+    nombre = models.CharField(max_length=100)
+    categoria = models.CharField(max_length=50)
+    piezas = models.BigIntegerField(default=0)
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = PorSucursalManager()
+
+    class Meta:
+        constraints = [
+            # También es el índice de los reportes: (sucursal, rango de días)
+            models.UniqueConstraint(fields=['sucursal', 'dia', 'producto_id'], name='resumen_venta_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia}: {self.piezas} x {self.nombre} (${self.importe})"
+
+
+class ResumenCategoria(models.Model):
+    sucursal = models.ForeignKey(
+        Sucursal, on_delete=models.PROTECT, default=sucursal_actual_id, related_name="+", db_index=False
+    )
+    dia = models.DateField()
+    hora = models.PositiveSmallIntegerField() # 0-23, o DIA_COMPLETO
+    categoria = models.CharField(max_length=50)
+    piezas = models.BigIntegerField(default=0)
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = PorSucursalManager()
+
+    class Meta:
+        constraints = [
+            # (sucursal, días completos o por hora, rango de días)
+            models.UniqueConstraint(fields=['sucursal', 'hora', 'dia', 'categoria'], name='resumen_categoria_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.hora}h: {self.categoria} ${self.importe}"
+
+
+class ResumenConsumo(models.Model):
+    sucursal = models.ForeignKey(
+        Sucursal, on_delete=models.PROTECT, default=sucursal_actual_id, related_name="+", db_index=False
+    )
+    dia = models.DateField()
+    # Sin llaves foráneas, como en ResumenVenta. El proveedor y el costo son
+    # los que tenía el artículo en su último consumo.
+    inventario_id = models.BigIntegerField()
+    nombre = models.CharField(max_length=100)
+    unidad = models.CharField(max_length=20)
+    proveedor_id = models.BigIntegerField(blank=True, null=True)
+    cantidad = models.DecimalField(max_digits=16, decimal_places=3, default=0)
+    costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = PorSucursalManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'dia', 'inventario_id'], name='resumen_consumo_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia}: {self.cantidad} {self.unidad} de {self.nombre}"
+
+# ==========================================
+# MODELO: Trabajo (cola de trabajos en segundo plano)
+# ==========================================
+class Trabajo(models.Model):
+    # Lo que no debe correr dentro de una petición (importaciones,
+    # reconstrucciones): la vista lo encola y responde, y el comando
+    # `trabajador` lo toma y lo ejecuta (ver trabajos.py). Vive siempre en la
+    # base 'default', también con sucursales en archivos separados.
+    PENDIENTE, EN_CURSO, TERMINADO, FALLIDO = 'pendiente', 'en_curso', 'terminado', 'fallido'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (TERMINADO, 'Terminado'),
+        (FALLIDO, 'Fallido'),
+    ]
+
+    tipo = models.CharField(max_length=50) # Nombre registrado en trabajos.TIPOS
+    parametros = models.JSONField(default=dict)
+    # Clave de la sucursal en la que corre ('' = toda la cadena)
+    sucursal = models.CharField(max_length=50, blank=True, default='')
+    # Sólo puede haber un trabajo pendiente por clave: encolar lo mismo otra
+    # vez regresa el que ya espera
+    clave = models.CharField(max_length=100, blank=True, null=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    # No se toma antes de esta fecha (espera entre reintentos)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    # Quién lo ejecuta ("host:pid:hilo") y su última señal de vida
+    tomado_por = models.CharField(max_length=100, blank=True, default='')
+    latido = models.DateTimeField(blank=True, null=True)
+    avance = models.BigIntegerField(default=0)
+    total = models.BigIntegerField(blank=True, null=True)
+    resultado = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    creado = models.DateTimeField(auto_now_add=True)
+    terminado = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # La cola: sólo los pendientes, en el orden en que se toman
+            models.Index(
+                fields=['disponible_desde', 'id'],
+                name='trabajo_cola_idx',
+                condition=models.Q(estado='pendiente'),
+            ),
+            # Los que están en curso, para los latidos y los vencidos
+            models.Index(
+                fields=['latido'],
+                name='trabajo_en_curso_idx',
+                condition=models.Q(estado='en_curso'),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clave'],
+                condition=models.Q(estado='pendiente'),
+                name='trabajo_clave_pendiente_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Trabajo #{self.id} {self.tipo} ({self.estado})"
+
+    @property
+    def activo(self):
+        return self.estado in (self.PENDIENTE, self.EN_CURSO)
+
+    @property
+    def porcentaje(self):
+        if not self.total:
+            return None
+        return min(100, round(self.avance * 100 / self.total))
@@ -0,0 +1,219 @@
+import datetime
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import DecimalField, Exists, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import disponibilidad
+from .models import Inventario, MovimientoInventario, SaldoInventario
+
+# ==========================================
+# SERVICIO: Bitácora de movimientos de inventario
+# ==========================================
+# Cada cambio de stock deja un renglón en MovimientoInventario (compra,
+# consumo de un pedido o ajuste), así que Inventario.stock siempre es la suma
+# de los movimientos del artículo y el historial se puede auditar.
+#
+# Para saber el stock de un artículo en una fecha no se suma toda su
+# historia: SaldoInventario guarda instantáneas periódicas (tomar_instantanea,
+# comando instantanea_inventario) y stock_en() parte del saldo anterior más
+# cercano y sólo suma los movimientos desde ese saldo, un rango acotado del
+# índice (inventario, fecha).
+#
+# Las escrituras masivas (pedidos, importación, API) no pasan por save(), así
+# que llaman a registrar() / registrar_diferencias() directamente.
+
+# Renglones por INSERT
+TAMAÑO_LOTE = 1000
+
+DECIMAL = DecimalField(max_digits=12, decimal_places=3)
+
+# Límite inferior para los artículos que todavía no tienen saldo
+PRINCIPIO = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class RegistroMovimientos:
+    """
+    Acumula movimientos y los escribe con bulk_create, TAMAÑO_LOTE renglones
+    por INSERT. Como bloque `with` escribe lo pendiente al salir sin error:
+
+        with RegistroMovimientos() as registro:
+            for articulo_id, cantidad in ...:
+                registro.agregar(articulo_id, cantidad, MovimientoInventario.COMPRA)
+    """
+
+    def __init__(self, fecha=None, tamaño=TAMAÑO_LOTE):
+        self.fecha = fecha or timezone.now()
+        self.tamaño = tamaño
+        self.pendientes = []
+        self.escritos = 0
+
+    def agregar(self, inventario_id, cantidad, tipo):
+        if not cantidad:
+            return
+        self.pendientes.append(MovimientoInventario(
+            inventario_id=inventario_id, fecha=self.fecha, tipo=tipo, cantidad=cantidad,
+        ))
+        if len(self.pendientes) >= self.tamaño:
+            self.escribir()
+
+    def escribir(self):
+        if self.pendientes:
+            MovimientoInventario.objects.bulk_create(self.pendientes, batch_size=self.tamaño)
+            self.escritos += len(self.pendientes)
+            self.pendientes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_error, *exc):
+        if tipo_error is None:
+            self.escribir()
+
+
+def registrar(cantidades, tipo, fecha=None):
+    """Registra {inventario_id: cantidad con signo} con el mismo tipo y fecha."""
+    with RegistroMovimientos(fecha) as registro:
+        for inventario_id in sorted(cantidades):
+            registro.agregar(inventario_id, cantidades[inventario_id], tipo)
+    return registro.escritos
+
+
+def stocks_actuales(ids):
+    """
+    {inventario_id: stock} antes de una escritura masiva, para después
+    registrar la diferencia. Debe llamarse dentro de transaction.atomic(): en
+    bases con bloqueo por fila se bloquean los artículos hasta el final.
+    """
+    articulos = Inventario.objects.filter(id__in=list(ids))
+    if connections[router.db_for_write(Inventario)].features.has_select_for_update:
+        articulos = articulos.select_for_update().order_by('id')
+    return dict(articulos.values_list('id', 'stock'))
+
+
+def registrar_diferencias(anteriores, articulos, tipo=MovimientoInventario.AJUSTE):
+    """
+    Registra stock nuevo - stock anterior de cada artículo (los que no estaban
+    en `anteriores` son nuevos y parten de 0).
+    """
+    with RegistroMovimientos() as registro:
+        for articulo in articulos:
+            anterior = anteriores.get(articulo.id) or Decimal('0')
+            registro.agregar(articulo.id, Decimal(str(articulo.stock)) - anterior, tipo)
+    return registro.escritos
+
+
+def registrar_compra(inventario_id, cantidad, fecha=None):
+    """
+    Suma la compra al stock (sobre el valor actual, con F()) y la registra.
+    Lanza Inventario.DoesNotExist si el artículo no existe en la sucursal activa.
+    """
+    cantidad = Decimal(str(cantidad))
+    fecha = fecha or timezone.now()
+    with transaction.atomic(using=router.db_for_write(Inventario)):
+        if not Inventario.objects.filter(id=inventario_id).update(
+            stock=F('stock') + cantidad, fecha_ultima_compra=timezone.localdate(fecha),
+        ):
+            raise Inventario.DoesNotExist(f"No existe el artículo {inventario_id}.")
+        registrar({inventario_id: cantidad}, MovimientoInventario.COMPRA, fecha)
+        disponibilidad.por_ajustes({inventario_id: cantidad})
+
+
+# ---------- Consultas en el tiempo ----------
+
+def _momento(fecha):
+    """Una fecha (date) se toma completa: el stock al cierre de ese día."""
+    if isinstance(fecha, datetime.datetime):
+        return fecha if timezone.is_aware(fecha) else timezone.make_aware(fecha)
+    siguiente = datetime.datetime.combine(fecha + datetime.timedelta(days=1), datetime.time())
+    return timezone.make_aware(siguiente)
+
+
+def stock_en(inventario_id, fecha):
+    """
+    Stock del artículo en `fecha` (datetime, o date = al cierre del día).
+    Son dos consultas sobre índices: el saldo anterior más cercano y la suma
+    de los movimientos entre ese saldo y `fecha`.
+    """
+    momento = _momento(fecha)
+    saldo = (
+        SaldoInventario.objects.filter(inventario_id=inventario_id, fecha__lte=momento)
+        .order_by('-fecha').values_list('fecha', 'stock').first()
+    )
+    desde, base = saldo or (PRINCIPIO, Decimal('0'))
+    suma = MovimientoInventario.objects.filter(
+        inventario_id=inventario_id, fecha__gte=desde, fecha__lt=momento,
+    ).aggregate(total=Sum('cantidad'))['total']
+    return base + (suma or Decimal('0'))
+
+
+def con_stock_en(fecha, queryset=None):
+    """
+    Artículos anotados con stock_en_fecha (y saldo_fecha, el saldo del que se
+    partió) en una sola consulta: por cada artículo, el saldo más cercano y la
+    suma acotada de sus movimientos como subconsultas correlacionadas.
+    """
+    momento = _momento(fecha)
+    if queryset is None:
+        queryset = Inventario.objects.all()
+    saldos = SaldoInventario.objects.filter(inventario_id=OuterRef('pk'), fecha__lte=momento).order_by('-fecha')
+    suma = (
+        MovimientoInventario.objects.filter(
+            inventario_id=OuterRef('pk'), fecha__gte=OuterRef('saldo_fecha'), fecha__lt=momento,
+        )
+        .values('inventario_id').annotate(total=Sum('cantidad')).values('total')
+    )
+    return queryset.annotate(
+        saldo_fecha=Coalesce(Subquery(saldos.values('fecha')[:1]), Value(PRINCIPIO)),
+        saldo_stock=Coalesce(Subquery(saldos.values('stock')[:1]), Value(Decimal('0')), output_field=DECIMAL),
+    ).annotate(
+        stock_en_fecha=F('saldo_stock') + Coalesce(
+            Subquery(suma, output_field=DECIMAL), Value(Decimal('0')), output_field=DECIMAL,
+        ),
+    )
+
+
+def tomar_instantanea(fecha=None):
+    """
+    Guarda el saldo de cada artículo que tuvo movimientos desde su saldo
+    anterior. Pensado para correr periódicamente (p. ej. cada noche); entre
+    más seguido, más corto es el rango que suma stock_en(). Regresa cuántos
+    saldos se guardaron.
+    """
+    momento = _momento(fecha or timezone.now())
+    movidos = MovimientoInventario.objects.filter(
+        inventario_id=OuterRef('pk'), fecha__gte=OuterRef('saldo_fecha'), fecha__lt=momento,
+    )
+    filas = (
+        con_stock_en(momento)
+        .filter(Exists(movidos))  # sin movimientos, el saldo anterior sigue sirviendo
+        .values_list('id', 'stock_en_fecha')
+    )
+    guardados = 0
+    lote = []
+    for articulo_id, stock in filas.iterator(chunk_size=TAMAÑO_LOTE):
+        lote.append(SaldoInventario(inventario_id=articulo_id, fecha=momento, stock=stock))
+        if len(lote) == TAMAÑO_LOTE:
+            guardados += len(SaldoInventario.objects.bulk_create(lote, ignore_conflicts=True))
+            lote = []
+    if lote:
+        guardados += len(SaldoInventario.objects.bulk_create(lote, ignore_conflicts=True))
+    return guardados
+
+
+def diferencias():
+    """
+    Artículos cuyo stock no coincide con la suma de sus movimientos, como
+    [(articulo, suma de movimientos), ...]. Para verificar la bitácora.
+    """
+    totales = (
+        MovimientoInventario.objects.filter(inventario_id=OuterRef('pk'))
+        .values('inventario_id').annotate(total=Sum('cantidad')).values('total')
+    )
+    articulos = Inventario.objects.annotate(
+        suma=Coalesce(Subquery(totales, output_field=DECIMAL), Value(Decimal('0')), output_field=DECIMAL)
+    )
+    # Se compara en Python: SQLite suma los decimales como punto flotante
+    return [(a, a.suma) for a in articulos.iterator(chunk_size=TAMAÑO_LOTE) if a.stock != a.suma]
@@ -0,0 +1,155 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from . import disponibilidad, movimientos, reportes
+from .models import Inventario, Menu, RecetaExpandida, Pedido, DetallePedido, MovimientoInventario
+
+# ==========================================
+# SERVICIO: Registro de pedidos y descuento de stock
+# ==========================================
+# El descuento se hace con UPDATE ... SET stock = stock - CASE id WHEN ... END,
+# es decir, la base de datos resta sobre el valor actual. Nunca se lee el
+# stock a Python para volver a escribirlo, así que dos cajas que venden queso
+# al mismo tiempo no se pisan (no hay "lost updates"). Los resúmenes de
+# ventas (reportes.py) se suman igual, en la misma transacción.
+
+# Máximo de artículos por sentencia UPDATE (límite de parámetros de SQLite)
+TAMAÑO_LOTE = 400
+
+
+class PedidoInvalido(Exception):
+    """El pedido no se puede registrar (producto inexistente, no disponible...)."""
+
+
+class StockInsuficiente(PedidoInvalido):
+    """Algún artículo quedaría con stock negativo; el pedido se revierte completo."""
+
+    def __init__(self, articulos):
+        self.articulos = articulos
+        super().__init__("Stock insuficiente de: " + ", ".join(articulos))
+
+
+def agrupar_lineas(lineas):
+    """Suma las cantidades de [(producto_id, cantidad), ...] por producto."""
+    cantidades = defaultdict(int)
+    for producto_id, cantidad in lineas:
+        cantidad = int(cantidad)
+        if cantidad < 0:
+            raise PedidoInvalido("Las cantidades no pueden ser negativas.")
+        if cantidad:
+            cantidades[int(producto_id)] += cantidad
+    if not cantidades:
+        raise PedidoInvalido("El pedido no tiene productos.")
+    return dict(cantidades)
+
+
+def calcular_consumo(cantidades):
+    """
+    Convierte {producto_id: piezas} en {inventario_id: cantidad a descontar}
+    leyendo las recetas expandidas (preparaciones ya convertidas en artículos,
+    ver recetas.py) de todos los productos en una sola consulta.
+    """
+    consumo = defaultdict(Decimal)
+    recetas = RecetaExpandida.objects.filter(menu_id__in=cantidades).values_list(
+        'menu_id', 'inventario_id', 'cantidad'
+    )
+    for menu_id, inventario_id, cantidad in recetas:
+        consumo[inventario_id] += cantidad * cantidades[menu_id]
+    return dict(consumo)
+
+
+def descontar_stock(consumo):
+    """
+    Descuenta {inventario_id: cantidad} con UPDATEs por lotes usando F().
+    Debe llamarse dentro de transaction.atomic(). Lanza PedidoInvalido si
+    algún artículo no es de la sucursal activa.
+    """
+    ids = sorted(consumo)
+    if not ids:
+        return
+
+    # En bases con bloqueo por fila (PostgreSQL) bloqueamos primero en orden de
+    # id: todas las transacciones piden los candados en el mismo orden, así que
+    # no se pueden formar ciclos (deadlocks). SQLite bloquea la base completa
+    # y no lo necesita.
+    if connections[router.db_for_write(Inventario)].features.has_select_for_update:
+        list(
+            Inventario.objects.select_for_update()
+            .filter(id__in=ids).order_by('id').values_list('id', flat=True)
+        )
+
+    for inicio in range(0, len(ids), TAMAÑO_LOTE):
+        lote = ids[inicio:inicio + TAMAÑO_LOTE]
+        resta = Case(
+            *[When(id=articulo_id, then=Value(consumo[articulo_id])) for articulo_id in lote],
+            output_field=DecimalField(max_digits=10, decimal_places=3),
+        )
+        Inventario.objects.filter(id__in=lote).update(stock=F('stock') - resta)
+    # La bitácora se escribe en la misma transacción que el descuento
+    movimientos.registrar({i: -c for i, c in consumo.items()}, MovimientoInventario.CONSUMO)
+
+    # Stock que quedó, leído como lo lee el ORM (redondeado a sus decimales):
+    # SQLite resta como REAL y 1 - 0.8 - 0.2 queda en -5.55e-17, no en 0
+    restantes = list(
+        Inventario.objects.filter(id__in=ids)
+        .order_by('nombre_articulo').values_list('id', 'nombre_articulo', 'stock')
+    )
+    if len(restantes) < len(ids):
+        # Un artículo de la receta es de otra sucursal (el manager no lo ve y
+        # el UPDATE no lo descontó): no se vende sin descontar todo
+        ajenos = sorted(set(ids) - {articulo_id for articulo_id, _, _ in restantes})
+        raise PedidoInvalido(
+            "La receta usa artículos que no son de la sucursal: " + ", ".join(map(str, ajenos))
+        )
+    faltantes = [nombre for _, nombre, stock in restantes if stock < 0]
+    if faltantes:
+        # La excepción revierte toda la transacción (pedido + descuentos)
+        raise StockInsuficiente(faltantes)
+    # Sólo los productos cuyo umbral de receta cruzó el stock descontado
+    disponibilidad.por_ajustes(
+        {i: -c for i, c in consumo.items()}, {articulo_id: stock for articulo_id, _, stock in restantes},
+    )
+
+
+def registrar_pedido(lineas, cliente=None):
+    """
+    Registra un pedido a partir de [(producto_id, cantidad), ...] y descuenta
+    del inventario lo que consumen sus recetas, todo en una transacción.
+    El pedido es de la sucursal de sus productos (los de otras sucursales no
+    existen para la sucursal activa, ver models.PorSucursalManager).
+    Lanza PedidoInvalido / StockInsuficiente si no se puede surtir.
+    """
+    cantidades = agrupar_lineas(lineas)
+
+    # Lecturas fuera de la transacción: precios y recetas no cambian en
+    # cada venta, y así la transacción empieza directamente escribiendo.
+    productos = Menu.objects.only('id', 'nombre', 'categoria', 'precio', 'disponible', 'sucursal_id').in_bulk(list(cantidades))
+    for producto_id in cantidades:
+        producto = productos.get(producto_id)
+        if producto is None:
+            raise PedidoInvalido(f"El producto {producto_id} no existe.")
+        if not producto.disponible:
+            raise PedidoInvalido(f"'{producto.nombre}' no está disponible.")
+    sucursales = {producto.sucursal_id for producto in productos.values()}
+    if len(sucursales) > 1:
+        raise PedidoInvalido("Los productos de un pedido deben ser de la misma sucursal.")
+    consumo = calcular_consumo(cantidades)
+    total = sum(productos[i].precio * n for i, n in cantidades.items())
+
+    with transaction.atomic(using=router.db_for_write(Pedido)):
+        pedido = Pedido.objects.create(cliente=cliente or None, total=total, sucursal_id=sucursales.pop())
+        DetallePedido.objects.bulk_create([
+            DetallePedido(
+                pedido=pedido,
+                producto_id=producto_id,
+                cantidad=cantidad,
+                precio_unitario=productos[producto_id].precio,
+            )
+            for producto_id, cantidad in cantidades.items()
+        ])
+        descontar_stock(consumo)
+        reportes.registrar_venta(pedido, productos, cantidades, consumo)
+    return pedido
@@ -0,0 +1,204 @@
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Inventario, MovimientoInventario
+
+try:
+    import numpy as np
+except ImportError:  # Dependencia opcional: sin ella no hay pronóstico
+    np = None
+
+# ==========================================
+# SERVICIO: Pronóstico de consumo y stock mínimo sugerido
+# ==========================================
+# El consumo diario de cada artículo sale de la bitácora (movimientos de tipo
+# CONSUMO, que registran los pedidos según las recetas). Con él se pronostica,
+# para todos los artículos a la vez (matrices de NumPy de artículos x días):
+#
+#   1. Estacionalidad semanal: cuánto se consume cada día de la semana
+#      respecto al promedio del artículo (los viernes se vende más pizza).
+#   2. Suavizamiento exponencial del consumo sin estacionalidad (nivel) y de
+#      su error absoluto (para el stock de seguridad). El recorrido es por
+#      día, pero cada paso opera sobre todos los artículos.
+#   3. stock_minimo = consumo esperado durante los días de reabasto
+#      + nivel_servicio * desviación del error * raíz(días de reabasto).
+#
+# Los artículos sin consumo en el periodo conservan su stock_minimo. Los
+# valores se escriben con bulk_update (subiendo la versión, ver edicion.py).
+
+# Parámetros predeterminados (comando sugerir_minimos)
+DIAS_HISTORIAL = 365
+DIAS_REABASTO = 3
+ALFA = 0.2
+# Factor z de la normal: 1.65 cubre ~95% de los días de reabasto
+NIVEL_SERVICIO = 1.65
+# Desviación estándar ~= 1.25 * error absoluto medio (distribución normal)
+MAD_A_SIGMA = 1.25
+
+# Renglones por lectura de la bitácora y por UPDATE
+TAMAÑO_LOTE = 10_000
+TAMAÑO_ESCRITURA = 500
+
+
+def disponible():
+    return np is not None
+
+
+class Dia(TruncDate):
+    """
+    TruncDate que en SQLite usa date() en lugar de la función de Python que
+    registra Django (mucho más lenta en millones de renglones), cuando eso da
+    el mismo día: fechas guardadas en UTC y zona horaria UTC.
+    """
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        if settings.USE_TZ and self.get_tzname() != 'UTC':
+            return self.as_sql(compiler, connection, **extra_context)
+        sql, params = compiler.compile(self.lhs)
+        return f'date({sql})', params
+
+
+def historial(dias=DIAS_HISTORIAL, hasta=None):
+    """
+    Consumo diario de los `dias` anteriores a `hasta` (por defecto hoy, sin
+    incluirlo). Regresa (ids, consumo, inicio): ids de los artículos con algún
+    consumo (ordenados), matriz float64 [artículo, día] e inicio del periodo.
+    """
+    hasta = hasta or timezone.localdate()
+    inicio = hasta - datetime.timedelta(days=dias)
+    desde = timezone.make_aware(datetime.datetime.combine(inicio, datetime.time.min))
+    limite = timezone.make_aware(datetime.datetime.combine(hasta, datetime.time.min))
+    consumos = (
+        MovimientoInventario.objects
+        .filter(tipo=MovimientoInventario.CONSUMO, fecha__gte=desde, fecha__lt=limite)
+        .annotate(dia=Dia('fecha'))
+        .values_list('inventario_id', 'dia')
+        # Como float: NumPy no usa Decimal y así se evita convertir cada renglón
+        .annotate(consumo=Sum('cantidad', output_field=FloatField()))
+        .order_by()
+    )
+    indice_dia = {inicio + datetime.timedelta(days=d): d for d in range(dias)}
+
+    # Se juntan por lotes y cada lote se coloca en la matriz de una vez
+    articulos, columnas, valores = [], [], []
+    for inventario_id, dia, consumo in consumos.iterator(chunk_size=TAMAÑO_LOTE):
+        articulos.append(inventario_id)
+        columnas.append(indice_dia[dia])
+        valores.append(-consumo)  # los consumos se registran negativos
+    articulos = np.array(articulos, dtype=np.int64)
+    ids = np.unique(articulos)
+    consumo = np.zeros((len(ids), dias))
+    consumo[np.searchsorted(ids, articulos), np.array(columnas, dtype=np.int64)] = valores
+    return ids, np.maximum(consumo, 0), inicio
+
+
+def pronosticar(consumo, primer_dia_semana, dias_reabasto=DIAS_REABASTO, alfa=ALFA,
+                nivel_servicio=NIVEL_SERVICIO):
+    """
+    stock_minimo sugerido (float64, uno por renglón de `consumo`).
+    `primer_dia_semana` es el weekday() de la primera columna; el reabasto
+    empieza el día siguiente a la última.
+    """
+    articulos, dias = consumo.shape
+    dia_semana = (primer_dia_semana + np.arange(dias)) % 7
+
+    # 1. Índice estacional: promedio de cada día de la semana / promedio total
+    por_dia = np.zeros((articulos, 7))
+    for d in range(7):
+        por_dia[:, d] = consumo[:, dia_semana == d].mean(axis=1)
+    promedio = por_dia.mean(axis=1, keepdims=True)
+    estacional = np.divide(por_dia, promedio, out=np.ones_like(por_dia), where=promedio > 0)
+
+    # 2. Suavizamiento exponencial del consumo sin estacionalidad. Los días de
+    #    la semana sin consumo (índice 0) no aportan información al nivel
+    nivel = promedio[:, 0].copy()
+    error = np.zeros(articulos)
+    for t in range(dias):
+        indice = estacional[:, dia_semana[t]]
+        valido = indice > 0
+        sin_estacion = np.divide(consumo[:, t], indice, out=nivel.copy(), where=valido)
+        diferencia = sin_estacion - nivel
+        nivel += alfa * diferencia
+        error += alfa * (np.abs(diferencia) * indice - error) * valido
+
+    # 3. Consumo esperado en los días de reabasto + stock de seguridad
+    siguientes = (primer_dia_semana + dias + np.arange(dias_reabasto)) % 7
+    esperado = nivel * estacional[:, siguientes].sum(axis=1)
+    seguridad = nivel_servicio * MAD_A_SIGMA * error * np.sqrt(dias_reabasto)
+    return np.maximum(esperado + seguridad, 0)
+
+
+# Matriz que heredan los procesos hijos (fork) en pronosticar_en_paralelo()
+_consumo_compartido = None
+
+
+def _pronosticar_renglones(renglones, **opciones):
+    return pronosticar(_consumo_compartido[renglones[0]:renglones[-1] + 1], **opciones)
+
+
+def pronosticar_en_paralelo(consumo, primer_dia_semana, procesos, **opciones):
+    """
+    pronosticar() repartiendo los artículos entre `procesos` procesos. Con
+    fork los hijos leen la matriz del padre sin copiarla; si no hay fork, cada
+    uno recibe su parte serializada.
+    """
+    if procesos <= 1 or len(consumo) < procesos:
+        return pronosticar(consumo, primer_dia_semana, **opciones)
+    global _consumo_compartido
+    opciones['primer_dia_semana'] = primer_dia_semana
+    if 'fork' in multiprocessing.get_all_start_methods():
+        _consumo_compartido = consumo
+        tarea = partial(_pronosticar_renglones, **opciones)
+        partes = np.array_split(np.arange(len(consumo)), procesos)
+        contexto = multiprocessing.get_context('fork')
+    else:
+        tarea = partial(pronosticar, **opciones)
+        partes = np.array_split(consumo, procesos)
+        contexto = None
+    try:
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as ejecutor:
+            return np.concatenate(list(ejecutor.map(tarea, partes)))
+    finally:
+        _consumo_compartido = None
+
+
+def sugerir_minimos(dias=DIAS_HISTORIAL, dias_reabasto=DIAS_REABASTO, alfa=ALFA,
+                    nivel_servicio=NIVEL_SERVICIO, procesos=1, guardar=True, hasta=None):
+    """
+    Calcula el stock_minimo sugerido de los artículos con consumo y, si
+    `guardar`, escribe los que cambiaron. Regresa {inventario_id: (actual, sugerido)}
+    de los que cambian.
+    """
+    ids, consumo, inicio = historial(dias, hasta)
+    if not len(ids):
+        return {}
+    sugeridos = pronosticar_en_paralelo(
+        consumo, inicio.weekday(), procesos,
+        dias_reabasto=dias_reabasto, alfa=alfa, nivel_servicio=nivel_servicio,
+    )
+    sugeridos = {int(i): Decimal(f'{s:.2f}') for i, s in zip(ids, sugeridos)}
+
+    cambios = {}
+    # Todo el inventario (un id__in con 100,000 ids excede el límite de SQLite)
+    actuales = Inventario.objects.values_list('id', 'stock_minimo')
+    for inventario_id, actual in actuales.iterator(chunk_size=TAMAÑO_LOTE):
+        if inventario_id in sugeridos and sugeridos[inventario_id] != actual:
+            cambios[inventario_id] = (actual, sugeridos[inventario_id])
+
+    if guardar and cambios:
+        objetos = []
+        for inventario_id, (_, sugerido) in cambios.items():
+            # Sube la versión: los formularios abiertos detectan el cambio
+            objetos.append(Inventario(id=inventario_id, stock_minimo=sugerido, version=F('version') + 1))
+        with transaction.atomic():
+            Inventario.objects.bulk_update(objetos, ['stock_minimo', 'version'], batch_size=TAMAÑO_ESCRITURA)
+    return cambios
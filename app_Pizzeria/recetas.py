@@ -0,0 +1,200 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+
+from .models import (
+    ComponentePreparacion, Preparacion, PreparacionExpandida, Receta, RecetaExpandida, RecetaPreparacion,
+)
+
+# ==========================================
+# SERVICIO: Sub-recetas (preparaciones) y receta expandida
+# ==========================================
+# Un producto lleva artículos del inventario (Receta) y preparaciones
+# (RecetaPreparacion): masa, salsa... Una preparación lleva a su vez artículos
+# y otras preparaciones (ComponentePreparacion). Para vender o costear sólo
+# importa cuánto de cada artículo crudo consume UNA pieza, así que la gráfica
+# se aplana una vez y se guarda en dos tablas:
+#
+#   - PreparacionExpandida: artículos crudos por unidad de cada preparación
+#     (la sub-receta memoizada). Se calcula en Python recorriendo la gráfica
+#     con memo: una preparación que usan otras diez se aplana una sola vez, y
+#     las que no cambiaron se leen ya aplanadas. Un ciclo lanza RecetaCiclica.
+#   - RecetaExpandida: artículos crudos por pieza de cada producto (receta
+#     directa + preparaciones expandidas, sumados por artículo). Se calcula en
+#     la base con un INSERT ... SELECT ... GROUP BY por lote de productos.
+#
+# Los pedidos (descuento de stock), los costos y la disponibilidad leen sólo
+# RecetaExpandida: una consulta plana, sin recorrer la gráfica en cada venta.
+#
+# Invalidación: si cambia un componente de una preparación se vuelve a
+# aplanar ella y todas las que la usan (hacia arriba en la gráfica), y después
+# se expanden los productos que usan cualquiera de ellas. Si cambia la receta
+# de un producto (costos.marcar_productos) sólo se expande ese producto.
+
+# Máximo de productos por sentencia (límite de parámetros de SQLite)
+TAMAÑO_LOTE = 500
+
+# Como Receta.cantidad y la bitácora de movimientos
+DECIMALES = RecetaExpandida._meta.get_field('cantidad').decimal_places
+
+
+class RecetaCiclica(Exception):
+    """Una preparación se usa a sí misma, directa o indirectamente."""
+
+    def __init__(self, camino):
+        self.camino = camino
+        super().__init__("Receta cíclica: " + " -> ".join(str(paso) for paso in camino))
+
+
+def _grafo():
+    """{preparacion_id: [(articulo_id, subpreparacion_id, cantidad), ...]} en una sola consulta."""
+    grafo = defaultdict(list)
+    componentes = ComponentePreparacion.objects.values_list(
+        'preparacion_id', 'articulo_id', 'subpreparacion_id', 'cantidad',
+    )
+    for preparacion_id, *componente in componentes:
+        grafo[preparacion_id].append(componente)
+    return grafo
+
+
+def _aplanar(preparacion_id, grafo, memo, camino=()):
+    """{articulo_id: cantidad por unidad} de la preparación; `memo` guarda las ya aplanadas."""
+    if preparacion_id in memo:
+        return memo[preparacion_id]
+    if preparacion_id in camino:
+        raise RecetaCiclica([*camino[camino.index(preparacion_id):], preparacion_id])
+    camino = (*camino, preparacion_id)
+    total = defaultdict(Decimal)
+    for articulo_id, subpreparacion_id, cantidad in grafo.get(preparacion_id, ()):
+        if articulo_id is not None:
+            total[articulo_id] += cantidad
+        else:
+            for sub_articulo_id, sub_cantidad in _aplanar(subpreparacion_id, grafo, memo, camino).items():
+                total[sub_articulo_id] += cantidad * sub_cantidad
+    memo[preparacion_id] = dict(total)
+    return memo[preparacion_id]
+
+
+def _usuarias(preparacion_ids, grafo):
+    """Las preparaciones indicadas y todas las que las usan, directa o indirectamente."""
+    usada_en = defaultdict(set)
+    for preparacion_id, componentes in grafo.items():
+        for _, subpreparacion_id, _ in componentes:
+            if subpreparacion_id is not None:
+                usada_en[subpreparacion_id].add(preparacion_id)
+    encontradas = set(preparacion_ids)
+    pendientes = list(encontradas)
+    while pendientes:
+        for usuaria in usada_en[pendientes.pop()] - encontradas:
+            encontradas.add(usuaria)
+            pendientes.append(usuaria)
+    return encontradas
+
+
+def formaria_ciclo(preparacion_id, subpreparacion_id):
+    """True si usar `subpreparacion_id` dentro de `preparacion_id` cerraría un ciclo."""
+    return subpreparacion_id in _usuarias([preparacion_id], _grafo())
+
+
+def expandir_preparaciones(preparacion_ids):
+    """
+    Vuelve a aplanar las preparaciones indicadas y las que las usan. Regresa
+    los ids de los productos que usan alguna de ellas (su receta expandida ya
+    no está al día: ver costos.marcar_productos).
+    """
+    grafo = _grafo()
+    afectadas = _usuarias(preparacion_ids, grafo)
+
+    # Memo inicial: las sub-preparaciones que no cambiaron, ya aplanadas
+    intactas = {
+        subpreparacion_id
+        for preparacion_id in afectadas for _, subpreparacion_id, _ in grafo.get(preparacion_id, ())
+        if subpreparacion_id is not None and subpreparacion_id not in afectadas
+    }
+    memo = defaultdict(dict)
+    for preparacion_id, inventario_id, cantidad in PreparacionExpandida.objects.filter(
+        preparacion_id__in=intactas
+    ).values_list('preparacion_id', 'inventario_id', 'cantidad'):
+        memo[preparacion_id][inventario_id] = cantidad
+    memo = {preparacion_id: memo[preparacion_id] for preparacion_id in intactas}
+
+    try:
+        filas = [
+            PreparacionExpandida(preparacion_id=preparacion_id, inventario_id=inventario_id, cantidad=cantidad)
+            for preparacion_id in sorted(afectadas)
+            for inventario_id, cantidad in _aplanar(preparacion_id, grafo, memo).items()
+            if cantidad
+        ]
+    except RecetaCiclica as e:
+        nombres = dict(Preparacion.objects.filter(id__in=e.camino).values_list('id', 'nombre'))
+        raise RecetaCiclica([nombres.get(i, i) for i in e.camino]) from None
+
+    with transaction.atomic(using=router.db_for_write(PreparacionExpandida)):
+        PreparacionExpandida.objects.filter(preparacion_id__in=afectadas).delete()
+        PreparacionExpandida.objects.bulk_create(filas, batch_size=TAMAÑO_LOTE)
+    return set(
+        RecetaPreparacion.objects.filter(preparacion_id__in=afectadas).values_list('menu_id', flat=True)
+    )
+
+
+# Receta directa + preparaciones expandidas, sumadas por (producto, artículo)
+_EXPANDIR = '''
+    INSERT INTO {expandida} (menu_id, inventario_id, cantidad)
+    SELECT menu_id, inventario_id, ROUND(SUM(cantidad), {decimales})
+    FROM (
+        SELECT menu_id, inventario_id, cantidad FROM {receta} {filtro}
+        UNION ALL
+        SELECT rp.menu_id, pe.inventario_id, rp.cantidad * pe.cantidad
+        FROM {receta_preparacion} rp
+        JOIN {preparacion_expandida} pe ON pe.preparacion_id = rp.preparacion_id
+        {filtro_rp}
+    ) componentes
+    GROUP BY menu_id, inventario_id
+    HAVING ROUND(SUM(cantidad), {decimales}) > 0
+'''
+
+
+def _sql(conexion, filtro):
+    tablas = {
+        'expandida': RecetaExpandida,
+        'receta': Receta,
+        'receta_preparacion': RecetaPreparacion,
+        'preparacion_expandida': PreparacionExpandida,
+    }
+    nombres = {clave: conexion.ops.quote_name(modelo._meta.db_table) for clave, modelo in tablas.items()}
+    return _EXPANDIR.format(
+        decimales=DECIMALES,
+        filtro=filtro.format(columna='menu_id'),
+        filtro_rp=filtro.format(columna='rp.menu_id'),
+        **nombres,
+    )
+
+
+def expandir_productos(menu_ids=None):
+    """
+    Vuelve a calcular RecetaExpandida de los productos indicados (todos si es
+    None). Regresa el número de renglones escritos.
+    """
+    conexion = connections[router.db_for_write(RecetaExpandida)]
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        if menu_ids is None:
+            RecetaExpandida.objects.all().delete()
+            cursor.execute(_sql(conexion, ''))
+            return cursor.rowcount
+        menu_ids = sorted(set(menu_ids))
+        escritos = 0
+        for inicio in range(0, len(menu_ids), TAMAÑO_LOTE):
+            lote = menu_ids[inicio:inicio + TAMAÑO_LOTE]
+            RecetaExpandida.objects.filter(menu_id__in=lote).delete()
+            marcadores = ', '.join(['%s'] * len(lote))
+            cursor.execute(_sql(conexion, f'WHERE {{columna}} IN ({marcadores})'), lote * 2)
+            escritos += cursor.rowcount
+        return escritos
+
+
+def reconstruir():
+    """Vuelve a aplanar todas las preparaciones y a expandir todos los productos."""
+    with transaction.atomic(using=router.db_for_write(RecetaExpandida)):
+        expandir_preparaciones(Preparacion.objects.values_list('id', flat=True))
+        return expandir_productos()
@@ -0,0 +1,107 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Prefetch, Sum
+
+from .models import Proveedores, Inventario
+
+# ==========================================
+# SERVICIO: Sugerencias de reorden (stock bajo)
+# ==========================================
+# Inventario.bajo_minimo es una columna generada que la base de datos
+# mantiene al día en cada escritura, y el índice parcial inv_reorden_idx sólo
+# contiene esos artículos ordenados por (proveedor, id). Así el tablero lee
+# únicamente las filas que hay que reordenar, aunque el inventario tenga
+# cientos de miles de artículos.
+
+# Se sugiere comprar hasta tener FACTOR_REORDEN veces el stock mínimo
+FACTOR_REORDEN = 2
+
+# proveedor_id que representa a los artículos sin proveedor
+SIN_PROVEEDOR = 0
+
+DECIMAL = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _cantidad_sugerida():
+    return ExpressionWrapper(F('stock_minimo') * FACTOR_REORDEN - F('stock'), output_field=DECIMAL)
+
+
+def _costo_sugerido():
+    return ExpressionWrapper(_cantidad_sugerida() * F('costo_unitario'), output_field=DECIMAL)
+
+
+def por_reordenar():
+    """Artículos con stock < stock_minimo, con la cantidad y el costo sugeridos."""
+    return (
+        Inventario.objects.filter(bajo_minimo=True)
+        .annotate(cantidad_sugerida=_cantidad_sugerida(), costo_sugerido=_costo_sugerido())
+        .order_by('proveedor_id', 'id')
+    )
+
+
+def resumen_reorden():
+    """
+    Un renglón por proveedor: {'proveedor', 'articulos', 'costo'}, ordenados
+    por nombre y con los artículos sin proveedor al final. El GROUP BY recorre
+    el índice parcial ya ordenado por proveedor; son dos consultas.
+    """
+    filas = list(
+        Inventario.objects.filter(bajo_minimo=True)
+        .values('proveedor_id')
+        .annotate(articulos=Count('id'), costo=Sum(_costo_sugerido()))
+        .order_by('proveedor_id')
+    )
+    ids = [f['proveedor_id'] for f in filas if f['proveedor_id'] is not None]
+    proveedores = Proveedores.objects.in_bulk(ids) if ids else {}
+
+    resumen = []
+    for fila in filas:
+        resumen.append({
+            'proveedor': proveedores.get(fila['proveedor_id']),
+            'proveedor_id': fila['proveedor_id'] or SIN_PROVEEDOR,
+            'articulos': fila['articulos'],
+            'costo': fila['costo'] or Decimal('0'),
+        })
+    resumen.sort(key=lambda r: (r['proveedor'] is None, str(r['proveedor'] or '')))
+    return resumen
+
+
+class GrupoReorden:
+    """Artículos por reordenar de un proveedor (o sin proveedor, si es None)."""
+
+    def __init__(self, proveedor, articulos):
+        self.proveedor = proveedor
+        self.articulos = articulos
+
+    @property
+    def total(self):
+        return sum((a.costo_sugerido for a in self.articulos), Decimal('0'))
+
+    def __len__(self):
+        return len(self.articulos)
+
+
+def sugerencias_reorden(proveedor_id=None):
+    """
+    Regresa una lista de GrupoReorden, un grupo por proveedor (por nombre) y al
+    final los artículos sin proveedor. Con proveedor_id sólo ese grupo
+    (SIN_PROVEEDOR para los que no tienen). Son a lo más tres consultas sin
+    importar cuántos proveedores haya, y todas recorren sólo el índice parcial.
+    """
+    articulos = por_reordenar()
+    grupos = []
+    if proveedor_id != SIN_PROVEEDOR:
+        proveedores = Proveedores.objects.filter(
+            id__in=articulos.filter(proveedor__isnull=False).values('proveedor_id')
+        )
+        if proveedor_id is not None:
+            proveedores = proveedores.filter(id=proveedor_id)
+        proveedores = proveedores.order_by('nombre_proveedor').prefetch_related(
+            Prefetch('articulos_inventario', queryset=articulos, to_attr='por_reordenar')
+        )
+        grupos = [GrupoReorden(p, p.por_reordenar) for p in proveedores]
+    if proveedor_id in (None, SIN_PROVEEDOR):
+        sin_proveedor = list(articulos.filter(proveedor__isnull=True))
+        if sin_proveedor:
+            grupos.append(GrupoReorden(None, sin_proveedor))
+    return grupos
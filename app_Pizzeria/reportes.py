@@ -0,0 +1,364 @@
+import csv
+import io
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import DecimalField, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import (
+    DIA_COMPLETO, DetallePedido, Inventario, MovimientoInventario, Proveedores, ResumenCategoria, ResumenConsumo,
+    ResumenVenta, sucursal_actual,
+)
+
+# ==========================================
+# SERVICIO: Reportes de ventas (resúmenes por día y hora)
+# ==========================================
+# Un reporte de doce meses no debe recorrer millones de renglones de
+# DetallePedido ni de la bitácora de movimientos. registrar_pedido llama a
+# registrar_venta() dentro de su transacción, y ésta suma el pedido a tres
+# resúmenes con un INSERT ... ON CONFLICT DO UPDATE SET x = x + excluded.x
+# por tabla: tres sentencias por pedido sin importar cuántos productos lleve,
+# y sin leer los resúmenes a Python (dos cajas que venden en la misma hora no
+# se pisan, como con el stock).
+#
+#   ResumenVenta      producto y día     productos más vendidos
+#   ResumenCategoria  categoría y hora,  ventas por categoría (por hora, por
+#                     y día completo     día o en todo el rango)
+#   ResumenConsumo    artículo y día     consumo por proveedor
+#
+# Lo que lee un reporte depende del número de productos, categorías o
+# artículos y de los días del rango, no de cuántos pedidos hubo: un año de
+# 200 productos son ~73 mil renglones de ResumenVenta y ~3 mil de
+# ResumenCategoria. Las horas se guardan sólo por categoría (24 veces más
+# renglones) y durante REPORTES_DIAS_POR_HORA días: compactar() (comando
+# resumir_ventas, cada noche) borra las más viejas, y en los reportes por
+# hora esos días salen como "día completo".
+#
+# reconstruir() vuelve a calcular los resúmenes desde los pedidos y la
+# bitácora con INSERT ... SELECT (para los pedidos anteriores a los
+# resúmenes). Un pedido cuenta al registrarse, sin importar su estado
+# después. Los días y las horas son los de settings.TIME_ZONE.
+
+# (clave única, columnas que se suman o se reemplazan) de cada resumen
+COLUMNAS = {
+    ResumenVenta: (['sucursal_id', 'dia', 'producto_id'], ['nombre', 'categoria', 'piezas', 'importe']),
+    ResumenCategoria: (['sucursal_id', 'hora', 'dia', 'categoria'], ['piezas', 'importe']),
+    ResumenConsumo: (['sucursal_id', 'dia', 'inventario_id'], ['nombre', 'unidad', 'proveedor_id', 'cantidad', 'costo']),
+}
+# Las que se suman al renglón existente; las demás se reemplazan por las nuevas
+SUMADAS = {'piezas', 'importe', 'cantidad', 'costo'}
+
+# Por dónde se agrupan las ventas por categoría
+PERIODOS = ('dia', 'hora', 'total')
+
+
+# ---------- Escritura ----------
+
+def _bd():
+    return router.db_for_write(ResumenVenta)
+
+
+def _sumar(modelo, origen, parametros):
+    """
+    INSERT INTO <resumen> (columnas) <origen> ON CONFLICT (clave) DO UPDATE:
+    suma las columnas de SUMADAS y reemplaza las demás (nombre, categoría,
+    proveedor...). Regresa los renglones escritos.
+    """
+    conexion = connections[_bd()]
+    q = conexion.ops.quote_name
+    tabla = q(modelo._meta.db_table)
+    clave, otras = COLUMNAS[modelo]
+    asignaciones = [
+        f'{q(c)} = {tabla}.{q(c)} + excluded.{q(c)}' if c in SUMADAS else f'{q(c)} = excluded.{q(c)}'
+        for c in otras
+    ]
+    sql = (
+        f'INSERT INTO {tabla} ({", ".join(map(q, clave + otras))}) {origen} '
+        f'ON CONFLICT ({", ".join(map(q, clave))}) DO UPDATE SET {", ".join(asignaciones)}'
+    )
+    with conexion.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return cursor.rowcount
+
+
+def _sumar_filas(modelo, filas):
+    """Suma [tupla en el orden de COLUMNAS[modelo], ...] al resumen en un solo INSERT."""
+    clave, otras = COLUMNAS[modelo]
+    marcas = '(' + ', '.join(['%s'] * (len(clave) + len(otras))) + ')'
+    _sumar(modelo, 'VALUES ' + ', '.join([marcas] * len(filas)), [v for fila in filas for v in fila])
+
+
+def _sumar_consulta(modelo, consulta, alias):
+    """
+    Suma al resumen los renglones de un QuerySet agrupado, sin pasarlos por
+    Python: INSERT ... SELECT <alias en el orden de COLUMNAS[modelo]> FROM (consulta).
+    """
+    q = connections[_bd()].ops.quote_name
+    sql, parametros = consulta.query.get_compiler(using=_bd()).as_sql()
+    # El WHERE es obligatorio en SQLite para INSERT ... SELECT ... ON CONFLICT
+    origen = f'SELECT {", ".join(map(q, alias))} FROM ({sql}) {q("agrupado")} WHERE 1 = 1'
+    return _sumar(modelo, origen, parametros)
+
+
+def registrar_venta(pedido, productos, cantidades, consumo):
+    """
+    Suma un pedido a los resúmenes de su día y su hora: `productos` {id:
+    Menu} (con nombre, categoría y precio), `cantidades` {producto_id:
+    piezas} y `consumo` {inventario_id: cantidad}. El nombre, la unidad, el
+    proveedor y el costo de los artículos se leen en el mismo INSERT ...
+    SELECT. Debe llamarse dentro de la transacción del pedido.
+    """
+    conexion = connections[_bd()]
+    local = timezone.localtime(pedido.fecha)
+    # La fecha como la guarda el ORM (SQLite ya no adapta las fechas por su cuenta)
+    dia = conexion.ops.adapt_datefield_value(local.date())
+    sucursal_id = pedido.sucursal_id
+
+    por_categoria = defaultdict(lambda: [0, 0])
+    filas = []
+    for producto_id, piezas in sorted(cantidades.items()):
+        producto = productos[producto_id]
+        importe = producto.precio * piezas
+        filas.append((sucursal_id, dia, producto_id, producto.nombre, producto.categoria, piezas, importe))
+        por_categoria[producto.categoria][0] += piezas
+        por_categoria[producto.categoria][1] += importe
+    _sumar_filas(ResumenVenta, filas)
+    _sumar_filas(ResumenCategoria, [
+        (sucursal_id, hora, dia, categoria, piezas, importe)
+        for hora in (local.hour, DIA_COMPLETO)
+        for categoria, (piezas, importe) in sorted(por_categoria.items())
+    ])
+    if not consumo:
+        return
+
+    q = conexion.ops.quote_name
+    id_, nombre, unidad, proveedor, costo = (
+        q(Inventario._meta.get_field(c).column)
+        for c in ('id', 'nombre_articulo', 'unidad', 'proveedor', 'costo_unitario')
+    )
+    ids = sorted(consumo)
+    casos = [v for i in ids for v in (i, consumo[i])]
+    cantidad = f'CASE {id_} ' + ' '.join(['WHEN %s THEN %s'] * len(ids)) + ' END'
+    origen = (
+        f'SELECT %s, %s, {id_}, {nombre}, {unidad}, {proveedor}, {cantidad}, ({cantidad}) * {costo} '
+        f'FROM {q(Inventario._meta.db_table)} WHERE {id_} IN ({", ".join(["%s"] * len(ids))})'
+    )
+    _sumar(ResumenConsumo, origen, [sucursal_id, dia, *casos, *casos, *ids])
+
+
+# ---------- Compactación y reconstrucción ----------
+
+def _limite_por_hora():
+    """Primer día que conserva sus renglones por hora."""
+    return timezone.localdate() - timedelta(days=settings.REPORTES_DIAS_POR_HORA)
+
+
+def compactar():
+    """
+    Borra los renglones por hora de los días anteriores a los últimos
+    REPORTES_DIAS_POR_HORA (sus días completos ya tienen los totales).
+    Regresa cuántos borró.
+    """
+    with transaction.atomic(using=_bd()):
+        return ResumenCategoria.objects.filter(hora__lt=DIA_COMPLETO, dia__lt=_limite_por_hora()).delete()[0]
+
+
+def _importe(cantidad, precio):
+    return Sum(F(cantidad) * F(precio), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def reconstruir():
+    """
+    Vuelve a calcular los resúmenes (de la sucursal activa o de todas) desde
+    los renglones de los pedidos y los consumos de la bitácora, y compacta.
+    Los productos borrados quedan como producto 0, sin categoría. Regresa
+    los renglones escritos antes de compactar.
+    """
+    sucursal_id = sucursal_actual.get()
+    lineas = DetallePedido.objects.all()
+    consumos = MovimientoInventario.objects.filter(tipo=MovimientoInventario.CONSUMO)
+    if sucursal_id is not None:
+        lineas = lineas.filter(pedido__sucursal_id=sucursal_id)
+        consumos = consumos.filter(inventario__sucursal_id=sucursal_id)
+
+    # (Los alias no pueden llamarse como los campos de los modelos)
+    ventas = lineas.values(
+        sucursal=F('pedido__sucursal_id'), dia_venta=TruncDate('pedido__fecha'),
+        producto_venta=Coalesce('producto_id', 0),
+    ).annotate(
+        nombre_producto=Coalesce(Max('producto__nombre'), Value('Producto borrado')),
+        categoria_producto=Coalesce(Max('producto__categoria'), Value('')),
+        total_piezas=Sum('cantidad'),
+        total_importe=_importe('cantidad', 'precio_unitario'),
+    ).order_by()
+    por_hora = lineas.values(
+        sucursal=F('pedido__sucursal_id'), hora_venta=ExtractHour('pedido__fecha'),
+        dia_venta=TruncDate('pedido__fecha'), categoria_producto=Coalesce('producto__categoria', Value('')),
+    ).annotate(
+        total_piezas=Sum('cantidad'),
+        total_importe=_importe('cantidad', 'precio_unitario'),
+    ).order_by()
+    # En la bitácora los consumos son negativos
+    consumos = consumos.values(
+        sucursal=F('inventario__sucursal_id'), dia_consumo=TruncDate('fecha'), articulo=F('inventario_id'),
+    ).annotate(
+        nombre_articulo=Max('inventario__nombre_articulo'),
+        unidad_articulo=Max('inventario__unidad'),
+        proveedor=Max('inventario__proveedor_id'),
+        total=-Sum('cantidad'),
+        total_costo=-_importe('cantidad', 'inventario__costo_unitario'),
+    ).order_by()
+
+    with transaction.atomic(using=_bd()):
+        for modelo in COLUMNAS:
+            modelo.objects.all().delete()
+        escritos = _sumar_consulta(ResumenVenta, ventas, [
+            'sucursal', 'dia_venta', 'producto_venta', 'nombre_producto', 'categoria_producto',
+            'total_piezas', 'total_importe',
+        ])
+        escritos += _sumar_consulta(ResumenCategoria, por_hora, [
+            'sucursal', 'hora_venta', 'dia_venta', 'categoria_producto', 'total_piezas', 'total_importe',
+        ])
+        # Los días completos, de las horas recién escritas
+        por_dia = ResumenCategoria.objects.filter(hora__lt=DIA_COMPLETO).values('sucursal_id', 'dia', 'categoria').annotate(
+            dia_completo=Value(DIA_COMPLETO), total_piezas=Sum('piezas'), total_importe=Sum('importe'),
+        ).order_by()
+        escritos += _sumar_consulta(ResumenCategoria, por_dia, [
+            'sucursal_id', 'dia_completo', 'dia', 'categoria', 'total_piezas', 'total_importe',
+        ])
+        escritos += _sumar_consulta(ResumenConsumo, consumos, [
+            'sucursal', 'dia_consumo', 'articulo', 'nombre_articulo', 'unidad_articulo', 'proveedor',
+            'total', 'total_costo',
+        ])
+        compactar()
+    return escritos
+
+
+def diferencias():
+    """
+    [(sucursal_id, resumen, (piezas, importe) resumidos, (piezas, importe)
+    de los pedidos)] de los resúmenes de venta cuyos totales por sucursal no
+    coinciden con los de los pedidos.
+    """
+    lineas = DetallePedido.objects.all()
+    if sucursal_actual.get() is not None:
+        lineas = lineas.filter(pedido__sucursal_id=sucursal_actual.get())
+    calculados = _totales(lineas, 'pedido__sucursal_id', 'cantidad', _importe('cantidad', 'precio_unitario'))
+    distintas = []
+    for modelo, resumen in (
+        (ResumenVenta, ResumenVenta.objects.all()),
+        (ResumenCategoria, ResumenCategoria.objects.filter(hora=DIA_COMPLETO)),
+    ):
+        resumidos = _totales(resumen, 'sucursal_id', 'piezas', Sum('importe'))
+        for sucursal_id in sorted(resumidos.keys() | calculados.keys()):
+            guardado = resumidos.get(sucursal_id, (0, _dinero(0)))
+            calculado = calculados.get(sucursal_id, (0, _dinero(0)))
+            if guardado != calculado:
+                distintas.append((sucursal_id, modelo.__name__, guardado, calculado))
+    return distintas
+
+
+def _totales(consulta, sucursal, piezas, importe):
+    return {
+        f[sucursal]: (f['total_piezas'], _dinero(f['total_importe']))
+        for f in consulta.values(sucursal).annotate(total_piezas=Sum(piezas), total_importe=importe).order_by()
+    }
+
+
+def _dinero(valor):
+    # SQLite suma los DecimalField como números sin decimales fijos
+    return Decimal(valor or 0).quantize(Decimal('0.01'))
+
+
+# ---------- Reportes ----------
+# Cada reporte regresa (columnas, filas): las filas se generan conforme se
+# leen, para exportarlas por partes (ver a_csv).
+
+def _periodo(fila, por, desde, hasta):
+    if por == 'total':
+        return f'{desde} a {hasta}'
+    if por == 'dia':
+        return fila['dia'].isoformat()
+    if fila['hora'] == DIA_COMPLETO:
+        return f"{fila['dia'].isoformat()} (día completo)"
+    return f"{fila['dia'].isoformat()} {fila['hora']:02d}:00"
+
+
+def ventas_por_categoria(desde, hasta, por='dia'):
+    """Piezas e importe por categoría, por día, por hora o en total, de `desde` a `hasta` inclusive."""
+    if por == 'hora':
+        # Por hora donde todavía hay horas; el día completo en los días anteriores
+        limite = _limite_por_hora()
+        renglones = ResumenCategoria.objects.filter(
+            Q(hora__lt=DIA_COMPLETO, dia__gte=max(desde, limite), dia__lte=hasta)
+            | Q(hora=DIA_COMPLETO, dia__gte=desde, dia__lte=min(hasta, limite - timedelta(days=1)))
+        )
+    else:
+        renglones = ResumenCategoria.objects.filter(hora=DIA_COMPLETO, dia__gte=desde, dia__lte=hasta)
+    grupo = {'dia': ['dia'], 'hora': ['dia', 'hora'], 'total': []}[por]
+    consulta = renglones.values(*grupo, 'categoria').annotate(
+        total_piezas=Sum('piezas'), total_importe=Sum('importe'),
+    ).order_by(*grupo, 'categoria')
+    filas = (
+        (_periodo(f, por, desde, hasta), f['categoria'], f['total_piezas'], _dinero(f['total_importe']))
+        for f in consulta.iterator()
+    )
+    return ['Periodo', 'Categoría', 'Piezas', 'Importe'], filas
+
+
+def productos_mas_vendidos(desde, hasta, limite=20):
+    """Los `limite` productos con más importe vendido de `desde` a `hasta`."""
+    consulta = ResumenVenta.objects.filter(dia__gte=desde, dia__lte=hasta).values('producto_id').annotate(
+        producto=Max('nombre'), categoria_producto=Max('categoria'),
+        total_piezas=Sum('piezas'), total_importe=Sum('importe'),
+    ).order_by('-total_importe', 'producto_id')[:limite]
+    filas = (
+        (f['producto_id'], f['producto'], f['categoria_producto'], f['total_piezas'], _dinero(f['total_importe']))
+        for f in consulta.iterator()
+    )
+    return ['ID', 'Producto', 'Categoría', 'Piezas', 'Importe'], filas
+
+
+def consumo_por_proveedor(desde, hasta):
+    """Lo consumido de cada artículo por proveedor (cantidad y costo) de `desde` a `hasta`."""
+    consulta = ResumenConsumo.objects.filter(dia__gte=desde, dia__lte=hasta).values(
+        'proveedor_id', 'inventario_id'
+    ).annotate(
+        articulo=Max('nombre'), unidad_articulo=Max('unidad'),
+        total=Sum('cantidad'), total_costo=Sum('costo'),
+    ).order_by('proveedor_id', '-total_costo', 'inventario_id')
+
+    def nombre(proveedores, proveedor_id):
+        if proveedor_id in proveedores:
+            return proveedores[proveedor_id].nombre_proveedor
+        return 'Sin proveedor' if proveedor_id is None else f'Proveedor {proveedor_id}'
+
+    def filas():
+        # Los nombres de todos los proveedores del periodo en una sola consulta
+        proveedores = Proveedores.objects.filter(
+            id__in=ResumenConsumo.objects.filter(dia__gte=desde, dia__lte=hasta).values('proveedor_id')
+        ).only('nombre_proveedor').in_bulk()
+        for f in consulta.iterator():
+            cantidad = Decimal(f['total'] or 0).quantize(Decimal('0.001'))
+            yield (nombre(proveedores, f['proveedor_id']), f['articulo'], cantidad, f['unidad_articulo'],
+                   _dinero(f['total_costo']))
+
+    return ['Proveedor', 'Artículo', 'Cantidad', 'Unidad', 'Costo'], filas()
+
+
+def a_csv(columnas, filas):
+    """Genera el CSV renglón por renglón (para StreamingHttpResponse)."""
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(columnas)
+    yield salida.getvalue()
+    for fila in filas:
+        salida.seek(0)
+        salida.truncate()
+        escritor.writerow(fila)
+        yield salida.getvalue()
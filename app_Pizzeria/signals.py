@@ -0,0 +1,249 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db import connections
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import (
+    busqueda, disponibilidad, estadisticas, eventos, metricas, movimientos, recetas, sincronizacion, sucursales,
+)
+from .cache_menu import invalidar_menu
+from .costos import marcar_productos, recalculo_agrupado, recalcular_por_articulos
+from .models import (
+    Proveedores, Inventario, Menu, Receta, Preparacion, ComponentePreparacion, RecetaPreparacion,
+    PreparacionExpandida, RecetaExpandida, Pedido, MovimientoInventario, Sucursal,
+)
+
+# ==========================================
+# SEÑALES
+# ==========================================
+# Se conectan en AppPizzeriaConfig.ready() (apps.py).
+
+
+# ---------- Caché del menú ----------
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+@receiver(post_save, sender=Receta)
+@receiver(post_delete, sender=Receta)
+@receiver(post_save, sender=RecetaPreparacion)
+@receiver(post_delete, sender=RecetaPreparacion)
+def menu_modificado(sender, **kwargs):
+    invalidar_menu()
+
+
+@receiver(m2m_changed, sender=Menu.articulos.through)
+@receiver(m2m_changed, sender=Menu.preparaciones.through)
+def articulos_menu_modificados(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_menu()
+
+
+# ---------- Costo de receta (costos.py) ----------
+
+@receiver(post_save, sender=Inventario)
+def costo_articulo_modificado(sender, instance, created, update_fields=None, **kwargs):
+    """Si cambió costo_unitario, recalcula sólo los productos que usan el artículo."""
+    if created or (update_fields is not None and 'costo_unitario' not in update_fields):
+        return
+    if 'costo_unitario' not in instance.__dict__:
+        return  # campo diferido (.only()): no se guardó
+    nuevo = instance.costo_unitario
+    original = getattr(instance, '_costo_original', None)
+    if original is None or Decimal(str(nuevo)) != Decimal(str(original)):
+        recalcular_por_articulos([instance.pk])
+    instance._costo_original = nuevo
+
+
+def _borrado_desde(origin, *modelos):
+    """True si el post_delete viene del borrado en cascada de alguno de los modelos."""
+    modelo = origin._meta.model if hasattr(origin, '_meta') else getattr(origin, 'model', None)
+    return modelo in modelos
+
+
+@receiver(post_save, sender=Receta)
+@receiver(post_delete, sender=Receta)
+@receiver(post_save, sender=RecetaPreparacion)
+@receiver(post_delete, sender=RecetaPreparacion)
+def receta_modificada(sender, instance, origin=None, **kwargs):
+    # Al borrar el producto no hay nada que recalcular; al borrar el
+    # artículo lo hace articulo_borrado() cuando ya no queda ningún renglón
+    if _borrado_desde(origin, Menu, Inventario):
+        return
+    marcar_productos([instance.menu_id])
+
+
+@receiver(m2m_changed, sender=Menu.articulos.through)
+@receiver(m2m_changed, sender=Menu.preparaciones.through)
+def articulos_menu_costos(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Después del clear ya no se sabe qué productos usaban el artículo
+        instance._productos_afectados = list(instance.productos_menu.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            marcar_productos([instance.pk])
+        elif action == 'post_clear':
+            marcar_productos(instance.__dict__.pop('_productos_afectados', []))
+        else:
+            marcar_productos(pk_set or [])
+
+
+# ---------- Sub-recetas (recetas.py) ----------
+
+@receiver(post_save, sender=ComponentePreparacion)
+@receiver(post_delete, sender=ComponentePreparacion)
+def componente_modificado(sender, instance, origin=None, **kwargs):
+    """Vuelve a aplanar la preparación (y las que la usan) y expande sus productos."""
+    # Una preparación que se puede borrar no la usa nadie (PROTECT)
+    if _borrado_desde(origin, Preparacion, Inventario):
+        return
+    marcar_productos(recetas.expandir_preparaciones([instance.preparacion_id]))
+
+
+@receiver(pre_delete, sender=Inventario)
+def articulo_por_borrar(sender, instance, **kwargs):
+    # Después del borrado ya no se sabe qué recetas lo usaban
+    instance._recetas_afectadas = (
+        list(PreparacionExpandida.objects.filter(inventario_id=instance.pk).values_list('preparacion_id', flat=True)),
+        set(RecetaExpandida.objects.filter(inventario_id=instance.pk).values_list('menu_id', flat=True)),
+    )
+
+
+@receiver(post_delete, sender=Inventario)
+def articulo_borrado(sender, instance, **kwargs):
+    """
+    El borrado en cascada quita el artículo de las recetas y preparaciones;
+    se expanden de nuevo cuando ya no queda ningún renglón que lo use.
+    """
+    preparaciones, productos = instance.__dict__.pop('_recetas_afectadas', ([], set()))
+    with recalculo_agrupado():
+        # ComponentePreparacion.articulo es opcional, así que Django no
+        # garantiza borrar los componentes antes que el artículo
+        ComponentePreparacion.objects.filter(articulo_id=instance.pk).delete()
+        if preparaciones:
+            productos |= recetas.expandir_preparaciones(preparaciones)
+        marcar_productos(productos)
+
+
+# ---------- Bitácora de movimientos (movimientos.py) ----------
+
+@receiver(post_save, sender=Inventario)
+def stock_articulo_modificado(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Registra como ajuste el cambio de stock hecho con save() (formularios,
+    admin) y recalcula la disponibilidad de los productos que cruzaron su
+    umbral. Los pedidos, la importación y la API lo hacen por su cuenta.
+    """
+    if update_fields is not None and 'stock' not in update_fields:
+        return
+    if 'stock' not in instance.__dict__:
+        return  # campo diferido (.only()): no se guardó
+    nuevo = Decimal(str(instance.stock))
+    if created:
+        anterior = Decimal('0')
+    elif getattr(instance, '_stock_original', None) is not None:
+        anterior = Decimal(str(instance._stock_original))
+    else:
+        # No se leyó de la base (p. ej. Inventario(id=...).save()): se parte
+        # de la bitácora, que termina justo antes de este guardado
+        anterior = movimientos.stock_en(instance.pk, timezone.now())
+    if nuevo != anterior:
+        movimientos.registrar({instance.pk: nuevo - anterior}, MovimientoInventario.AJUSTE)
+        disponibilidad.por_ajustes({instance.pk: nuevo - anterior}, {instance.pk: nuevo})
+    instance._stock_original = nuevo
+
+
+# ---------- Índice de búsqueda (busqueda.py) ----------
+
+@receiver(post_save, sender=Proveedores)
+@receiver(post_save, sender=Inventario)
+@receiver(post_save, sender=Menu)
+def indexar_busqueda(sender, instance, **kwargs):
+    busqueda.indexar_objetos([instance])
+
+
+@receiver(post_delete, sender=Proveedores)
+@receiver(post_delete, sender=Inventario)
+@receiver(post_delete, sender=Menu)
+def desindexar_busqueda(sender, instance, **kwargs):
+    busqueda.desindexar(sender, [instance.pk])
+
+
+# ---------- Pantallas de cocina (eventos.py) ----------
+
+@receiver(post_save, sender=Pedido)
+@receiver(post_delete, sender=Pedido)
+def pedido_modificado(sender, instance, **kwargs):
+    eventos.pedidos_modificados([instance.pk])
+
+
+# ---------- Disponibilidad según el stock (disponibilidad.py) ----------
+
+@receiver(post_save, sender=Menu)
+def habilitado_modificado(sender, instance, update_fields=None, **kwargs):
+    """
+    Recalcula 'disponible' del producto guardado con save(): pudo cambiar
+    'habilitado', y save() escribe el 'disponible' que se leyó, que ya pudo
+    haber cambiado en la base (avisa a la cocina si cambió).
+    """
+    if update_fields is not None and not {'habilitado', 'disponible'} & set(update_fields):
+        return
+    disponibilidad.actualizar_disponibilidad([instance.pk])
+
+
+# ---------- Estadísticas por proveedor ----------
+
+@receiver(post_migrate)
+def instalar_triggers_estadisticas(sender, using, **kwargs):
+    """(Re)crea los triggers de EstadisticasProveedor después de cada migrate (ver estadisticas.py)."""
+    if sender.name == 'app_Pizzeria':
+        estadisticas.instalar(connections[using])
+
+
+# ---------- Bitácora para las terminales (sincronizacion.py) ----------
+
+@receiver(post_migrate)
+def instalar_triggers_sincronizacion(sender, using, **kwargs):
+    """(Re)crea los triggers de CambioSincronizacion después de cada migrate."""
+    if sender.name == 'app_Pizzeria':
+        sincronizacion.instalar(connections[using])
+
+
+# ---------- Sucursales (sucursales.py) ----------
+
+@receiver(post_save, sender=Sucursal)
+@receiver(post_delete, sender=Sucursal)
+def sucursal_modificada(sender, **kwargs):
+    """Una clave renombrada o una sucursal desactivada deja de resolverse."""
+    sucursales.olvidar()
+
+
+@receiver(post_migrate)
+def crear_sucursal_de_la_base(sender, using, **kwargs):
+    """La base propia de una sucursal (settings.SUCURSALES_BD) necesita su renglón en Sucursal."""
+    if sender.name != 'app_Pizzeria':
+        return
+    for clave, alias in settings.SUCURSALES_BD.items():
+        if alias == using:
+            Sucursal.objects.using(using).get_or_create(clave=clave, defaults={'nombre': clave.capitalize()})
+
+
+# ---------- Conexiones ----------
+
+@receiver(connection_created)
+def medir_consultas(sender, connection, **kwargs):
+    """Mide todas las consultas de la conexión (ver metricas.py)."""
+    metricas.instalar(connection)
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    """Aplica settings.SQLITE_PRAGMAS (WAL, synchronous...) a cada conexión nueva."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma in getattr(settings, 'SQLITE_PRAGMAS', []):
+            cursor.execute(f'PRAGMA {pragma}')
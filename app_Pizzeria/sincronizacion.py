@@ -0,0 +1,232 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection as conexion_predeterminada, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import (
+    Proveedores, Inventario, Menu, Receta, CambioSincronizacion, SecuenciaSincronizacion, sucursal_actual,
+)
+
+# ==========================================
+# SERVICIO: Bitácora de cambios para las terminales sin conexión
+# ==========================================
+# Las terminales de venta guardan una copia de proveedores, inventario y menú.
+# Al volver la conexión piden GET /api/cambios/?desde=<seq> (ver api.py) y
+# reciben sólo lo que cambió desde entonces, en lugar de descargar todo.
+#
+# CambioSincronizacion guarda, por objeto, su último cambio con un número de
+# secuencia (seq) que sólo crece. Es una bitácora compactada: si el queso
+# cambia cien veces en la mañana queda un solo renglón con el seq del último
+# cambio, así que lo que se manda a una terminal depende de cuántos objetos
+# cambiaron, no de cuántas veces. La terminal recibe el estado actual de cada
+# objeto; si ya no existe, su id va como borrado (lápida).
+#
+# La alimentan triggers de la base de datos y no señales, por la misma razón
+# que las estadísticas por proveedor (estadisticas.py): el stock, la
+# disponibilidad y el costo de receta cambian casi siempre por UPDATE masivos
+# que no envían señales. Cada INSERT, UPDATE (de alguna columna que ve la
+# terminal) o DELETE sube SecuenciaSincronizacion.valor y escribe el renglón
+# del objeto con ese seq. Los renglones de Receta (Menu.articulos) cuentan
+# como cambio del producto (su número de artículos).
+#
+# Cada renglón lleva la sucursal del artículo o producto (la de un proveedor
+# queda vacía: es de toda la cadena) y la API sólo entrega los de la sucursal
+# de la terminal, así que los objetos de otras sucursales ni se reportan como
+# borrados ni cuentan para el límite de cada respuesta.
+#
+# El contador es un solo renglón: cada transacción que registra cambios lo
+# bloquea hasta terminar, así que los seq se confirman en orden y una terminal
+# nunca se salta un cambio que todavía no se había confirmado. (SQLite ya
+# escribe de una transacción a la vez.)
+#
+# Las lápidas más viejas que settings.SINCRONIZACION_DIAS se borran con el
+# comando compactar_cambios, que recuerda hasta qué seq borró: una terminal
+# que pide desde antes de ese seq pudo perderse un borrado y debe descargar
+# todo de nuevo. Los triggers se (re)instalan después de cada `migrate`.
+#
+# Sólo SQLite y PostgreSQL: en otras bases la API pide siempre descargar todo.
+
+# Nombre en la API -> modelo
+MODELOS = {
+    'proveedores': Proveedores,
+    'inventario': Inventario,
+    'menu': Menu,
+}
+
+TABLAS = {
+    'cambios': CambioSincronizacion._meta.db_table,
+    'secuencia': SecuenciaSincronizacion._meta.db_table,
+    'receta': Receta._meta.db_table,
+    **{nombre: modelo._meta.db_table for nombre, modelo in MODELOS.items()},
+}
+
+# El id del renglón del contador
+CONTADOR = 1
+
+
+def columnas_vigiladas(modelo):
+    """Columnas cuyo cambio se registra: todas menos el id, la versión y las calculadas."""
+    return [
+        f.column for f in modelo._meta.concrete_fields
+        if f.name not in ('id', 'version') and not f.generated
+    ]
+
+
+def por_sucursal(modelo):
+    """Si los objetos del modelo son de una sucursal (tienen columna sucursal_id)."""
+    return any(f.column == 'sucursal_id' for f in modelo._meta.concrete_fields)
+
+
+# SQLite: tres triggers por tabla (el contador y el renglón en el mismo
+# trigger). Si el renglón ya existía y no se sabe la sucursal (se borró la
+# receta de un producto ya borrado) se conserva la que tenía.
+_SQLITE_REGISTRAR = '''
+    UPDATE {secuencia} SET valor = valor + 1 WHERE id = {contador};
+    INSERT INTO {cambios} (seq, modelo, objeto_id, sucursal_id, fecha)
+    SELECT valor, '{modelo}', {fila}, {sucursal}, strftime('%Y-%m-%d %H:%M:%f', 'now')
+    FROM {secuencia} WHERE id = {contador}
+    ON CONFLICT (modelo, objeto_id) DO UPDATE SET
+        seq = excluded.seq, fecha = excluded.fecha,
+        sucursal_id = COALESCE(excluded.sucursal_id, sucursal_id)
+'''
+
+
+def _sqlite(q):
+    sentencias = []
+
+    def trigger(nombre, evento, tabla, modelo, fila, sucursal, cuando=''):
+        sentencias.append(f'DROP TRIGGER IF EXISTS {nombre}')
+        cuerpo = _SQLITE_REGISTRAR.format(
+            secuencia=q(TABLAS['secuencia']), cambios=q(TABLAS['cambios']),
+            contador=CONTADOR, modelo=modelo, fila=fila, sucursal=sucursal,
+        )
+        sentencias.append(f'CREATE TRIGGER {nombre} {evento} ON {q(tabla)} {cuando} BEGIN {cuerpo}; END')
+
+    for nombre, modelo in MODELOS.items():
+        tabla = TABLAS[nombre]
+        cambio = ' OR '.join(f'old.{q(c)} IS NOT new.{q(c)}' for c in columnas_vigiladas(modelo))
+        nueva, vieja = ('new.sucursal_id', 'old.sucursal_id') if por_sucursal(modelo) else ('NULL', 'NULL')
+        trigger(f'sincronizacion_{nombre}_alta', 'AFTER INSERT', tabla, nombre, 'new.id', nueva)
+        trigger(f'sincronizacion_{nombre}_cambio', 'AFTER UPDATE', tabla, nombre, 'new.id', nueva, f'WHEN {cambio}')
+        trigger(f'sincronizacion_{nombre}_baja', 'AFTER DELETE', tabla, nombre, 'old.id', vieja)
+    menu = q(TABLAS['menu'])
+    trigger('sincronizacion_receta_alta', 'AFTER INSERT', TABLAS['receta'], 'menu', 'new.menu_id',
+            f'(SELECT sucursal_id FROM {menu} WHERE id = new.menu_id)')
+    trigger('sincronizacion_receta_baja', 'AFTER DELETE', TABLAS['receta'], 'menu', 'old.menu_id',
+            f'(SELECT sucursal_id FROM {menu} WHERE id = old.menu_id)')
+    return sentencias
+
+
+# PostgreSQL: una función; los argumentos del trigger dicen el modelo, la
+# columna con el id del objeto y, si el renglón no trae su sucursal_id (la
+# receta), la tabla de la que se lee
+_POSTGRES_FUNCION = '''
+    CREATE OR REPLACE FUNCTION sincronizacion_cambio() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        fila jsonb;
+        objeto bigint;
+        sucursal bigint;
+        siguiente bigint;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN fila := to_jsonb(OLD); ELSE fila := to_jsonb(NEW); END IF;
+        objeto := (fila ->> TG_ARGV[1])::bigint;
+        IF TG_NARGS > 2 THEN
+            EXECUTE format('SELECT sucursal_id FROM %I WHERE id = $1', TG_ARGV[2]) INTO sucursal USING objeto;
+        ELSE
+            sucursal := (fila ->> 'sucursal_id')::bigint;
+        END IF;
+        UPDATE {secuencia} SET valor = valor + 1 WHERE id = {contador} RETURNING valor INTO siguiente;
+        INSERT INTO {cambios} AS c (seq, modelo, objeto_id, sucursal_id, fecha)
+        VALUES (siguiente, TG_ARGV[0], objeto, sucursal, now())
+        ON CONFLICT (modelo, objeto_id) DO UPDATE SET
+            seq = EXCLUDED.seq, fecha = EXCLUDED.fecha,
+            sucursal_id = COALESCE(EXCLUDED.sucursal_id, c.sucursal_id);
+        RETURN NULL;
+    END $$
+'''
+
+
+def _postgres(q):
+    sentencias = [_POSTGRES_FUNCION.format(
+        secuencia=q(TABLAS['secuencia']), cambios=q(TABLAS['cambios']), contador=CONTADOR,
+    )]
+
+    def trigger(nombre, evento, tabla, modelo, columna, cuando='', sucursal_de=None):
+        argumentos = f"'{modelo}', '{columna}'" + (f", '{sucursal_de}'" if sucursal_de else '')
+        sentencias.append(f'DROP TRIGGER IF EXISTS {nombre} ON {q(tabla)}')
+        sentencias.append(
+            f"CREATE TRIGGER {nombre} {evento} ON {q(tabla)} FOR EACH ROW {cuando} "
+            f"EXECUTE FUNCTION sincronizacion_cambio({argumentos})"
+        )
+
+    for nombre, modelo in MODELOS.items():
+        tabla = TABLAS[nombre]
+        cambio = ' OR '.join(f'OLD.{q(c)} IS DISTINCT FROM NEW.{q(c)}' for c in columnas_vigiladas(modelo))
+        trigger(f'sincronizacion_{nombre}', 'AFTER INSERT OR DELETE', tabla, nombre, 'id')
+        trigger(f'sincronizacion_{nombre}_cambio', 'AFTER UPDATE', tabla, nombre, 'id', f'WHEN ({cambio})')
+    trigger('sincronizacion_receta', 'AFTER INSERT OR DELETE', TABLAS['receta'], 'menu', 'menu_id',
+            sucursal_de=TABLAS['menu'])
+    return sentencias
+
+
+def disponible(conexion=None):
+    return (conexion or conexion_predeterminada).vendor in ('sqlite', 'postgresql')
+
+
+def instalar(conexion=None):
+    """
+    (Re)crea el renglón del contador y los triggers. Regresa False si la base
+    no los soporta o todavía no existen las tablas (migración parcial).
+    """
+    conexion = conexion or conexion_predeterminada
+    if not disponible(conexion) or not set(TABLAS.values()) <= set(conexion.introspection.table_names()):
+        return False
+    sentencias = (_sqlite if conexion.vendor == 'sqlite' else _postgres)(conexion.ops.quote_name)
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        SecuenciaSincronizacion.objects.using(conexion.alias).get_or_create(id=CONTADOR)
+        for sentencia in sentencias:
+            cursor.execute(sentencia)
+    return True
+
+
+def secuencia():
+    """(último seq asignado, seq hasta el que se compactó); None si no está instalada."""
+    return SecuenciaSincronizacion.objects.filter(id=CONTADOR).values_list('valor', 'compactado_hasta').first()
+
+
+def bitacora():
+    """Los renglones que ve la sucursal activa: los suyos y los de toda la cadena (todos sin sucursal)."""
+    consulta = CambioSincronizacion.objects.all()
+    sucursal_id = sucursal_actual.get()
+    if sucursal_id is not None:
+        consulta = consulta.filter(Q(sucursal_id=sucursal_id) | Q(sucursal_id__isnull=True))
+    return consulta
+
+
+def compactar(dias=None):
+    """
+    Borra las lápidas (renglones de objetos que ya no existen) más viejas que
+    `dias` (settings.SINCRONIZACION_DIAS) y sube compactado_hasta. Regresa
+    cuántas borró.
+    """
+    dias = settings.SINCRONIZACION_DIAS if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    borradas = 0
+    with transaction.atomic():
+        # Primero el contador: bloquea a los triggers mientras se compacta
+        contador = SecuenciaSincronizacion.objects.select_for_update().get(id=CONTADOR)
+        hasta = contador.compactado_hasta
+        for nombre, modelo in MODELOS.items():
+            lapidas = CambioSincronizacion.objects.filter(modelo=nombre, fecha__lt=limite).exclude(
+                objeto_id__in=modelo.objects.values('id')
+            )
+            ultimo = lapidas.aggregate(ultimo=Max('seq'))['ultimo']
+            if ultimo is None:
+                continue
+            hasta = max(hasta, ultimo)
+            borradas += CambioSincronizacion.objects.filter(id__in=lapidas.values('id')).delete()[0]
+        if hasta != contador.compactado_hasta:
+            SecuenciaSincronizacion.objects.filter(id=CONTADOR).update(compactado_hasta=hasta)
+    return borradas
@@ -0,0 +1,202 @@
+import datetime
+import random
+from array import array
+from decimal import Decimal
+
+from django.db import transaction
+
+from . import busqueda
+from .cache_menu import invalidar_menu
+from .costos import recalcular_costos
+from .disponibilidad import actualizar_disponibilidad
+from .models import Proveedores, Inventario, Menu, Receta, MovimientoInventario
+from .movimientos import RegistroMovimientos
+from .recetas import expandir_productos
+
+# ==========================================
+# DATOS SINTÉTICOS (comando generar_datos)
+# ==========================================
+# Genera proveedores, artículos y productos del menú con sus recetas, con
+# nombres y cantidades verosímiles, para reproducir en desarrollo el tamaño
+# de producción (hasta millones de renglones). Todo se escribe con
+# bulk_create por lotes, sin tener la tabla completa en memoria: de cada
+# tabla sólo se guardan los ids (array de enteros) para armar las recetas.
+#
+# bulk_create no envía señales, así que al final se hace lo que harían:
+# el stock inicial en la bitácora, la receta expandida, el costo de receta,
+# el índice de búsqueda y la caché del menú. Con la misma semilla se generan los mismos datos.
+
+TAMAÑO_LOTE = 5000
+
+GIROS = ['Lácteos', 'Abarrotes', 'Carnes Frías', 'Distribuidora', 'Verduras', 'Bebidas', 'Panificadora', 'Especias']
+APELLIDOS = ['López', 'García', 'Hernández', 'Martínez', 'Rodríguez', 'Pérez', 'Sánchez', 'Ramírez', 'Torres', 'Flores']
+REGIONES = ['del Norte', 'del Bajío', 'de Occidente', 'del Centro', 'del Sureste', 'Hermanos', 'y Asociados', 'Express']
+CALLES = ['Av. Juárez', 'Calle Hidalgo', 'Blvd. Morelos', 'Av. Reforma', 'Calle Allende', 'Av. Insurgentes']
+
+# (artículo, unidad, giro del proveedor, costo unitario típico)
+INGREDIENTES = [
+    ('Queso mozzarella', 'kg', 'Lácteos', 145), ('Queso parmesano', 'kg', 'Lácteos', 320),
+    ('Queso cheddar', 'kg', 'Lácteos', 180), ('Crema', 'litro', 'Lácteos', 60),
+    ('Harina', 'kg', 'Abarrotes', 22), ('Levadura', 'kg', 'Panificadora', 90),
+    ('Aceite de oliva', 'litro', 'Abarrotes', 210), ('Sal', 'kg', 'Abarrotes', 12),
+    ('Puré de tomate', 'kg', 'Abarrotes', 35), ('Orégano', 'kg', 'Especias', 240),
+    ('Albahaca', 'kg', 'Verduras', 160), ('Pepperoni', 'kg', 'Carnes Frías', 230),
+    ('Jamón', 'kg', 'Carnes Frías', 150), ('Salchicha italiana', 'kg', 'Carnes Frías', 190),
+    ('Tocino', 'kg', 'Carnes Frías', 210), ('Champiñones', 'kg', 'Verduras', 80),
+    ('Pimiento', 'kg', 'Verduras', 45), ('Cebolla', 'kg', 'Verduras', 25),
+    ('Aceitunas negras', 'kg', 'Abarrotes', 140), ('Piña', 'kg', 'Verduras', 30),
+    ('Jalapeño', 'kg', 'Verduras', 35), ('Refresco de cola', 'pieza', 'Bebidas', 14),
+    ('Agua embotellada', 'pieza', 'Bebidas', 7), ('Cerveza', 'pieza', 'Bebidas', 18),
+    ('Caja para pizza', 'pieza', 'Distribuidora', 6), ('Servilletas', 'pieza', 'Distribuidora', 1),
+]
+PRESENTACIONES = ['', 'premium', 'económico', 'a granel', 'importado', 'orgánico']
+
+SABORES = ['Margarita', 'Pepperoni', 'Hawaiana', 'Mexicana', 'Cuatro Quesos', 'Vegetariana',
+           'Carnes Frías', 'Napolitana', 'Suprema', 'BBQ', 'Champiñones', 'Italiana']
+TAMAÑOS = [('Chica', Decimal('0.6')), ('Mediana', Decimal('1')), ('Grande', Decimal('1.4')), ('Familiar', Decimal('1.8'))]
+OTROS = [
+    ('Bebida', ['Refresco', 'Agua de Jamaica', 'Limonada', 'Cerveza', 'Té helado'], 25),
+    ('Postre', ['Pay de queso', 'Brownie', 'Helado', 'Calzone de Nutella'], 55),
+    ('Entrada', ['Pan de ajo', 'Alitas', 'Papas gajo', 'Ensalada César', 'Dedos de queso'], 75),
+]
+
+
+def _rfc(azar, i):
+    """RFC de persona moral con formato válido; los últimos caracteres lo hacen único."""
+    letras = ''.join(azar.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(3))
+    fecha = datetime.date(1980, 1, 1) + datetime.timedelta(days=azar.randrange(15000))
+    return f'{letras}{fecha:%y%m%d}{_base36(i):0>4}'
+
+
+def _base36(numero):
+    digitos = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    texto = ''
+    while True:
+        numero, resto = divmod(numero, 36)
+        texto = digitos[resto] + texto
+        if not numero:
+            return texto
+
+
+def _lotes(total, tamaño):
+    for inicio in range(0, total, tamaño):
+        yield range(inicio, min(inicio + tamaño, total))
+
+
+def _proveedor(azar, i):
+    giro = azar.choice(GIROS)
+    nombre = f'{giro} {azar.choice(APELLIDOS)} {azar.choice(REGIONES)}'
+    return Proveedores(
+        # El nombre es único: el número de proveedor lo distingue
+        nombre_proveedor=f'{nombre} {i + 1}',
+        telefono_contacto=f'55-{azar.randrange(1000, 10000)}-{azar.randrange(1000, 10000)}',
+        email_contacto=f'ventas{i + 1}@{giro.lower().replace(" ", "")}.example.com',
+        direccion=f'{azar.choice(CALLES)} {azar.randrange(1, 3000)}',
+        tipo_producto=giro,
+        rfc=_rfc(azar, i),
+        activo=azar.random() > 0.05,
+    )
+
+
+def _articulo(azar, proveedores_por_giro, proveedores):
+    nombre, unidad, giro, costo = azar.choice(INGREDIENTES)
+    presentacion = azar.choice(PRESENTACIONES)
+    minimo = Decimal(azar.randrange(2, 30))
+    # La mayoría por encima del mínimo; ~10% por reordenar
+    factor = azar.uniform(0.3, 0.9) if azar.random() < 0.1 else azar.uniform(1.2, 5)
+    stock = minimo * Decimal(f'{factor:.2f}')
+    candidatos = proveedores_por_giro.get(giro) or proveedores
+    return Inventario(
+        nombre_articulo=f'{nombre} {presentacion}'.strip(),
+        stock=stock.quantize(Decimal('0.01')),
+        unidad=unidad,
+        stock_minimo=minimo,
+        costo_unitario=(Decimal(costo) * Decimal(azar.uniform(0.8, 1.25))).quantize(Decimal('0.01')),
+        fecha_ultima_compra=datetime.date.today() - datetime.timedelta(days=azar.randrange(60)),
+        proveedor_id=azar.choice(candidatos) if candidatos else None,
+    )
+
+
+def _producto(azar):
+    if azar.random() < 0.7:
+        tamaño, factor = azar.choice(TAMAÑOS)
+        return Menu(
+            nombre=f'Pizza {azar.choice(SABORES)}',
+            descripcion='Masa artesanal horneada en horno de piedra',
+            precio=(Decimal(azar.randrange(110, 190)) * factor).quantize(Decimal('1')),
+            categoria='Pizza',
+            tamaño=tamaño,
+            habilitado=azar.random() > 0.03,
+        )
+    categoria, nombres, precio = azar.choice(OTROS)
+    return Menu(
+        nombre=azar.choice(nombres),
+        precio=Decimal(precio + azar.randrange(-10, 30)),
+        categoria=categoria,
+        tamaño=None,
+        habilitado=azar.random() > 0.03,
+    )
+
+
+def generar(proveedores=100, articulos=1000, productos=200, ingredientes=(3, 8),
+            semilla=1, tamaño=TAMAÑO_LOTE, progreso=None):
+    """
+    Genera los registros indicados; `ingredientes` es el rango de artículos
+    por receta. `progreso(mensaje)` se llama al terminar cada tabla.
+    Regresa {'proveedores', 'articulos', 'productos', 'recetas'}.
+    """
+    azar = random.Random(semilla)
+    avisar = progreso or (lambda mensaje: None)
+    totales = dict.fromkeys(['proveedores', 'articulos', 'productos', 'recetas'], 0)
+
+    # 1. Proveedores (se recuerda el giro para asignar artículos con sentido)
+    proveedores_por_giro, ids_proveedores = {}, array('q')
+    for lote in _lotes(proveedores, tamaño):
+        creados = Proveedores.objects.bulk_create([_proveedor(azar, i) for i in lote])
+        for proveedor in creados:
+            ids_proveedores.append(proveedor.id)
+            proveedores_por_giro.setdefault(proveedor.tipo_producto, array('q')).append(proveedor.id)
+        totales['proveedores'] += len(creados)
+    avisar(f"{totales['proveedores']} proveedores")
+
+    # 2. Artículos, con su stock inicial en la bitácora (save() lo haría por señal)
+    ids_articulos = array('q')
+    for lote in _lotes(articulos, tamaño):
+        with transaction.atomic(), RegistroMovimientos() as registro:
+            creados = Inventario.objects.bulk_create([
+                _articulo(azar, proveedores_por_giro, ids_proveedores) for _ in lote
+            ])
+            for articulo in creados:
+                ids_articulos.append(articulo.id)
+                registro.agregar(articulo.id, articulo.stock, MovimientoInventario.AJUSTE)
+        totales['articulos'] += len(creados)
+    avisar(f"{totales['articulos']} artículos")
+
+    # 3. Productos y sus recetas (filas de la tabla intermedia del ManyToMany)
+    for lote in _lotes(productos, tamaño):
+        with transaction.atomic():
+            creados = Menu.objects.bulk_create([_producto(azar) for _ in lote])
+            recetas = []
+            for producto in creados:
+                if not ids_articulos or producto.categoria == 'Bebida':
+                    continue
+                cuantos = min(len(ids_articulos), azar.randint(*ingredientes))
+                for articulo_id in azar.sample(ids_articulos, cuantos):
+                    # Con dos decimales, como el stock: el consumo no deja residuos de redondeo
+                    recetas.append(Receta(
+                        menu_id=producto.id, inventario_id=articulo_id,
+                        cantidad=Decimal(azar.randrange(1, 40)) / 100,
+                    ))
+            Receta.objects.bulk_create(recetas, batch_size=tamaño)
+        totales['productos'] += len(creados)
+        totales['recetas'] += len(recetas)
+    avisar(f"{totales['productos']} productos, {totales['recetas']} renglones de receta")
+
+    # 4. Lo que harían las señales
+    expandir_productos()
+    recalcular_costos()
+    actualizar_disponibilidad()
+    busqueda.reconstruir()
+    invalidar_menu()
+    avisar("costos, disponibilidad, índice de búsqueda y caché del menú al día")
+    return totales
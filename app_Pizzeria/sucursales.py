@@ -0,0 +1,197 @@
+import contextvars
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+
+from .models import Sucursal, sucursal_actual
+
+# ==========================================
+# SERVICIO: Sucursales
+# ==========================================
+# Cada petición trabaja en UNA sucursal: la del parámetro ?sucursal=<clave>
+# (que además se guarda en una cookie para las páginas siguientes), la del
+# encabezado X-Sucursal (terminales y API) o, si no trae ninguna,
+# settings.SUCURSAL_PREDETERMINADA. SucursalMiddleware la deja en
+# models.sucursal_actual y el manager de Inventario, Menu y Pedido filtra por
+# ella (ver models.PorSucursalQuerySet).
+#
+# Con todas las sucursales en la misma base, los índices (sucursal, ..., id)
+# hacen que cada listado lea sólo la parte de su sucursal. Con
+# PIZZERIA_SUCURSALES_BD además cada sucursal indicada vive en su propio
+# archivo SQLite: RouterSucursales manda ahí todas las consultas de la app
+# mientras esa sucursal está activa (los servicios que abren transacciones o
+# usan SQL directo piden la base con router.db_for_write()). Los proveedores
+# son de toda la cadena, pero con archivos separados cada uno tiene su copia.
+
+COOKIE = 'sucursal'
+ENCABEZADO = 'HTTP_X_SUCURSAL'
+
+# Alias de la base de la sucursal activa (None = 'default') y su clave
+_bd_actual = contextvars.ContextVar('sucursal_bd', default=None)
+_clave_actual = contextvars.ContextVar('sucursal_clave', default=None)
+
+# Modelos de la app que son de toda la cadena y se quedan en 'default'
+COMUNES = {'trabajo'}
+
+# (alias, clave) -> id, para no consultar la sucursal en cada petición
+_ids = {}
+
+
+def bd_de(clave):
+    """Alias de la base de la sucursal: la suya si tiene archivo propio, si no 'default'."""
+    return settings.SUCURSALES_BD.get(clave, DEFAULT_DB_ALIAS)
+
+
+def resolver(clave):
+    """Id de la sucursal activa con esa clave (en su base); None si no existe."""
+    bd = bd_de(clave)
+    if (bd, clave) not in _ids:
+        sucursal_id = Sucursal.objects.using(bd).filter(clave=clave, activa=True).values_list(
+            'id', flat=True
+        ).first()
+        if sucursal_id is None:
+            return None
+        _ids[bd, clave] = sucursal_id
+    return _ids[bd, clave]
+
+
+def olvidar():
+    """Descarta las claves ya resueltas (se llama al cambiar una sucursal)."""
+    _ids.clear()
+
+
+def elegir_clave(parametro, encabezado, cookie):
+    """(clave, viene de ?sucursal=): el parámetro, el encabezado, la cookie o la predeterminada."""
+    if parametro:
+        return parametro, True
+    return encabezado or cookie or settings.SUCURSAL_PREDETERMINADA, False
+
+
+def actual():
+    """Id de la sucursal activa (None = todas)."""
+    return sucursal_actual.get()
+
+
+def clave_actual():
+    """Clave de la sucursal activa (None = todas)."""
+    return _clave_actual.get()
+
+
+@contextmanager
+def _activa(clave, sucursal_id):
+    token_clave = _clave_actual.set(clave)
+    token_bd = _bd_actual.set(bd_de(clave))
+    token = sucursal_actual.set(sucursal_id)
+    try:
+        yield sucursal_id
+    finally:
+        sucursal_actual.reset(token)
+        _bd_actual.reset(token_bd)
+        _clave_actual.reset(token_clave)
+
+
+def etiqueta():
+    """
+    La sucursal activa para las claves de caché. Lleva también la base: con
+    archivos separados los ids (de la sucursal y de sus registros) se repiten.
+    """
+    return f'{_bd_actual.get() or DEFAULT_DB_ALIAS}.{sucursal_actual.get()}'
+
+
+def activar(clave):
+    """Trabaja dentro del bloque en la sucursal `clave` (comandos, benchmarks, pruebas)."""
+    sucursal_id = resolver(clave)
+    if sucursal_id is None:
+        raise Sucursal.DoesNotExist(f"No existe la sucursal '{clave}'.")
+    return _activa(clave, sucursal_id)
+
+
+def en_la_sucursal(iterable):
+    """
+    Itera `iterable` con la sucursal activa ahora. Las respuestas por partes
+    (StreamingHttpResponse) se generan después de que el middleware terminó.
+    """
+    # Se copia ya: el cuerpo de un generador corre hasta la primera parte
+    contexto = contextvars.copy_context()
+    iterador = iter(iterable)
+
+    def partes():
+        while True:
+            try:
+                parte = contexto.run(next, iterador)
+            except StopIteration:
+                return
+            yield parte
+
+    return partes()
+
+
+# ---------- Middleware ----------
+
+class SucursalMiddleware:
+    """Activa la sucursal de la petición (sync o async); 404 si la clave no existe."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def _clave(self, request):
+        """(clave, viene de ?sucursal=)."""
+        return elegir_clave(request.GET.get('sucursal'), request.META.get(ENCABEZADO), request.COOKIES.get(COOKIE))
+
+    def _recordar(self, request, respuesta, clave, elegida):
+        if elegida and request.COOKIES.get(COOKIE) != clave:
+            respuesta.set_cookie(COOKIE, clave, max_age=365 * 24 * 60 * 60, samesite='Lax')
+        return respuesta
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        clave, elegida = self._clave(request)
+        sucursal_id = resolver(clave)
+        if sucursal_id is None:
+            raise Http404(f"No existe la sucursal '{clave}'.")
+        with _activa(clave, sucursal_id):
+            respuesta = self.get_response(request)
+        return self._recordar(request, respuesta, clave, elegida)
+
+    async def __acall__(self, request):
+        clave, elegida = self._clave(request)
+        # La clave se resuelve en un hilo (puede consultar la base) y la
+        # sucursal se activa aquí, en el contexto de la vista async
+        sucursal_id = await sync_to_async(resolver)(clave)
+        if sucursal_id is None:
+            raise Http404(f"No existe la sucursal '{clave}'.")
+        with _activa(clave, sucursal_id):
+            respuesta = await self.get_response(request)
+        return self._recordar(request, respuesta, clave, elegida)
+
+
+# ---------- Router ----------
+
+class RouterSucursales:
+    """
+    Con archivo propio (settings.SUCURSALES_BD), las lecturas y escrituras de
+    la app van a la base de la sucursal activa; lo demás (usuarios, sesiones,
+    la cola de trabajos) y las sucursales sin archivo propio se quedan en
+    'default'. Cada archivo se crea con
+    `python manage.py migrate --database <alias>`.
+    """
+
+    def _bd(self, model):
+        if model._meta.app_label != 'app_Pizzeria' or model._meta.model_name in COMUNES:
+            return None
+        return _bd_actual.get()
+
+    def db_for_read(self, model, **hints):
+        return self._bd(model)
+
+    def db_for_write(self, model, **hints):
+        return self._bd(model)
@@ -1,3 +1,1850 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import QueryDict
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .listados import LISTADO_PROVEEDORES, LISTADO_INVENTARIO, LISTADO_MENU
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ValidationError
+
+from .models import (
+    Proveedores, Inventario, Menu, Receta, Pedido, MovimientoInventario, SaldoInventario, EstadisticasProveedor,
+    Preparacion, ComponentePreparacion, RecetaPreparacion, PreparacionExpandida, RecetaExpandida,
+    CambioSincronizacion, Sucursal, SUCURSAL_PRINCIPAL, Trabajo, ResumenVenta, ResumenCategoria, ResumenConsumo,
+    DIA_COMPLETO,
+)
+from .pedidos import registrar_pedido, PedidoInvalido, StockInsuficiente
+from .costos import con_costos, recalcular_costos
+from .reorden import resumen_reorden, sugerencias_reorden, SIN_PROVEEDOR
+from . import (
+    busqueda, cache_menu, disponibilidad, estadisticas, eventos, intercambio, metricas, movimientos, pronostico,
+    recetas, reportes, sincronizacion, sucursales, trabajos,
+)
+
+# Tamaños de tabla con los que se verifica el presupuesto de consultas
+ESCALAS = (10, 1_000, 10_000)
+
+
+def parametros(**valores):
+    """Arma un QueryDict como el de request.GET."""
+    qd = QueryDict(mutable=True)
+    qd.update(valores)
+    return qd
+
+
+# ==========================================
+# PRUEBAS: Motor de listados (paginación por cursor)
+# ==========================================
+class ListadosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.proveedor = Proveedores.objects.create(nombre_proveedor='Lácteos del Norte')
+        Inventario.objects.bulk_create([
+            Inventario(
+                nombre_articulo=f'Artículo {i:03d}',
+                stock=Decimal(i % 7),
+                stock_minimo=Decimal(3),
+                unidad='kg' if i % 2 else 'pieza',
+                proveedor=cls.proveedor if i % 3 == 0 else None,
+            )
+            for i in range(1, 121)
+        ])
+        Menu.objects.bulk_create([
+            Menu(nombre=f'Pizza {i}', precio=Decimal(100 + i % 5), categoria='Pizza')
+            for i in range(1, 31)
+        ])
+
+    def recorrer(self, listado, **valores):
+        """Sigue los cursores 'despues' hasta el final y regresa todos los ids."""
+        ids = []
+        params = parametros(**valores)
+        while True:
+            pagina = listado.paginar(params)
+            ids.extend(obj.id for obj in pagina)
+            if not pagina.hay_siguiente:
+                return ids
+            params = QueryDict(pagina.url_siguiente[1:])
+
+    def test_recorrido_completo_sin_repetidos(self):
+        ids = self.recorrer(LISTADO_INVENTARIO, por_pagina='25')
+        esperados = list(Inventario.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(ids, esperados)
+
+    def test_orden_con_empates_usa_id(self):
+        ids = self.recorrer(LISTADO_MENU, orden='-precio', por_pagina='7')
+        esperados = list(Menu.objects.order_by('-precio', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperados)
+
+    def test_filtros(self):
+        ids = self.recorrer(LISTADO_INVENTARIO, proveedor=str(self.proveedor.id), unidad='kg')
+        esperados = list(
+            Inventario.objects.filter(proveedor=self.proveedor, unidad='kg')
+            .order_by('id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, esperados)
+
+    def test_filtro_stock_bajo(self):
+        ids = self.recorrer(LISTADO_INVENTARIO, stock_bajo='1')
+        self.assertTrue(ids)
+        for articulo in Inventario.objects.filter(id__in=ids):
+            self.assertLess(articulo.stock, articulo.stock_minimo)
+
+    def test_pagina_anterior(self):
+        primera = LISTADO_INVENTARIO.paginar(parametros(por_pagina='10'))
+        segunda = LISTADO_INVENTARIO.paginar(QueryDict(primera.url_siguiente[1:]))
+        regreso = LISTADO_INVENTARIO.paginar(QueryDict(segunda.url_anterior[1:]))
+        self.assertEqual([a.id for a in regreso], [a.id for a in primera])
+        self.assertFalse(regreso.hay_anterior)
+
+    def test_cursor_invalido_se_ignora(self):
+        pagina = LISTADO_INVENTARIO.paginar(parametros(despues='no-es-un-cursor'))
+        self.assertEqual(pagina.objetos[0].id, Inventario.objects.order_by('id').first().id)
+
+    def test_vistas_responden(self):
+        for nombre in ('ver_proveedores', 'ver_inventario', 'ver_menu'):
+            respuesta = self.client.get(reverse(nombre), {'por_pagina': '5'})
+            self.assertEqual(respuesta.status_code, 200)
+
+
+# ==========================================
+# PRUEBAS: Presupuesto de consultas por vista
+# ==========================================
+class PresupuestoConsultasTests(TestCase):
+    """
+    Cada vista debe ejecutar el mismo número de consultas SQL sin importar
+    cuántas filas existan. Si alguien vuelve a usar prod.articulos.count o
+    art.proveedor sin select_related en un template, estas pruebas fallan.
+    """
+
+    def poblar(self, total):
+        """Crea filas hasta tener 'total' proveedores, artículos y productos."""
+        actuales = Inventario.objects.count()
+        faltan = total - actuales
+        if faltan <= 0:
+            return
+        proveedores = Proveedores.objects.bulk_create([
+            Proveedores(nombre_proveedor=f'Proveedor {actuales + i}')
+            for i in range(faltan)
+        ])
+        articulos = Inventario.objects.bulk_create([
+            Inventario(
+                nombre_articulo=f'Artículo {actuales + i}',
+                stock=Decimal(i % 10),
+                stock_minimo=Decimal(5),
+                unidad='kg',
+                proveedor=proveedores[i],
+            )
+            for i in range(faltan)
+        ])
+        productos = Menu.objects.bulk_create([
+            Menu(nombre=f'Producto {actuales + i}', precio=Decimal(99), categoria='Pizza')
+            for i in range(faltan)
+        ])
+        Receta = Menu.articulos.through
+        Receta.objects.bulk_create([
+            Receta(menu_id=producto.id, inventario_id=articulos[(i + j) % faltan].id)
+            for i, producto in enumerate(productos)
+            for j in range(3)
+        ], ignore_conflicts=True)
+
+    def verificar(self, nombre_url, consultas, argumentos=None):
+        """Verifica el número exacto de consultas de una vista en cada escala."""
+        for total in ESCALAS:
+            self.poblar(total)
+            url = reverse(nombre_url, args=argumentos() if argumentos else None)
+            with self.subTest(vista=nombre_url, filas=total):
+                cache.clear()  # se mide el camino sin caché (ver CacheMenuTests)
+                with self.assertNumQueries(consultas):
+                    respuesta = self.client.get(url)
+                self.assertEqual(respuesta.status_code, 200)
+
+    def primer_producto(self):
+        return [Menu.objects.order_by('id').values_list('id', flat=True).first()]
+
+    def primer_articulo(self):
+        return [Inventario.objects.order_by('id').values_list('id', flat=True).first()]
+
+    def primer_proveedor(self):
+        return [Proveedores.objects.order_by('id').values_list('id', flat=True).first()]
+
+    def test_ver_proveedores(self):
+        # 1: página de proveedores
+        self.verificar('ver_proveedores', 1)
+
+    def test_ver_inventario(self):
+        # 1: página de artículos con JOIN al proveedor, 2: proveedores del filtro
+        self.verificar('ver_inventario', 2)
+
+    def test_ver_menu(self):
+        # 1: página de productos con COUNT(articulos) agrupado
+        self.verificar('ver_menu', 1)
+
+    def test_actualizar_menu(self):
+        # 1: producto, 2: IDs seleccionados, 3: artículos del <select>
+        self.verificar('actualizar_menu', 3, self.primer_producto)
+
+    def test_agregar_menu(self):
+        # 1: artículos del <select>
+        self.verificar('agregar_menu', 1)
+
+    def test_actualizar_inventario(self):
+        # 1: artículo, 2: proveedores del <select>
+        self.verificar('actualizar_inventario', 2, self.primer_articulo)
+
+    def test_actualizar_proveedor(self):
+        # 1: proveedor
+        self.verificar('actualizar_proveedor', 1, self.primer_proveedor)
+
+    def test_num_articulos_correcto(self):
+        self.poblar(10)
+        respuesta = self.client.get(reverse('ver_menu'))
+        self.assertContains(respuesta, '3 art.')
+
+    def test_articulos_seleccionados(self):
+        self.poblar(10)
+        producto = Menu.objects.order_by('id').first()
+        respuesta = self.client.get(reverse('actualizar_menu', args=[producto.id]))
+        seleccionados = set(producto.articulos.values_list('id', flat=True))
+        self.assertEqual(respuesta.context['articulos_seleccionados'], seleccionados)
+        self.assertEqual(respuesta.content.decode().count(' selected'), len(seleccionados))
+
+
+# ==========================================
+# PRUEBAS: Pedidos y descuento de stock
+# ==========================================
+class PedidosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.masa = Inventario.objects.create(nombre_articulo='Masa', stock=Decimal('10'), unidad='pieza')
+        cls.queso = Inventario.objects.create(nombre_articulo='Queso', stock=Decimal('2'), unidad='kg')
+        cls.pizza = Menu.objects.create(nombre='Pizza Queso', precio=Decimal('120'), categoria='Pizza')
+        Receta.objects.create(menu=cls.pizza, inventario=cls.masa, cantidad=Decimal('1'))
+        Receta.objects.create(menu=cls.pizza, inventario=cls.queso, cantidad=Decimal('0.250'))
+
+    def test_descuenta_stock_segun_receta(self):
+        pedido = registrar_pedido([(self.pizza.id, 2), (self.pizza.id, 1)])
+        self.assertEqual(pedido.total, Decimal('360'))
+        self.assertEqual(pedido.detalles.get().cantidad, 3)
+        self.masa.refresh_from_db()
+        self.queso.refresh_from_db()
+        self.assertEqual(self.masa.stock, Decimal('7'))
+        self.assertEqual(self.queso.stock, Decimal('1.25'))
+
+    def test_stock_insuficiente_revierte_todo(self):
+        with self.assertRaises(StockInsuficiente) as error:
+            registrar_pedido([(self.pizza.id, 9)])
+        self.assertEqual(error.exception.articulos, ['Queso'])
+        self.assertFalse(Pedido.objects.exists())
+        self.masa.refresh_from_db()
+        self.assertEqual(self.masa.stock, Decimal('10'))
+
+    def test_producto_no_disponible(self):
+        Menu.objects.filter(id=self.pizza.id).update(habilitado=False, disponible=False)
+        with self.assertRaises(PedidoInvalido):
+            registrar_pedido([(self.pizza.id, 1)])
+
+    def test_consultas_constantes(self):
+        # 1: productos, 2: recetas, 3: INSERT pedido, 4: INSERT detalles,
+        # 5: UPDATE stock (un lote), 6: INSERT de la bitácora, 7: stock restante
+        # (faltantes), 8: recetas que cruzaron su umbral (ninguna: sin UPDATE
+        # de disponibilidad), 9-11: resúmenes por producto, por categoría y de
+        # consumo (+2 por el SAVEPOINT de atomic() dentro de la transacción de la prueba)
+        with self.assertNumQueries(13):
+            registrar_pedido([(self.pizza.id, 1)])
+
+    def test_vista_agregar_pedido(self):
+        respuesta = self.client.post(reverse('agregar_pedido'), {
+            'cliente': 'Mesa 4', f'cantidad_{self.pizza.id}': '2',
+        })
+        self.assertRedirects(respuesta, reverse('ver_pedidos'))
+        self.assertContains(self.client.get(reverse('ver_pedidos')), 'Mesa 4')
+
+    def test_vista_muestra_error_de_stock(self):
+        respuesta = self.client.post(reverse('agregar_pedido'), {f'cantidad_{self.pizza.id}': '50'})
+        self.assertContains(respuesta, 'Stock insuficiente')
+
+
+# ==========================================
+# PRUEBAS: Importación / exportación masiva
+# ==========================================
+class IntercambioTests(TestCase):
+
+    def importar(self, modelo, texto, formato='csv'):
+        return intercambio.importar(modelo, io.BytesIO(texto.encode()), formato)
+
+    def exportar(self, modelo, formato='csv'):
+        return ''.join(intercambio.exportar(modelo, formato))
+
+    def test_importar_proveedores_hace_upsert(self):
+        texto = "nombre_proveedor,rfc,telefono_contacto\nLácteos,LAC010101AAA,111\nHarinas,,222\n"
+        self.assertEqual(self.importar('proveedores', texto).guardadas, 2)
+        texto = "nombre_proveedor,rfc,telefono_contacto\nLácteos,LAC010101AAA,999\n"
+        self.importar('proveedores', texto)
+        self.assertEqual(Proveedores.objects.count(), 2)
+        self.assertEqual(Proveedores.objects.get(nombre_proveedor='Lácteos').telefono_contacto, '999')
+
+    def test_importar_inventario_resuelve_proveedor_sin_consulta_por_fila(self):
+        Proveedores.objects.create(nombre_proveedor='Lácteos', rfc='LAC010101AAA')
+        filas = ''.join(
+            f"Queso {i},{i},kg,{'LAC010101AAA' if i % 2 else 'lácteos'},12.50\n" for i in range(100)
+        )
+        texto = "nombre_articulo,stock,unidad,proveedor,costo_unitario\n" + filas
+        # 1: mapa de proveedores, 2: existentes del lote, 3-7: SAVEPOINT + INSERT +
+        # versión + INSERT de la bitácora + RELEASE, 8: recálculo del costo de las
+        # recetas afectadas, 9-11: índice de búsqueda y su vocabulario (el número
+        # de filas no cambia el número de consultas)
+        with self.assertNumQueries(11):
+            resultado = self.importar('inventario', texto)
+        self.assertEqual(resultado.guardadas, 100)
+        self.assertEqual(Inventario.objects.filter(proveedor__nombre_proveedor='Lácteos').count(), 100)
+
+        # Reimportar actualiza en lugar de duplicar
+        self.importar('inventario', "nombre_articulo,stock,unidad,proveedor\nQueso 1,77,kg,lácteos\n")
+        self.assertEqual(Inventario.objects.count(), 100)
+        self.assertEqual(Inventario.objects.get(nombre_articulo='Queso 1').stock, Decimal('77'))
+
+    def test_lista_de_precios_no_toca_el_stock(self):
+        lacteos = Proveedores.objects.create(nombre_proveedor='Lácteos')
+        queso = Inventario.objects.create(nombre_articulo='Queso', stock=Decimal('40'), stock_minimo=Decimal('10'),
+                                          costo_unitario=Decimal('80'), unidad='kg', proveedor=lacteos)
+        pizza = Menu.objects.create(nombre='Hawaiana', precio=Decimal('150'), categoria='Pizza')
+        movimientos_antes = MovimientoInventario.objects.count()
+        # Sólo las columnas que trae el archivo se actualizan
+        self.assertEqual(self.importar(
+            'inventario', "nombre_articulo,proveedor,costo_unitario\nQueso,Lácteos,95\n"
+        ).guardadas, 1)
+        self.importar('menu', '{"nombre": "Hawaiana", "descripcion": "Con piña"}\n', 'json')
+
+        queso.refresh_from_db()
+        self.assertEqual((queso.stock, queso.stock_minimo, queso.costo_unitario, queso.unidad),
+                         (Decimal('40'), Decimal('10'), Decimal('95'), 'kg'))
+        self.assertEqual(MovimientoInventario.objects.count(), movimientos_antes)
+        pizza.refresh_from_db()
+        self.assertEqual((pizza.precio, pizza.categoria, pizza.descripcion), (Decimal('150'), 'Pizza', 'Con piña'))
+        # La categoría del índice se lee de la base
+        self.assertEqual([r['id'] for r in busqueda.buscar('pizza')], [pizza.id])
+
+    def test_errores_por_linea(self):
+        texto = "nombre_articulo,stock,proveedor\n,1,\nHarina,abc,\nSal,1,Nadie\nAzúcar,2,\n"
+        resultado = self.importar('inventario', texto)
+        self.assertEqual(resultado.guardadas, 1)
+        self.assertEqual(resultado.total_errores, 3)
+        self.assertIn('Línea 3', resultado.errores[1])
+
+    def test_ida_y_vuelta_menu_json(self):
+        masa = Inventario.objects.create(nombre_articulo='Masa', unidad='pieza')
+        pizza = Menu.objects.create(nombre='Hawaiana', precio=Decimal('150'), categoria='Pizza')
+        Receta.objects.create(menu=pizza, inventario=masa, cantidad=Decimal('0.5'))
+
+        exportado = self.exportar('menu', 'json')
+        fila = json.loads(exportado)
+        self.assertEqual(fila['articulos'], f'{masa.id}:0.5')
+
+        Menu.objects.filter(id=pizza.id).update(precio=1)
+        Receta.objects.all().delete()
+        self.importar('menu', exportado, 'json')
+        pizza.refresh_from_db()
+        self.assertEqual(pizza.precio, Decimal('150'))
+        self.assertEqual(Receta.objects.get(menu=pizza).cantidad, Decimal('0.5'))
+
+    def test_receta_con_articulo_desconocido(self):
+        masa = Inventario.objects.create(nombre_articulo='Masa', unidad='pieza')
+        Sucursal.objects.create(nombre='Norte', clave='norte')
+        with sucursales.activar('norte'):
+            queso_norte = Inventario.objects.create(nombre_articulo='Queso', unidad='kg')
+        texto = f"nombre,precio,articulos\nHawaiana,150,{masa.id}:1|{queso_norte.id}:0.25|99999\n"
+        with sucursales.activar('principal'):
+            resultado = self.importar('menu', texto)
+        # El producto se guarda con lo válido, pero cada artículo descartado se reporta
+        self.assertEqual(resultado.errores, [
+            f"Línea 2: artículo desconocido en la receta: {queso_norte.id}",
+            "Línea 2: artículo desconocido en la receta: 99999",
+        ])
+        self.assertEqual(list(Receta.objects.values_list('inventario_id', flat=True)), [masa.id])
+
+    def test_vista_exportar_es_streaming(self):
+        Proveedores.objects.create(nombre_proveedor='Harinas')
+        respuesta = self.client.get(reverse('exportar_datos', args=['proveedores']), {'formato': 'csv'})
+        self.assertTrue(respuesta.streaming)
+        contenido = b''.join(respuesta.streaming_content).decode()
+        self.assertIn('Harinas', contenido)
+
+    def test_vista_importar(self):
+        with tempfile.TemporaryDirectory() as carpeta, override_settings(TRABAJOS_DIR=carpeta):
+            archivo = SimpleUploadedFile('proveedores.csv', b"nombre_proveedor\nHarinas\n")
+            respuesta = self.client.post(reverse('importar_datos', args=['proveedores']), {'archivo': archivo})
+            # Responde sin importar: el archivo queda en la cola (ver trabajos.py)
+            trabajo = Trabajo.objects.get()
+            self.assertRedirects(respuesta, reverse('ver_trabajo', args=[trabajo.id]))
+            self.assertFalse(Proveedores.objects.exists())
+
+            with self.assertLogs('pizzeria.trabajos'):
+                self.assertEqual(trabajos.procesar_pendientes(), 1)
+            self.assertContains(self.client.get(respuesta.url), 'Filas guardadas: <strong>1</strong>')
+            self.assertTrue(Proveedores.objects.filter(nombre_proveedor='Harinas').exists())
+            # El archivo subido se borra al terminar
+            self.assertEqual(os.listdir(carpeta), [])
+
+    def test_modelo_desconocido(self):
+        self.assertEqual(self.client.get(reverse('exportar_datos', args=['pedidos'])).status_code, 404)
+
+
+# ==========================================
+# PRUEBAS: Caché del menú y GET condicional
+# ==========================================
+class CacheMenuTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.pizza = Menu.objects.create(nombre='Margarita', precio=Decimal('110'), categoria='Pizza')
+
+    def test_segunda_visita_sin_consultas(self):
+        self.client.get(reverse('ver_menu'))
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(reverse('ver_menu'))
+        self.assertContains(respuesta, 'Margarita')
+
+    def test_etag_responde_304(self):
+        respuesta = self.client.get(reverse('ver_menu'))
+        self.assertTrue(respuesta.has_header('ETag'))
+        self.assertTrue(respuesta.has_header('Last-Modified'))
+        condicional = self.client.get(reverse('ver_menu'), HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(condicional.status_code, 304)
+
+    def test_guardar_producto_invalida(self):
+        etag = self.client.get(reverse('ver_menu'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pizza.nombre = 'Margarita Especial'
+            self.pizza.save()
+        respuesta = self.client.get(reverse('ver_menu'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, 'Margarita Especial')
+
+    def test_cambio_de_articulos_invalida(self):
+        queso = Inventario.objects.create(nombre_articulo='Queso', unidad='kg')
+        self.client.get(reverse('ver_menu'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pizza.articulos.add(queso)
+        self.assertContains(self.client.get(reverse('ver_menu')), '1 art.')
+
+    def test_filtros_distintos_no_comparten_entrada(self):
+        Menu.objects.create(nombre='Refresco', precio=Decimal('25'), categoria='Bebida')
+        cache.clear()
+        self.assertNotContains(self.client.get(reverse('ver_menu'), {'categoria': 'Pizza'}), 'Refresco')
+        self.assertContains(self.client.get(reverse('ver_menu'), {'categoria': 'Bebida'}), 'Refresco')
+
+
+# ==========================================
+# PRUEBAS: Reorden (stock bajo)
+# ==========================================
+class ReordenTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lacteos = Proveedores.objects.create(nombre_proveedor='Lácteos del Norte')
+        cls.harinas = Proveedores.objects.create(nombre_proveedor='Harinas Sol')
+        cls.queso = Inventario.objects.create(
+            nombre_articulo='Queso', stock=Decimal('1'), stock_minimo=Decimal('5'),
+            costo_unitario=Decimal('100'), unidad='kg', proveedor=cls.lacteos,
+        )
+        cls.harina = Inventario.objects.create(
+            nombre_articulo='Harina', stock=Decimal('50'), stock_minimo=Decimal('10'),
+            unidad='kg', proveedor=cls.harinas,
+        )
+        cls.sal = Inventario.objects.create(
+            nombre_articulo='Sal', stock=Decimal('0'), stock_minimo=Decimal('1'), unidad='kg',
+        )
+
+    def test_agrupa_por_proveedor(self):
+        grupos = sugerencias_reorden()
+        self.assertEqual([g.proveedor for g in grupos], [self.lacteos, None])
+        queso = grupos[0].articulos[0]
+        # Se sugiere llegar al doble del mínimo: 5 * 2 - 1 = 9 kg
+        self.assertEqual(queso.cantidad_sugerida, Decimal('9'))
+        self.assertEqual(grupos[0].total, Decimal('900'))
+
+    def test_bandera_se_actualiza_con_updates_masivos(self):
+        # Un pedido descuenta stock con UPDATE ... F(); la columna generada se
+        # recalcula sin que nadie la toque
+        Inventario.objects.filter(id=self.harina.id).update(stock=Decimal('3'))
+        Inventario.objects.filter(id=self.queso.id).update(stock_minimo=Decimal('0'))
+        grupos = sugerencias_reorden()
+        self.assertEqual([g.proveedor for g in grupos], [self.harinas, None])
+
+    def test_resumen(self):
+        with self.assertNumQueries(2):
+            resumen = resumen_reorden()
+        self.assertEqual(
+            [(r['proveedor'], r['articulos'], r['costo']) for r in resumen],
+            [(self.lacteos, 1, Decimal('900')), (None, 1, Decimal('0'))],
+        )
+        self.assertEqual(resumen[1]['proveedor_id'], SIN_PROVEEDOR)
+
+    def test_consultas_constantes(self):
+        # 1: proveedores, 2: sus artículos (prefetch), 3: artículos sin proveedor
+        with self.assertNumQueries(3):
+            sugerencias_reorden()
+
+    def test_usa_indice_parcial(self):
+        # Como en el tablero: el índice empieza con la sucursal de la petición
+        consulta = Inventario.objects.de_sucursal(SUCURSAL_PRINCIPAL).filter(bajo_minimo=True).order_by(
+            'proveedor_id', 'id'
+        )
+        if connection.vendor == 'sqlite':
+            self.assertIn('inv_reorden_idx', consulta.explain())
+
+    def test_tablero_y_comando(self):
+        respuesta = self.client.get(reverse('reorden_inventario'), {'proveedor': self.lacteos.id})
+        self.assertContains(respuesta, 'Lácteos del Norte')
+        self.assertContains(respuesta, 'Queso')
+        self.assertNotContains(respuesta, 'Harina')
+        salida = io.StringIO()
+        call_command('reorden', proveedor=self.lacteos.id, stdout=salida)
+        self.assertIn('Queso', salida.getvalue())
+        self.assertNotIn('Sal', salida.getvalue())
+
+
+# ==========================================
+# PRUEBAS: Costo de receta y margen
+# ==========================================
+class CostosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.masa = Inventario.objects.create(nombre_articulo='Masa', unidad='pieza', costo_unitario=Decimal('10'))
+        cls.queso = Inventario.objects.create(nombre_articulo='Queso', unidad='kg', costo_unitario=Decimal('200'))
+        cls.pizza = Menu.objects.create(nombre='Pizza Queso', precio=Decimal('150'), categoria='Pizza')
+        cls.pan = Menu.objects.create(nombre='Pan de Ajo', precio=Decimal('60'), categoria='Entrada')
+        Receta.objects.create(menu=cls.pizza, inventario=cls.masa, cantidad=Decimal('1'))
+        Receta.objects.create(menu=cls.pizza, inventario=cls.queso, cantidad=Decimal('0.250'))
+        Receta.objects.create(menu=cls.pan, inventario=cls.masa, cantidad=Decimal('0.5'))
+
+    def costo(self, producto):
+        producto.refresh_from_db(fields=['costo_receta'])
+        return producto.costo_receta
+
+    def test_costo_y_margen(self):
+        self.assertEqual(self.costo(self.pizza), Decimal('60'))
+        self.assertEqual(self.pizza.margen, Decimal('90'))
+        self.assertEqual(self.pizza.margen_porcentaje, Decimal('60'))
+
+    def test_cambio_de_costo_recalcula_solo_afectados(self):
+        queso = Inventario.objects.get(id=self.queso.id)
+        queso.costo_unitario = Decimal('240')
+        # 1: UPDATE del artículo, 2: UPDATE de los productos que usan queso,
+        # 3-5: índice de búsqueda
+        with self.assertNumQueries(5):
+            queso.save()
+        self.assertEqual(self.costo(self.pizza), Decimal('70'))
+        self.assertEqual(self.costo(self.pan), Decimal('5'))
+
+    def test_guardar_sin_cambiar_costo_no_recalcula(self):
+        masa = Inventario.objects.get(id=self.masa.id)
+        masa.stock = Decimal('30')
+        # 1: UPDATE del artículo, 2: INSERT de la bitácora, 3: recetas que
+        # cruzaron su umbral (de 0 a 30), 4: UPDATE de su disponibilidad,
+        # 5-7: índice de búsqueda (sin recálculo de costos)
+        with self.assertNumQueries(7):
+            masa.save()
+
+    def test_cambio_de_receta(self):
+        self.pan.articulos.add(self.queso, through_defaults={'cantidad': Decimal('0.1')})
+        self.assertEqual(self.costo(self.pan), Decimal('25'))
+        self.queso.delete()
+        self.assertEqual(self.costo(self.pizza), Decimal('10'))
+
+    def test_consulta_agregada_coincide(self):
+        Inventario.objects.filter(id=self.masa.id).update(costo_unitario=Decimal('12'))
+        with self.assertNumQueries(1):
+            calculados = {p.id: p.costo_actual for p in con_costos()}
+        self.assertEqual(calculados[self.pizza.id], Decimal('62'))
+        # update() no envía señales: el recálculo completo lo corrige
+        recalcular_costos()
+        self.assertEqual(self.costo(self.pizza), Decimal('62'))
+
+    def test_importar_receta_recalcula(self):
+        texto = f"id,nombre,precio,categoria,articulos\n{self.pan.id},Pan de Ajo,60,Entrada,{self.queso.id}:0.5\n"
+        intercambio.importar('menu', io.BytesIO(texto.encode()), 'csv')
+        self.assertEqual(self.costo(self.pan), Decimal('100'))
+
+
+# ==========================================
+# PRUEBAS: API JSON
+# ==========================================
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.proveedor = Proveedores.objects.create(nombre_proveedor='Lácteos del Norte')
+        Inventario.objects.bulk_create([
+            Inventario(nombre_articulo=f'Artículo {i:02d}', stock=i, unidad='kg', proveedor=cls.proveedor)
+            for i in range(30)
+        ])
+
+    def lote(self, modelo, operaciones):
+        return self.client.post(
+            reverse('api_lote', args=[modelo]), json.dumps(operaciones), content_type='application/json'
+        )
+
+    def test_campos_y_cursor(self):
+        url = reverse('api_listar', args=['inventario'])
+        with self.assertNumQueries(1):
+            datos = self.client.get(url, {'campos': 'nombre_articulo', 'orden': 'nombre', 'por_pagina': 20}).json()
+        self.assertEqual(datos['resultados'][0], {'nombre_articulo': 'Artículo 00'})
+        siguiente = self.client.get(url, {'campos': 'id', 'orden': 'nombre', 'despues': datos['siguiente']}).json()
+        self.assertEqual(len(siguiente['resultados']), 10)
+        self.assertIsNone(siguiente['siguiente'])
+
+    def test_detalle_y_total(self):
+        articulo = Inventario.objects.order_by('id').first()
+        datos = self.client.get(reverse('api_detalle', args=['inventario', articulo.id]), {'campos': 'stock'}).json()
+        self.assertEqual(datos, {'stock': '0.00'})
+        self.assertEqual(self.client.get(reverse('api_detalle', args=['inventario', 0])).status_code, 404)
+        datos = self.client.get(reverse('api_listar', args=['inventario']), {'total': '1', 'por_pagina': 5}).json()
+        self.assertEqual(datos['total'], 30)
+
+    def test_campo_desconocido(self):
+        respuesta = self.client.get(reverse('api_listar', args=['menu']), {'fields': 'nombre,secreto'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['detalles'], {'campos': ['secreto']})
+
+    def test_respuesta_comprimida(self):
+        respuesta = self.client.get(reverse('api_listar', args=['inventario']), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(respuesta.content))['resultados']), 30)
+
+    def test_lote_en_una_transaccion(self):
+        primero = Inventario.objects.order_by('id').first()
+        respuesta = self.lote('inventario', {
+            'crear': [{'nombre_articulo': 'Harina', 'unidad': 'kg', 'stock': '5', 'proveedor_id': self.proveedor.id}],
+            'actualizar': [{'id': primero.id, 'stock': '99.5'}],
+            'borrar': [primero.id + 1],
+        })
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertEqual(respuesta.json()['borrados'], 1)
+        self.assertEqual(Inventario.objects.get(id=primero.id).stock, Decimal('99.5'))
+        self.assertTrue(Inventario.objects.filter(nombre_articulo='Harina').exists())
+
+    def test_lote_con_error_no_guarda_nada(self):
+        respuesta = self.lote('inventario', {
+            'crear': [{'nombre_articulo': 'Harina', 'unidad': 'kg'}, {'nombre_articulo': 'Sal', 'stock': 'mucho'}],
+            'borrar': [Inventario.objects.first().id],
+        })
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('crear[1]', respuesta.json()['detalles'])
+        self.assertEqual(Inventario.objects.count(), 30)
+
+    def test_lote_duplicado_es_conflicto(self):
+        respuesta = self.lote('proveedores', {'crear': [{'nombre_proveedor': 'Lácteos del Norte'}]})
+        self.assertEqual(respuesta.status_code, 409)
+
+    def test_lote_menu(self):
+        respuesta = self.lote('menu', {'crear': [{'nombre': 'Refresco', 'precio': '25', 'categoria': 'Bebida'}]})
+        producto_id = respuesta.json()['creados'][0]
+        self.lote('menu', {'actualizar': [{'id': producto_id, 'precio': '30'}]})
+        self.assertEqual(Menu.objects.get(id=producto_id).precio, Decimal('30'))
+
+    def test_lote_exige_json(self):
+        respuesta = self.client.post(reverse('api_lote', args=['menu']), {'crear': 'x'})
+        self.assertEqual(respuesta.status_code, 415)
+
+
+# ==========================================
+# PRUEBAS: Búsqueda (índice FTS5)
+# ==========================================
+@skipUnless(busqueda.disponible(), "El índice de búsqueda requiere SQLite (FTS5)")
+class BusquedaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.proveedor = Proveedores.objects.create(nombre_proveedor='Embutidos Peña', rfc='EMB010101AAA')
+        cls.jamon = Inventario.objects.create(nombre_articulo='Jamón Serrano', unidad='kg')
+        cls.pizza = Menu.objects.create(nombre='Pizza Pepperoni', precio=Decimal('150'), categoria='Pizza')
+        Menu.objects.create(nombre='Pizza Hawaiana con jamón', precio=Decimal('160'), categoria='Pizza')
+
+    def nombres(self, texto, **opciones):
+        return [r['nombre'] for r in busqueda.buscar(texto, **opciones)]
+
+    def test_sin_acentos_ni_mayusculas(self):
+        self.assertEqual(self.nombres('JAMON', tipo=busqueda.ARTICULO), ['Jamón Serrano'])
+        self.assertIn('Embutidos Peña', self.nombres('pena'))
+        self.assertIn('Embutidos Peña', self.nombres('emb010101'))
+
+    def test_errores_de_dedo(self):
+        self.assertEqual(self.nombres('peperoni'), ['Pizza Pepperoni'])
+
+    def test_se_mantiene_con_senales(self):
+        self.pizza.nombre = 'Pizza Margarita'
+        self.pizza.save()
+        self.assertEqual(self.nombres('margarita'), ['Pizza Margarita'])
+        self.jamon.delete()
+        self.assertEqual(self.nombres('serrano'), [])
+
+    def test_importacion_indexa(self):
+        texto = "nombre_articulo,unidad\nAceitunas negras,kg\n"
+        intercambio.importar('inventario', io.BytesIO(texto.encode()), 'csv')
+        self.assertEqual(self.nombres('aceituna'), ['Aceitunas negras'])
+
+    def test_endpoint_y_reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {busqueda.TABLA}')
+        call_command('reconstruir_busqueda', stdout=io.StringIO())
+        datos = self.client.get(reverse('api_buscar'), {'q': 'jamón', 'tipo': 'producto'}).json()
+        self.assertEqual([r['nombre'] for r in datos['resultados']], ['Pizza Hawaiana con jamón'])
+        self.assertEqual(self.client.get(reverse('api_buscar'), {'q': 'x', 'tipo': 'otro'}).status_code, 400)
+
+    def test_otras_sucursales_no_quitan_lugar(self):
+        Sucursal.objects.create(nombre='Norte', clave='norte')
+        with sucursales.activar('norte'):
+            for i in range(busqueda.CANDIDATOS + 10):
+                Inventario.objects.create(nombre_articulo=f'Jamón York {i}', unidad='kg')
+        with sucursales.activar('principal'):
+            # Después de los del norte en el índice
+            pavo = Inventario.objects.create(nombre_articulo='Jamón de pavo', unidad='kg')
+            # El filtro por sucursal va dentro del MATCH: el LIMIT cuenta sólo sus filas
+            self.assertEqual(self.nombres('jamon', tipo=busqueda.ARTICULO), ['Jamón Serrano', 'Jamón de pavo'])
+            self.assertEqual(sorted(busqueda.ids(Inventario, 'jamon')), [self.jamon.id, pavo.id])
+        with sucursales.activar('norte'):
+            self.assertEqual(len(busqueda.ids(Inventario, 'jamon')), busqueda.CANDIDATOS + 10)
+
+    def test_admin_usa_el_indice(self):
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        respuesta = self.client.get(reverse('admin:app_Pizzeria_inventario_changelist'), {'q': 'jamon'})
+        self.assertContains(respuesta, 'Jamón Serrano')
+
+
+# ==========================================
+# PRUEBAS: Bitácora de movimientos y saldos
+# ==========================================
+class MovimientosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.queso = Inventario.objects.create(nombre_articulo='Queso', stock=Decimal('10'), unidad='kg')
+        cls.pizza = Menu.objects.create(nombre='Pizza Queso', precio=Decimal('120'), categoria='Pizza')
+        Receta.objects.create(menu=cls.pizza, inventario=cls.queso, cantidad=Decimal('0.5'))
+
+    def tipos(self):
+        return list(self.queso.movimientos.order_by('id').values_list('tipo', 'cantidad'))
+
+    def test_cada_cambio_de_stock_queda_registrado(self):
+        registrar_pedido([(self.pizza.id, 2)])
+        movimientos.registrar_compra(self.queso.id, '4')
+        queso = Inventario.objects.get(id=self.queso.id)
+        queso.stock = Decimal('12.5')
+        queso.save()
+        self.assertEqual(self.tipos(), [
+            (MovimientoInventario.AJUSTE, Decimal('10')),
+            (MovimientoInventario.CONSUMO, Decimal('-1')),
+            (MovimientoInventario.COMPRA, Decimal('4')),
+            (MovimientoInventario.AJUSTE, Decimal('-0.5')),
+        ])
+        self.assertEqual(movimientos.diferencias(), [])
+
+    def test_formulario_de_compra(self):
+        url = reverse('comprar_inventario', args=[self.queso.id])
+        self.assertContains(self.client.get(url), 'Compra de: Queso')
+        self.assertRedirects(self.client.post(url, {'cantidad': '2.5'}), reverse('ver_inventario'))
+        queso = Inventario.objects.get(id=self.queso.id)
+        self.assertEqual((queso.stock, queso.fecha_ultima_compra), (Decimal('12.5'), timezone.localdate()))
+        self.assertEqual(self.tipos()[-1], (MovimientoInventario.COMPRA, Decimal('2.5')))
+
+        for datos in ({'cantidad': '0'}, {'cantidad': 'x'}, {'cantidad': '1', 'fecha': '2025-02-30'},
+                      {'cantidad': '1', 'fecha': str(timezone.localdate() + timedelta(days=1))}):
+            self.assertEqual(self.client.post(url, datos).status_code, 400)
+        self.assertEqual(len(self.tipos()), 2)
+        self.assertEqual(movimientos.diferencias(), [])
+
+    def test_importacion_y_api_registran_la_diferencia(self):
+        texto = f"id,nombre_articulo,stock,unidad\n{self.queso.id},Queso,7,kg\n"
+        intercambio.importar('inventario', io.BytesIO(texto.encode()), 'csv')
+        self.client.post(
+            reverse('api_lote', args=['inventario']),
+            json.dumps({'actualizar': [{'id': self.queso.id, 'stock': '9'}]}),
+            content_type='application/json',
+        )
+        self.assertEqual([c for _, c in self.tipos()], [Decimal('10'), Decimal('-3'), Decimal('2')])
+        self.assertEqual(movimientos.diferencias(), [])
+
+    def test_stock_en_fecha_parte_del_saldo_mas_cercano(self):
+        from datetime import datetime, timezone as tz
+        MovimientoInventario.objects.all().delete()
+        for dia, cantidad in ((1, '10'), (2, '-3'), (3, '5'), (4, '-1')):
+            MovimientoInventario.objects.create(
+                inventario=self.queso, fecha=datetime(2025, 1, dia, 12, tzinfo=tz.utc),
+                tipo=MovimientoInventario.AJUSTE, cantidad=Decimal(cantidad),
+            )
+        self.assertEqual(movimientos.tomar_instantanea(datetime(2025, 1, 2).date()), 1)
+        # Sin movimientos nuevos no se repite el saldo
+        self.assertEqual(movimientos.tomar_instantanea(datetime(2025, 1, 3, 6, tzinfo=tz.utc)), 0)
+        self.assertEqual(SaldoInventario.objects.get().stock, Decimal('7'))
+
+        # Si la suma de movimientos ignorara el saldo, el resultado cambiaría
+        MovimientoInventario.objects.filter(fecha__day=1).delete()
+        with self.assertNumQueries(2):
+            self.assertEqual(movimientos.stock_en(self.queso.id, datetime(2025, 1, 3).date()), Decimal('12'))
+        self.assertEqual(movimientos.stock_en(self.queso.id, datetime(2025, 1, 3, 6, tzinfo=tz.utc)), Decimal('7'))
+        articulo = movimientos.con_stock_en(datetime(2025, 1, 4).date()).get(id=self.queso.id)
+        self.assertEqual(articulo.stock_en_fecha, Decimal('11'))
+
+
+# ==========================================
+# PRUEBAS: Pronóstico de stock mínimo
+# ==========================================
+@skipUnless(pronostico.disponible(), "El pronóstico requiere NumPy")
+class PronosticoTests(TestCase):
+
+    def test_estacionalidad_semanal(self):
+        import numpy as np
+        # Artículo 0: 5 diarios. Artículo 1: 7 sólo los lunes (la 1a columna es lunes)
+        consumo = np.full((2, 28), 5.0)
+        consumo[1] = 0
+        consumo[1, ::7] = 7
+        np.testing.assert_allclose(pronostico.pronosticar(consumo, 0, dias_reabasto=3), [15, 7])
+        np.testing.assert_allclose(pronostico.pronosticar(consumo, 0, dias_reabasto=7), [35, 7])
+        # Con 27 días el reabasto empieza en domingo: un día sin lunes
+        np.testing.assert_allclose(pronostico.pronosticar(consumo[:, :27], 0, dias_reabasto=1), [5, 0])
+
+    def test_sugerir_minimos_desde_la_bitacora(self):
+        from datetime import date, datetime, timezone as tz
+        queso = Inventario.objects.create(nombre_articulo='Queso', unidad='kg', stock_minimo=Decimal('1'))
+        harina = Inventario.objects.create(nombre_articulo='Harina', unidad='kg', stock_minimo=Decimal('8'))
+        for dia in range(1, 29):
+            # Dos pedidos al día de 1 kg cada uno
+            for hora in (13, 20):
+                MovimientoInventario.objects.create(
+                    inventario=queso, fecha=datetime(2025, 1, dia, hora, tzinfo=tz.utc),
+                    tipo=MovimientoInventario.CONSUMO, cantidad=Decimal('-1'),
+                )
+        cambios = pronostico.sugerir_minimos(dias=28, dias_reabasto=3, hasta=date(2025, 1, 29))
+        self.assertEqual(cambios, {queso.id: (Decimal('1'), Decimal('6.00'))})
+        queso.refresh_from_db()
+        self.assertEqual((queso.stock_minimo, queso.version), (Decimal('6'), 2))
+        # Sin consumo en el periodo no se toca
+        harina.refresh_from_db()
+        self.assertEqual(harina.stock_minimo, Decimal('8'))
+
+
+# ==========================================
+# PRUEBAS: Métricas (/metrics)
+# ==========================================
+class MetricasTests(TestCase):
+
+    def setUp(self):
+        metricas.reiniciar()
+        Menu.objects.create(nombre='Pizza Hawaiana', precio=Decimal('150'), categoria='Pizza')
+
+    def linea(self, texto, prefijo):
+        return next(l for l in texto.splitlines() if l.startswith(prefijo))
+
+    def test_mide_por_nombre_de_url(self):
+        self.client.get(reverse('ver_inventario'))
+        self.client.get(reverse('ver_inventario'))
+        self.client.get('/no-existe/')
+        texto = self.client.get(reverse('metricas')).content.decode()
+        self.assertIn('pizzeria_peticiones_total{vista="ver_inventario",codigo="200"} 2', texto)
+        self.assertIn('pizzeria_peticiones_total{vista="sin_ruta",codigo="404"} 1', texto)
+        self.assertIn('pizzeria_peticion_segundos_bucket{vista="ver_inventario",le="+Inf"} 2', texto)
+        self.assertIn('pizzeria_peticion_segundos_count{vista="ver_inventario"} 2', texto)
+        # La página (sin caché) se arma con consultas y una plantilla
+        consultas = self.linea(texto, 'pizzeria_consultas_total{vista="ver_inventario"}')
+        self.assertGreater(int(consultas.split()[-1]), 0)
+        plantillas = self.linea(texto, 'pizzeria_plantillas_segundos_total{vista="ver_inventario"}')
+        self.assertGreater(float(plantillas.split()[-1]), 0)
+        tamaño = self.linea(texto, 'pizzeria_respuesta_bytes_sum{vista="ver_inventario"}')
+        self.assertGreater(int(tamaño.split()[-1]), 0)
+
+    def test_suma_los_hilos(self):
+        import threading
+        medicion = metricas.Medicion()
+        medicion.consultas = 3
+        hilos = [
+            threading.Thread(target=metricas.registrar, args=('ver_menu', 0.02, medicion, 200, 100))
+            for _ in range(4)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        total = metricas.totales()['ver_menu']
+        self.assertEqual((total.peticiones, total.consultas), (4, 12))
+        # Los hilos ya terminaron: sus fragmentos se sueltan sin perder lo acumulado
+        self.assertFalse(any(h() in hilos for h, _ in metricas._fragmentos))
+        metricas.registrar('ver_menu', 0.02, medicion, 200, 100)
+        total = metricas.totales()['ver_menu']
+        self.assertEqual((total.peticiones, total.consultas), (5, 15))
+
+    @override_settings(CONSULTA_LENTA_MS=0)
+    def test_registra_consultas_lentas(self):
+        with self.assertLogs('pizzeria.consultas_lentas', 'WARNING') as registro:
+            self.client.get(reverse('ver_proveedores'))
+        self.assertIn('[ver_proveedores]', registro.output[0])
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+        respuesta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+
+
+# ==========================================
+# PRUEBAS: Edición con control de concurrencia (edicion.py)
+# ==========================================
+class EdicionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.proveedor = Proveedores.objects.create(nombre_proveedor='Lácteos del Norte', telefono_contacto='555-0100')
+        cls.queso = Inventario.objects.create(
+            nombre_articulo='Queso', stock=Decimal('10'), unidad='kg', costo_unitario=Decimal('80'),
+        )
+        cls.jamon = Inventario.objects.create(nombre_articulo='Jamón', stock=Decimal('5'), unidad='kg')
+        cls.pizza = Menu.objects.create(nombre='Pizza Queso', precio=Decimal('120'), categoria='Pizza')
+        Receta.objects.create(menu=cls.pizza, inventario=cls.queso, cantidad=Decimal('0.5'))
+
+    def formulario(self, vista, objeto, **cambios):
+        """Datos del formulario tal como los envía el navegador, con `cambios`."""
+        respuesta = self.client.get(reverse(vista, args=[objeto.id]))
+        datos = {'original': respuesta.context['original']}
+        for campo in objeto._meta.concrete_fields:
+            if campo.name in ('id', 'version'):
+                continue
+            valor = campo.value_from_object(objeto)
+            if isinstance(valor, bool):
+                if valor:
+                    datos[campo.name] = 'on'
+            elif valor is not None:
+                datos[campo.name] = str(valor)
+        datos.update(cambios)
+        return datos
+
+    def actualizaciones(self, capturadas):
+        return [q['sql'] for q in capturadas if q['sql'].startswith('UPDATE')]
+
+    def test_no_se_pierden_cambios_concurrentes(self):
+        # Dos cajeros abren el mismo formulario
+        cajero_a = self.formulario('actualizar_proveedor', self.proveedor, telefono_contacto='555-0199')
+        cajero_b = self.formulario('actualizar_proveedor', self.proveedor, direccion='Av. Juárez 10')
+        url = reverse('realizar_actualizacion_proveedor')
+
+        with CaptureQueriesContext(connection) as capturadas:
+            self.assertEqual(self.client.post(url, cajero_a).status_code, 302)
+        # Un solo UPDATE, sólo con la columna cambiada y la versión
+        [sql] = self.actualizaciones(capturadas)
+        self.assertIn('"telefono_contacto"', sql)
+        self.assertNotIn('"direccion"', sql)
+        self.assertIn('"version" = 1', sql.split('WHERE')[1])
+
+        # El segundo se rechaza en lugar de borrar el teléfono del primero
+        respuesta = self.client.post(url, cajero_b)
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertContains(respuesta, 'Otro usuario guardó', status_code=409)
+        self.assertContains(respuesta, 'Av. Juárez 10', status_code=409)
+        proveedor = Proveedores.objects.get(id=self.proveedor.id)
+        self.assertEqual((proveedor.telefono_contacto, proveedor.direccion, proveedor.version), ('555-0199', None, 2))
+
+        # Con los datos actuales se aplica y se conservan los dos cambios
+        cajero_b = self.formulario('actualizar_proveedor', proveedor, direccion='Av. Juárez 10')
+        self.assertEqual(self.client.post(url, cajero_b).status_code, 302)
+        proveedor.refresh_from_db()
+        self.assertEqual((proveedor.telefono_contacto, proveedor.direccion, proveedor.version), ('555-0199', 'Av. Juárez 10', 3))
+
+    def test_stock_se_ajusta_sin_perder_ventas(self):
+        datos = self.formulario('actualizar_inventario', self.queso, stock='15', costo_unitario='100')
+        # Mientras se edita se vende una pizza (0.5 kg de queso)
+        registrar_pedido([(self.pizza.id, 1)])
+        self.assertEqual(self.client.post(reverse('realizar_actualizacion_inventario'), datos).status_code, 302)
+        queso = Inventario.objects.get(id=self.queso.id)
+        self.assertEqual(queso.stock, Decimal('14.5'))
+        self.assertEqual(Menu.objects.get(id=self.pizza.id).costo_receta, Decimal('50'))
+        self.assertEqual(movimientos.diferencias(), [])
+
+    def test_receta_como_diferencia(self):
+        datos = self.formulario('actualizar_menu', self.pizza)
+        datos['articulos'] = [str(self.queso.id), str(self.jamon.id)]
+        self.assertEqual(self.client.post(reverse('realizar_actualizacion_menu'), datos).status_code, 302)
+        pizza = Menu.objects.get(id=self.pizza.id)
+        # La receta existente (0.5 kg de queso) no se borra y vuelve a crear
+        self.assertEqual(
+            sorted(pizza.receta_set.values_list('inventario__nombre_articulo', 'cantidad')),
+            [('Jamón', Decimal('1')), ('Queso', Decimal('0.5'))],
+        )
+        self.assertEqual(pizza.version, 2)
+        # El mismo formulario ya es viejo
+        self.assertEqual(self.client.post(reverse('realizar_actualizacion_menu'), datos).status_code, 409)
+
+    def test_original_alterado(self):
+        datos = self.formulario('actualizar_proveedor', self.proveedor, nombre_proveedor='Otro')
+        datos['original'] = datos['original'][:-2] + 'xx'
+        self.assertEqual(self.client.post(reverse('realizar_actualizacion_proveedor'), datos).status_code, 400)
+        self.assertEqual(Proveedores.objects.get(id=self.proveedor.id).nombre_proveedor, 'Lácteos del Norte')
+
+    def test_original_de_otro_modelo(self):
+        # Un producto y un artículo con el mismo id y la misma versión
+        self.assertEqual((self.queso.id, self.queso.version), (self.pizza.id, self.pizza.version))
+        datos = self.formulario('actualizar_menu', self.pizza, nombre_articulo='Otro', stock='0')
+        respuesta = self.client.post(reverse('realizar_actualizacion_inventario'), datos)
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(Inventario.objects.get(id=self.queso.id).nombre_articulo, 'Queso')
+
+
+# ==========================================
+# PRUEBAS: Plantillas (caché de fragmentos y procesador de contexto)
+# ==========================================
+class PlantillasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.queso = Inventario.objects.create(nombre_articulo='Queso', stock=Decimal('10'), unidad='kg')
+        cls.pizza = Menu.objects.create(nombre='Pizza Queso', precio=Decimal('120'), categoria='Pizza')
+        Receta.objects.create(menu=cls.pizza, inventario=cls.queso, cantidad=Decimal('0.5'))
+
+    def setUp(self):
+        from django.core.cache import caches
+        caches['template_fragments'].clear()
+
+    def test_fragmentos_cambian_con_los_datos(self):
+        self.assertContains(self.client.get(reverse('ver_inventario')), '10.00')
+        # El pedido descuenta stock sin subir la versión: la clave del renglón
+        # incluye el stock
+        registrar_pedido([(self.pizza.id, 2)])
+        self.assertContains(self.client.get(reverse('ver_inventario')), '9.00')
+        # Sin cambio de versión se sirve lo que está en caché; al guardar, sube
+        Inventario.objects.filter(id=self.queso.id).update(nombre_articulo='Queso Oaxaca')
+        self.assertNotContains(self.client.get(reverse('ver_inventario')), 'Queso Oaxaca')
+        queso = Inventario.objects.get(id=self.queso.id)
+        queso.save()
+        self.assertContains(self.client.get(reverse('ver_inventario')), 'Queso Oaxaca')
+
+    def test_fecha_actual_en_el_contexto(self):
+        import datetime
+        respuesta = self.client.get(reverse('inicio_pizzeria'))
+        self.assertEqual(respuesta.context['fecha_actual'], datetime.date.today())
+
+
+# ==========================================
+# PRUEBAS: Pantallas de cocina (eventos SSE)
+# ==========================================
+class EventosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pizza = Menu.objects.create(nombre='Hawaiana', precio=Decimal('130'), categoria='Pizza')
+        cls.pedido = registrar_pedido([(cls.pizza.id, 2)], cliente='Mesa 4')
+
+    def test_cola_acotada_descarta_y_pide_estado(self):
+        suscriptor = eventos.Suscriptor(None, limite=3)
+        for i in range(5):
+            suscriptor.entregar(eventos.Evento.crear('pedido', {'id': i}))
+        # Al llenarse no acumula: se vacía y la pantalla recibirá el estado completo
+        self.assertTrue(suscriptor.atrasado)
+        self.assertEqual(len(suscriptor.pendientes), 0)
+
+    def test_sin_pantallas_no_publica(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            producto = Menu.objects.get(id=self.pizza.id)
+            producto.habilitado = False
+            producto.save()
+        self.assertFalse(any(c.__module__ == eventos.__name__ for c in callbacks))
+
+    def test_wsgi_manda_el_estado(self):
+        respuesta = self.client.get(reverse('eventos_cocina'))
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        cuerpo = respuesta.content.decode()
+        self.assertIn('retry: ', cuerpo)
+        self.assertIn('event: estado', cuerpo)
+        self.assertIn('"cliente":"Mesa 4"', cuerpo)
+
+    def _marcar_no_disponible(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = Menu.objects.get(id=self.pizza.id)
+            producto.habilitado = False
+            producto.save()
+
+    async def test_flujo_asgi(self):
+        # Vista de Django (sin con_eventos): respuesta en flujo
+        respuesta = await self.async_client.get(reverse('eventos_cocina'))
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(respuesta['Cache-Control'], 'no-cache')
+
+        # Aplicación ASGI: el flujo se atiende antes de llegar a Django
+        aplicacion = eventos.con_eventos(None)
+        enviados, desconectar = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await desconectar.wait()
+            return {'type': 'http.disconnect'}
+
+        async def siguiente():
+            return (await asyncio.wait_for(enviados.get(), 5)).get('body', b'')
+
+        scope = {'type': 'http', 'method': 'GET', 'path': reverse('eventos_cocina'),
+                 'headers': [(b'host', b'testserver')]}
+        tarea = asyncio.ensure_future(aplicacion(scope, receive, enviados.put))
+        await siguiente()  # http.response.start
+        self.assertTrue((await siguiente()).startswith(b'retry: '))
+        estado = await siguiente()
+        self.assertIn(b'event: estado', estado)
+        self.assertIn(b'"lineas":[{"producto":"Hawaiana","cantidad":2}]', estado)
+
+        # Con la pantalla conectada, el cambio de disponibilidad se publica
+        await sync_to_async(self._marcar_no_disponible)()
+        cambio = await siguiente()
+        self.assertTrue(cambio.startswith(b'event: menu\n'))
+        self.assertIn(b'"disponible":false', cambio)
+
+        desconectar.set()
+        await asyncio.wait_for(tarea, 5)
+        self.assertEqual(eventos.canal.total(), 0)
+
+    def test_cada_pantalla_recibe_su_sucursal(self):
+        norte, todas = eventos.Suscriptor(None, limite=3, sucursal='norte'), eventos.Suscriptor(None, limite=3)
+        for evento in (eventos.Evento.crear('menu', {}, 'principal'), eventos.Evento.crear('menu', {}, 'norte'),
+                       eventos.Evento.crear('estado', {})):
+            eventos._entregar([norte, todas], evento)
+        self.assertEqual([e.sucursal for e in norte.pendientes], ['norte', None])
+        self.assertEqual(len(todas.pendientes), 3)
+        # La sucursal viaja por el broker
+        self.assertEqual(eventos.Evento.desde_linea(eventos.Evento.crear('menu', {}, 'norte').linea()).sucursal,
+                         'norte')
+
+    def _pedido_del_norte(self):
+        Sucursal.objects.create(nombre='Norte', clave='norte')
+        with sucursales.activar('norte'):
+            pizza = Menu.objects.create(nombre='Norteña', precio=Decimal('150'), categoria='Pizza')
+            registrar_pedido([(pizza.id, 1)], cliente='Mesa 9')
+        return pizza.id
+
+    def _marcar_no_disponibles(self, *ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            for producto in Menu.objects.filter(id__in=ids):
+                producto.habilitado = False
+                producto.save()
+
+    async def test_flujo_asgi_por_sucursal(self):
+        pizza_norte = await sync_to_async(self._pedido_del_norte)()
+        aplicacion = eventos.con_eventos(None)
+        enviados, desconectar = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await desconectar.wait()
+            return {'type': 'http.disconnect'}
+
+        async def siguiente():
+            return await asyncio.wait_for(enviados.get(), 5)
+
+        # El flujo no pasa por SucursalMiddleware: elige la sucursal igual que él
+        scope = {'type': 'http', 'method': 'GET', 'path': reverse('eventos_cocina'),
+                 'query_string': b'sucursal=norte', 'headers': [(b'host', b'testserver')]}
+        tarea = asyncio.ensure_future(aplicacion(scope, receive, enviados.put))
+        self.assertEqual((await siguiente())['status'], 200)
+        await siguiente()  # retry
+        estado = (await siguiente())['body']
+        self.assertIn(b'"cliente":"Mesa 9"', estado)
+        self.assertNotIn(b'Mesa 4', estado)
+
+        # El cambio de la sucursal principal no llega a la pantalla del norte
+        await sync_to_async(self._marcar_no_disponibles)(self.pizza.id, pizza_norte)
+        cambio = (await siguiente())['body']
+        self.assertIn('Norteña'.encode(), cambio)
+        self.assertNotIn(b'Hawaiana', cambio)
+        desconectar.set()
+        await asyncio.wait_for(tarea, 5)
+
+        # Clave que no existe: 404, como en el resto del sitio
+        cookie = {**scope, 'query_string': b'', 'headers': [(b'host', b'testserver'), (b'cookie', b'sucursal=sur')]}
+        await aplicacion(cookie, receive, enviados.put)
+        self.assertEqual((await siguiente())['status'], 404)
+        await siguiente()
+        self.assertEqual(eventos.canal.total(), 0)
+
+
+# ==========================================
+# PRUEBAS: Estadísticas por proveedor (triggers)
+# ==========================================
+class EstadisticasProveedorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lacteos = Proveedores.objects.create(nombre_proveedor='Lácteos')
+        cls.carnes = Proveedores.objects.create(nombre_proveedor='Carnes')
+        cls.queso = Inventario.objects.create(
+            nombre_articulo='Queso', stock=Decimal('4'), stock_minimo=Decimal('5'),
+            costo_unitario=Decimal('100'), unidad='kg', proveedor=cls.lacteos,
+        )
+        cls.crema = Inventario.objects.create(
+            nombre_articulo='Crema', stock=Decimal('10'), stock_minimo=Decimal('2'),
+            costo_unitario=Decimal('2.50'), unidad='litro', proveedor=cls.lacteos,
+        )
+        cls.pizza = Menu.objects.create(nombre='Pizza', precio=Decimal('120'), categoria='Pizza')
+        Receta.objects.create(menu=cls.pizza, inventario=cls.crema, cantidad=Decimal('4.5'))
+
+    def estadisticas(self, proveedor, sucursal_id=SUCURSAL_PRINCIPAL):
+        e = EstadisticasProveedor.objects.filter(proveedor=proveedor, sucursal_id=sucursal_id).first()
+        # Sin renglón: sin artículos en la sucursal
+        return (e.articulos, e.valor_stock, e.articulos_bajo_minimo) if e else (0, Decimal('0'), 0)
+
+    def test_altas_y_updates_masivos(self):
+        self.assertEqual(self.estadisticas(self.lacteos), (2, Decimal('425'), 1))
+        self.assertEqual(self.estadisticas(self.carnes), (0, Decimal('0'), 0))
+        # Los pedidos descuentan con UPDATE ... F(): sin señales, lo ve el trigger
+        registrar_pedido([(self.pizza.id, 2)])
+        self.assertEqual(self.estadisticas(self.lacteos), (2, Decimal('402.5'), 2))
+        Inventario.objects.bulk_create([
+            Inventario(nombre_articulo='Jamón', stock=Decimal('3'), costo_unitario=Decimal('150'),
+                       unidad='kg', proveedor=self.carnes),
+        ])
+        self.assertEqual(self.estadisticas(self.carnes), (1, Decimal('450'), 0))
+        self.assertEqual(estadisticas.diferencias(), [])
+
+    def test_cambio_de_proveedor_y_bajas(self):
+        self.queso.proveedor = self.carnes
+        self.queso.save()
+        self.assertEqual(self.estadisticas(self.lacteos), (1, Decimal('25'), 0))
+        self.assertEqual(self.estadisticas(self.carnes), (1, Decimal('400'), 1))
+        self.crema.delete()
+        self.assertEqual(self.estadisticas(self.lacteos), (0, Decimal('0'), 0))
+        # SET_NULL: los artículos se quedan sin proveedor y sus estadísticas se van con él
+        self.carnes.delete()
+        self.assertFalse(EstadisticasProveedor.objects.filter(proveedor_id=self.carnes.id).exists())
+        self.assertIsNone(Inventario.objects.get(id=self.queso.id).proveedor_id)
+        self.assertEqual(estadisticas.diferencias(), [])
+
+    def test_verificar_y_reconstruir(self):
+        EstadisticasProveedor.objects.filter(proveedor=self.lacteos).update(articulos=7)
+        self.assertEqual(estadisticas.diferencias(), [
+            (self.lacteos.id, SUCURSAL_PRINCIPAL, (7, Decimal('425'), 1), (2, Decimal('425'), 1)),
+        ])
+        salida = io.StringIO()
+        call_command('estadisticas_proveedores', verificar=True, stdout=salida)
+        self.assertIn('1 proveedores con estadísticas distintas', salida.getvalue())
+        call_command('estadisticas_proveedores', stdout=io.StringIO())
+        self.assertEqual(estadisticas.diferencias(), [])
+
+    def test_por_sucursal(self):
+        norte = Sucursal.objects.create(nombre='Norte', clave='norte')
+        with sucursales.activar('norte'):
+            queso_norte = Inventario.objects.create(
+                nombre_articulo='Queso', stock=Decimal('1'), stock_minimo=Decimal('2'),
+                costo_unitario=Decimal('10'), unidad='kg', proveedor=self.lacteos,
+            )
+            self.assertEqual(LISTADO_PROVEEDORES.consulta().get(id=self.lacteos.id).num_articulos, 1)
+        self.assertEqual(self.estadisticas(self.lacteos, norte.id), (1, Decimal('10'), 1))
+        self.assertEqual(self.estadisticas(self.lacteos), (2, Decimal('425'), 1))
+        # Sin sucursal activa se suma toda la cadena
+        lacteos = LISTADO_PROVEEDORES.consulta().get(id=self.lacteos.id)
+        self.assertEqual((lacteos.num_articulos, lacteos.valor_stock, lacteos.articulos_bajo_minimo),
+                         (3, Decimal('435'), 2))
+        respuesta = self.client.get(reverse('ver_proveedores'), {'sucursal': 'norte'})
+        self.assertContains(respuesta, '$10.00')
+        self.assertNotContains(respuesta, '$425.00')
+        # Un artículo que cambia de sucursal se resta de una y se suma a la otra
+        Inventario.objects.filter(id=queso_norte.id).update(sucursal_id=SUCURSAL_PRINCIPAL)
+        self.assertEqual(self.estadisticas(self.lacteos, norte.id), (0, Decimal('0'), 0))
+        self.assertEqual(self.estadisticas(self.lacteos), (3, Decimal('435'), 2))
+        self.assertEqual(estadisticas.diferencias(), [])
+
+    def test_ver_proveedores(self):
+        respuesta = self.client.get(reverse('ver_proveedores'))
+        self.assertContains(respuesta, '$425.00')
+        self.assertContains(respuesta, f'?proveedor={self.lacteos.id}&amp;stock_bajo=1')
+        # Un cambio de stock sin cambio de versión no deja el renglón viejo en la caché
+        Inventario.objects.filter(id=self.crema.id).update(stock=Decimal('20'))
+        self.assertContains(self.client.get(reverse('ver_proveedores')), '$450.00')
+
+
+# ==========================================
+# PRUEBAS: Disponibilidad según el stock (disponibilidad.py)
+# ==========================================
+class DisponibilidadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.queso = Inventario.objects.create(nombre_articulo='Queso', stock=Decimal('1'), unidad='kg')
+        cls.masa = Inventario.objects.create(nombre_articulo='Masa', stock=Decimal('50'), unidad='pieza')
+        cls.grande = Menu.objects.create(nombre='Pizza Grande', precio=Decimal('180'), categoria='Pizza')
+        cls.chica = Menu.objects.create(nombre='Pizza Chica', precio=Decimal('90'), categoria='Pizza')
+        cls.pan = Menu.objects.create(nombre='Pan de Ajo', precio=Decimal('40'), categoria='Entrada')
+        cls.grande.articulos.add(cls.queso, cls.masa, through_defaults={'cantidad': Decimal('0.40')})
+        cls.chica.articulos.add(cls.queso, cls.masa, through_defaults={'cantidad': Decimal('0.20')})
+        cls.pan.articulos.add(cls.masa, through_defaults={'cantidad': Decimal('1')})
+
+    def disponibles(self):
+        return set(Menu.objects.filter(disponible=True).values_list('nombre', flat=True))
+
+    def test_pedido_apaga_solo_los_que_cruzan_su_umbral(self):
+        self.assertEqual(self.disponibles(), {'Pizza Grande', 'Pizza Chica', 'Pan de Ajo'})
+        # Queda 0.2 kg de queso: alcanza para la chica, no para la grande
+        registrar_pedido([(self.grande.id, 2)])
+        self.assertEqual(self.disponibles(), {'Pizza Chica', 'Pan de Ajo'})
+        with self.assertRaises(PedidoInvalido):
+            registrar_pedido([(self.grande.id, 1)])
+        registrar_pedido([(self.chica.id, 1)])
+        self.assertEqual(self.disponibles(), {'Pan de Ajo'})
+        self.assertEqual(disponibilidad.diferencias(), [])
+
+    def test_compra_y_ajuste_la_devuelven(self):
+        Inventario.objects.filter(id=self.queso.id).update(stock=Decimal('0'))
+        disponibilidad.por_ajustes({self.queso.id: Decimal('-1')})
+        self.assertEqual(self.disponibles(), {'Pan de Ajo'})
+        movimientos.registrar_compra(self.queso.id, '0.3')
+        self.assertEqual(self.disponibles(), {'Pizza Chica', 'Pan de Ajo'})
+        queso = Inventario.objects.get(id=self.queso.id)
+        queso.stock = Decimal('5')
+        queso.save()
+        self.assertEqual(self.disponibles(), {'Pizza Grande', 'Pizza Chica', 'Pan de Ajo'})
+
+    def test_cambio_que_no_cruza_no_toca_productos(self):
+        Inventario.objects.filter(id=self.masa.id).update(stock=Decimal('45'))
+        # 1: stock nuevo, 2: recetas con el umbral entre 45 y 50 (ninguna)
+        with self.assertNumQueries(2):
+            self.assertEqual(disponibilidad.por_ajustes({self.masa.id: Decimal('-5')}), 0)
+
+    def test_habilitado_y_receta(self):
+        self.pan.habilitado = False
+        self.pan.save()
+        self.assertNotIn('Pan de Ajo', self.disponibles())
+        # Un artículo sin stock en la receta lo apaga aunque esté habilitado
+        agotado = Inventario.objects.create(nombre_articulo='Albahaca', stock=Decimal('0'), unidad='kg')
+        self.chica.articulos.add(agotado, through_defaults={'cantidad': Decimal('0.01')})
+        self.assertEqual(self.disponibles(), {'Pizza Grande'})
+        self.chica.articulos.remove(agotado)
+        self.assertEqual(self.disponibles(), {'Pizza Grande', 'Pizza Chica'})
+
+    def test_verificar_y_recalcular(self):
+        Menu.objects.filter(id=self.pan.id).update(disponible=False)
+        salida = io.StringIO()
+        call_command('recalcular_disponibilidad', verificar=True, stdout=salida)
+        self.assertIn('1 productos con disponibilidad desactualizada', salida.getvalue())
+        call_command('recalcular_disponibilidad', stdout=io.StringIO())
+        self.assertEqual(disponibilidad.diferencias(), [])
+
+
+# ==========================================
+# PRUEBAS: Sub-recetas y receta expandida (recetas.py)
+# ==========================================
+class RecetasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.harina = Inventario.objects.create(
+            nombre_articulo='Harina', stock=Decimal('10'), unidad='kg', costo_unitario=Decimal('20'))
+        cls.tomate = Inventario.objects.create(
+            nombre_articulo='Tomate', stock=Decimal('10'), unidad='kg', costo_unitario=Decimal('10'))
+        cls.queso = Inventario.objects.create(
+            nombre_articulo='Queso', stock=Decimal('5'), unidad='kg', costo_unitario=Decimal('100'))
+        cls.masa = Preparacion.objects.create(nombre='Masa', unidad='pieza')
+        cls.salsa = Preparacion.objects.create(nombre='Salsa', unidad='litro')
+        cls.base = Preparacion.objects.create(nombre='Base', unidad='pieza')
+        ComponentePreparacion.objects.create(preparacion=cls.masa, articulo=cls.harina, cantidad=Decimal('0.25'))
+        ComponentePreparacion.objects.create(preparacion=cls.salsa, articulo=cls.tomate, cantidad=Decimal('0.5'))
+        # La base es una masa con media porción de salsa
+        ComponentePreparacion.objects.create(preparacion=cls.base, subpreparacion=cls.masa, cantidad=Decimal('1'))
+        ComponentePreparacion.objects.create(preparacion=cls.base, subpreparacion=cls.salsa, cantidad=Decimal('0.5'))
+        cls.pizza = Menu.objects.create(nombre='Pizza Queso', precio=Decimal('150'), categoria='Pizza')
+        cls.pizza.articulos.add(cls.queso, through_defaults={'cantidad': Decimal('0.2')})
+        RecetaPreparacion.objects.create(menu=cls.pizza, preparacion=cls.base, cantidad=Decimal('1'))
+
+    def expandida(self, producto):
+        return dict(RecetaExpandida.objects.filter(menu=producto).values_list('inventario_id', 'cantidad'))
+
+    def test_expansion_consumo_y_costo(self):
+        self.assertEqual(self.expandida(self.pizza), {
+            self.harina.id: Decimal('0.25'), self.tomate.id: Decimal('0.25'), self.queso.id: Decimal('0.2'),
+        })
+        # 0.25 * 20 + 0.25 * 10 + 0.2 * 100
+        self.assertEqual(Menu.objects.get(id=self.pizza.id).costo_receta, Decimal('27.50'))
+        registrar_pedido([(self.pizza.id, 4)])
+        stocks = dict(Inventario.objects.values_list('nombre_articulo', 'stock'))
+        self.assertEqual(stocks, {'Harina': Decimal('9'), 'Tomate': Decimal('9'), 'Queso': Decimal('4.2')})
+
+    def test_cambio_de_componente_vuelve_a_expandir(self):
+        componente = ComponentePreparacion.objects.get(preparacion=self.masa)
+        componente.cantidad = Decimal('0.5')
+        componente.save()
+        # La base (que usa la masa) y la pizza (que usa la base) se actualizan
+        self.assertEqual(
+            PreparacionExpandida.objects.get(preparacion=self.base, inventario=self.harina).cantidad, Decimal('0.5'))
+        self.assertEqual(self.expandida(self.pizza)[self.harina.id], Decimal('0.5'))
+        self.assertEqual(Menu.objects.get(id=self.pizza.id).costo_receta, Decimal('32.50'))
+        # Sin tomate suficiente para la salsa, la pizza se apaga
+        tomate = Inventario.objects.get(id=self.tomate.id)
+        tomate.stock = Decimal('0.2')
+        tomate.save()
+        self.assertFalse(Menu.objects.get(id=self.pizza.id).disponible)
+
+    def test_ciclos(self):
+        # La masa no puede llevar la base, que ya lleva masa
+        with self.assertRaises(ValidationError):
+            ComponentePreparacion(preparacion=self.masa, subpreparacion=self.base).full_clean()
+        ComponentePreparacion(preparacion=self.masa, subpreparacion=self.salsa, cantidad=Decimal('0.1')).full_clean()
+        # Un ciclo que no pasó por clean() se detecta al expandir
+        ComponentePreparacion.objects.bulk_create([
+            ComponentePreparacion(preparacion=self.salsa, subpreparacion=self.base),
+        ])
+        with self.assertRaisesMessage(recetas.RecetaCiclica, 'Salsa -> Base -> Salsa'):
+            recetas.expandir_preparaciones([self.salsa.id])
+
+    def test_borrar_articulo_y_reconstruir(self):
+        self.harina.delete()
+        self.assertEqual(set(self.expandida(self.pizza)), {self.tomate.id, self.queso.id})
+        self.assertEqual(Menu.objects.get(id=self.pizza.id).costo_receta, Decimal('22.50'))
+        RecetaExpandida.objects.all().delete()
+        call_command('expandir_recetas', stdout=io.StringIO())
+        self.assertEqual(set(self.expandida(self.pizza)), {self.tomate.id, self.queso.id})
+
+
+# ==========================================
+# PRUEBAS: Cambios para las terminales sin conexión (sincronizacion.py)
+# ==========================================
+@skipUnless(sincronizacion.disponible(), "Requiere SQLite o PostgreSQL")
+class SincronizacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.proveedor = Proveedores.objects.create(nombre_proveedor='Lácteos del Norte')
+        cls.queso = Inventario.objects.create(
+            nombre_articulo='Queso', stock=Decimal('10'), unidad='kg', proveedor=cls.proveedor)
+        cls.masa = Inventario.objects.create(nombre_articulo='Masa', stock=Decimal('50'), unidad='pieza')
+        cls.pizza = Menu.objects.create(nombre='Pizza Queso', precio=Decimal('150'), categoria='Pizza')
+        cls.pizza.articulos.add(cls.queso, through_defaults={'cantidad': Decimal('0.25')})
+
+    def cambios(self, **parametros):
+        return self.client.get(reverse('api_cambios'), parametros)
+
+    def test_solo_lo_que_cambio_y_lapidas(self):
+        desde, _ = sincronizacion.secuencia()
+        # UPDATE masivos (sin señales): el descuento del pedido y la disponibilidad
+        for _ in range(3):
+            registrar_pedido([(self.pizza.id, 2)])
+        self.pizza.articulos.add(self.masa, through_defaults={'cantidad': Decimal('1')})
+        proveedor_id = self.proveedor.id
+        self.proveedor.delete()
+        datos = self.cambios(desde=desde).json()
+        self.assertFalse(datos['mas'])
+        self.assertEqual(datos['hasta'], sincronizacion.secuencia()[0])
+        # Un renglón por objeto aunque cambió varias veces (bitácora compactada)
+        self.assertEqual([a['nombre_articulo'] for a in datos['cambios']['inventario']], ['Queso'])
+        queso = datos['cambios']['inventario'][0]
+        self.assertEqual((queso['stock'], queso['proveedor_id']), ('8.50', None))
+        self.assertEqual(datos['cambios']['menu'][0]['num_articulos'], 2)
+        self.assertEqual(datos['borrados'], {'proveedores': [proveedor_id]})
+        # Al día: nada nuevo
+        self.assertEqual(self.cambios(since=datos['hasta']).json()['cambios'], {})
+
+    def test_por_partes_y_por_modelo(self):
+        desde, _ = sincronizacion.secuencia()
+        for articulo in Inventario.objects.all():
+            articulo.stock += 1
+            articulo.save()
+        Menu.objects.filter(id=self.pizza.id).update(precio=Decimal('160'))
+        primera = self.cambios(desde=desde, limite=1, modelos='inventario').json()
+        self.assertTrue(primera['mas'])
+        self.assertEqual(list(primera['cambios']), ['inventario'])
+        segunda = self.cambios(desde=primera['hasta'], limite=1, modelos='inventario').json()
+        self.assertFalse(segunda['mas'])
+        ids = [a['id'] for r in (primera, segunda) for a in r['cambios']['inventario']]
+        self.assertEqual(sorted(ids), sorted([self.queso.id, self.masa.id]))
+        self.assertEqual(self.cambios(desde=desde, modelos='menu').json()['cambios']['menu'][0]['precio'], '160.00')
+        self.assertEqual(self.cambios(desde=desde, modelos='pedidos').status_code, 400)
+
+    def test_compactar_obliga_a_descargar_todo(self):
+        respuesta = self.cambios()
+        self.assertEqual(respuesta.status_code, 410)
+        desde = respuesta.json()['detalles']['hasta']
+        self.masa.delete()
+        antes = CambioSincronizacion.objects.count()
+        call_command('compactar_cambios', dias=0, stdout=io.StringIO())
+        self.assertEqual(CambioSincronizacion.objects.count(), antes - 1)
+        # Se perdió la lápida de la masa: quien pida desde antes descarga todo
+        self.assertEqual(self.cambios(desde=desde).status_code, 410)
+        _, compactado = sincronizacion.secuencia()
+        self.assertEqual(self.cambios(desde=compactado).status_code, 200)
+
+
+# ==========================================
+# PRUEBAS: Sucursales (sucursales.py)
+# ==========================================
+class SucursalesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.norte = Sucursal.objects.create(nombre='Norte', clave='norte')
+        cls.queso = Inventario.objects.create(nombre_articulo='Queso Centro', stock=Decimal('10'), unidad='kg')
+        cls.pizza = Menu.objects.create(nombre='Pizza Centro', precio=Decimal('150'), categoria='Pizza')
+        with sucursales.activar('norte'):
+            # Los registros nuevos toman la sucursal activa
+            cls.queso_norte = Inventario.objects.create(nombre_articulo='Queso Norte', stock=Decimal('10'), unidad='kg')
+            cls.pizza_norte = Menu.objects.create(nombre='Pizza Norte', precio=Decimal('150'), categoria='Pizza')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cada_peticion_ve_su_sucursal(self):
+        self.assertEqual(self.queso_norte.sucursal, self.norte)
+        respuesta = self.client.get(reverse('ver_inventario'), {'sucursal': 'norte'})
+        self.assertContains(respuesta, 'Queso Norte')
+        self.assertNotContains(respuesta, 'Queso Centro')
+        # La cookie recuerda la sucursal elegida; el encabezado de una terminal manda
+        self.assertContains(self.client.get(reverse('ver_menu')), 'Pizza Norte')
+        menu = self.client.get(reverse('ver_menu'), HTTP_X_SUCURSAL='principal')
+        self.assertContains(menu, 'Pizza Centro')
+        self.assertNotContains(menu, 'Pizza Norte')
+        # Lo de otra sucursal no existe, ni en la API
+        self.assertEqual(self.client.get(reverse('actualizar_inventario', args=[self.queso.id])).status_code, 404)
+        api = self.client.get(reverse('api_listar', args=['menu']), HTTP_X_SUCURSAL='norte').json()
+        self.assertEqual([p['nombre'] for p in api['resultados']], ['Pizza Norte'])
+        # Las respuestas por partes se generan ya sin el middleware
+        exportado = self.client.get(reverse('exportar_datos', args=['inventario']), HTTP_X_SUCURSAL='norte')
+        self.assertIn(b'Queso Norte', b''.join(exportado.streaming_content))
+        self.assertEqual(self.client.get(reverse('ver_menu'), {'sucursal': 'sur'}).status_code, 404)
+
+    def test_listados_usan_el_indice_de_la_sucursal(self):
+        with sucursales.activar('norte'):
+            consulta, *_ = LISTADO_INVENTARIO.preparar(parametros(orden='nombre'))
+            self.assertEqual([a.id for a in consulta], [self.queso_norte.id])
+            if connection.vendor == 'sqlite':
+                self.assertIn('inv_nombre_id_idx', consulta.explain())
+                # Una sola condición aunque el manager y el listado filtren
+                self.assertEqual(str(consulta.query).count('"sucursal_id" = '), 1)
+
+    def test_pedido_de_la_sucursal_de_sus_productos(self):
+        with self.assertRaises(PedidoInvalido):
+            registrar_pedido([(self.pizza.id, 1), (self.pizza_norte.id, 1)])
+        self.assertEqual(registrar_pedido([(self.pizza_norte.id, 1)]).sucursal, self.norte)
+        with sucursales.activar('principal'), self.assertRaisesMessage(PedidoInvalido, 'no existe'):
+            registrar_pedido([(self.pizza_norte.id, 1)])
+
+    def test_recetas_solo_con_lo_de_la_sucursal(self):
+        with sucursales.activar('norte'):
+            masa_norte = Preparacion.objects.create(nombre='Masa', unidad='pieza')
+        # El mismo nombre en otra sucursal
+        masa = Preparacion.objects.create(nombre='Masa', unidad='pieza')
+        self.assertEqual((masa_norte.sucursal, masa.sucursal_id), (self.norte, SUCURSAL_PRINCIPAL))
+        for enlace in (
+            Receta(menu=self.pizza_norte, inventario=self.queso),
+            ComponentePreparacion(preparacion=masa_norte, articulo=self.queso),
+            ComponentePreparacion(preparacion=masa, subpreparacion=masa_norte),
+            RecetaPreparacion(menu=self.pizza, preparacion=masa_norte),
+        ):
+            with self.subTest(enlace=enlace), self.assertRaisesMessage(ValidationError, 'otra sucursal'):
+                enlace.full_clean()
+        ComponentePreparacion(preparacion=masa_norte, articulo=self.queso_norte).full_clean()
+        # Un enlace guardado sin validar no descuenta el stock de otra sucursal
+        Receta.objects.create(menu=self.pizza_norte, inventario=self.queso, cantidad=Decimal('1'))
+        with sucursales.activar('norte'), self.assertRaisesMessage(PedidoInvalido, 'no son de la sucursal'):
+            registrar_pedido([(self.pizza_norte.id, 1)])
+        self.queso.refresh_from_db()
+        self.assertEqual(self.queso.stock, Decimal('10'))
+
+    def test_cambios_de_la_sucursal_de_la_terminal(self):
+        desde, _ = sincronizacion.secuencia()
+        for articulo in Inventario.objects.all():
+            articulo.stock += 1
+            articulo.save()
+        Receta.objects.create(menu=self.pizza_norte, inventario=self.queso_norte, cantidad=Decimal('0.2'))
+        Receta.objects.create(menu=self.pizza, inventario=self.queso, cantidad=Decimal('0.2'))
+        queso_id = self.queso.id
+        self.queso.delete()
+
+        def cambios(clave):
+            return self.client.get(
+                reverse('api_cambios'), {'desde': desde, 'limite': 2}, HTTP_X_SUCURSAL=clave
+            ).json()
+
+        # Lo de otra sucursal ni se reporta como borrado ni cuenta para el límite
+        norte = cambios('norte')
+        self.assertFalse(norte['mas'])
+        self.assertEqual(norte['borrados'], {})
+        self.assertEqual([a['id'] for a in norte['cambios']['inventario']], [self.queso_norte.id])
+        self.assertEqual([p['id'] for p in norte['cambios']['menu']], [self.pizza_norte.id])
+        principal = cambios('principal')
+        self.assertFalse(principal['mas'])
+        self.assertEqual(principal['borrados'], {'inventario': [queso_id]})
+        self.assertEqual([p['id'] for p in principal['cambios']['menu']], [self.pizza.id])
+
+    @override_settings(SUCURSALES_BD={'norte': 'sucursal_norte'})
+    def test_router_manda_a_la_base_de_la_sucursal(self):
+        router = sucursales.RouterSucursales()
+        self.assertIsNone(router.db_for_read(Inventario))
+        with sucursales._activa('norte', self.norte.id):
+            self.assertEqual(router.db_for_read(Inventario), 'sucursal_norte')
+            self.assertEqual(router.db_for_write(Pedido), 'sucursal_norte')
+            # Usuarios, sesiones y la cola de trabajos se quedan en 'default'
+            self.assertIsNone(router.db_for_read(Session))
+            self.assertIsNone(router.db_for_write(Trabajo))
+
+
+# ==========================================
+# PRUEBAS: Trabajos en segundo plano (trabajos.py)
+# ==========================================
+@override_settings(TRABAJOS_REINTENTO=60)
+class TrabajosTests(TestCase):
+
+    def registrar(self, nombre, funcion, **opciones):
+        trabajos.tipo(nombre, nombre, **opciones)(funcion)
+        self.addCleanup(trabajos.TIPOS.pop, nombre)
+
+    def procesar(self):
+        with self.assertLogs('pizzeria.trabajos'):
+            return trabajos.procesar_pendientes()
+
+    def test_reintentos_con_espera_y_avance(self):
+        llamadas = []
+
+        def sumar(n):
+            llamadas.append(n)
+            if len(llamadas) == 1:
+                raise RuntimeError("se cayó la red")
+            trabajos.avance(n, n)
+            return {'n': n}
+
+        self.registrar('prueba', sumar)
+        trabajo = trabajos.encolar('prueba', n=5)
+        self.assertEqual(self.procesar(), 1)
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (Trabajo.PENDIENTE, 1))
+        self.assertEqual(trabajo.error, 'RuntimeError: se cayó la red')
+        self.assertGreater(trabajo.disponible_desde, timezone.now() + timedelta(seconds=59))
+        # Todavía no le toca
+        self.assertEqual(trabajos.procesar_pendientes(), 0)
+
+        Trabajo.objects.filter(id=trabajo.id).update(disponible_desde=timezone.now())
+        self.assertEqual(self.procesar(), 1)
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (Trabajo.TERMINADO, 2))
+        self.assertEqual(trabajo.resultado, {'n': 5})
+        self.assertEqual((trabajo.avance, trabajo.porcentaje), (5, 100))
+        respuesta = self.client.get(reverse('ver_trabajo', args=[trabajo.id]), {'formato': 'json'})
+        self.assertEqual(respuesta.json()['estado'], 'terminado')
+
+    def test_fallidos(self):
+        self.registrar('siempre_falla', lambda: 1 / 0, intentos=2)
+        trabajo = trabajos.encolar('siempre_falla')
+        self.procesar()
+        Trabajo.objects.filter(id=trabajo.id).update(disponible_desde=timezone.now())
+        self.procesar()
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (Trabajo.FALLIDO, 2))
+
+        # Un archivo que no se puede leer falla sin reintentos
+        with tempfile.TemporaryDirectory() as carpeta, override_settings(TRABAJOS_DIR=carpeta):
+            archivo = trabajos.guardar_archivo(SimpleUploadedFile('x.csv', b'\xff\xfe\x00nombre'))
+            trabajo = trabajos.encolar('importar', modelo='proveedores', formato='csv', archivo=archivo)
+            self.procesar()
+            self.assertEqual(os.listdir(carpeta), [])
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (Trabajo.FALLIDO, 1))
+        self.assertContains(self.client.get(reverse('ver_trabajo', args=[trabajo.id])), 'utf-8')
+
+    def test_clave_evita_duplicados(self):
+        url = reverse('encolar_trabajo', args=['recalcular_costos'])
+        primero = self.client.post(url)
+        self.assertEqual(self.client.post(url).url, primero.url)
+        self.assertEqual(Trabajo.objects.count(), 1)
+        # Ya en curso no cuenta: lo que cambie mientras corre necesita otra corrida
+        trabajos.tomar('prueba:0')
+        self.assertNotEqual(self.client.post(url).url, primero.url)
+        self.assertEqual(Trabajo.objects.filter(estado=Trabajo.PENDIENTE).count(), 1)
+
+        self.assertEqual(self.client.post(reverse('encolar_trabajo', args=['importar'])).status_code, 404)
+        self.assertContains(self.client.get(reverse('ver_trabajos')), 'Recalcular el costo de receta')
+
+    def test_por_sucursal(self):
+        Sucursal.objects.create(nombre='Norte', clave='norte')
+        Menu.objects.create(nombre='Hawaiana', precio=Decimal('150'), categoria='Pizza')
+        self.registrar('contar_menu', lambda: {'productos': Menu.objects.count()}, por_sucursal=True)
+        with sucursales.activar('norte'):
+            norte = trabajos.encolar('contar_menu')
+        # Los de mantenimiento son de toda la cadena
+        cadena = trabajos.encolar('recalcular_costos')
+        self.procesar()
+        norte.refresh_from_db()
+        cadena.refresh_from_db()
+        self.assertEqual((norte.sucursal, norte.resultado), ('norte', {'productos': 0}))
+        self.assertEqual((cadena.sucursal, cadena.resultado), ('', {'productos': 1}))
+
+    def test_cola_usa_indice_y_vencidos(self):
+        trabajos.encolar('recalcular_costos')
+        conexion = connection
+        sql = trabajos._TOMAR.format(
+            tabla=conexion.ops.quote_name(Trabajo._meta.db_table), en_curso=Trabajo.EN_CURSO,
+            pendiente=Trabajo.PENDIENTE, bloqueo='',
+        )
+        with conexion.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, ['x', timezone.now(), timezone.now()])
+            self.assertIn('trabajo_cola_idx', str(cursor.fetchall()))
+
+        # Un trabajador que dejó de dar latidos: el trabajo vuelve a la cola
+        trabajo = trabajos.tomar('otro-host:1:0')
+        self.assertEqual(trabajos.latir('otro-host:1'), 1)
+        Trabajo.objects.filter(id=trabajo.id).update(latido=timezone.now() - timedelta(hours=1))
+        with self.assertLogs('pizzeria.trabajos', 'WARNING'):
+            self.assertEqual(trabajos.recuperar_vencidos(), 1)
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.tomado_por), (Trabajo.PENDIENTE, ''))
+        self.assertIn('dejó de responder', trabajo.error)
+
+    def test_trabajador_exige_cache_compartida(self):
+        # Con la caché local el menú que invalida un trabajo no se entera la web
+        self.assertFalse(cache_menu.compartida())
+        with self.assertRaisesMessage(CommandError, 'PIZZERIA_CACHE=archivo'):
+            call_command('trabajador', una_vez=True, stdout=io.StringIO())
+        with tempfile.TemporaryDirectory() as carpeta, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': carpeta},
+        }):
+            self.assertTrue(cache_menu.compartida())
+
+
+# ==========================================
+# PRUEBAS: Reportes de ventas (reportes.py)
+# ==========================================
+class ReportesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.proveedor = Proveedores.objects.create(nombre_proveedor='Lácteos del Norte')
+        cls.masa = Inventario.objects.create(nombre_articulo='Masa', stock=Decimal('100'), unidad='pieza',
+                                             costo_unitario=Decimal('5'))
+        cls.queso = Inventario.objects.create(nombre_articulo='Queso', stock=Decimal('100'), unidad='kg',
+                                              costo_unitario=Decimal('80'), proveedor=cls.proveedor)
+        cls.pizza = Menu.objects.create(nombre='Pizza Queso', precio=Decimal('120'), categoria='Pizza')
+        cls.refresco = Menu.objects.create(nombre='Refresco', precio=Decimal('25'), categoria='Bebida')
+        Receta.objects.create(menu=cls.pizza, inventario=cls.masa, cantidad=Decimal('1'))
+        Receta.objects.create(menu=cls.pizza, inventario=cls.queso, cantidad=Decimal('0.250'))
+
+    def filas(self, reporte):
+        return [tuple(str(v) for v in fila) for fila in reporte[1]]
+
+    def test_los_pedidos_se_suman_a_su_hora_y_su_dia(self):
+        registrar_pedido([(self.pizza.id, 2), (self.refresco.id, 1)])
+        registrar_pedido([(self.pizza.id, 1)])
+
+        hoy, hora = timezone.localdate(), timezone.localtime().hour
+        venta = ResumenVenta.objects.get(producto_id=self.pizza.id)
+        self.assertEqual((venta.dia, venta.piezas, venta.importe), (hoy, 3, Decimal('360')))
+        self.assertEqual(sorted(ResumenCategoria.objects.filter(categoria='Pizza').values_list('hora', 'piezas')),
+                         [(hora, 3), (DIA_COMPLETO, 3)])
+        queso = ResumenConsumo.objects.get(inventario_id=self.queso.id)
+        self.assertEqual((queso.cantidad, queso.costo, queso.proveedor_id), (Decimal('0.75'), Decimal('60'), self.proveedor.id))
+
+        self.assertEqual(self.filas(reportes.ventas_por_categoria(hoy, hoy, 'total')), [
+            (f'{hoy} a {hoy}', 'Bebida', '1', '25.00'), (f'{hoy} a {hoy}', 'Pizza', '3', '360.00'),
+        ])
+        self.assertEqual(self.filas(reportes.ventas_por_categoria(hoy, hoy, 'hora'))[-1],
+                         (f'{hoy} {hora:02d}:00', 'Pizza', '3', '360.00'))
+        self.assertEqual(self.filas(reportes.productos_mas_vendidos(hoy, hoy, limite=1)),
+                         [(str(self.pizza.id), 'Pizza Queso', 'Pizza', '3', '360.00')])
+        self.assertEqual(self.filas(reportes.consumo_por_proveedor(hoy, hoy))[-1],
+                         ('Lácteos del Norte', 'Queso', '0.750', 'kg', '60.00'))
+        self.assertEqual(reportes.diferencias(), [])
+
+    def test_consumo_por_proveedor_en_dos_consultas(self):
+        otros = [Proveedores.objects.create(nombre_proveedor=f'Proveedor {i}') for i in range(5)]
+        articulos = [
+            Inventario.objects.create(nombre_articulo=f'Artículo {i}', stock=Decimal('100'), unidad='kg',
+                                      costo_unitario=Decimal('10'), proveedor=proveedor)
+            for i, proveedor in enumerate(otros)
+        ]
+        for articulo in articulos:
+            Receta.objects.create(menu=self.pizza, inventario=articulo, cantidad=Decimal('1'))
+        registrar_pedido([(self.pizza.id, 1)])
+        hoy = timezone.localdate()
+        # Los nombres de los proveedores se leen juntos, no uno por proveedor
+        with self.assertNumQueries(2):
+            filas = self.filas(reportes.consumo_por_proveedor(hoy, hoy))
+        self.assertEqual({f[0] for f in filas}, {'Sin proveedor', 'Lácteos del Norte', *(p.nombre_proveedor for p in otros)})
+
+    def test_compactar_conserva_los_dias(self):
+        registrar_pedido([(self.pizza.id, 3)])
+        hace_60 = timezone.localdate() - timedelta(days=60)
+        ResumenCategoria.objects.update(dia=hace_60)
+
+        self.assertEqual(reportes.compactar(), 1)
+        self.assertEqual(ResumenCategoria.objects.get().hora, DIA_COMPLETO)
+        self.assertEqual(self.filas(reportes.ventas_por_categoria(hace_60, hace_60, 'hora')),
+                         [(f'{hace_60} (día completo)', 'Pizza', '3', '360.00')])
+        # Los rangos son de días completos, con ambos extremos incluidos
+        self.assertEqual(self.filas(reportes.ventas_por_categoria(hace_60 + timedelta(days=1), timezone.localdate())), [])
+        self.assertEqual(reportes.compactar(), 0)
+
+    def test_reconstruir_desde_los_pedidos(self):
+        registrar_pedido([(self.pizza.id, 2), (self.refresco.id, 3)])
+        resumenes = (ResumenVenta, ResumenCategoria, ResumenConsumo)
+        antes = [sorted(modelo.objects.values_list()) for modelo in resumenes]
+        for modelo in resumenes:
+            modelo.objects.all().delete()
+        self.assertEqual(len(reportes.diferencias()), 2)
+
+        # 2 productos, 2 categorías por hora y por día, 2 artículos
+        self.assertEqual(reportes.reconstruir(), 8)
+        despues = [sorted(modelo.objects.values_list()) for modelo in resumenes]
+        # (Sin los id, que cambian)
+        self.assertEqual([[f[1:] for f in m] for m in despues], [[f[1:] for f in m] for m in antes])
+        self.assertEqual(reportes.diferencias(), [])
+
+    def test_vistas(self):
+        registrar_pedido([(self.pizza.id, 2)])
+        respuesta = self.client.get(reverse('ver_reportes'))
+        self.assertContains(respuesta, 'Pizza')
+
+        respuesta = self.client.get(reverse('ver_reporte', args=['productos']), {'formato': 'csv', 'limite': 5})
+        self.assertTrue(respuesta.streaming)
+        contenido = b''.join(respuesta.streaming_content).decode()
+        self.assertEqual(contenido.splitlines(), ['ID,Producto,Categoría,Piezas,Importe', f'{self.pizza.id},Pizza Queso,Pizza,2,240.00'])
+
+        self.assertEqual(self.client.get(reverse('ver_reportes'), {'desde': '2024-13-01'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('ver_reportes'), {'por': 'semana'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('ver_reporte', args=['otro'])).status_code, 404)
+
+
+# ==========================================
+# PRUEBAS: Datos sintéticos (generar_datos)
+# ==========================================
+class DatosSinteticosTests(TestCase):
+    def test_generar_datos(self):
+        salida = io.StringIO()
+        call_command('generar_datos', proveedores=7, articulos=60, productos=25,
+                     ingredientes='2-4', lote=10, stdout=salida)
+        self.assertIn('25 productos', salida.getvalue())
+        self.assertEqual(Proveedores.objects.count(), 7)
+        self.assertEqual(Inventario.objects.count(), 60)
+        self.assertEqual(Menu.objects.count(), 25)
+        for producto in Menu.objects.exclude(categoria='Bebida'):
+            self.assertTrue(2 <= producto.receta_set.count() <= 4)
+        # Lo que harían las señales: costo de receta, disponibilidad, bitácora e índice de búsqueda
+        for producto in con_costos():
+            self.assertEqual(producto.costo_receta, producto.costo_actual.quantize(Decimal('0.01')))
+        self.assertEqual(disponibilidad.diferencias(), [])
+        self.assertEqual(movimientos.diferencias(), [])
+        self.assertTrue(busqueda.buscar('pizza', tipo=busqueda.PRODUCTO))
+
+        # Misma semilla, mismos datos
+        antes = list(Inventario.objects.order_by('id').values_list('nombre_articulo', 'stock'))
+        Menu.objects.all().delete()
+        Inventario.objects.all().delete()
+        Proveedores.objects.all().delete()
+        call_command('generar_datos', proveedores=7, articulos=60, productos=25,
+                     ingredientes='2-4', lote=10, verbosity=0, stdout=io.StringIO())
+        self.assertEqual(list(Inventario.objects.order_by('id').values_list('nombre_articulo', 'stock')), antes)
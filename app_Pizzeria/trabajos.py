@@ -0,0 +1,497 @@
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connections, router, transaction
+from django.utils import timezone
+
+from . import busqueda, costos, disponibilidad, estadisticas, intercambio, recetas, reportes, sucursales
+from .models import Sucursal, Trabajo
+
+# ==========================================
+# SERVICIO: Trabajos en segundo plano
+# ==========================================
+# Lo pesado no corre en el hilo de la petición: importar cien mil filas o
+# reconstruir el índice de búsqueda ocupa al worker de gunicorn (y su
+# conexión) durante minutos. La vista lo encola con encolar() y responde de
+# inmediato con la página del trabajo, que se recarga sola hasta que termina.
+#
+# La cola es la tabla Trabajo (sin Redis ni otro broker) y la atiende el
+# comando `python manage.py trabajador`, con varios hilos (--hilos) y/o
+# procesos (--procesos). Cada trabajador toma el siguiente trabajo con una
+# sola sentencia UPDATE ... WHERE id = (SELECT ...) RETURNING id:
+#   - PostgreSQL: el SELECT lleva FOR UPDATE SKIP LOCKED, así que dos
+#     trabajadores nunca toman el mismo y ninguno espera a que el otro termine;
+#   - SQLite: las escrituras van de una en una, así que el UPDATE ya es atómico.
+#
+# - Reintentos: si el trabajo lanza una excepción vuelve a la cola con una
+#   espera que se duplica en cada intento (TRABAJOS_REINTENTO, 2x, 4x...)
+#   hasta max_intentos. TrabajoFallido lo marca fallido sin reintentar (un
+#   archivo que no se puede leer no se arregla reintentando).
+# - Claves: encolar(..., clave=) no agrega otro trabajo si ya hay uno
+#   pendiente con esa clave (lo garantiza un índice único parcial). Uno en
+#   curso no cuenta: lo que cambió mientras corre necesita otra corrida.
+# - Avance: el trabajo llama avance(hecho, total) cuando quiera; se guarda a
+#   lo más una vez por INTERVALO_AVANCE segundos.
+# - Latidos: cada proceso trabajador renueva el latido de sus trabajos en
+#   curso. Los que pasan TRABAJOS_VENCIMIENTO segundos sin latido (su proceso
+#   murió) vuelven a la cola como un intento fallido, así que un trabajo corre
+#   al menos una vez: los tipos deben poder repetirse (la importación es un
+#   upsert).
+#
+# Los tipos por sucursal (la importación) guardan la clave de la sucursal
+# activa al encolar y corren con ella; los de mantenimiento son de toda la
+# cadena, como los comandos equivalentes.
+
+registro = logging.getLogger('pizzeria.trabajos')
+
+# Segundos mínimos entre dos escrituras del avance de un trabajo
+INTERVALO_AVANCE = 1.0
+
+
+class TrabajoFallido(Exception):
+    """El trabajo no puede completarse: se marca fallido sin más intentos."""
+
+
+# ---------- Tipos de trabajo ----------
+
+class Tipo:
+    """Una función que se puede encolar, con su título y sus opciones."""
+    __slots__ = ('nombre', 'funcion', 'titulo', 'por_sucursal', 'intentos', 'al_final', 'mantenimiento')
+
+    def __init__(self, nombre, funcion, titulo, por_sucursal, intentos, al_final, mantenimiento):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.titulo = titulo
+        self.por_sucursal = por_sucursal
+        self.intentos = intentos
+        self.al_final = al_final
+        self.mantenimiento = mantenimiento
+
+
+# nombre -> Tipo
+TIPOS = {}
+
+
+def tipo(nombre, titulo, por_sucursal=False, intentos=3, al_final=None, mantenimiento=False):
+    """
+    Registra la función decorada como tipo de trabajo. Se llama con los
+    parámetros del trabajo y regresa su resultado (algo que quepa en JSON).
+    `al_final(**parametros)` corre cuando el trabajo termina o falla del todo;
+    los de `mantenimiento` no llevan parámetros y se encolan desde /trabajos/.
+    """
+    def registrar(funcion):
+        TIPOS[nombre] = Tipo(nombre, funcion, titulo, por_sucursal, intentos, al_final, mantenimiento)
+        return funcion
+    return registrar
+
+
+def de_mantenimiento():
+    return [t for t in TIPOS.values() if t.mantenimiento]
+
+
+# ---------- Encolar ----------
+
+def _bd():
+    return router.db_for_write(Trabajo)
+
+
+def encolar(nombre, clave=None, **parametros):
+    """
+    Agrega un trabajo a la cola y lo regresa sin esperar a que corra. Con
+    `clave`, si ya hay uno pendiente con esa clave regresa ése.
+    """
+    tipo_trabajo = TIPOS[nombre]
+    sucursal = (sucursales.clave_actual() or '') if tipo_trabajo.por_sucursal else ''
+    while True:
+        try:
+            with transaction.atomic(using=_bd()):
+                return Trabajo.objects.create(
+                    tipo=nombre, parametros=parametros, sucursal=sucursal, clave=clave,
+                    max_intentos=tipo_trabajo.intentos,
+                )
+        except IntegrityError:
+            if clave is None:
+                raise
+            pendiente = Trabajo.objects.filter(clave=clave, estado=Trabajo.PENDIENTE).first()
+            if pendiente is not None:
+                return pendiente
+            # Lo tomaron entre el INSERT y la consulta: ahora sí cabe otro
+
+
+def ruta_archivo(nombre):
+    return os.path.join(settings.TRABAJOS_DIR, os.path.basename(nombre))
+
+
+def guardar_archivo(subido):
+    """
+    Copia un archivo subido a TRABAJOS_DIR (la petición termina antes que el
+    trabajo y Django borra sus temporales) y regresa el nombre con el que quedó.
+    """
+    os.makedirs(settings.TRABAJOS_DIR, exist_ok=True)
+    nombre = uuid.uuid4().hex
+    with open(ruta_archivo(nombre), 'wb') as destino:
+        for parte in subido.chunks():
+            destino.write(parte)
+    return nombre
+
+
+# ---------- Tomar y ejecutar ----------
+
+# Los estados van escritos en el SQL (no como parámetros) para que la
+# condición coincida con la del índice parcial trabajo_cola_idx
+_TOMAR = '''
+    UPDATE {tabla}
+    SET estado = '{en_curso}', tomado_por = %s, latido = %s, intentos = intentos + 1
+    WHERE id = (
+        SELECT id FROM {tabla}
+        WHERE estado = '{pendiente}' AND disponible_desde <= %s
+        ORDER BY disponible_desde, id
+        LIMIT 1{bloqueo}
+    )
+    RETURNING id
+'''
+
+
+def tomar(trabajador):
+    """Marca como suyo el siguiente trabajo pendiente y lo regresa (None si no hay)."""
+    conexion = connections[_bd()]
+    ahora = conexion.ops.adapt_datetimefield_value(timezone.now())
+    sql = _TOMAR.format(
+        tabla=conexion.ops.quote_name(Trabajo._meta.db_table),
+        en_curso=Trabajo.EN_CURSO,
+        pendiente=Trabajo.PENDIENTE,
+        bloqueo=' FOR UPDATE SKIP LOCKED' if conexion.features.has_select_for_update_skip_locked else '',
+    )
+    with conexion.cursor() as cursor:
+        cursor.execute(sql, [trabajador, ahora, ahora])
+        fila = cursor.fetchone()
+    return Trabajo.objects.get(id=fila[0]) if fila else None
+
+
+def _cerrar(trabajo, estado, **campos):
+    """
+    Deja el trabajo en `estado` si sigue siendo de quien lo tomó (pudo vencer
+    y tomarlo otro). Regresa si lo cambió.
+    """
+    cambiados = Trabajo.objects.filter(
+        id=trabajo.id, estado=Trabajo.EN_CURSO, tomado_por=trabajo.tomado_por
+    ).update(estado=estado, **campos)
+    if cambiados and estado in (Trabajo.TERMINADO, Trabajo.FALLIDO):
+        tipo_trabajo = TIPOS.get(trabajo.tipo)
+        if tipo_trabajo and tipo_trabajo.al_final:
+            tipo_trabajo.al_final(**trabajo.parametros)
+    return bool(cambiados)
+
+
+def _fallo(trabajo, error, definitivo=False):
+    """Regresa el trabajo a la cola con espera creciente, o lo marca fallido."""
+    ahora = timezone.now()
+    if not definitivo and trabajo.intentos < trabajo.max_intentos:
+        espera = settings.TRABAJOS_REINTENTO * 2 ** (trabajo.intentos - 1)
+        try:
+            with transaction.atomic(using=_bd()):
+                # Un poco al azar: los que fallaron juntos no vuelven juntos
+                return _cerrar(
+                    trabajo, Trabajo.PENDIENTE, error=error, tomado_por='',
+                    disponible_desde=ahora + timedelta(seconds=espera * random.uniform(1, 1.25)),
+                )
+        except IntegrityError:
+            # Ya hay otro pendiente con la misma clave: ése hará el trabajo
+            error = f"{error} (reemplazado por otro trabajo pendiente con la misma clave)"
+    return _cerrar(trabajo, Trabajo.FALLIDO, error=error, terminado=ahora)
+
+
+def ejecutar(trabajo):
+    """Corre un trabajo ya tomado (con su sucursal activa) y guarda cómo terminó."""
+    tipo_trabajo = TIPOS.get(trabajo.tipo)
+    if tipo_trabajo is None:
+        return _fallo(trabajo, f"Tipo de trabajo desconocido: {trabajo.tipo}", definitivo=True)
+
+    token = _actual.set(_Avance(trabajo))
+    inicio = time.perf_counter()
+    try:
+        with sucursales.activar(trabajo.sucursal) if trabajo.sucursal else nullcontext():
+            resultado = tipo_trabajo.funcion(**trabajo.parametros)
+    except (TrabajoFallido, Sucursal.DoesNotExist) as e:
+        registro.warning("Trabajo #%s (%s) fallido: %s", trabajo.id, trabajo.tipo, e)
+        return _fallo(trabajo, str(e), definitivo=True)
+    except Exception as e:
+        registro.exception("Trabajo #%s (%s), intento %s de %s",
+                           trabajo.id, trabajo.tipo, trabajo.intentos, trabajo.max_intentos)
+        return _fallo(trabajo, f"{type(e).__name__}: {e}")
+    finally:
+        _actual.reset(token)
+
+    registro.info("Trabajo #%s (%s) terminado en %.1f s", trabajo.id, trabajo.tipo, time.perf_counter() - inicio)
+    return _cerrar(trabajo, Trabajo.TERMINADO, resultado=resultado, error='', terminado=timezone.now())
+
+
+def procesar_pendientes(trabajador='local'):
+    """Ejecuta en este hilo los trabajos pendientes hasta vaciar la cola. Regresa cuántos."""
+    hechos = 0
+    while (trabajo := tomar(trabajador)) is not None:
+        ejecutar(trabajo)
+        hechos += 1
+    return hechos
+
+
+# ---------- Avance ----------
+
+class _Avance:
+    """El trabajo que corre en este contexto y cuándo se guardó su avance."""
+    __slots__ = ('trabajo', 'guardado')
+
+    def __init__(self, trabajo):
+        self.trabajo = trabajo
+        self.guardado = 0.0
+
+
+# Trabajo en curso (None fuera de un trabajo)
+_actual = ContextVar('trabajo_actual', default=None)
+
+
+def avance(hecho, total=None):
+    """
+    Guarda cuánto lleva el trabajo en curso (fuera de un trabajo no hace
+    nada). Se escribe a lo más una vez por INTERVALO_AVANCE y siempre al
+    llegar al total. También cuenta como latido.
+    """
+    actual = _actual.get()
+    if actual is None:
+        return
+    ahora = time.monotonic()
+    if ahora - actual.guardado < INTERVALO_AVANCE and (total is None or hecho < total):
+        return
+    actual.guardado = ahora
+    campos = {'avance': hecho, 'latido': timezone.now()}
+    if total is not None:
+        campos['total'] = total
+    Trabajo.objects.filter(
+        id=actual.trabajo.id, estado=Trabajo.EN_CURSO, tomado_por=actual.trabajo.tomado_por
+    ).update(**campos)
+
+
+# ---------- Latidos, vencidos y limpieza ----------
+
+def latir(proceso):
+    """Renueva el latido de los trabajos en curso de los hilos de `proceso`."""
+    return Trabajo.objects.filter(
+        estado=Trabajo.EN_CURSO, tomado_por__startswith=f'{proceso}:'
+    ).update(latido=timezone.now())
+
+
+def recuperar_vencidos():
+    """Los trabajos en curso sin latido reciente cuentan como intento fallido. Regresa cuántos."""
+    limite = timezone.now() - timedelta(seconds=settings.TRABAJOS_VENCIMIENTO)
+    vencidos = list(Trabajo.objects.filter(estado=Trabajo.EN_CURSO, latido__lt=limite))
+    for trabajo in vencidos:
+        registro.warning("Trabajo #%s (%s) sin latido desde %s", trabajo.id, trabajo.tipo, trabajo.latido)
+        _fallo(trabajo, f"El trabajador {trabajo.tomado_por} dejó de responder.")
+    return len(vencidos)
+
+
+def limpiar():
+    """Borra los trabajos terminados o fallidos hace más de TRABAJOS_DIAS días."""
+    limite = timezone.now() - timedelta(days=settings.TRABAJOS_DIAS)
+    borrados, _ = Trabajo.objects.filter(
+        estado__in=[Trabajo.TERMINADO, Trabajo.FALLIDO], terminado__lt=limite
+    ).delete()
+    return borrados
+
+
+# ---------- Trabajador (comando `trabajador`) ----------
+
+def _proceso():
+    return f'{socket.gethostname()[:60]}:{os.getpid()}'
+
+
+def _hilo(nombre, detener, espera, una_vez):
+    """Toma trabajos hasta que se active `detener` (con una_vez, hasta vaciar la cola)."""
+    try:
+        while not detener.is_set():
+            # Como al empezar cada petición: descarta conexiones rotas o viejas
+            close_old_connections()
+            try:
+                trabajo = tomar(nombre)
+                if trabajo is not None:
+                    ejecutar(trabajo)
+                    continue
+            except DatabaseError:
+                registro.exception("Error de la base en el trabajador %s", nombre)
+            if una_vez:
+                return
+            detener.wait(espera)
+    finally:
+        connections.close_all()
+
+
+def _mantenimiento(proceso, detener):
+    """Latidos del proceso, trabajos vencidos y limpieza, cada tercio del vencimiento."""
+    try:
+        while True:
+            try:
+                latir(proceso)
+                recuperar_vencidos()
+                limpiar()
+            except DatabaseError:
+                registro.exception("Error de la base en el mantenimiento de la cola")
+            if detener.wait(settings.TRABAJOS_VENCIMIENTO / 3):
+                return
+    finally:
+        connections.close_all()
+
+
+def _grupo_de_hilos(hilos, espera, una_vez):
+    """Un proceso trabajador: `hilos` hilos que toman trabajos y uno de mantenimiento."""
+    proceso = _proceso()
+    detener = threading.Event()
+    anteriores = {}
+    if threading.current_thread() is threading.main_thread():
+        # Ctrl+C o SIGTERM: cada hilo termina su trabajo actual y sale
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            anteriores[senal] = signal.signal(senal, lambda *_: detener.set())
+
+    mantenimiento = threading.Thread(target=_mantenimiento, args=(proceso, detener), daemon=True)
+    mantenimiento.start()
+    grupo = [
+        threading.Thread(target=_hilo, args=(f'{proceso}:{i}', detener, espera, una_vez), name=f'trabajador-{i}')
+        for i in range(hilos)
+    ]
+    for hilo in grupo:
+        hilo.start()
+    for hilo in grupo:
+        hilo.join()
+    detener.set()
+    mantenimiento.join()
+    for senal, anterior in anteriores.items():
+        signal.signal(senal, anterior)
+
+
+def servir(hilos=1, procesos=0, espera=None, una_vez=False):
+    """
+    Atiende la cola con `hilos` hilos en este proceso o, con `procesos`, en
+    ese número de procesos hijos de `hilos` hilos cada uno (fork: sólo en
+    sistemas POSIX). Los procesos sirven para trabajos que usan el CPU en
+    Python; los hilos bastan para los que esperan a la base.
+    """
+    espera = settings.TRABAJOS_ESPERA if espera is None else espera
+    if not procesos:
+        return _grupo_de_hilos(hilos, espera, una_vez)
+
+    contexto = multiprocessing.get_context('fork')
+    # Los hijos abren sus propias conexiones
+    connections.close_all()
+    hijos = [
+        contexto.Process(target=_grupo_de_hilos, args=(hilos, espera, una_vez), name=f'trabajador-{i}')
+        for i in range(procesos)
+    ]
+    for hijo in hijos:
+        hijo.start()
+
+    def terminar(*_):
+        for hijo in hijos:
+            if hijo.is_alive():
+                hijo.terminate()
+
+    # Ctrl+C ya les llega a los hijos (mismo grupo de procesos); SIGTERM se les reenvía
+    anteriores = {signal.SIGINT: signal.signal(signal.SIGINT, signal.SIG_IGN),
+                  signal.SIGTERM: signal.signal(signal.SIGTERM, terminar)}
+    try:
+        for hijo in hijos:
+            hijo.join()
+    finally:
+        for senal, anterior in anteriores.items():
+            signal.signal(senal, anterior)
+
+
+# ==========================================
+# TIPOS DE TRABAJO
+# ==========================================
+
+def _borrar_archivo(archivo, **parametros):
+    try:
+        os.remove(ruta_archivo(archivo))
+    except FileNotFoundError:
+        pass
+
+
+@tipo('importar', "Importar archivo", por_sucursal=True, al_final=_borrar_archivo)
+def _importar(modelo, formato, archivo, nombre_archivo=''):
+    """Importa el archivo que guardó la vista (ver intercambio.importar); avance en bytes."""
+    ruta = ruta_archivo(archivo)
+    try:
+        tamaño = os.path.getsize(ruta)
+        with open(ruta, 'rb') as f:
+            resultado = intercambio.importar(
+                modelo, f, formato, avance=lambda leidos: avance(leidos, tamaño)
+            )
+    except FileNotFoundError:
+        raise TrabajoFallido("El archivo subido ya no existe.")
+    except (intercambio.ErrorImportacion, UnicodeDecodeError) as e:
+        raise TrabajoFallido(str(e))
+    avance(tamaño, tamaño)
+    return {
+        'guardadas': resultado.guardadas,
+        'total_errores': resultado.total_errores,
+        'errores': resultado.errores,
+    }
+
+
+@tipo('recalcular_costos', "Recalcular el costo de receta", mantenimiento=True)
+def _recalcular_costos():
+    return {'productos': costos.recalcular_costos()}
+
+
+@tipo('recalcular_disponibilidad', "Recalcular la disponibilidad del menú", mantenimiento=True)
+def _recalcular_disponibilidad():
+    return {'productos_cambiados': disponibilidad.actualizar_disponibilidad()}
+
+
+@tipo('expandir_recetas', "Expandir recetas (y recalcular costos y disponibilidad)", mantenimiento=True)
+def _expandir_recetas():
+    try:
+        renglones = recetas.reconstruir()
+    except recetas.RecetaCiclica as e:
+        raise TrabajoFallido(str(e))
+    avance(1, 3)
+    productos = costos.recalcular_costos()
+    avance(2, 3)
+    cambiados = disponibilidad.actualizar_disponibilidad()
+    avance(3, 3)
+    return {'renglones': renglones, 'productos': productos, 'productos_cambiados': cambiados}
+
+
+@tipo('reconstruir_busqueda', "Reconstruir el índice de búsqueda", mantenimiento=True)
+def _reconstruir_busqueda():
+    if not busqueda.disponible():
+        raise TrabajoFallido("El índice de búsqueda sólo existe en SQLite (FTS5).")
+    return {'registros': busqueda.reconstruir()}
+
+
+@tipo('estadisticas_proveedores', "Recalcular las estadísticas por proveedor", mantenimiento=True)
+def _estadisticas_proveedores():
+    if not estadisticas.disponible():
+        raise TrabajoFallido("Las estadísticas por proveedor requieren SQLite o PostgreSQL.")
+    estadisticas.instalar()
+    return {'renglones': estadisticas.reconstruir()}
+
+
+@tipo('compactar_ventas', "Compactar los resúmenes de ventas", mantenimiento=True)
+def _compactar_ventas():
+    return {'renglones_quitados': reportes.compactar()}
+
+
+@tipo('reconstruir_ventas', "Reconstruir los resúmenes de ventas", mantenimiento=True)
+def _reconstruir_ventas():
+    return {'renglones': reportes.reconstruir()}
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api, eventos, metricas
 
 urlpatterns = [
     # URLs de la App (Inicio)
@@ -18,6 +18,8 @@ urlpatterns = [
     path('inventario/actualizar/<int:id>/', views.actualizar_inventario, name='actualizar_inventario'),
     path('inventario/actualizar/realizar/', views.realizar_actualizacion_inventario, name='realizar_actualizacion_inventario'),
     path('inventario/borrar/<int:id>/', views.borrar_inventario, name='borrar_inventario'),
+    path('inventario/comprar/<int:id>/', views.comprar_inventario, name='comprar_inventario'),
+    path('inventario/reorden/', views.reorden_inventario, name='reorden_inventario'),
     
     # URLs de Menú (CRUD) (¡NUEVO!)
     path('menu/', views.ver_menu, name='ver_menu'),
@@ -25,4 +27,35 @@ urlpatterns = [
     path('menu/actualizar/<int:id>/', views.actualizar_menu, name='actualizar_menu'),
     path('menu/actualizar/realizar/', views.realizar_actualizacion_menu, name='realizar_actualizacion_menu'),
     path('menu/borrar/<int:id>/', views.borrar_menu, name='borrar_menu'),
+
+    # URLs de Pedidos (¡NUEVO!)
+    path('pedidos/', views.ver_pedidos, name='ver_pedidos'),
+    path('pedidos/agregar/', views.agregar_pedido, name='agregar_pedido'),
+    path('pedidos/cocina/', views.ver_cocina, name='ver_cocina'),
+
+    # Flujo de eventos para las pantallas de cocina (¡NUEVO!)
+    path('eventos/cocina/', eventos.eventos_cocina, name='eventos_cocina'),
+
+    # URLs de Importar / Exportar (¡NUEVO!) - modelo: proveedores, inventario o menu
+    path('importar/<str:modelo>/', views.importar_datos, name='importar_datos'),
+    path('exportar/<str:modelo>/', views.exportar_datos, name='exportar_datos'),
+
+    # URLs de Trabajos en segundo plano
+    path('trabajos/', views.ver_trabajos, name='ver_trabajos'),
+    path('trabajos/<int:id>/', views.ver_trabajo, name='ver_trabajo'),
+    path('trabajos/encolar/<str:tipo>/', views.encolar_trabajo, name='encolar_trabajo'),
+
+    # URLs de Reportes de ventas - reporte: categorias, productos o proveedores
+    path('reportes/', views.ver_reporte, name='ver_reportes'),
+    path('reportes/<str:reporte>/', views.ver_reporte, name='ver_reporte'),
+
+    # API JSON (¡NUEVO!) - modelo: proveedores, inventario o menu
+    path('api/buscar/', api.api_buscar, name='api_buscar'),
+    path('api/cambios/', api.api_cambios, name='api_cambios'),
+    path('api/<str:modelo>/', api.api_listar, name='api_listar'),
+    path('api/<str:modelo>/<int:id>/', api.api_detalle, name='api_detalle'),
+    path('api/<str:modelo>/lote/', api.api_lote, name='api_lote'),
+
+    # Métricas para Prometheus (¡NUEVO!)
+    path('metrics', metricas.ver_metricas, name='metricas'),
 ]
\ No newline at end of file
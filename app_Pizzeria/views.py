@@ -1,6 +1,22 @@
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Proveedores, Inventario, Menu # <-- IMPORTANTE: Añadir Menu
-import datetime # Necesario para el footer
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from .models import Proveedores, Inventario, Menu, MovimientoInventario, Trabajo # <-- IMPORTANTE: Añadir Menu
+from .listados import LISTADO_PROVEEDORES, LISTADO_INVENTARIO, LISTADO_MENU, LISTADO_PEDIDOS
+from .pedidos import registrar_pedido, PedidoInvalido
+from .reorden import resumen_reorden, sugerencias_reorden
+from . import intercambio
+from . import cache_menu
+from . import busqueda, disponibilidad, edicion, fragmentos, movimientos, reportes, sucursales, trabajos
+from .costos import recalcular_por_articulos, recalculo_agrupado
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
 
 # ==========================================
 # VISTA: INICIO
@@ -9,22 +25,49 @@ def inicio_pizzeria(request):
     """
     Vista para la página de inicio.
     """
-    contexto = {
-        'fecha_actual': datetime.date.today(),
-    }
-    return render(request, 'inicio.html', contexto)
+    return render(request, 'inicio.html')
+
+# ==========================================
+# EDICIÓN CON CONTROL DE CONCURRENCIA (ver edicion.py)
+# ==========================================
+# Campos que escribe cada formulario de actualización
+CAMPOS_PROVEEDOR = ['nombre_proveedor', 'telefono_contacto', 'email_contacto', 'direccion', 'tipo_producto', 'rfc', 'activo']
+CAMPOS_INVENTARIO = ['nombre_articulo', 'stock', 'unidad', 'stock_minimo', 'costo_unitario', 'fecha_ultima_compra', 'proveedor']
+CAMPOS_MENU = ['nombre', 'descripcion', 'precio', 'categoria', 'tamaño', 'habilitado']
+
+
+def _rechazar_edicion(request, mostrar_formulario, id, error, status, cambios=None):
+    """
+    Vuelve a mostrar el formulario con los datos actuales, el error y los
+    cambios que el usuario intentó guardar (409 si hubo conflicto, 400 si el
+    formulario no era válido).
+    """
+    respuesta = mostrar_formulario(request, id, extra={
+        'error': error,
+        'cambios_rechazados': cambios or [],
+    })
+    respuesta.status_code = status
+    return respuesta
+
+
+def _cambios_para_mostrar(modelo, cambios):
+    return [(modelo._meta.get_field(c).verbose_name, v) for c, v in cambios.items()]
 
 # ==========================================
 # VISTAS: PROVEEDORES
 # ==========================================
-def ver_proveedores(request):
+async def ver_proveedores(request):
     """
-    Vista para mostrar todos los proveedores.
+    Vista para mostrar los proveedores, paginados por cursor.
+    Acepta ?activo=, ?orden= y los cursores ?despues= / ?antes=.
+    Es async: bajo ASGI no ocupa un hilo mientras espera a la base de datos.
     """
-    lista_proveedores = Proveedores.objects.all()
+    pagina = await LISTADO_PROVEEDORES.apaginar(request.GET)
     contexto = {
-        'proveedores': lista_proveedores,
-        'fecha_actual': datetime.date.today(),
+        'proveedores': pagina,
+        'pagina': pagina,
+        # Claves de la caché de la tabla y de cada renglón
+        **fragmentos.preparar(pagina),
     }
     return render(request, 'proveedores/ver_proveedores.html', contexto)
 
@@ -57,13 +100,10 @@ def agregar_proveedor(request):
     # Por simplicidad del CRUD, asumimos que el formulario está en una página
     # y esta vista solo maneja el POST.
     # Para mostrar el formulario:
-    contexto = {
-        'fecha_actual': datetime.date.today(),
-    }
-    return render(request, 'proveedores/agregar_proveedor.html', contexto)
+    return render(request, 'proveedores/agregar_proveedor.html')
 
 
-def actualizar_proveedor(request, id):
+def actualizar_proveedor(request, id, extra=None):
     """
     Vista para mostrar el formulario con los datos de un proveedor específico
     que se desea actualizar.
@@ -73,7 +113,9 @@ def actualizar_proveedor(request, id):
     
     contexto = {
         'proveedor': proveedor,
-        'fecha_actual': datetime.date.today(),
+        # Versión y valores mostrados, firmados (ver edicion.py)
+        'original': edicion.firmar(proveedor, CAMPOS_PROVEEDOR),
+        **(extra or {}),
     }
     return render(request, 'proveedores/actualizar_proveedor.html', contexto)
 
@@ -83,27 +125,27 @@ def realizar_actualizacion_proveedor(request):
     Se accede a esta vista mediante POST desde 'actualizar_proveedor.html'.
     """
     if request.method == 'POST':
-        # Obtenemos el ID del proveedor a actualizar
-        id_proveedor = request.POST.get('id_proveedor')
-        
         try:
-            # Buscamos el proveedor
-            proveedor = Proveedores.objects.get(id=id_proveedor)
-            
-            # Actualizamos los datos
-            proveedor.nombre_proveedor = request.POST.get('nombre_proveedor')
-            proveedor.telefono_contacto = request.POST.get('telefono_contacto')
-            proveedor.email_contacto = request.POST.get('email_contacto')
-            proveedor.direccion = request.POST.get('direccion')
-            proveedor.tipo_producto = request.POST.get('tipo_producto')
-            proveedor.rfc = request.POST.get('rfc')
-            
-            # Guardamos los cambios
-            proveedor.save()
+            # Sólo los campos que cambiaron respecto a lo que se mostró
+            cambio = edicion.Edicion(Proveedores, CAMPOS_PROVEEDOR, request.POST)
+        except edicion.EdicionInvalida as e:
+            return HttpResponse(str(e), status=400)
 
+        try:
+            with transaction.atomic(using=router.db_for_write(Proveedores)):
+                # Un solo UPDATE ... WHERE id = %s AND version = %s
+                if cambio.guardar() and {'nombre_proveedor', 'rfc'} & cambio.cambios.keys():
+                    busqueda.indexar(Proveedores, [cambio.id])
+        except edicion.Conflicto as e:
+            return _rechazar_edicion(request, actualizar_proveedor, cambio.id, str(e), 409,
+                                     _cambios_para_mostrar(Proveedores, cambio.cambios))
+        except IntegrityError:
+            return _rechazar_edicion(request, actualizar_proveedor, cambio.id,
+                                     "Ya existe un proveedor con ese nombre o RFC.", 400,
+                                     _cambios_para_mostrar(Proveedores, cambio.cambios))
         except Proveedores.DoesNotExist:
-            # (Manejo de error simple, solo volvemos)
-            pass 
+            # (Lo borraron mientras se editaba, solo volvemos)
+            pass
         
         # Redirigimos a la lista de proveedores
         return redirect('ver_proveedores')
@@ -126,7 +168,6 @@ def borrar_proveedor(request, id):
     # Si es GET, mostramos la página de confirmación
     contexto = {
         'proveedor': proveedor,
-        'fecha_actual': datetime.date.today(),
     }
     return render(request, 'proveedores/borrar_proveedor.html', contexto)
 
@@ -135,21 +176,27 @@ def borrar_proveedor(request, id):
 # VISTAS: INVENTARIO (¡NUEVO!)
 # ==========================================
 
-def ver_inventario(request):
+async def ver_inventario(request):
     """
-    Vista para mostrar todos los artículos del inventario.
+    Vista para mostrar los artículos del inventario, paginados por cursor.
+    Acepta ?proveedor=, ?unidad=, ?stock_bajo=, ?orden= y los cursores.
     """
-    # Obtenemos todos los artículos
-    articulos = Inventario.objects.all()
+    # Obtenemos sólo la página pedida (no toda la tabla)
+    pagina = await LISTADO_INVENTARIO.apaginar(request.GET)
     
     # Obtenemos todos los proveedores (para el formulario de filtro, aunque no se pidió,
-    # es útil para el <select> al agregar/actualizar)
-    proveedores = Proveedores.objects.filter(activo=True)
+    # es útil para el <select> al agregar/actualizar). En una vista async la
+    # consulta se ejecuta aquí: la plantilla no puede usar el ORM.
+    proveedores = [
+        p async for p in Proveedores.objects.filter(activo=True).only('id', 'nombre_proveedor').aiterator()
+    ]
     
     contexto = {
-        'articulos': articulos,
+        'articulos': pagina,
+        'pagina': pagina,
         'proveedores': proveedores,
-        'fecha_actual': datetime.date.today(),
+        # Claves de la caché de la tabla y de cada renglón
+        **fragmentos.preparar(pagina),
     }
     return render(request, 'inventario/ver_inventario.html', contexto)
 
@@ -200,11 +247,10 @@ def agregar_inventario(request):
     # Si es GET, solo mostramos el formulario
     contexto = {
         'proveedores': proveedores,
-        'fecha_actual': datetime.date.today(),
     }
     return render(request, 'inventario/agregar_inventario.html', contexto)
 
-def actualizar_inventario(request, id):
+def actualizar_inventario(request, id, extra=None):
     """
     Vista para mostrar el formulario con los datos de un artículo específico
     que se desea actualizar.
@@ -217,7 +263,9 @@ def actualizar_inventario(request, id):
     contexto = {
         'articulo': articulo,
         'proveedores': proveedores,
-        'fecha_actual': datetime.date.today(),
+        # Versión y valores mostrados, firmados (ver edicion.py)
+        'original': edicion.firmar(articulo, CAMPOS_INVENTARIO),
+        **(extra or {}),
     }
     return render(request, 'inventario/actualizar_inventario.html', contexto)
 
@@ -227,40 +275,44 @@ def realizar_actualizacion_inventario(request):
     Se accede a esta vista mediante POST desde 'actualizar_inventario.html'.
     """
     if request.method == 'POST':
-        # Obtenemos el ID del artículo a actualizar
-        id_articulo = request.POST.get('id_articulo')
-        
         try:
-            # Buscamos el artículo
-            articulo = Inventario.objects.get(id=id_articulo)
-            
-            # Actualizamos los datos
-            articulo.nombre_articulo = request.POST.get('nombre_articulo')
-            articulo.stock = request.POST.get('stock', 0.0)
-            articulo.unidad = request.POST.get('unidad')
-            articulo.stock_minimo = request.POST.get('stock_minimo', 0.0)
-            articulo.costo_unitario = request.POST.get('costo_unitario', 0.0)
-            
-            # Manejamos la fecha
-            fecha_compra = request.POST.get('fecha_ultima_compra')
-            articulo.fecha_ultima_compra = fecha_compra if fecha_compra else None
-            
-            # Manejamos el proveedor
-            id_proveedor = request.POST.get('proveedor')
-            if id_proveedor:
-                try:
-                    articulo.proveedor = Proveedores.objects.get(id=id_proveedor)
-                except Proveedores.DoesNotExist:
-                    articulo.proveedor = None
-            else:
-                articulo.proveedor = None
-            
-            # Guardamos los cambios
-            articulo.save()
+            # Sólo los campos que cambiaron respecto a lo que se mostró
+            cambio = edicion.Edicion(Inventario, CAMPOS_INVENTARIO, request.POST)
+        except edicion.EdicionInvalida as e:
+            return HttpResponse(str(e), status=400)
+
+        cambios = cambio.cambios
+        # El stock se escribe como diferencia sobre el valor actual: las
+        # ventas registradas mientras se editaba (que no cambian la versión)
+        # no se pierden
+        expresiones = {}
+        ajuste = None
+        if 'stock' in cambios:
+            ajuste = cambios['stock'] - cambio.originales['stock']
+            expresiones['stock'] = F('stock') + ajuste
 
+        try:
+            with transaction.atomic(using=router.db_for_write(Inventario)):
+                # Un solo UPDATE ... WHERE id = %s AND version = %s
+                if cambio.guardar(**expresiones):
+                    # update() no envía señales: bitácora, costos e índice aquí
+                    if ajuste:
+                        movimientos.registrar({cambio.id: ajuste}, MovimientoInventario.AJUSTE)
+                        disponibilidad.por_ajustes({cambio.id: ajuste})
+                    if 'costo_unitario' in cambios:
+                        recalcular_por_articulos([cambio.id])
+                    if 'nombre_articulo' in cambios:
+                        busqueda.indexar(Inventario, [cambio.id])
+        except edicion.Conflicto as e:
+            return _rechazar_edicion(request, actualizar_inventario, cambio.id, str(e), 409,
+                                     _cambios_para_mostrar(Inventario, cambios))
+        except IntegrityError:
+            return _rechazar_edicion(request, actualizar_inventario, cambio.id,
+                                     "El proveedor seleccionado ya no existe.", 400,
+                                     _cambios_para_mostrar(Inventario, cambios))
         except Inventario.DoesNotExist:
-            # (Manejo de error simple, solo volvemos)
-            pass 
+            # (Lo borraron mientras se editaba, solo volvemos)
+            pass
         
         # Redirigimos a la lista de inventario
         return redirect('ver_inventario')
@@ -283,26 +335,98 @@ def borrar_inventario(request, id):
     # Si es GET, mostramos la página de confirmación
     contexto = {
         'articulo': articulo,
-        'fecha_actual': datetime.date.today(),
     }
     return render(request, 'inventario/borrar_inventario.html', contexto)
 
+def comprar_inventario(request, id):
+    """
+    Registra la compra de un artículo: suma la cantidad al stock, actualiza
+    la fecha de última compra y deja un movimiento COMPRA en la bitácora
+    (el formulario de actualización registra un AJUSTE).
+    """
+    articulo = get_object_or_404(Inventario, id=id)
+    contexto = {'articulo': articulo, 'hoy': timezone.localdate()}
+
+    if request.method == 'POST':
+        fecha = request.POST.get('fecha', '').strip()
+        # Para volver a mostrar lo capturado si hay un error
+        contexto.update(cantidad=request.POST.get('cantidad', ''), fecha=fecha)
+        try:
+            cantidad = Decimal(request.POST.get('cantidad', '').strip())
+        except ArithmeticError:
+            cantidad = None
+        try:
+            dia = parse_date(fecha) if fecha else contexto['hoy']
+        except ValueError:
+            dia = None
+        if cantidad is None or not cantidad.is_finite() or cantidad <= 0:
+            contexto['error'] = "La cantidad comprada debe ser un número mayor que cero."
+        elif dia is None or dia > contexto['hoy']:
+            contexto['error'] = "La fecha de compra no es válida."
+        else:
+            # Una compra de otro día queda a la hora actual de ese día
+            momento = timezone.now() if dia == contexto['hoy'] else timezone.make_aware(
+                datetime.combine(dia, timezone.localtime().time())
+            )
+            try:
+                movimientos.registrar_compra(articulo.id, cantidad, momento)
+            except Inventario.DoesNotExist:
+                # (Lo borraron mientras se capturaba la compra)
+                pass
+            return redirect('ver_inventario')
+        return render(request, 'inventario/comprar_inventario.html', contexto, status=400)
+
+    return render(request, 'inventario/comprar_inventario.html', contexto)
+
+def reorden_inventario(request):
+    """
+    Tablero de reorden: resumen por proveedor de los artículos con stock por
+    debajo del mínimo. Con ?proveedor=<id> (0 = sin proveedor) muestra el
+    detalle de ese proveedor con las cantidades sugeridas.
+    """
+    proveedor = request.GET.get('proveedor', '')
+    resumen = resumen_reorden()
+    grupos = sugerencias_reorden(int(proveedor)) if proveedor.isdigit() else []
+
+    contexto = {
+        'resumen': resumen,
+        'grupos': grupos,
+        'total_articulos': sum(r['articulos'] for r in resumen),
+        'total_costo': sum((r['costo'] for r in resumen), Decimal('0')),
+    }
+    return render(request, 'inventario/reorden.html', contexto)
+
 # ==========================================
 # VISTAS: MENÚ (¡NUEVO!)
 # ==========================================
 
-def ver_menu(request):
+@cache_control(max_age=0, must_revalidate=True)
+@condition(etag_func=cache_menu.etag_menu, last_modified_func=cache_menu.last_modified_menu)
+async def ver_menu(request):
     """
-    Vista para mostrar todos los productos del menú.
+    Vista para mostrar los productos del menú, paginados por cursor.
+    Acepta ?categoria=, ?disponible=, ?orden= y los cursores.
+
+    Es la página más visitada y el menú cambia pocas veces al día, así que
+    la página (consulta y HTML) se guarda en caché por versión del menú, y
+    @condition responde 304 si el navegador ya tiene la versión actual.
     """
-    # Obtenemos todos los productos del menú
-    productos = Menu.objects.all()
-    
-    contexto = {
-        'productos': productos,
-        'fecha_actual': datetime.date.today(),
-    }
-    return render(request, 'menu/ver_menu.html', contexto)
+    version = await cache_menu.aversion_menu()
+
+    async def construir_html():
+        # Obtenemos sólo la página pedida del menú
+        pagina = await cache_menu.aobtener(
+            'pagina', request.GET, lambda: LISTADO_MENU.apaginar(request.GET), version
+        )
+        contexto = {
+            'productos': pagina,
+            'pagina': pagina,
+            # Claves de la caché de la tabla y de cada renglón
+            **fragmentos.preparar(pagina),
+        }
+        return render(request, 'menu/ver_menu.html', contexto).content
+
+    return HttpResponse(await cache_menu.aobtener('html', request.GET, construir_html, version))
 
 def agregar_menu(request):
     """
@@ -310,7 +434,7 @@ def agregar_menu(request):
     para procesar la adición de un nuevo producto al menú.
     """
     # Obtenemos todos los artículos de inventario para el <select>
-    articulos_inventario = Inventario.objects.all()
+    articulos_inventario = Inventario.objects.only('id', 'nombre_articulo', 'stock', 'unidad')
     
     if request.method == 'POST':
         # Capturamos los datos del formulario
@@ -319,7 +443,7 @@ def agregar_menu(request):
         precio = request.POST.get('precio', 0.0)
         categoria = request.POST.get('categoria')
         tamaño = request.POST.get('tamaño')
-        disponible = 'disponible' in request.POST # Checkbox
+        habilitado = 'habilitado' in request.POST # Checkbox
 
         # 1. Creamos el objeto Menu con los datos simples
         nuevo_producto = Menu.objects.create(
@@ -328,7 +452,7 @@ def agregar_menu(request):
             precio=precio,
             categoria=categoria,
             tamaño=tamaño,
-            disponible=disponible
+            habilitado=habilitado
         )
 
         # 2. Obtenemos la lista de IDs de los artículos seleccionados
@@ -344,24 +468,30 @@ def agregar_menu(request):
     # Si es GET, solo mostramos el formulario
     contexto = {
         'articulos_inventario': articulos_inventario,
-        'fecha_actual': datetime.date.today(),
     }
     return render(request, 'menu/agregar_menu.html', contexto)
 
-def actualizar_menu(request, id):
+def actualizar_menu(request, id, extra=None):
     """
     Vista para mostrar el formulario con los datos de un producto específico
     que se desea actualizar.
     """
     # Obtenemos el producto específico
     producto = get_object_or_404(Menu, id=id)
-    # Obtenemos todos los artículos para el <select>
-    articulos_inventario = Inventario.objects.all()
+    # Obtenemos todos los artículos para el <select> (sólo las columnas que se muestran)
+    articulos_inventario = Inventario.objects.only('id', 'nombre_articulo', 'stock', 'unidad')
+    # IDs ya asignados al producto, en una sola consulta. El template pregunta
+    # "art.id in articulos_seleccionados" contra este set en lugar de
+    # consultar producto.articulos.all por cada <option>.
+    articulos_seleccionados = set(producto.articulos.values_list('id', flat=True))
     
     contexto = {
         'producto': producto,
         'articulos_inventario': articulos_inventario,
-        'fecha_actual': datetime.date.today(),
+        'articulos_seleccionados': articulos_seleccionados,
+        # Versión y valores mostrados (también los artículos), firmados (ver edicion.py)
+        'original': edicion.firmar(producto, CAMPOS_MENU, articulos=sorted(articulos_seleccionados)),
+        **(extra or {}),
     }
     return render(request, 'menu/actualizar_menu.html', contexto)
 
@@ -370,29 +500,47 @@ def realizar_actualizacion_menu(request):
     Vista para procesar la actualización de un producto del menú.
     """
     if request.method == 'POST':
-        # Obtenemos el ID del producto a actualizar
-        id_producto = request.POST.get('id_producto')
-        
         try:
-            # Buscamos el producto
-            producto = Menu.objects.get(id=id_producto)
-            
-            # 1. Actualizamos los datos simples
-            producto.nombre = request.POST.get('nombre')
-            producto.descripcion = request.POST.get('descripcion')
-            producto.precio = request.POST.get('precio', 0.0)
-            producto.categoria = request.POST.get('categoria')
-            producto.tamaño = request.POST.get('tamaño')
-            producto.disponible = 'disponible' in request.POST # Checkbox
-            
-            producto.save() # Guardamos los campos simples
+            # Sólo los campos que cambiaron respecto a lo que se mostró
+            cambio = edicion.Edicion(Menu, CAMPOS_MENU, request.POST)
+            articulos_ids = {int(i) for i in request.POST.getlist('articulos')}
+        except (edicion.EdicionInvalida, ValueError) as e:
+            return HttpResponse(str(e), status=400)
 
-            # 2. Actualizamos la relación ManyToMany
-            articulos_ids = request.POST.getlist('articulos')
-            producto.articulos.set(articulos_ids)
+        # La relación ManyToMany también como diferencia contra lo mostrado
+        anteriores = set(cambio.original.get('articulos', []))
+        quitar = anteriores - articulos_ids
+        agregar = articulos_ids - anteriores
 
+        try:
+            with transaction.atomic(using=router.db_for_write(Menu)), recalculo_agrupado():
+                # 1. Un solo UPDATE ... WHERE id = %s AND version = %s; si sólo
+                #    cambiaron los artículos también sube la versión
+                if cambio.guardar(forzar=bool(quitar or agregar)):
+                    # update() no envía señales: caché e índice aquí
+                    cache_menu.invalidar_menu()
+                    if {'nombre', 'categoria'} & cambio.cambios.keys():
+                        busqueda.indexar(Menu, [cambio.id])
+                    if 'habilitado' in cambio.cambios:
+                        disponibilidad.actualizar_disponibilidad([cambio.id])
+                # 2. Sólo los artículos quitados y agregados (sus señales
+                #    recalculan el costo de la receta e invalidan la caché)
+                articulos = Menu(pk=cambio.id).articulos
+                if quitar:
+                    articulos.remove(*quitar)
+                if agregar:
+                    articulos.add(*agregar)
+        except edicion.Conflicto as e:
+            intentados = _cambios_para_mostrar(Menu, cambio.cambios)
+            if quitar or agregar:
+                intentados.append((Menu._meta.get_field('articulos').verbose_name, "(cambios en la receta)"))
+            return _rechazar_edicion(request, actualizar_menu, cambio.id, str(e), 409, intentados)
+        except IntegrityError:
+            return _rechazar_edicion(request, actualizar_menu, cambio.id,
+                                     "Alguno de los artículos seleccionados ya no existe.", 400,
+                                     _cambios_para_mostrar(Menu, cambio.cambios))
         except Menu.DoesNotExist:
-            pass 
+            pass
         
         # Redirigimos a la lista de menú
         return redirect('ver_menu')
@@ -415,6 +563,272 @@ def borrar_menu(request, id):
     # Si es GET, mostramos la página de confirmación
     contexto = {
         'producto': producto,
-        'fecha_actual': datetime.date.today(),
     }
-    return render(request, 'menu/borrar_menu.html', contexto)
\ No newline at end of file
+    return render(request, 'menu/borrar_menu.html', contexto)
+
+# ==========================================
+# VISTAS: PEDIDOS (¡NUEVO!)
+# ==========================================
+
+def ver_pedidos(request):
+    """
+    Vista para mostrar los pedidos, del más reciente al más antiguo.
+    Acepta ?estado= y los cursores ?despues= / ?antes=.
+    """
+    pagina = LISTADO_PEDIDOS.paginar(request.GET)
+
+    contexto = {
+        'pedidos': pagina,
+        'pagina': pagina,
+    }
+    return render(request, 'pedidos/ver_pedidos.html', contexto)
+
+def agregar_pedido(request):
+    """
+    Vista para mostrar el formulario de pedido y para registrarlo.
+    Cada producto disponible tiene un campo 'cantidad_<id>'; al registrar
+    se descuenta del inventario lo que indica la receta de cada producto.
+    """
+    # Sólo se pueden vender productos disponibles
+    productos = Menu.objects.filter(disponible=True).only('id', 'nombre', 'precio', 'tamaño')
+    error = None
+
+    if request.method == 'POST':
+        # Capturamos las cantidades de cada producto
+        lineas = []
+        for clave, valor in request.POST.items():
+            if clave.startswith('cantidad_') and valor.strip():
+                try:
+                    lineas.append((int(clave[len('cantidad_'):]), int(valor)))
+                except ValueError:
+                    continue
+
+        try:
+            registrar_pedido(lineas, cliente=request.POST.get('cliente'))
+        except PedidoInvalido as e:
+            # Si no se pudo surtir, mostramos el formulario con el error
+            error = str(e)
+        else:
+            # Redirigimos a la lista de pedidos
+            return redirect('ver_pedidos')
+
+    contexto = {
+        'productos': productos,
+        'error': error,
+    }
+    return render(request, 'pedidos/agregar_pedido.html', contexto)
+
+def ver_cocina(request):
+    """
+    Pantalla de cocina: pedidos pendientes y en preparación. La página
+    sólo trae el JavaScript; los datos llegan por /eventos/cocina/ (ver eventos.py).
+    """
+    return render(request, 'pedidos/cocina.html')
+
+# ==========================================
+# VISTAS: IMPORTAR / EXPORTAR (¡NUEVO!)
+# ==========================================
+
+# Modelo de la URL -> (título, URL de su lista)
+MODELOS_INTERCAMBIO = {
+    'proveedores': ('Proveedores', 'ver_proveedores'),
+    'inventario': ('Inventario', 'ver_inventario'),
+    'menu': ('Menú', 'ver_menu'),
+}
+
+def importar_datos(request, modelo):
+    """
+    Vista para subir un archivo CSV o JSON Lines y guardarlo por lotes.
+    Las filas existentes se actualizan (upsert) y las nuevas se crean.
+    La importación corre en segundo plano: la vista guarda el archivo, lo
+    encola (ver trabajos.py) y redirige a la página del trabajo.
+    """
+    if modelo not in MODELOS_INTERCAMBIO:
+        raise Http404("Modelo no soportado")
+    titulo, url_lista = MODELOS_INTERCAMBIO[modelo]
+    error = None
+
+    if request.method == 'POST':
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            error = "Selecciona un archivo."
+        else:
+            try:
+                formato = intercambio.detectar_formato(archivo.name, request.POST.get('formato'))
+            except intercambio.ErrorImportacion as e:
+                error = str(e)
+            else:
+                trabajo = trabajos.encolar(
+                    'importar', modelo=modelo, formato=formato,
+                    archivo=trabajos.guardar_archivo(archivo), nombre_archivo=archivo.name,
+                )
+                return redirect('ver_trabajo', id=trabajo.id)
+
+    contexto = {
+        'modelo': modelo,
+        'titulo': titulo,
+        'url_lista': url_lista,
+        'columnas': intercambio.COLUMNAS[modelo],
+        'error': error,
+    }
+    return render(request, 'intercambio/importar.html', contexto)
+
+def exportar_datos(request, modelo):
+    """
+    Vista para descargar todas las filas de un modelo (?formato=csv|json).
+    La respuesta se genera por partes, sin cargar la tabla en memoria (y
+    con la sucursal de la petición, ver sucursales.en_la_sucursal).
+    """
+    if modelo not in MODELOS_INTERCAMBIO:
+        raise Http404("Modelo no soportado")
+    formato = request.GET.get('formato', 'csv')
+    if formato not in intercambio.FORMATOS:
+        raise Http404("Formato no soportado")
+
+    tipo = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    extension = 'csv' if formato == 'csv' else 'jsonl'
+    respuesta = StreamingHttpResponse(
+        sucursales.en_la_sucursal(intercambio.exportar(modelo, formato)),
+        content_type=f'{tipo}; charset=utf-8',
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="{modelo}.{extension}"'
+    return respuesta
+
+# ==========================================
+# VISTAS: TRABAJOS EN SEGUNDO PLANO (ver trabajos.py)
+# ==========================================
+
+def _titulo_trabajo(trabajo):
+    tipo = trabajos.TIPOS.get(trabajo.tipo)
+    return tipo.titulo if tipo else trabajo.tipo
+
+def ver_trabajos(request):
+    """
+    Vista con los trabajos más recientes y los botones para encolar los de
+    mantenimiento (recalcular costos, reconstruir la búsqueda...).
+    """
+    recientes = Trabajo.objects.order_by('-id')[:50]
+    contexto = {
+        'trabajos': [(t, _titulo_trabajo(t)) for t in recientes],
+        'mantenimiento': trabajos.de_mantenimiento(),
+    }
+    return render(request, 'trabajos/ver_trabajos.html', contexto)
+
+def encolar_trabajo(request, tipo):
+    """
+    Vista para encolar un trabajo de mantenimiento (POST). Si ya hay uno
+    igual esperando no se agrega otro: se muestra ése.
+    """
+    if tipo not in {t.nombre for t in trabajos.de_mantenimiento()}:
+        raise Http404("Trabajo no soportado")
+    if request.method != 'POST':
+        return redirect('ver_trabajos')
+    trabajo = trabajos.encolar(tipo, clave=tipo)
+    return redirect('ver_trabajo', id=trabajo.id)
+
+def ver_trabajo(request, id):
+    """
+    Vista con el estado, el avance y el resultado de un trabajo; se recarga
+    sola mientras no termina. Con ?formato=json regresa lo mismo en JSON.
+    """
+    trabajo = get_object_or_404(Trabajo, id=id)
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'id': trabajo.id,
+            'tipo': trabajo.tipo,
+            'estado': trabajo.estado,
+            'intentos': trabajo.intentos,
+            'avance': trabajo.avance,
+            'total': trabajo.total,
+            'resultado': trabajo.resultado,
+            'error': trabajo.error,
+        })
+
+    contexto = {
+        'trabajo': trabajo,
+        'titulo': _titulo_trabajo(trabajo),
+    }
+    if trabajo.tipo == 'importar':
+        modelo = trabajo.parametros.get('modelo')
+        contexto['modelo'] = modelo
+        contexto['url_lista'] = MODELOS_INTERCAMBIO.get(modelo, (None, 'inicio_pizzeria'))[1]
+    return render(request, 'trabajos/ver_trabajo.html', contexto)
+
+# ==========================================
+# VISTAS: REPORTES DE VENTAS (ver reportes.py)
+# ==========================================
+
+REPORTES = {
+    'categorias': "Ventas por categoría",
+    'productos': "Productos más vendidos",
+    'proveedores': "Consumo por proveedor",
+}
+# Renglones que muestra la página; el CSV los trae todos
+FILAS_POR_REPORTE = 500
+
+def _fecha_reporte(request, nombre, por_defecto):
+    texto = request.GET.get(nombre)
+    if not texto:
+        return por_defecto
+    try:
+        fecha = parse_date(texto)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValueError(f"Fecha inválida en '{nombre}': {texto} (use AAAA-MM-DD).")
+    return fecha
+
+def ver_reporte(request, reporte='categorias'):
+    """
+    Vista de un reporte de ventas entre ?desde y ?hasta (AAAA-MM-DD, por
+    defecto los últimos 30 días), leído sólo de los resúmenes. Las ventas
+    por categoría se agrupan con ?por=dia|hora|total y los productos más
+    vendidos se limitan con ?limite. Con ?formato=csv se descarga por partes.
+    """
+    if reporte not in REPORTES:
+        raise Http404("Reporte no soportado")
+    hoy = timezone.localdate()
+    por = request.GET.get('por', 'dia')
+    try:
+        desde = _fecha_reporte(request, 'desde', hoy - timedelta(days=29))
+        hasta = _fecha_reporte(request, 'hasta', hoy)
+        limite = int(request.GET.get('limite', 20))
+        if desde > hasta:
+            raise ValueError("'desde' no puede ser posterior a 'hasta'.")
+        if por not in reportes.PERIODOS:
+            raise ValueError(f"'por' debe ser uno de: {', '.join(reportes.PERIODOS)}.")
+        if not 1 <= limite <= 1000:
+            raise ValueError("'limite' debe estar entre 1 y 1000.")
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+
+    if reporte == 'categorias':
+        columnas, filas = reportes.ventas_por_categoria(desde, hasta, por)
+    elif reporte == 'productos':
+        columnas, filas = reportes.productos_mas_vendidos(desde, hasta, limite)
+    else:
+        columnas, filas = reportes.consumo_por_proveedor(desde, hasta)
+
+    if request.GET.get('formato') == 'csv':
+        respuesta = StreamingHttpResponse(
+            sucursales.en_la_sucursal(reportes.a_csv(columnas, filas)),
+            content_type='text/csv; charset=utf-8',
+        )
+        respuesta['Content-Disposition'] = f'attachment; filename="{reporte}_{desde}_{hasta}.csv"'
+        return respuesta
+
+    filas = list(islice(filas, FILAS_POR_REPORTE + 1))
+    contexto = {
+        'reporte': reporte,
+        'titulo': REPORTES[reporte],
+        'reportes': REPORTES.items(),
+        'columnas': columnas,
+        'filas': filas[:FILAS_POR_REPORTE],
+        'recortado': len(filas) > FILAS_POR_REPORTE,
+        'desde': desde,
+        'hasta': hasta,
+        'por': por,
+        'limite': limite,
+        'parametros': request.GET.urlencode(),
+    }
+    return render(request, 'reportes/ver_reporte.html', contexto)
@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_Pizzeria.settings')
 
 application = get_asgi_application()
+
+# Las pantallas de cocina (GET /eventos/cocina/) se atienden antes del manejador
+# de Django para que cada conexión abierta no ocupe un hilo (ver
+# app_Pizzeria/eventos.py). Se importa después de get_asgi_application(),
+# que carga las apps.
+from app_Pizzeria.eventos import con_eventos  # noqa: E402
+
+application = con_eventos(application)
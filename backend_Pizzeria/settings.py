@@ -21,12 +21,16 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-z(y1b@t_8_!bky-m$!0_qf352(m+b!yq4-@x=f!e7(u*k^m#0c'
+SECRET_KEY = os.environ.get(
+    'PIZZERIA_SECRET_KEY',
+    'django-insecure-z(y1b@t_8_!bky-m$!0_qf352(m+b!yq4-@x=f!e7(u*k^m#0c',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# PIZZERIA_DEBUG=0 para producción (con DEBUG Django guarda cada consulta en memoria)
+DEBUG = os.environ.get('PIZZERIA_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [h for h in os.environ.get('PIZZERIA_ALLOWED_HOSTS', '').split(',') if h]
 
 
 # Application definition
@@ -42,9 +46,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que la latencia medida incluya a todos los demás
+    'app_Pizzeria.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    # Sucursal de la petición (?sucursal=, X-Sucursal o cookie)
+    'app_Pizzeria.sucursales.SucursalMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -55,17 +63,26 @@ ROOT_URLCONF = 'backend_Pizzeria.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render (metricas.py)
+        'BACKEND': 'app_Pizzeria.metricas.PlantillasMedidas',
         'DIRS': [
             os.path.join(BASE_DIR, 'app_Pizzeria', 'templates'), # <-- PASO 25
         ],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Cada plantilla se lee y se compila una sola vez por proceso
+            # (también con DEBUG: Django la vuelve a leer si el archivo cambia)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'app_Pizzeria.contexto.fecha_actual',
             ],
         },
     },
@@ -77,11 +94,187 @@ WSGI_APPLICATION = 'backend_Pizzeria.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# PIZZERIA_DB=sqlite (por defecto) o postgres.
+#
+# SQLite con varios workers (gunicorn -w N) necesita:
+#   - journal_mode=WAL: los lectores no bloquean al escritor ni viceversa.
+#   - transaction_mode IMMEDIATE: la transacción toma el candado de escritura
+#     al empezar. Con DEFERRED dos transacciones que leen y luego escriben se
+#     bloquean entre sí y una falla al instante con "database is locked".
+#   - timeout: cuánto espera una escritura su turno antes de fallar.
+#   - synchronous=NORMAL: con WAL es seguro ante fallas del proceso y evita
+#     un fsync por cada commit.
+# Los PRAGMA se aplican en cada conexión nueva (ver signals.py).
+# PIZZERIA_SQLITE_CONCURRENCIA=0 regresa a la configuración por defecto de Django.
+
+PIZZERIA_DB = os.environ.get('PIZZERIA_DB', 'sqlite')
+
+# Segundos que se reutiliza una conexión (0 = una conexión por petición)
+CONN_MAX_AGE = int(os.environ.get('PIZZERIA_CONN_MAX_AGE', '60'))
+
+if PIZZERIA_DB == 'postgres':
+    # Con pool (psycopg[pool]) las conexiones se reparten entre los hilos del
+    # worker; Django exige CONN_MAX_AGE = 0 cuando se usa pool.
+    usar_pool = os.environ.get('PIZZERIA_PG_POOL', '1') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('PIZZERIA_DB_NAME', 'pizzeria'),
+            'USER': os.environ.get('PIZZERIA_DB_USER', 'pizzeria'),
+            'PASSWORD': os.environ.get('PIZZERIA_DB_PASSWORD', ''),
+            'HOST': os.environ.get('PIZZERIA_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('PIZZERIA_DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if usar_pool else CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': not usar_pool,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('PIZZERIA_PG_POOL_MIN', '2')),
+                    'max_size': int(os.environ.get('PIZZERIA_PG_POOL_MAX', '10')),
+                    'timeout': 10,
+                },
+            } if usar_pool else {},
+        }
+    }
+else:
+    SQLITE_CONCURRENCIA = os.environ.get('PIZZERIA_SQLITE_CONCURRENCIA', '1') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('PIZZERIA_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': CONN_MAX_AGE if SQLITE_CONCURRENCIA else 0,
+            'CONN_HEALTH_CHECKS': SQLITE_CONCURRENCIA,
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            } if SQLITE_CONCURRENCIA else {},
+        }
+    }
+
+# PRAGMA que se ejecutan al abrir cada conexión SQLite
+SQLITE_PRAGMAS = [
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'busy_timeout=20000',
+    'cache_size=-20000',    # 20 MB de caché de páginas por conexión
+    'temp_store=MEMORY',
+    'mmap_size=268435456',  # 256 MB
+] if PIZZERIA_DB != 'postgres' and SQLITE_CONCURRENCIA else []
+
+# Sucursales (ver app_Pizzeria/sucursales.py)
+# PIZZERIA_SUCURSAL: clave de la sucursal de las peticiones que no indican
+# ninguna. PIZZERIA_SUCURSALES_BD=centro,norte (sólo SQLite): esas sucursales
+# guardan sus datos en su propio archivo (db_sucursal_centro.sqlite3...) con
+# el alias sucursal_<clave>; se crean con `migrate --database sucursal_centro`.
+
+SUCURSAL_PREDETERMINADA = os.environ.get('PIZZERIA_SUCURSAL', 'principal')
+
+SUCURSALES_BD = {
+    clave: f'sucursal_{clave}'
+    for clave in os.environ.get('PIZZERIA_SUCURSALES_BD', '').split(',') if clave
+} if PIZZERIA_DB != 'postgres' else {}
+
+for _clave, _alias in SUCURSALES_BD.items():
+    DATABASES[_alias] = {**DATABASES['default'], 'NAME': BASE_DIR / f'db_{_alias}.sqlite3'}
+
+DATABASE_ROUTERS = ['app_Pizzeria.sucursales.RouterSucursales']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# PIZZERIA_CACHE=memoria (por defecto): caché local de cada proceso.
+# PIZZERIA_CACHE=archivo: caché en disco compartida por todos los workers
+# (gunicorn -w N) y el trabajador de la cola, necesaria para que la
+# invalidación del menú llegue a todos (`trabajador` no arranca sin ella).
+
+if os.environ.get('PIZZERIA_CACHE', 'memoria') == 'archivo':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('PIZZERIA_CACHE_DIR', str(BASE_DIR / 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'pizzeria',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
     }
+
+# Fragmentos de plantilla ({% cache %}, ver app_Pizzeria/fragmentos.py). Sus
+# claves cambian con los datos y nunca hay que invalidarlas, así que basta una
+# caché local por proceso, aparte para no desplazar las páginas del menú.
+# FRAGMENTOS_SEGUNDOS sólo limita cuánto ocupan las versiones viejas.
+
+CACHES['template_fragments'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'pizzeria-fragmentos',
+    'OPTIONS': {'MAX_ENTRIES': 50000},
+}
+
+FRAGMENTOS_SEGUNDOS = int(os.environ.get('PIZZERIA_FRAGMENTOS_SEGUNDOS', '3600'))
+
+# Pantallas de cocina (GET /eventos/cocina/, ver app_Pizzeria/eventos.py)
+# EVENTOS_BUFFER: eventos que se guardan por conexión antes de descartarlos y
+# mandarle el estado completo. EVENTOS_LATIDO: segundos sin eventos tras los
+# que se manda un comentario para que los proxies no cierren la conexión.
+# Con varios procesos, PIZZERIA_EVENTOS_BROKER es el socket Unix del broker
+# (python manage.py broker_eventos) por el que se reparten los eventos.
+
+EVENTOS_BUFFER = int(os.environ.get('PIZZERIA_EVENTOS_BUFFER', '64'))
+EVENTOS_LATIDO = float(os.environ.get('PIZZERIA_EVENTOS_LATIDO', '15'))
+EVENTOS_BROKER = os.environ.get('PIZZERIA_EVENTOS_BROKER', '')
+
+# Terminales sin conexión (GET /api/cambios/, ver app_Pizzeria/sincronizacion.py)
+# Las lápidas (objetos borrados) de la bitácora de cambios se guardan
+# PIZZERIA_SINCRONIZACION_DIAS días (comando compactar_cambios): una terminal
+# que estuvo desconectada más tiempo descarga todo de nuevo.
+
+SINCRONIZACION_DIAS = int(os.environ.get('PIZZERIA_SINCRONIZACION_DIAS', '30'))
+
+# Trabajos en segundo plano (ver app_Pizzeria/trabajos.py), que atiende
+# `python manage.py trabajador`. PIZZERIA_TRABAJOS_DIR: carpeta de los archivos
+# subidos que esperan su importación (la misma para la web y los
+# trabajadores). PIZZERIA_TRABAJOS_ESPERA: segundos entre consultas a la cola
+# vacía. PIZZERIA_TRABAJOS_REINTENTO: espera antes del primer reintento (se
+# duplica en cada uno). PIZZERIA_TRABAJOS_VENCIMIENTO: segundos sin latido tras
+# los que un trabajo en curso vuelve a la cola. Los terminados se borran a los
+# PIZZERIA_TRABAJOS_DIAS días.
+
+TRABAJOS_DIR = os.environ.get('PIZZERIA_TRABAJOS_DIR', str(BASE_DIR / 'trabajos'))
+TRABAJOS_ESPERA = float(os.environ.get('PIZZERIA_TRABAJOS_ESPERA', '1'))
+TRABAJOS_REINTENTO = float(os.environ.get('PIZZERIA_TRABAJOS_REINTENTO', '30'))
+TRABAJOS_VENCIMIENTO = float(os.environ.get('PIZZERIA_TRABAJOS_VENCIMIENTO', '300'))
+TRABAJOS_DIAS = int(os.environ.get('PIZZERIA_TRABAJOS_DIAS', '7'))
+
+# Reportes de ventas (ver app_Pizzeria/reportes.py)
+# Las ventas por hora se guardan PIZZERIA_REPORTES_DIAS_POR_HORA días; después
+# `python manage.py resumir_ventas` (cada noche) las borra y quedan las del
+# día completo.
+
+REPORTES_DIAS_POR_HORA = int(os.environ.get('PIZZERIA_REPORTES_DIAS_POR_HORA', '35'))
+
+# Métricas (GET /metrics, ver app_Pizzeria/metricas.py)
+# Las consultas que tardan más de PIZZERIA_CONSULTA_LENTA_MS se registran en
+# el logger 'pizzeria.consultas_lentas'. Con PIZZERIA_METRICAS_TOKEN, /metrics
+# exige 'Authorization: Bearer <token>'.
+
+CONSULTA_LENTA_MS = float(os.environ.get('PIZZERIA_CONSULTA_LENTA_MS', '200'))
+METRICAS_TOKEN = os.environ.get('PIZZERIA_METRICAS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'pizzeria.consultas_lentas': {'handlers': ['consola'], 'level': 'WARNING', 'propagate': False},
+        'pizzeria.eventos': {'handlers': ['consola'], 'level': 'WARNING', 'propagate': False},
+        'pizzeria.trabajos': {'handlers': ['consola'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
 
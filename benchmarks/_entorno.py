@@ -0,0 +1,81 @@
+"""
+Utilidades compartidas por los scripts de benchmarks/.
+
+Cada benchmark trabaja sobre una base SQLite temporal (nunca sobre
+db.sqlite3), la migra y al terminar la borra.
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def preparar_django(ruta_bd=None):
+    """
+    Configura Django para usar una base temporal y la migra.
+    Regresa la ruta del archivo de la base.
+    """
+    if str(RAIZ) not in sys.path:
+        sys.path.insert(0, str(RAIZ))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_Pizzeria.settings')
+    # Sin DEBUG: Django no acumula cada consulta en connection.queries
+    os.environ.setdefault('PIZZERIA_DEBUG', '0')
+    # Sin DEBUG, ALLOWED_HOSTS vacío rechaza (400) el host del cliente de pruebas
+    os.environ.setdefault('PIZZERIA_ALLOWED_HOSTS', 'testserver,localhost')
+
+    if ruta_bd is None:
+        descriptor, ruta_bd = tempfile.mkstemp(prefix='pizzeria_bench_', suffix='.sqlite3')
+        os.close(descriptor)
+    os.environ['PIZZERIA_DB'] = 'sqlite'
+    os.environ['PIZZERIA_DB_NAME'] = ruta_bd
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return ruta_bd
+
+
+def borrar_bd(ruta_bd):
+    """Elimina la base temporal (y sus archivos -wal/-shm si existen)."""
+    from django.db import connections
+    connections.close_all()
+    for sufijo in ('', '-wal', '-shm', '-journal'):
+        try:
+            os.remove(ruta_bd + sufijo)
+        except FileNotFoundError:
+            pass
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del rango más cercano."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def imprimir_reporte(titulo, filas):
+    """Imprime [(etiqueta, valor), ...] alineado."""
+    print(f"\n== {titulo} ==")
+    ancho = max(len(etiqueta) for etiqueta, _ in filas)
+    for etiqueta, valor in filas:
+        if isinstance(valor, float):
+            valor = f"{valor:,.3f}"
+        print(f"  {etiqueta.ljust(ancho)}  {valor}")
+
+
+class Cronometro:
+    """with Cronometro() as c: ...  ->  c.segundos"""
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.segundos = time.perf_counter() - self.inicio
@@ -0,0 +1,82 @@
+"""
+Benchmark de la API JSON contra las vistas HTML.
+
+Pide la misma página (mismos filtros y tamaño) a la vista HTML y a la API,
+con y sin ?campos=, y reporta peticiones/seg y bytes transferidos (la API
+con gzip). También mide un lote de escritura de N filas.
+
+    python benchmarks/bench_api.py --articulos 10000 --peticiones 300
+"""
+import argparse
+import json
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, imprimir_reporte, Cronometro
+
+
+def medir(cliente, url, parametros, peticiones, **encabezados):
+    bytes_totales = 0
+    with Cronometro() as c:
+        for _ in range(peticiones):
+            respuesta = cliente.get(url, parametros, **encabezados)
+            assert respuesta.status_code == 200, respuesta.status_code
+            bytes_totales += len(respuesta.content)
+    return peticiones / c.segundos, bytes_totales / peticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articulos', type=int, default=10_000)
+    parser.add_argument('--peticiones', type=int, default=300)
+    parser.add_argument('--por-pagina', type=int, default=100)
+    parser.add_argument('--lote', type=int, default=500, help='filas del lote de escritura')
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.test import Client
+        from django.urls import reverse
+        from app_Pizzeria.models import Proveedores, Inventario
+
+        proveedor = Proveedores.objects.create(nombre_proveedor='Proveedor')
+        Inventario.objects.bulk_create([
+            Inventario(nombre_articulo=f'Artículo {i}', stock=Decimal(i % 50), stock_minimo=Decimal(10),
+                       costo_unitario=Decimal('12.50'), unidad='kg', proveedor=proveedor)
+            for i in range(args.articulos)
+        ], batch_size=5000)
+
+        cliente = Client()
+        parametros = {'orden': 'nombre', 'por_pagina': args.por_pagina}
+        html = medir(cliente, reverse('ver_inventario'), parametros, args.peticiones)
+        api = medir(cliente, reverse('api_listar', args=['inventario']), parametros, args.peticiones)
+        api_gzip = medir(cliente, reverse('api_listar', args=['inventario']), parametros, args.peticiones,
+                         HTTP_ACCEPT_ENCODING='gzip')
+        api_campos = medir(cliente, reverse('api_listar', args=['inventario']),
+                           {**parametros, 'campos': 'id,nombre_articulo,stock'}, args.peticiones,
+                           HTTP_ACCEPT_ENCODING='gzip')
+
+        cuerpo = json.dumps({'crear': [
+            {'nombre_articulo': f'Nuevo {i}', 'unidad': 'kg', 'stock': '1'} for i in range(args.lote)
+        ]})
+        with Cronometro() as lote:
+            respuesta = cliente.post(reverse('api_lote', args=['inventario']), cuerpo,
+                                     content_type='application/json')
+        assert respuesta.status_code == 200, respuesta.content
+
+        imprimir_reporte(f'Página de {args.por_pagina} artículos ({args.articulos:,} en total)', [
+            ('HTML peticiones/seg', html[0]),
+            ('HTML bytes/respuesta', int(html[1])),
+            ('API peticiones/seg', api[0]),
+            ('API bytes/respuesta', int(api[1])),
+            ('API gzip peticiones/seg', api_gzip[0]),
+            ('API gzip bytes/respuesta', int(api_gzip[1])),
+            ('API ?campos= peticiones/seg', api_campos[0]),
+            ('API ?campos= bytes/respuesta', int(api_campos[1])),
+            (f'lote de {args.lote} altas (ms)', lote.segundos * 1000),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Prueba de carga WSGI contra ASGI para las páginas de lectura.
+
+Levanta el proyecto con gunicorn (WSGI, hilos) y con uvicorn (ASGI) sobre la
+misma base temporal, abre N conexiones concurrentes (por defecto 1,000) que
+piden páginas sin parar durante unos segundos, y reporta peticiones/seg,
+latencia p50/p99 y errores de cada modo.
+
+    pip install gunicorn uvicorn
+    python benchmarks/bench_asgi.py --conexiones 1000 --segundos 20
+    python benchmarks/bench_asgi.py --modos asgi --ruta /api/menu/
+
+El cliente de carga usa sólo asyncio (HTTP/1.1 con keep-alive), sin
+dependencias. Si alguno de los servidores no está instalado, ese modo se omite.
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+from _entorno import RAIZ, preparar_django, borrar_bd, percentil, imprimir_reporte
+
+SERVIDORES = {
+    'wsgi': ('gunicorn', lambda puerto, args: [
+        sys.executable, '-m', 'gunicorn', 'backend_Pizzeria.wsgi:application',
+        '--bind', f'127.0.0.1:{puerto}', '--workers', str(args.procesos),
+        '--worker-class', 'gthread', '--threads', str(args.hilos),
+        '--backlog', '4096', '--log-level', 'warning',
+    ]),
+    'asgi': ('uvicorn', lambda puerto, args: [
+        sys.executable, '-m', 'uvicorn', 'backend_Pizzeria.asgi:application',
+        '--host', '127.0.0.1', '--port', str(puerto), '--workers', str(args.procesos),
+        '--backlog', '4096', '--log-level', 'warning', '--no-access-log',
+    ]),
+}
+
+
+def crear_datos(num_productos, num_articulos):
+    from app_Pizzeria.models import Proveedores, Inventario, Menu
+
+    proveedor = Proveedores.objects.create(nombre_proveedor='Proveedor')
+    Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', stock=Decimal(i % 50), unidad='kg', proveedor=proveedor)
+        for i in range(num_articulos)
+    ], batch_size=5000)
+    Menu.objects.bulk_create([
+        Menu(nombre=f'Pizza {i}', precio=Decimal('150.00'), categoria=random.choice(['Pizza', 'Bebida']))
+        for i in range(num_productos)
+    ], batch_size=5000)
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(puerto, proceso, limite=30):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            raise RuntimeError("El servidor terminó al arrancar")
+        try:
+            with socket.create_connection(('127.0.0.1', puerto), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+# ---------- Cliente HTTP mínimo ----------
+
+async def leer_respuesta(lector):
+    """Lee una respuesta HTTP/1.1; regresa (estado, conservar_conexion)."""
+    linea = await lector.readline()
+    if not linea:
+        raise ConnectionError("conexión cerrada")
+    estado = int(linea.split()[1])
+    encabezados = {}
+    while True:
+        linea = await lector.readline()
+        if linea in (b'\r\n', b''):
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        encabezados[nombre.strip().lower()] = valor.strip().lower()
+    if 'content-length' in encabezados:
+        await lector.readexactly(int(encabezados['content-length']))
+    elif encabezados.get('transfer-encoding') == 'chunked':
+        while True:
+            tamaño = int((await lector.readline()).split(b';')[0], 16)
+            await lector.readexactly(tamaño + 2)
+            if tamaño == 0:
+                break
+    return estado, encabezados.get('connection') != 'close'
+
+
+async def conexion(puerto, rutas, fin, latencias, errores):
+    lector = escritor = None
+    while time.monotonic() < fin:
+        try:
+            if escritor is None:
+                lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+            ruta = random.choice(rutas)
+            inicio = time.perf_counter()
+            escritor.write(f'GET {ruta} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+            await escritor.drain()
+            estado, conservar = await leer_respuesta(lector)
+            if estado >= 400:
+                errores.append(estado)
+            else:
+                latencias.append(time.perf_counter() - inicio)
+            if not conservar:
+                escritor.close()
+                escritor = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            errores.append(type(e).__name__)
+            if escritor is not None:
+                escritor.close()
+            escritor = None
+            await asyncio.sleep(0.05)
+    if escritor is not None:
+        escritor.close()
+
+
+async def carga(puerto, rutas, conexiones, segundos):
+    latencias, errores = [], []
+    fin = time.monotonic() + segundos
+    inicio = time.perf_counter()
+    await asyncio.gather(*[conexion(puerto, rutas, fin, latencias, errores) for _ in range(conexiones)])
+    return latencias, errores, time.perf_counter() - inicio
+
+
+def medir_modo(modo, args, rutas):
+    paquete, comando = SERVIDORES[modo]
+    if importlib.util.find_spec(paquete) is None:
+        print(f"{modo}: '{paquete}' no está instalado, se omite")
+        return None
+    puerto = puerto_libre()
+    proceso = subprocess.Popen(comando(puerto, args), cwd=RAIZ, env=os.environ.copy())
+    try:
+        esperar_servidor(puerto, proceso)
+        asyncio.run(carga(puerto, rutas, min(50, args.conexiones), 2))  # calentamiento
+        latencias, errores, duracion = asyncio.run(carga(puerto, rutas, args.conexiones, args.segundos))
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+    total = len(latencias) + len(errores)
+    return [
+        ('peticiones/seg', len(latencias) / duracion),
+        ('latencia p50 (ms)', percentil(latencias, 50) * 1000),
+        ('latencia p99 (ms)', percentil(latencias, 99) * 1000),
+        ('tasa de error (%)', 100.0 * len(errores) / total if total else 0.0),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--conexiones', type=int, default=1000)
+    parser.add_argument('--segundos', type=float, default=20)
+    parser.add_argument('--procesos', type=int, default=4, help='procesos del servidor')
+    parser.add_argument('--hilos', type=int, default=8, help='hilos por proceso (sólo WSGI)')
+    parser.add_argument('--modos', default='wsgi,asgi')
+    parser.add_argument('--ruta', action='append', help='rutas a pedir (por defecto, las de lectura)')
+    parser.add_argument('--articulos', type=int, default=5000)
+    parser.add_argument('--productos', type=int, default=500)
+    args = parser.parse_args()
+
+    # 1,000 conexiones necesitan más descriptores que el límite típico (1,024)
+    suave, duro = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(suave, min(duro, args.conexiones * 2 + 256)), duro))
+
+    # Cada conexión del servidor es persistente por hilo; bajo ASGI Django
+    # recomienda no reutilizarlas (CONN_MAX_AGE=0)
+    os.environ.setdefault('PIZZERIA_CONN_MAX_AGE', '0')
+    ruta_bd = preparar_django()
+    try:
+        crear_datos(args.productos, args.articulos)
+        rutas = args.ruta or ['/menu/', '/inventario/', '/proveedores/', '/api/menu/', '/api/inventario/']
+        for modo in args.modos.split(','):
+            filas = medir_modo(modo.strip(), args, rutas)
+            if filas:
+                imprimir_reporte(f'{modo.upper()} con {args.conexiones} conexiones', filas)
+    finally:
+        borrar_bd(ruta_bd)
+
+
+if __name__ == '__main__':
+    main()
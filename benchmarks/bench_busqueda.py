@@ -0,0 +1,85 @@
+"""
+Benchmark del autocompletado sobre el índice de búsqueda.
+
+Genera N nombres (por defecto 500,000 artículos con palabras en español,
+muchas con acento), reconstruye el índice FTS5 y mide busqueda.buscar() con
+consultas exactas, sin acento y con errores de dedo. Compara con el
+icontains que hacía el admin.
+
+    python benchmarks/bench_busqueda.py --articulos 500000
+"""
+import argparse
+import random
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+PALABRAS = [
+    'jamón', 'queso', 'tamaño', 'piña', 'champiñón', 'pepperoni', 'salsa', 'orégano', 'albahaca',
+    'chorizo', 'tocino', 'aceituna', 'pimiento', 'cebolla', 'ajo', 'tomate', 'harina', 'levadura',
+    'mozzarella', 'parmesano', 'anchoa', 'atún', 'camarón', 'salchicha', 'jalapeño', 'elote',
+    'frijol', 'aguacate', 'limón', 'azúcar', 'crema', 'mantequilla', 'espinaca', 'berenjena',
+]
+MARCAS = ['del Norte', 'Serrano', 'Premium', 'Económico', 'La Única', 'Peña', 'Doña María', 'Rancho']
+
+CONSULTAS = {
+    'exacta': ['jamón serrano', 'queso premium', 'champiñón', 'doña maría'],
+    'sin acento': ['jamon', 'champinon', 'pina', 'dona maria'],
+    'errores de dedo': ['peperoni', 'mozarela', 'jalapenio', 'albaca'],
+    'prefijo (3 letras)': ['jam', 'que', 'sal', 'ore'],
+}
+
+
+def crear_datos(num_articulos):
+    from app_Pizzeria.models import Inventario
+
+    azar = random.Random(1)
+    lote = []
+    for i in range(num_articulos):
+        nombre = f'{azar.choice(PALABRAS).capitalize()} {azar.choice(MARCAS)} {i}'
+        lote.append(Inventario(nombre_articulo=nombre, unidad='kg'))
+        if len(lote) == 10_000:
+            Inventario.objects.bulk_create(lote)
+            lote = []
+    Inventario.objects.bulk_create(lote)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articulos', type=int, default=500_000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from app_Pizzeria import busqueda
+        from app_Pizzeria.models import Inventario
+
+        crear_datos(args.articulos)
+        with Cronometro() as reconstruccion:
+            busqueda.reconstruir()
+
+        filas = [('reconstruir índice (s)', reconstruccion.segundos)]
+        busqueda.buscar('calentamiento')  # carga las URLs y el caché de páginas de SQLite
+        for nombre, consultas in CONSULTAS.items():
+            tiempos = []
+            for _ in range(args.repeticiones):
+                for consulta in consultas:
+                    with Cronometro() as c:
+                        busqueda.buscar(consulta)
+                    tiempos.append(c.segundos)
+            filas.append((f'{nombre} p50 (ms)', percentil(tiempos, 50) * 1000))
+            filas.append((f'{nombre} p99 (ms)', percentil(tiempos, 99) * 1000))
+
+        with Cronometro() as c:
+            list(Inventario.objects.filter(nombre_articulo__icontains='jamon')[:10])
+        filas.append(("icontains 'jamon' sin índice (ms)", c.segundos * 1000))
+
+        imprimir_reporte(f'Búsqueda en {args.articulos:,} artículos', filas)
+        for consulta in ('jamon serano', 'mozarela'):
+            print(f"  {consulta!r}: {[r['nombre'] for r in busqueda.buscar(consulta, limite=3)]}")
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
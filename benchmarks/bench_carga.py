@@ -0,0 +1,744 @@
+"""
+Prueba de carga de punta a punta: todas las URLs de la aplicación.
+
+Genera datos sintéticos (comando generar_datos) en una base temporal, levanta
+el proyecto con uvicorn (ASGI) o gunicorn (WSGI) y simula N usuarios que,
+durante unos segundos, navegan como lo haría el personal de la pizzería: ven
+listas, abren formularios, registran pedidos, editan artículos, importan,
+exportan, usan la API y la pantalla de cocina. Cada usuario tiene su sesión
+(cookies, token CSRF) y su conexión keep-alive, y espera un poco entre acciones.
+
+Al terminar escribe un reporte JSON (peticiones/seg, errores y latencia
+p50/p95/p99 por URL y método, commit, escala) para comparar versiones:
+
+    python benchmarks/bench_carga.py --usuarios 50 --segundos 60 --salida v1.json
+    git checkout otra-version
+    python benchmarks/bench_carga.py --usuarios 50 --segundos 60 --salida v2.json --comparar v1.json
+
+    # Escala de producción: se genera una vez y se reutiliza
+    python benchmarks/bench_carga.py --bd /tmp/pizzeria_grande.sqlite3 --articulos 1000000 --productos 20000
+
+    # Contra un servidor ya levantado (no genera datos ni verifica la bitácora)
+    python benchmarks/bench_carga.py --url http://127.0.0.1:8000
+
+El cliente usa sólo asyncio, sin dependencias. Las URLs que no se pidieron
+durante la prueba aparecen en "sin_cubrir".
+"""
+import argparse
+import asyncio
+import datetime
+import gzip
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from html.parser import HTMLParser
+from urllib.parse import urlencode, urlsplit
+
+from _entorno import RAIZ, preparar_django, borrar_bd, percentil, imprimir_reporte
+from bench_asgi import SERVIDORES, puerto_libre, esperar_servidor
+
+MODELOS = ('proveedores', 'inventario', 'menu')
+# Ids de cada modelo que se leen de la API para elegir a quién visitar
+MUESTRA_IDS = 2000
+BUSQUEDAS = ['pizza', 'queso', 'jamon', 'peperoni', 'mozarela', 'lacteos', 'refresco', 'harina', 'pina', 'champ']
+
+
+# ---------- Cliente HTTP con sesión ----------
+
+class Respuesta:
+    def __init__(self, estado, encabezados, cuerpo, tamaño):
+        self.estado = estado
+        self.encabezados = encabezados
+        self.cuerpo = cuerpo
+        self.tamaño = tamaño
+
+    def json(self):
+        cuerpo = self.cuerpo
+        if self.encabezados.get('content-encoding') == 'gzip':
+            cuerpo = gzip.decompress(cuerpo)
+        return json.loads(cuerpo)
+
+    @property
+    def texto(self):
+        return self.cuerpo.decode('utf-8', 'replace')
+
+
+class Registro:
+    """Latencias, errores y bytes por 'nombre_url MÉTODO'."""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(Counter)
+        self.bytes = Counter()
+
+    def anotar(self, clave, segundos, tamaño=0, error=None):
+        if error is None:
+            self.latencias[clave].append(segundos)
+            self.bytes[clave] += tamaño
+        else:
+            self.errores[clave][str(error)] += 1
+
+
+class Cliente:
+    """Un usuario: su conexión keep-alive y sus cookies (sesión y csrftoken)."""
+
+    def __init__(self, host, puerto, registro):
+        self.host = host
+        self.puerto = puerto
+        self.registro = registro
+        self.cookies = {}
+        self.lector = self.escritor = None
+
+    def cerrar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+        self.lector = self.escritor = None
+
+    def _solicitud(self, metodo, ruta, cuerpo, tipo, extra=()):
+        lineas = [f'{metodo} {ruta} HTTP/1.1', f'Host: {self.host}', 'Accept-Encoding: gzip']
+        if self.cookies:
+            lineas.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        if metodo == 'POST':
+            lineas.append(f'X-CSRFToken: {self.cookies.get("csrftoken", "")}')
+            lineas.append(f'Content-Type: {tipo}')
+            lineas.append(f'Content-Length: {len(cuerpo)}')
+        lineas.extend(extra)
+        return ('\r\n'.join(lineas) + '\r\n\r\n').encode('utf-8') + (cuerpo or b'')
+
+    async def _encabezados(self):
+        linea = await self.lector.readline()
+        if not linea:
+            raise ConnectionError("conexión cerrada")
+        estado = int(linea.split()[1])
+        encabezados = {}
+        while True:
+            linea = await self.lector.readline()
+            if linea in (b'\r\n', b''):
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            nombre, valor = nombre.strip().lower(), valor.strip()
+            if nombre == 'set-cookie':
+                clave, _, resto = valor.partition('=')
+                self.cookies[clave] = resto.split(';')[0]
+            else:
+                encabezados[nombre] = valor
+        return estado, encabezados
+
+    async def _cuerpo(self, encabezados, guardar):
+        partes, tamaño = [], 0
+        if 'content-length' in encabezados:
+            restante = int(encabezados['content-length'])
+            while restante:
+                datos = await self.lector.read(min(restante, 65536))
+                if not datos:
+                    raise ConnectionError("respuesta incompleta")
+                restante -= len(datos)
+                tamaño += len(datos)
+                if guardar:
+                    partes.append(datos)
+        elif encabezados.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                largo = int((await self.lector.readline()).split(b';')[0], 16)
+                datos = await self.lector.readexactly(largo + 2)
+                tamaño += largo
+                if guardar:
+                    partes.append(datos[:-2])
+                if largo == 0:
+                    break
+        else:
+            # Sin longitud: hasta que el servidor cierre
+            while datos := await self.lector.read(65536):
+                tamaño += len(datos)
+                if guardar:
+                    partes.append(datos)
+            encabezados['connection'] = 'close'
+        return b''.join(partes), tamaño
+
+    async def pedir(self, nombre, metodo, ruta, cuerpo=b'', tipo='application/x-www-form-urlencoded',
+                    guardar=True):
+        """
+        Hace la petición y la anota en el registro como 'nombre MÉTODO'. Las
+        redirecciones no se siguen. Regresa la Respuesta o None si falló.
+        """
+        clave = f'{nombre} {metodo}'
+        solicitud = self._solicitud(metodo, ruta, cuerpo, tipo)
+        for intento in range(2):
+            reutilizada = self.escritor is not None
+            inicio = time.perf_counter()
+            try:
+                if not reutilizada:
+                    self.lector, self.escritor = await asyncio.open_connection(self.host, self.puerto)
+                self.escritor.write(solicitud)
+                await self.escritor.drain()
+                estado, encabezados = await self._encabezados()
+                datos, tamaño = await self._cuerpo(encabezados, guardar)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                self.cerrar()
+                # El servidor pudo cerrar la conexión inactiva: se reintenta una vez
+                if reutilizada and intento == 0:
+                    continue
+                self.registro.anotar(clave, 0, error=type(e).__name__)
+                return None
+            segundos = time.perf_counter() - inicio
+            if encabezados.get('connection', '').lower() == 'close':
+                self.cerrar()
+            # 409: conflicto de edición concurrente, es una respuesta esperada
+            self.registro.anotar(clave, segundos, tamaño, estado if estado >= 400 and estado != 409 else None)
+            return Respuesta(estado, encabezados, datos, tamaño)
+
+    async def escuchar(self, nombre, ruta, evento=b'event: estado'):
+        """
+        Abre un flujo de eventos en su propia conexión (como EventSource) y lo
+        cierra al recibir el primer `evento` completo. Anota cuánto tardó.
+        """
+        clave = f'{nombre} GET'
+        inicio = time.perf_counter()
+        principal = self.lector, self.escritor
+        self.lector = self.escritor = None
+        try:
+            self.lector, self.escritor = await asyncio.open_connection(self.host, self.puerto)
+            self.escritor.write(self._solicitud('GET', ruta, b'', None, ['Accept: text/event-stream']))
+            await self.escritor.drain()
+            estado, _ = await self._encabezados()
+            leido = b''
+            while True:
+                datos = await asyncio.wait_for(self.lector.read(65536), 30)
+                if not datos:
+                    raise ConnectionError("flujo cerrado sin estado")
+                leido += datos
+                posicion = leido.find(evento)
+                if posicion != -1 and leido.find(b'\n\n', posicion) != -1:
+                    break
+            self.registro.anotar(clave, time.perf_counter() - inicio, len(leido),
+                                 estado if estado >= 400 else None)
+        except (OSError, ConnectionError, asyncio.TimeoutError, ValueError, IndexError) as e:
+            self.registro.anotar(clave, 0, error=type(e).__name__)
+        finally:
+            self.cerrar()
+            self.lector, self.escritor = principal
+
+
+# ---------- Formularios ----------
+
+class Formulario(HTMLParser):
+    """
+    Lee el primer <form method="post"> de una página: su action y los valores
+    que mandaría el navegador sin tocar nada (inputs, textarea, select y
+    checkboxes marcados).
+    """
+
+    def __init__(self, html):
+        super().__init__()
+        self.action = None
+        self.campos = []
+        self._dentro = self._terminado = False
+        self._select = self._textarea = None
+        self.feed(html)
+
+    def handle_starttag(self, etiqueta, atributos):
+        atributos = dict(atributos)
+        if self._terminado:
+            return
+        if etiqueta == 'form' and (atributos.get('method') or '').lower() == 'post':
+            self._dentro = True
+            self.action = atributos.get('action')
+        elif not self._dentro:
+            return
+        elif etiqueta == 'input' and atributos.get('name'):
+            tipo = (atributos.get('type') or 'text').lower()
+            if tipo in ('submit', 'button', 'file') or (tipo in ('checkbox', 'radio') and 'checked' not in atributos):
+                return
+            self.campos.append([atributos['name'], atributos.get('value') or ('on' if tipo == 'checkbox' else '')])
+        elif etiqueta == 'textarea':
+            self._textarea = [atributos.get('name'), '']
+            self.campos.append(self._textarea)
+        elif etiqueta == 'select':
+            self._select = atributos.get('name')
+        elif etiqueta == 'option' and self._select and 'selected' in atributos:
+            self.campos.append([self._select, atributos.get('value', '')])
+
+    def handle_endtag(self, etiqueta):
+        if etiqueta == 'form' and self._dentro:
+            self._dentro, self._terminado = False, True
+        elif etiqueta == 'textarea':
+            self._textarea = None
+        elif etiqueta == 'select':
+            self._select = None
+
+    def handle_data(self, datos):
+        if self._textarea is not None:
+            self._textarea[1] += datos
+
+    def poner(self, nombre, valor):
+        for campo in self.campos:
+            if campo[0] == nombre:
+                campo[1] = valor
+                return
+        self.campos.append([nombre, valor])
+
+    def cuerpo(self):
+        return urlencode([(nombre, valor) for nombre, valor in self.campos]).encode()
+
+
+def _multipart(campos, archivos):
+    """Cuerpo multipart/form-data; regresa (cuerpo, content-type)."""
+    frontera = uuid.uuid4().hex
+    partes = []
+    for nombre, valor in campos:
+        partes.append(f'--{frontera}\r\nContent-Disposition: form-data; name="{nombre}"\r\n\r\n{valor}\r\n'.encode())
+    for nombre, (archivo, contenido) in archivos.items():
+        partes.append(
+            f'--{frontera}\r\nContent-Disposition: form-data; name="{nombre}"; filename="{archivo}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n'.encode() + contenido + b'\r\n'
+        )
+    partes.append(f'--{frontera}--\r\n'.encode())
+    return b''.join(partes), f'multipart/form-data; boundary={frontera}'
+
+
+# ---------- Datos que conocen los usuarios ----------
+
+class Datos:
+    """Ids existentes (de la API) y los creados durante la prueba, por modelo."""
+
+    def __init__(self):
+        self.ids = {modelo: [] for modelo in MODELOS}
+        self.creados = {modelo: [] for modelo in MODELOS}
+
+    async def cargar(self, cliente):
+        for modelo in MODELOS:
+            parametros = {'campos': 'id', 'por_pagina': 200}
+            while len(self.ids[modelo]) < MUESTRA_IDS:
+                respuesta = await cliente.pedir('api_listar', 'GET', f'/api/{modelo}/?{urlencode(parametros)}')
+                if respuesta is None or respuesta.estado != 200:
+                    raise RuntimeError(f"No se pudieron leer los ids de {modelo}")
+                pagina = respuesta.json()
+                self.ids[modelo].extend(fila['id'] for fila in pagina['resultados'])
+                if not pagina['siguiente']:
+                    break
+                parametros['despues'] = pagina['siguiente']
+        if not all(self.ids.values()):
+            raise RuntimeError("La base no tiene datos: genérelos con --proveedores/--articulos/--productos")
+
+    def uno(self, modelo, azar):
+        return azar.choice(self.ids[modelo])
+
+
+def _unico(prefijo):
+    return f'{prefijo} {uuid.uuid4().hex[:10]}'
+
+
+# ---------- Tareas (lo que hace un usuario en cada paso) ----------
+
+def _ver(nombre, ruta):
+    async def tarea(cliente, datos, azar):
+        await cliente.pedir(nombre, 'GET', ruta)
+    return tarea
+
+
+async def ver_listado(cliente, datos, azar):
+    nombre, ruta, filtros = azar.choice([
+        ('ver_proveedores', '/proveedores/', [{}, {'orden': 'nombre'}, {'activo': '1'}]),
+        ('ver_inventario', '/inventario/', [{}, {'orden': 'nombre'}, {'stock_bajo': '1'}, {'por_pagina': 100}]),
+        ('ver_menu', '/menu/', [{}, {'categoria': 'Pizza'}, {'orden': '-precio'}, {'disponible': '1'}]),
+    ])
+    parametros = azar.choice(filtros)
+    respuesta = await cliente.pedir(nombre, 'GET', ruta + (f'?{urlencode(parametros)}' if parametros else ''))
+    # A veces se pasa a la página siguiente
+    if respuesta is not None and azar.random() < 0.3 and 'despues=' in respuesta.texto:
+        inicio = respuesta.texto.index('despues=')
+        cursor = respuesta.texto[inicio:].split('"')[0].replace('&amp;', '&')
+        await cliente.pedir(nombre, 'GET', f'{ruta}?{cursor}')
+
+
+async def ver_formulario_edicion(cliente, datos, azar):
+    modelo, ruta = azar.choice([
+        ('proveedores', '/proveedores/actualizar/{}/'), ('inventario', '/inventario/actualizar/{}/'),
+        ('menu', '/menu/actualizar/{}/'),
+    ])
+    nombre = {'proveedores': 'actualizar_proveedor', 'inventario': 'actualizar_inventario',
+              'menu': 'actualizar_menu'}[modelo]
+    await cliente.pedir(nombre, 'GET', ruta.format(datos.uno(modelo, azar)))
+
+
+async def ver_eventos(cliente, datos, azar):
+    await cliente.escuchar('eventos_cocina', '/eventos/cocina/')
+
+
+async def exportar(cliente, datos, azar):
+    modelo = azar.choice(MODELOS)
+    await cliente.pedir('exportar_datos', 'GET', f'/exportar/{modelo}/?formato={azar.choice(["csv", "json"])}',
+                        guardar=False)
+
+
+async def api_buscar(cliente, datos, azar):
+    texto = azar.choice(BUSQUEDAS)
+    # Autocompletar: una petición por letra a partir de la tercera
+    for fin in range(3, len(texto) + 1):
+        await cliente.pedir('api_buscar', 'GET', f'/api/buscar/?{urlencode({"q": texto[:fin]})}')
+
+
+async def api_listar(cliente, datos, azar):
+    modelo, campos = azar.choice([
+        ('proveedores', 'id,nombre_proveedor,telefono_contacto'), ('inventario', 'id,nombre_articulo,stock'),
+        ('menu', 'id,nombre,precio,disponible'),
+    ])
+    parametros = azar.choice([{}, {'campos': campos}, {'por_pagina': 50, 'orden': 'nombre'}])
+    await cliente.pedir('api_listar', 'GET', f'/api/{modelo}/?{urlencode(parametros)}')
+
+
+async def api_detalle(cliente, datos, azar):
+    modelo = azar.choice(MODELOS)
+    await cliente.pedir('api_detalle', 'GET', f'/api/{modelo}/{datos.uno(modelo, azar)}/')
+
+
+async def registrar_pedido(cliente, datos, azar):
+    respuesta = await cliente.pedir('agregar_pedido', 'GET', '/pedidos/agregar/')
+    if respuesta is None or respuesta.estado != 200:
+        return
+    formulario = Formulario(respuesta.texto)
+    productos = [c[0] for c in formulario.campos if c[0].startswith('cantidad_')]
+    for campo in azar.sample(productos, min(len(productos), azar.randint(1, 3))):
+        formulario.poner(campo, str(azar.randint(1, 3)))
+    formulario.poner('cliente', azar.choice(['', 'Mostrador', 'Mesa 4', 'Rappi']))
+    await cliente.pedir('agregar_pedido', 'POST', '/pedidos/agregar/', formulario.cuerpo())
+
+
+async def agregar(cliente, datos, azar):
+    modelo = azar.choice(MODELOS)
+    nombre, ruta = {
+        'proveedores': ('agregar_proveedor', '/proveedores/agregar/'),
+        'inventario': ('agregar_inventario', '/inventario/agregar/'),
+        'menu': ('agregar_menu', '/menu/agregar/'),
+    }[modelo]
+    respuesta = await cliente.pedir(nombre, 'GET', ruta)
+    if respuesta is None or respuesta.estado != 200:
+        return
+    formulario = Formulario(respuesta.texto)
+    if modelo == 'proveedores':
+        formulario.poner('nombre_proveedor', _unico('Proveedor de carga'))
+        formulario.poner('rfc', uuid.uuid4().hex[:13].upper())
+        formulario.poner('tipo_producto', 'Abarrotes')
+    elif modelo == 'inventario':
+        formulario.poner('nombre_articulo', _unico('Artículo de carga'))
+        formulario.poner('unidad', 'kg')
+        formulario.poner('stock', str(azar.randint(5, 50)))
+        formulario.poner('costo_unitario', f'{azar.uniform(10, 300):.2f}')
+    else:
+        formulario.poner('nombre', _unico('Pizza de carga'))
+        formulario.poner('precio', str(azar.randint(100, 250)))
+        formulario.poner('categoria', 'Pizza')
+        for articulo_id in azar.sample(datos.ids['inventario'], min(3, len(datos.ids['inventario']))):
+            formulario.campos.append(['articulos', str(articulo_id)])
+    await cliente.pedir(nombre, 'POST', formulario.action or ruta, formulario.cuerpo())
+
+
+async def editar(cliente, datos, azar):
+    modelo = azar.choice(MODELOS)
+    vista, ruta, campo, valor = {
+        'proveedores': ('proveedor', '/proveedores/actualizar/{}/', 'telefono_contacto',
+                        lambda: f'55-{azar.randrange(1000, 10000)}-{azar.randrange(1000, 10000)}'),
+        'inventario': ('inventario', '/inventario/actualizar/{}/',
+                       azar.choice(['costo_unitario', 'stock_minimo', 'stock']),
+                       lambda: f'{azar.uniform(1, 200):.2f}'),
+        'menu': ('menu', '/menu/actualizar/{}/', 'precio', lambda: str(azar.randint(90, 260))),
+    }[modelo]
+    respuesta = await cliente.pedir(f'actualizar_{vista}', 'GET', ruta.format(datos.uno(modelo, azar)))
+    if respuesta is None or respuesta.estado != 200:
+        return
+    formulario = Formulario(respuesta.texto)
+    formulario.poner(campo, valor())
+    await cliente.pedir(f'realizar_actualizacion_{vista}', 'POST', formulario.action, formulario.cuerpo())
+
+
+async def api_lote(cliente, datos, azar, modelo=None):
+    """Crea unos registros por la API (y a veces actualiza otros); recuerda los creados."""
+    modelo = modelo or azar.choice(MODELOS)
+    crear = []
+    for _ in range(azar.randint(1, 3)):
+        crear.append({
+            'proveedores': lambda: {'nombre_proveedor': _unico('Proveedor API'), 'activo': True},
+            'inventario': lambda: {'nombre_articulo': _unico('Artículo API'), 'unidad': 'pieza',
+                                   'stock': str(azar.randint(0, 40))},
+            'menu': lambda: {'nombre': _unico('Producto API'), 'precio': '120.00', 'categoria': 'Entrada'},
+        }[modelo]())
+    lote = {'crear': crear}
+    if modelo == 'menu' and azar.random() < 0.5:
+        lote['actualizar'] = [{'id': datos.uno('menu', azar), 'habilitado': azar.random() > 0.1}]
+    respuesta = await cliente.pedir('api_lote', 'POST', f'/api/{modelo}/lote/', json.dumps(lote).encode(),
+                                    tipo='application/json')
+    if respuesta is not None and respuesta.estado == 200:
+        datos.creados[modelo].extend(respuesta.json()['creados'])
+
+
+async def borrar(cliente, datos, azar):
+    """Confirma y borra algo creado durante la prueba (nunca los datos generados)."""
+    modelo = azar.choice(MODELOS)
+    if not datos.creados[modelo]:
+        await api_lote(cliente, datos, azar, modelo)
+        if not datos.creados[modelo]:
+            return
+    objeto_id = datos.creados[modelo].pop(azar.randrange(len(datos.creados[modelo])))
+    nombre, ruta = {
+        'proveedores': ('borrar_proveedor', '/proveedores/borrar/{}/'),
+        'inventario': ('borrar_inventario', '/inventario/borrar/{}/'),
+        'menu': ('borrar_menu', '/menu/borrar/{}/'),
+    }[modelo]
+    respuesta = await cliente.pedir(nombre, 'GET', ruta.format(objeto_id))
+    if respuesta is not None and respuesta.estado == 200:
+        formulario = Formulario(respuesta.texto)
+        await cliente.pedir(nombre, 'POST', formulario.action or ruta.format(objeto_id), formulario.cuerpo())
+
+
+async def importar(cliente, datos, azar):
+    respuesta = await cliente.pedir('importar_datos', 'GET', '/importar/inventario/')
+    if respuesta is None or respuesta.estado != 200:
+        return
+    filas = ['nombre_articulo,unidad,stock,costo_unitario']
+    for _ in range(azar.randint(1, 20)):
+        filas.append(f'{_unico("Importado")},kg,{azar.randint(1, 30)},{azar.uniform(5, 100):.2f}')
+    cuerpo, tipo = _multipart(
+        Formulario(respuesta.texto).campos, {'archivo': ('carga.csv', '\n'.join(filas).encode())},
+    )
+    await cliente.pedir('importar_datos', 'POST', '/importar/inventario/', cuerpo, tipo=tipo)
+
+
+# (peso, tarea): ~80% lecturas, ~20% escrituras, como un turno normal
+TAREAS = [
+    (4, _ver('inicio_pizzeria', '/')),
+    (24, ver_listado),
+    (6, ver_formulario_edicion),
+    (3, _ver('reorden_inventario', '/inventario/reorden/')),
+    (5, _ver('ver_pedidos', '/pedidos/')),
+    (2, _ver('ver_cocina', '/pedidos/cocina/')),
+    (2, ver_eventos),
+    (1, exportar),
+    (8, api_buscar),
+    (8, api_listar),
+    (6, api_detalle),
+    (1, _ver('metricas', '/metrics')),
+    (10, registrar_pedido),
+    (3, agregar),
+    (6, editar),
+    (4, api_lote),
+    (2, borrar),
+    (1, importar),
+]
+
+
+async def usuario(host, puerto, datos, registro, fin, espera, semilla):
+    azar = random.Random(semilla)
+    tareas, pesos = zip(*[(t, p) for p, t in TAREAS])
+    cliente = Cliente(host, puerto, registro)
+    try:
+        while time.monotonic() < fin:
+            await azar.choices(tareas, pesos)[0](cliente, datos, azar)
+            if espera:
+                await asyncio.sleep(azar.expovariate(1 / espera))
+    finally:
+        cliente.cerrar()
+
+
+async def carga(host, puerto, usuarios, segundos, espera, semilla):
+    registro = Registro()
+    datos = Datos()
+    cargador = Cliente(host, puerto, Registro())
+    await datos.cargar(cargador)
+    cargador.cerrar()
+    fin = time.monotonic() + segundos
+    inicio = time.perf_counter()
+    await asyncio.gather(*[
+        usuario(host, puerto, datos, registro, fin, espera, semilla + n) for n in range(usuarios)
+    ])
+    return registro, time.perf_counter() - inicio
+
+
+# ---------- Reporte ----------
+
+def _milisegundos(latencias, p):
+    return round(percentil(latencias, p) * 1000, 2)
+
+
+def armar_reporte(registro, duracion, metadatos, urls):
+    endpoints = {}
+    for clave in sorted(set(registro.latencias) | set(registro.errores)):
+        latencias = registro.latencias[clave]
+        errores = sum(registro.errores[clave].values())
+        endpoints[clave] = {
+            'peticiones': len(latencias) + errores,
+            'errores': errores,
+            'detalle_errores': dict(registro.errores[clave]),
+            'peticiones_seg': round((len(latencias) + errores) / duracion, 2),
+            'p50_ms': _milisegundos(latencias, 50),
+            'p95_ms': _milisegundos(latencias, 95),
+            'p99_ms': _milisegundos(latencias, 99),
+            'max_ms': round(max(latencias, default=0) * 1000, 2),
+            'bytes_promedio': round(registro.bytes[clave] / len(latencias)) if latencias else 0,
+        }
+    todas = [s for latencias in registro.latencias.values() for s in latencias]
+    total = sum(e['peticiones'] for e in endpoints.values())
+    errores = sum(e['errores'] for e in endpoints.values())
+    cubiertas = {clave.split()[0] for clave in registro.latencias}
+    return {
+        **metadatos,
+        'duracion_seg': round(duracion, 2),
+        'total': {
+            'peticiones': total,
+            'errores': errores,
+            'tasa_error': round(errores / total, 4) if total else 0,
+            'peticiones_seg': round(total / duracion, 2),
+            'p50_ms': _milisegundos(todas, 50),
+            'p95_ms': _milisegundos(todas, 95),
+            'p99_ms': _milisegundos(todas, 99),
+        },
+        'endpoints': endpoints,
+        'sin_cubrir': sorted(set(urls) - cubiertas),
+    }
+
+
+def comparar(anterior, actual):
+    """Imprime el cambio (%) de peticiones/seg y latencia respecto a otro reporte."""
+    def cambio(antes, despues):
+        return f"{(despues - antes) / antes * 100:+.1f}%" if antes else '-'
+
+    print(f"\n== Comparación con {anterior.get('commit') or 'reporte anterior'} ==")
+    filas = [('TOTAL', anterior['total'], actual['total'])]
+    filas += [(clave, anterior['endpoints'][clave], datos)
+              for clave, datos in actual['endpoints'].items() if clave in anterior['endpoints']]
+    ancho = max(len(clave) for clave, _, _ in filas)
+    print(f"  {'':{ancho}}  {'pet/seg':>9}  {'p50':>9}  {'p95':>9}  {'p99':>9}  {'errores':>9}")
+    for clave, antes, despues in filas:
+        print(f"  {clave.ljust(ancho)}  {cambio(antes['peticiones_seg'], despues['peticiones_seg']):>9}"
+              f"  {cambio(antes['p50_ms'], despues['p50_ms']):>9}  {cambio(antes['p95_ms'], despues['p95_ms']):>9}"
+              f"  {cambio(antes['p99_ms'], despues['p99_ms']):>9}  {antes['errores']:>4}->{despues['errores']:<4}")
+
+
+def _commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        sucio = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=RAIZ,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('-modificado' if sucio else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _nombres_urls():
+    from app_Pizzeria.urls import urlpatterns
+    return [patron.name for patron in urlpatterns]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--usuarios', type=int, default=50)
+    parser.add_argument('--segundos', type=float, default=60)
+    parser.add_argument('--espera', type=float, default=0.5,
+                        help='segundos promedio entre acciones de cada usuario (0: sin pausa)')
+    parser.add_argument('--servidor', choices=sorted(SERVIDORES), default='asgi')
+    parser.add_argument('--procesos', type=int, default=2, help='procesos del servidor')
+    parser.add_argument('--hilos', type=int, default=8, help='hilos por proceso (sólo WSGI)')
+    parser.add_argument('--url', help='servidor ya levantado (no se genera nada)')
+    parser.add_argument('--bd', help='base SQLite a reutilizar (se genera si está vacía y no se borra)')
+    parser.add_argument('--proveedores', type=int, default=200)
+    parser.add_argument('--articulos', type=int, default=5000)
+    parser.add_argument('--productos', type=int, default=300)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--salida', default='reporte_carga.json')
+    parser.add_argument('--comparar', help='reporte JSON anterior')
+    args = parser.parse_args()
+
+    metadatos = {
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'usuarios': args.usuarios,
+        'espera_seg': args.espera,
+        'semilla': args.semilla,
+    }
+
+    if args.url:
+        partes = urlsplit(args.url)
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_Pizzeria.settings')
+        sys.path.insert(0, str(RAIZ))
+        import django
+        django.setup()
+        metadatos.update(servidor=args.url)
+        registro, duracion = asyncio.run(carga(partes.hostname, partes.port or 80, args.usuarios,
+                                               args.segundos, args.espera, args.semilla))
+        reporte = armar_reporte(registro, duracion, metadatos, _nombres_urls())
+    else:
+        paquete, comando = SERVIDORES[args.servidor]
+        if importlib.util.find_spec(paquete) is None:
+            sys.exit(f"'{paquete}' no está instalado (pip install {paquete})")
+        # Escrituras concurrentes en SQLite: WAL y espera de bloqueo (ver settings)
+        os.environ.setdefault('PIZZERIA_SQLITE_CONCURRENCIA', '1')
+        os.environ.setdefault('PIZZERIA_CONN_MAX_AGE', '0' if args.servidor == 'asgi' else '60')
+        ruta_bd = preparar_django(args.bd)
+        try:
+            from django.core.management import call_command
+            from django.db import connections
+            from app_Pizzeria.models import Proveedores, Inventario, Menu, Pedido
+            from app_Pizzeria import disponibilidad, estadisticas, movimientos
+
+            if not Proveedores.objects.exists():
+                print("Generando datos...")
+                call_command('generar_datos', proveedores=args.proveedores, articulos=args.articulos,
+                             productos=args.productos, semilla=args.semilla)
+            metadatos.update(
+                servidor=f'{args.servidor} ({paquete}, {args.procesos} procesos)',
+                escala={'proveedores': Proveedores.objects.count(), 'articulos': Inventario.objects.count(),
+                        'productos': Menu.objects.count(), 'pedidos': Pedido.objects.count()},
+            )
+            connections.close_all()
+
+            puerto = puerto_libre()
+            proceso = subprocess.Popen(comando(puerto, args), cwd=RAIZ, env=os.environ.copy())
+            try:
+                esperar_servidor(puerto, proceso)
+                registro, duracion = asyncio.run(carga('localhost', puerto, args.usuarios, args.segundos,
+                                                       args.espera, args.semilla))
+            finally:
+                proceso.terminate()
+                proceso.wait(timeout=30)
+            reporte = armar_reporte(registro, duracion, metadatos, _nombres_urls())
+            # Después de cientos de escrituras concurrentes el stock debe cuadrar con
+            # la bitácora y las estadísticas por proveedor con el inventario
+            reporte['verificacion'] = {
+                'stock_distinto_de_bitacora': len(movimientos.diferencias()),
+                'estadisticas_proveedor_distintas': len(estadisticas.diferencias()),
+                'disponibilidad_distinta': len(disponibilidad.diferencias()),
+            }
+        finally:
+            if not args.bd:
+                borrar_bd(ruta_bd)
+
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+
+    total = reporte['total']
+    imprimir_reporte(f"Carga: {args.usuarios} usuarios, {reporte['duracion_seg']} s", [
+        ('peticiones/seg', float(total['peticiones_seg'])),
+        ('latencia p50 (ms)', float(total['p50_ms'])),
+        ('latencia p95 (ms)', float(total['p95_ms'])),
+        ('latencia p99 (ms)', float(total['p99_ms'])),
+        ('tasa de error (%)', total['tasa_error'] * 100.0),
+        ('URLs sin cubrir', ', '.join(reporte['sin_cubrir']) or '-'),
+    ] + [(verificacion.replace('_', ' '), valor) for verificacion, valor in reporte.get('verificacion', {}).items()])
+    lentos = sorted(reporte['endpoints'].items(), key=lambda e: -e[1]['p95_ms'])[:5]
+    imprimir_reporte("p95 más altos (ms)", [(clave, float(datos['p95_ms'])) for clave, datos in lentos])
+    print(f"\nReporte: {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            comparar(json.load(archivo), reporte)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark de escrituras concurrentes sobre SQLite.
+
+Muchos hilos envían POST a agregar_inventario y a
+realizar_actualizacion_inventario al mismo tiempo (como varios workers de
+gunicorn) y se reporta la latencia p50/p99 y la tasa de error
+("database is locked" y similares).
+
+    python benchmarks/bench_concurrencia.py --hilos 16 --peticiones 200
+    python benchmarks/bench_concurrencia.py --perfil basico   # sin WAL ni IMMEDIATE
+
+El perfil "basico" equivale a la configuración original del proyecto
+(PIZZERIA_SQLITE_CONCURRENCIA=0) y sirve para comparar.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte
+
+
+def trabajador(numero, peticiones, ids, resultados, barrera):
+    from django.db import connections
+    from django.test import Client
+    from django.urls import reverse
+
+    cliente = Client(raise_request_exception=False)
+    azar = random.Random(numero)
+    url_agregar = reverse('agregar_inventario')
+    url_actualizar = reverse('realizar_actualizacion_inventario')
+    latencias, errores = [], 0
+
+    barrera.wait()
+    for i in range(peticiones):
+        if azar.random() < 0.5:
+            url, datos = url_agregar, {
+                'nombre_articulo': f'Nuevo {numero}-{i}', 'stock': '10', 'unidad': 'kg',
+            }
+        else:
+            url, datos = url_actualizar, {
+                'id_articulo': str(azar.choice(ids)), 'nombre_articulo': f'Editado {numero}-{i}',
+                'stock': str(azar.randint(0, 100)), 'unidad': 'kg',
+            }
+        inicio = time.perf_counter()
+        try:
+            respuesta = cliente.post(url, datos)
+            fallo = respuesta.status_code >= 400
+        except Exception:
+            fallo = True
+        if fallo:
+            errores += 1
+        else:
+            latencias.append(time.perf_counter() - inicio)
+    connections.close_all()
+    resultados.append((latencias, errores))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hilos', type=int, default=16)
+    parser.add_argument('--peticiones', type=int, default=200, help='peticiones por hilo')
+    parser.add_argument('--articulos', type=int, default=1000, help='artículos iniciales')
+    parser.add_argument('--perfil', choices=('concurrente', 'basico'), default='concurrente')
+    args = parser.parse_args()
+
+    os.environ['PIZZERIA_SQLITE_CONCURRENCIA'] = '1' if args.perfil == 'concurrente' else '0'
+    ruta = preparar_django()
+    try:
+        from app_Pizzeria.models import Inventario
+        ids = [a.id for a in Inventario.objects.bulk_create([
+            Inventario(nombre_articulo=f'Artículo {i}', stock=10, unidad='kg')
+            for i in range(args.articulos)
+        ])]
+
+        resultados = []
+        barrera = threading.Barrier(args.hilos)
+        hilos = [
+            threading.Thread(target=trabajador, args=(n, args.peticiones, ids, resultados, barrera))
+            for n in range(args.hilos)
+        ]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        latencias = [x for r in resultados for x in r[0]]
+        errores = sum(r[1] for r in resultados)
+        total = len(latencias) + errores
+        imprimir_reporte(f'Escrituras concurrentes (perfil {args.perfil})', [
+            ('hilos', args.hilos),
+            ('peticiones', total),
+            ('peticiones/seg', total / duracion),
+            ('latencia p50 (ms)', percentil(latencias, 50) * 1000),
+            ('latencia p99 (ms)', percentil(latencias, 99) * 1000),
+            ('tasa de error (%)', 100.0 * errores / total if total else 0.0),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
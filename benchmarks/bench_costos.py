@@ -0,0 +1,96 @@
+"""
+Benchmark del recálculo de costos de receta.
+
+Crea un menú grande donde un ingrediente "popular" (el queso) aparece en casi
+todos los productos, cambia su costo_unitario varias veces y mide cuánto
+tarda el save() completo (UPDATE del artículo + recálculo de los productos
+afectados). Lo compara con el recálculo de todo el menú y verifica al final
+que los costos guardados coinciden con la consulta agregada.
+
+    python benchmarks/bench_costos.py --productos 20000 --articulos 2000
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+
+def crear_datos(num_productos, num_articulos, ingredientes, porcentaje_queso):
+    from app_Pizzeria.models import Inventario, Menu, Receta
+    from app_Pizzeria.recetas import expandir_productos
+
+    articulos = Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', unidad='kg', costo_unitario=Decimal('20.00'))
+        for i in range(num_articulos)
+    ])
+    queso = articulos[0]
+    productos = Menu.objects.bulk_create([
+        Menu(nombre=f'Producto {i}', precio=Decimal('150.00'), categoria='Pizza')
+        for i in range(num_productos)
+    ])
+    azar = random.Random(1)
+    recetas = []
+    for producto in productos:
+        usados = set(azar.sample(articulos[1:], ingredientes))
+        if azar.random() * 100 < porcentaje_queso:
+            usados.add(queso)
+        recetas.extend(
+            Receta(menu=producto, inventario=a, cantidad=Decimal('0.250')) for a in usados
+        )
+    Receta.objects.bulk_create(recetas, batch_size=5000)
+    expandir_productos()  # bulk_create no envía señales
+    return queso
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--productos', type=int, default=20_000)
+    parser.add_argument('--articulos', type=int, default=2_000)
+    parser.add_argument('--ingredientes', type=int, default=5, help='ingredientes por producto')
+    parser.add_argument('--queso', type=float, default=80.0, help='%% de productos que usan queso')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from app_Pizzeria.costos import con_costos, recalcular_costos
+        from app_Pizzeria.models import Inventario, Menu
+
+        queso = crear_datos(args.productos, args.articulos, args.ingredientes, args.queso)
+        with Cronometro() as completo:
+            recalcular_costos()
+        dependientes = queso.productos_menu.count()
+
+        tiempos = []
+        for i in range(args.repeticiones):
+            articulo = Inventario.objects.get(id=queso.id)
+            articulo.costo_unitario = Decimal('200.00') + i
+            with Cronometro() as c:
+                articulo.save()
+            tiempos.append(c.segundos)
+
+        # Un artículo poco usado sólo toca sus pocos productos
+        otro = Inventario.objects.get(id=queso.id + 1)
+        otro.costo_unitario = Decimal('99.00')
+        with Cronometro() as poco_usado:
+            otro.save()
+
+        reales = dict(con_costos().values_list('id', 'costo_actual'))
+        guardados = dict(Menu.objects.values_list('id', 'costo_receta'))
+        distintos = sum(1 for i, costo in guardados.items() if costo != round(reales[i], 2))
+
+        imprimir_reporte(f'Costos con {args.productos:,} productos', [
+            ('productos con queso', dependientes),
+            ('recálculo completo (ms)', completo.segundos * 1000),
+            ('cambio de queso p50 (ms)', percentil(tiempos, 50) * 1000),
+            ('cambio de queso p99 (ms)', percentil(tiempos, 99) * 1000),
+            ('cambio poco usado (ms)', poco_usado.segundos * 1000),
+            ('costos desactualizados', distintos),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
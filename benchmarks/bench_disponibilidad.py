@@ -0,0 +1,139 @@
+"""
+Benchmark de la disponibilidad derivada del stock (disponibilidad.py).
+
+Crea un menú donde todos los productos comparten unos pocos ingredientes
+"calientes" (masa, queso, salsa), cada uno con su propia cantidad en la
+receta, y mide:
+
+  - pedidos que no cruzan ningún umbral (el caso de todos los días): el
+    recálculo no debe tocar ningún producto;
+  - el queso bajando en pasos hasta agotarse: cada paso sólo reevalúa las
+    recetas cuyo umbral quedó entre el stock anterior y el nuevo, y al
+    agotarse apaga todo el menú con un UPDATE por lote;
+  - la compra que lo repone;
+
+contra reevaluar todos los productos que usan el artículo en cada cambio
+(lo que haría un índice inverso sin umbrales). Al final verifica que la
+disponibilidad guardada coincide con el cálculo completo.
+
+    python benchmarks/bench_disponibilidad.py --productos 5000 --calientes 3
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+
+def crear_datos(num_productos, num_calientes, num_articulos, ingredientes):
+    from app_Pizzeria.models import Inventario, Menu, Receta
+    from app_Pizzeria.recetas import expandir_productos
+
+    articulos = Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', stock=Decimal('100000'), unidad='kg')
+        for i in range(num_articulos)
+    ])
+    productos = Menu.objects.bulk_create([
+        Menu(nombre=f'Pizza {i}', precio=Decimal('150.00'), categoria='Pizza')
+        for i in range(num_productos)
+    ])
+    calientes, resto = articulos[:num_calientes], articulos[num_calientes:]
+    azar = random.Random(1)
+    recetas = []
+    for producto in productos:
+        usados = calientes + azar.sample(resto, ingredientes)
+        recetas.extend(
+            Receta(menu=producto, inventario=a, cantidad=Decimal(azar.randrange(5, 60)) / 100)
+            for a in usados
+        )
+    Receta.objects.bulk_create(recetas, batch_size=5000)
+    expandir_productos()  # bulk_create no envía señales
+    return productos, calientes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--productos', type=int, default=5_000)
+    parser.add_argument('--calientes', type=int, default=3, help='ingredientes que usan todos los productos')
+    parser.add_argument('--articulos', type=int, default=500)
+    parser.add_argument('--ingredientes', type=int, default=4, help='ingredientes extra por producto')
+    parser.add_argument('--pedidos', type=int, default=200)
+    parser.add_argument('--pasos', type=int, default=20, help='pasos en que se agota el queso')
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.db import connection, transaction
+        from django.db.models import F
+        from django.test.utils import CaptureQueriesContext
+
+        from app_Pizzeria import disponibilidad, movimientos
+        from app_Pizzeria.models import Inventario, Menu
+        from app_Pizzeria.pedidos import registrar_pedido
+
+        productos, calientes = crear_datos(args.productos, args.calientes, args.articulos, args.ingredientes)
+        with Cronometro() as completo:
+            disponibilidad.actualizar_disponibilidad()
+        queso = calientes[1]
+        dependientes = list(queso.productos_menu.values_list('id', flat=True))
+        azar = random.Random(2)
+
+        # 1. Pedidos sin cruce: stock de sobra
+        tiempos, consultas = [], []
+        for _ in range(args.pedidos):
+            lineas = [(azar.choice(productos).id, azar.randint(1, 3)) for _ in range(3)]
+            with CaptureQueriesContext(connection) as capturadas, Cronometro() as c:
+                registrar_pedido(lineas)
+            tiempos.append(c.segundos)
+            consultas.append(len(capturadas))
+
+        # 2. El queso se agota en pasos (cada paso, el UPDATE del stock + la reevaluación)
+        def bajar_queso(diferencia, reevaluar):
+            with transaction.atomic():
+                Inventario.objects.filter(id=queso.id).update(stock=F('stock') + diferencia)
+                return reevaluar({queso.id: diferencia})
+
+        def todos_los_dependientes(ajustes):
+            return disponibilidad.actualizar_disponibilidad(dependientes)
+
+        resultados = {}
+        for nombre, reevaluar in (('umbrales', disponibilidad.por_ajustes), ('todos', todos_los_dependientes)):
+            Inventario.objects.filter(id=queso.id).update(stock=Decimal('0.60'))
+            disponibilidad.actualizar_disponibilidad(dependientes)
+            paso = Decimal('-0.03')
+            pasos, apagados = [], 0
+            for _ in range(args.pasos):
+                with Cronometro() as c:
+                    apagados += bajar_queso(paso, reevaluar)
+                pasos.append(c.segundos)
+            with Cronometro() as compra:
+                movimientos.registrar_compra(queso.id, '10')
+            resultados[nombre] = (pasos, apagados, compra.segundos)
+
+        Inventario.objects.filter(id=queso.id).update(stock=Decimal('0'))
+        with Cronometro() as agotado:
+            apagados_de_golpe = disponibilidad.por_ajustes({queso.id: Decimal('-10')})
+        distintos = len(disponibilidad.diferencias())
+
+        umbrales, todos = resultados['umbrales'], resultados['todos']
+        imprimir_reporte(f'Disponibilidad con {args.productos:,} productos', [
+            ('productos con queso', len(dependientes)),
+            ('recálculo completo (ms)', completo.segundos * 1000),
+            ('pedido sin cruce p50 (ms)', percentil(tiempos, 50) * 1000),
+            ('pedido sin cruce p99 (ms)', percentil(tiempos, 99) * 1000),
+            ('consultas por pedido', max(consultas)),
+            ('paso del queso, umbrales p50 (ms)', percentil(umbrales[0], 50) * 1000),
+            ('paso del queso, todos p50 (ms)', percentil(todos[0], 50) * 1000),
+            ('productos apagados en los pasos', umbrales[1]),
+            ('compra que los repone (ms)', umbrales[2] * 1000),
+            ('queso agotado de golpe (ms)', agotado.segundos * 1000),
+            ('productos apagados de golpe', apagados_de_golpe),
+            ('disponibles al final', Menu.objects.filter(disponible=True).count()),
+            ('disponibilidad desactualizada', distintos),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Pantallas de cocina conectadas al flujo de eventos (GET /eventos/cocina/).
+
+Levanta el proyecto con uvicorn, conecta N pantallas (por defecto 500) y
+reporta la memoria del servidor por conexión (RSS de /proc antes y después de
+conectarlas). Después cambia la disponibilidad de un producto M veces por la
+API de lotes y mide cuánto tarda cada cambio en llegar a todas las pantallas
+(p50/p99) y cuántos eventos se perdieron.
+
+    pip install uvicorn
+    python benchmarks/bench_eventos.py --pantallas 500 --cambios 50
+    python benchmarks/bench_eventos.py --procesos 4   # con el broker de eventos
+
+Con --procesos > 1 se arranca también el broker (manage.py broker_eventos)
+para que los eventos lleguen a las pantallas de todos los procesos. Sólo
+Linux (lee /proc).
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from _entorno import RAIZ, preparar_django, borrar_bd, percentil, imprimir_reporte
+from bench_asgi import puerto_libre, esperar_servidor, leer_respuesta
+
+
+def rss_kb(pid):
+    """RSS (KB) del proceso y de todos sus hijos (los workers de uvicorn)."""
+    total = 0
+    pendientes = [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with open(f'/proc/{actual}/status') as f:
+                total += next(int(l.split()[1]) for l in f if l.startswith('VmRSS:'))
+            for tarea in Path(f'/proc/{actual}/task').iterdir():
+                pendientes.extend(int(h) for h in (tarea / 'children').read_text().split())
+        except (FileNotFoundError, StopIteration):
+            pass
+    return total
+
+
+class Pantalla:
+    """Un cliente SSE: anota cuándo recibe cada evento 'menu'."""
+
+    def __init__(self):
+        self.conectada = asyncio.Event()
+        self.recibidos = []
+
+    async def correr(self, puerto):
+        lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+        try:
+            escritor.write(b'GET /eventos/cocina/ HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n')
+            await escritor.drain()
+            resto = b''
+            while datos := await lector.read(65536):
+                ahora = time.perf_counter()
+                datos = resto + datos
+                if b'event: estado' in datos:
+                    self.conectada.set()
+                self.recibidos.extend([ahora] * datos.count(b'event: menu'))
+                resto = datos[-16:]  # un nombre de evento partido entre dos lecturas
+        finally:
+            escritor.close()
+
+
+async def cambiar_disponibilidad(puerto, producto_id, disponible):
+    cuerpo = json.dumps({'actualizar': [{'id': producto_id, 'habilitado': disponible}]}).encode()
+    lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+    try:
+        escritor.write(
+            b'POST /api/menu/lote/ HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n'
+            b'Content-Type: application/json\r\nContent-Length: ' + str(len(cuerpo)).encode() + b'\r\n\r\n' + cuerpo
+        )
+        await escritor.drain()
+        estado, _ = await leer_respuesta(lector)
+        if estado != 200:
+            raise RuntimeError(f"La API respondió {estado}")
+    finally:
+        escritor.close()
+
+
+async def medir(puerto, pid, args, producto_id):
+    # Calentamiento: una pantalla que se conecta y se va
+    calentamiento = Pantalla()
+    tarea = asyncio.create_task(calentamiento.correr(puerto))
+    await asyncio.wait_for(calentamiento.conectada.wait(), 30)
+    tarea.cancel()
+    await asyncio.sleep(1)
+    antes = rss_kb(pid)
+
+    pantallas = [Pantalla() for _ in range(args.pantallas)]
+    tareas = []
+    for i, pantalla in enumerate(pantallas):
+        tareas.append(asyncio.create_task(pantalla.correr(puerto)))
+        if i % 50 == 49:
+            await asyncio.sleep(0.05)  # sin saturar el backlog del servidor
+    await asyncio.wait_for(asyncio.gather(*(p.conectada.wait() for p in pantallas)), 120)
+    await asyncio.sleep(1)
+    despues = rss_kb(pid)
+
+    enviados = []
+    for i in range(args.cambios):
+        enviados.append(time.perf_counter())
+        await cambiar_disponibilidad(puerto, producto_id, i % 2 == 1)
+        await asyncio.sleep(args.pausa)
+    await asyncio.sleep(2)
+    for tarea in tareas:
+        tarea.cancel()
+
+    latencias, perdidos = [], 0
+    for pantalla in pantallas:
+        perdidos += max(0, len(enviados) - len(pantalla.recibidos))
+        latencias.extend(r - e for e, r in zip(enviados, pantalla.recibidos))
+    return [
+        ('RSS del servidor sin pantallas (MB)', antes / 1024),
+        (f'RSS con {args.pantallas} pantallas (MB)', despues / 1024),
+        ('memoria por conexión (KB)', (despues - antes) / args.pantallas),
+        ('entrega p50 (ms)', percentil(latencias, 50) * 1000),
+        ('entrega p99 (ms)', percentil(latencias, 99) * 1000),
+        ('eventos perdidos', perdidos),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pantallas', type=int, default=500)
+    parser.add_argument('--cambios', type=int, default=50)
+    parser.add_argument('--pausa', type=float, default=0.1, help='segundos entre cambios')
+    parser.add_argument('--procesos', type=int, default=1, help='workers de uvicorn')
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('uvicorn') is None:
+        sys.exit("uvicorn no está instalado (pip install uvicorn)")
+    suave, duro = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(suave, min(duro, args.pantallas * 2 + 256)), duro))
+
+    os.environ.setdefault('PIZZERIA_CONN_MAX_AGE', '0')
+    broker = None
+    if args.procesos > 1:
+        os.environ['PIZZERIA_EVENTOS_BROKER'] = os.path.join(tempfile.gettempdir(), f'pizzeria_eventos_{os.getpid()}.sock')
+    ruta_bd = preparar_django()
+    try:
+        from app_Pizzeria.models import Menu
+        producto = Menu.objects.create(nombre='Pizza', precio=Decimal('150'), categoria='Pizza')
+
+        if args.procesos > 1:
+            broker = subprocess.Popen([sys.executable, 'manage.py', 'broker_eventos'], cwd=RAIZ, env=os.environ.copy())
+        puerto = puerto_libre()
+        servidor = subprocess.Popen([
+            sys.executable, '-m', 'uvicorn', 'backend_Pizzeria.asgi:application',
+            '--host', '127.0.0.1', '--port', str(puerto), '--workers', str(args.procesos),
+            '--backlog', '4096', '--log-level', 'warning', '--no-access-log',
+        ], cwd=RAIZ, env=os.environ.copy())
+        try:
+            esperar_servidor(puerto, servidor)
+            filas = asyncio.run(medir(puerto, servidor.pid, args, producto.id))
+        finally:
+            servidor.terminate()
+            servidor.wait(timeout=30)
+        imprimir_reporte(f'{args.pantallas} pantallas, {args.procesos} proceso(s), {args.cambios} cambios', filas)
+    finally:
+        if broker is not None:
+            broker.terminate()
+            broker.wait(timeout=10)
+        borrar_bd(ruta_bd)
+
+
+if __name__ == '__main__':
+    main()
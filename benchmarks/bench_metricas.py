@@ -0,0 +1,90 @@
+"""
+Costo de las métricas (MetricasMiddleware + medición de consultas y plantillas).
+
+Pide las mismas páginas con y sin instrumentación, en rondas alternadas para
+que el ruido afecte igual a los dos modos, y reporta el tiempo por petición
+y la diferencia en porcentaje. También mide el costo aislado de registrar una
+petición en los acumuladores por hilo.
+
+    python benchmarks/bench_metricas.py --rondas 20 --peticiones 100
+"""
+import argparse
+import statistics
+import time
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, imprimir_reporte
+
+RUTAS = ['/menu/', '/inventario/', '/proveedores/', '/api/inventario/', '/pedidos/']
+
+
+def crear_datos():
+    from app_Pizzeria.models import Proveedores, Inventario, Menu
+
+    proveedor = Proveedores.objects.create(nombre_proveedor='Proveedor')
+    Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', stock=Decimal(i % 50), unidad='kg', proveedor=proveedor)
+        for i in range(2000)
+    ])
+    Menu.objects.bulk_create([
+        Menu(nombre=f'Pizza {i}', precio=Decimal('150.00'), categoria='Pizza') for i in range(200)
+    ])
+
+
+def ronda(cliente, peticiones):
+    inicio = time.perf_counter()
+    for i in range(peticiones):
+        respuesta = cliente.get(RUTAS[i % len(RUTAS)])
+        assert respuesta.status_code == 200, respuesta.status_code
+    return (time.perf_counter() - inicio) / peticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rondas', type=int, default=20)
+    parser.add_argument('--peticiones', type=int, default=100, help='peticiones por ronda')
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.conf import settings
+        from django.db import connection
+        from django.test import Client, override_settings
+        from app_Pizzeria import metricas
+
+        crear_datos()
+        cliente = Client()
+        sin_middleware = [m for m in settings.MIDDLEWARE if 'metricas' not in m]
+        plantillas = [{**settings.TEMPLATES[0], 'BACKEND': 'django.template.backends.django.DjangoTemplates'}]
+
+        ronda(cliente, len(RUTAS) * 4)  # calentamiento (plantillas, URLs, conexión)
+        con, sin = [], []
+        for _ in range(args.rondas):
+            metricas.instalar(connection)
+            con.append(ronda(cliente, args.peticiones))
+            with override_settings(MIDDLEWARE=sin_middleware, TEMPLATES=plantillas):
+                connection.execute_wrappers.remove(metricas.medir_consulta)
+                sin.append(ronda(cliente, args.peticiones))
+        metricas.instalar(connection)
+
+        medicion = metricas.Medicion()
+        veces = 100_000
+        inicio = time.perf_counter()
+        for _ in range(veces):
+            metricas.registrar('ver_menu', 0.003, medicion, 200, 12_000)
+        registro = (time.perf_counter() - inicio) / veces
+
+        con_ms, sin_ms = statistics.median(con) * 1000, statistics.median(sin) * 1000
+        imprimir_reporte(f'Métricas: {args.rondas} rondas de {args.peticiones} peticiones', [
+            ('sin métricas (ms/petición)', sin_ms),
+            ('con métricas (ms/petición)', con_ms),
+            ('diferencia (%)', (con_ms - sin_ms) / sin_ms * 100),
+            ('registrar una petición (µs)', registro * 1e6),
+            ('tamaño de /metrics (bytes)', len(cliente.get('/metrics').content)),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark de la bitácora de movimientos de inventario.
+
+Genera N movimientos (por defecto 10,000,000) repartidos en un año entre los
+artículos, toma saldos periódicos (tomar_instantanea) y mide:
+
+- stock_en(articulo, fecha) partiendo del saldo más cercano, contra sumar la
+  historia completa del artículo;
+- con_stock_en(fecha) para todo el inventario;
+- el escritor por lotes (RegistroMovimientos), en renglones/seg.
+
+    python benchmarks/bench_movimientos.py --movimientos 10000000 --articulos 1000
+    python benchmarks/bench_movimientos.py --cada 1   # saldos diarios
+"""
+import argparse
+import datetime
+import random
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+INICIO = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def crear_datos(num_movimientos, num_articulos, dias):
+    from django.db import connection
+    from app_Pizzeria.models import Inventario, MovimientoInventario
+
+    Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', unidad='kg') for i in range(num_articulos)
+    ])
+    primero = Inventario.objects.order_by('id').values_list('id', flat=True).first()
+    # Los movimientos se generan dentro de SQLite (CTE recursiva): crear 10
+    # millones de objetos en Python tardaría más que todo lo que se mide
+    segundos = dias * 86400 / num_movimientos
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < %s)
+            INSERT INTO {MovimientoInventario._meta.db_table} (inventario_id, fecha, tipo, cantidad)
+            SELECT %s + (i * 7919) %% %s,
+                   datetime(%s, '+' || CAST(i * %s AS INTEGER) || ' seconds'),
+                   CASE WHEN i %% 5 = 0 THEN 1 ELSE 2 END,
+                   CASE WHEN i %% 5 = 0 THEN 4 ELSE -1 END
+            FROM n
+            """,
+            [num_movimientos - 1, primero, num_articulos, INICIO.strftime('%Y-%m-%d %H:%M:%S'), segundos],
+        )
+    return primero
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--movimientos', type=int, default=10_000_000)
+    parser.add_argument('--articulos', type=int, default=1_000)
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--cada', type=int, default=7, help='días entre saldos')
+    parser.add_argument('--consultas', type=int, default=200)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.db import transaction
+        from django.db.models import Sum
+        from app_Pizzeria import movimientos
+        from app_Pizzeria.models import MovimientoInventario
+
+        with Cronometro() as generacion:
+            primero = crear_datos(args.movimientos, args.articulos, args.dias)
+
+        with Cronometro() as saldos:
+            for dia in range(args.cada, args.dias + 1, args.cada):
+                movimientos.tomar_instantanea(INICIO + datetime.timedelta(days=dia))
+
+        azar = random.Random(1)
+        consultas = [
+            (primero + azar.randrange(args.articulos),
+             INICIO + datetime.timedelta(seconds=azar.randrange(args.dias * 86400)))
+            for _ in range(args.consultas)
+        ]
+        con_saldo, sin_saldo = [], []
+        for articulo_id, fecha in consultas:
+            with Cronometro() as c:
+                resultado = movimientos.stock_en(articulo_id, fecha)
+            con_saldo.append(c.segundos)
+            with Cronometro() as c:
+                completo = MovimientoInventario.objects.filter(
+                    inventario_id=articulo_id, fecha__lt=fecha,
+                ).aggregate(total=Sum('cantidad'))['total'] or Decimal('0')
+            sin_saldo.append(c.segundos)
+            assert resultado == completo, (articulo_id, fecha, resultado, completo)
+
+        with Cronometro() as todos:
+            list(movimientos.con_stock_en(INICIO + datetime.timedelta(days=args.dias // 2)).values_list('id', 'stock_en_fecha'))
+
+        lote = 100_000
+        with Cronometro() as escritura, transaction.atomic():
+            with movimientos.RegistroMovimientos() as registro:
+                for i in range(lote):
+                    registro.agregar(primero + i % args.articulos, Decimal('-1'), MovimientoInventario.CONSUMO)
+
+        imprimir_reporte(f'{args.movimientos:,} movimientos, {args.articulos:,} artículos, saldo cada {args.cada} días', [
+            ('generar movimientos (s)', generacion.segundos),
+            ('tomar saldos (s)', saldos.segundos),
+            ('stock_en con saldo p50 (ms)', percentil(con_saldo, 50) * 1000),
+            ('stock_en con saldo p99 (ms)', percentil(con_saldo, 99) * 1000),
+            ('historia completa p50 (ms)', percentil(sin_saldo, 50) * 1000),
+            ('historia completa p99 (ms)', percentil(sin_saldo, 99) * 1000),
+            ('inventario completo en una fecha (ms)', todos.segundos * 1000),
+            ('escritor por lotes (renglones/s)', lote / escritura.segundos),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
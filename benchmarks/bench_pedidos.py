@@ -0,0 +1,152 @@
+"""
+Benchmark de pedidos concurrentes (hora pico).
+
+Varios procesos registran pedidos al mismo tiempo sobre los mismos
+ingredientes "calientes" (masa, queso, salsa). Reporta pedidos/seg, la
+latencia por pedido y el tiempo de espera de bloqueo, y al final verifica
+que no se perdió ninguna actualización de stock.
+
+    python benchmarks/bench_pedidos.py --pedidos 2000 --trabajadores 4
+
+La "espera de bloqueo" es la duración de la primera sentencia de escritura
+de cada transacción (en SQLite ahí se espera el candado de escritura; en
+PostgreSQL es el SELECT ... FOR UPDATE de descontar_stock).
+"""
+import argparse
+import multiprocessing
+import random
+import time
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte
+
+ESCRITURAS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def crear_datos(num_productos, num_articulos):
+    from app_Pizzeria.models import Inventario, Menu, Receta
+    from app_Pizzeria.recetas import expandir_productos
+
+    articulos = Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', stock=Decimal('1000000'), unidad='kg')
+        for i in range(num_articulos)
+    ])
+    productos = Menu.objects.bulk_create([
+        Menu(nombre=f'Pizza {i}', precio=Decimal('150.00'), categoria='Pizza')
+        for i in range(num_productos)
+    ])
+    calientes = articulos[:3]  # masa, queso y salsa: los usan todos
+    recetas = []
+    azar = random.Random(1)
+    for producto in productos:
+        extras = azar.sample(articulos[3:], k=min(3, len(articulos) - 3))
+        for articulo in calientes + extras:
+            recetas.append(Receta(menu=producto, inventario=articulo, cantidad=Decimal('0.250')))
+    Receta.objects.bulk_create(recetas)
+    expandir_productos()  # bulk_create no envía señales
+    return [p.id for p in productos]
+
+
+def trabajador(numero, pedidos, productos, cola):
+    from django.db import connection, connections, OperationalError
+    from app_Pizzeria.pedidos import registrar_pedido, PedidoInvalido
+
+    connections.close_all()  # cada proceso abre su propia conexión
+    azar = random.Random(numero)
+    estado = {'espera': None}
+
+    def medir(execute, sql, params, many, context):
+        if estado['espera'] is not None or not sql.lstrip().upper().startswith(ESCRITURAS + ('SELECT',)):
+            return execute(sql, params, many, context)
+        es_bloqueo = sql.lstrip().upper().startswith(ESCRITURAS) or 'FOR UPDATE' in sql.upper()
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if es_bloqueo:
+                estado['espera'] = time.perf_counter() - inicio
+
+    latencias, esperas, errores = [], [], 0
+    with connection.execute_wrapper(medir):
+        for _ in range(pedidos):
+            lineas = [(azar.choice(productos), azar.randint(1, 3)) for _ in range(azar.randint(1, 4))]
+            estado['espera'] = None
+            inicio = time.perf_counter()
+            try:
+                registrar_pedido(lineas)
+            except (OperationalError, PedidoInvalido):
+                errores += 1
+                continue
+            latencias.append(time.perf_counter() - inicio)
+            esperas.append(estado['espera'] or 0.0)
+    cola.put((latencias, esperas, errores))
+
+
+def verificar_stock():
+    """Compara el stock final contra lo que dicen los pedidos registrados."""
+    from collections import defaultdict
+    from app_Pizzeria.models import Inventario, RecetaExpandida, DetallePedido
+
+    recetas = defaultdict(list)
+    for menu_id, inventario_id, cantidad in RecetaExpandida.objects.values_list('menu_id', 'inventario_id', 'cantidad'):
+        recetas[menu_id].append((inventario_id, cantidad))
+    esperado = defaultdict(Decimal)
+    for producto_id, cantidad in DetallePedido.objects.values_list('producto_id', 'cantidad'):
+        for inventario_id, por_pieza in recetas[producto_id]:
+            esperado[inventario_id] += por_pieza * cantidad
+    diferencias = 0
+    for articulo in Inventario.objects.all():
+        if Decimal('1000000') - esperado[articulo.id] != articulo.stock:
+            diferencias += 1
+    return diferencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pedidos', type=int, default=2000, help='pedidos totales')
+    parser.add_argument('--trabajadores', type=int, default=4, help='procesos concurrentes')
+    parser.add_argument('--productos', type=int, default=50)
+    parser.add_argument('--articulos', type=int, default=30)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        productos = crear_datos(args.productos, args.articulos)
+        from django.db import connections
+        connections.close_all()
+
+        cola = multiprocessing.Queue()
+        por_trabajador = args.pedidos // args.trabajadores
+        procesos = [
+            multiprocessing.Process(target=trabajador, args=(n, por_trabajador, productos, cola))
+            for n in range(args.trabajadores)
+        ]
+        inicio = time.perf_counter()
+        for proceso in procesos:
+            proceso.start()
+        resultados = [cola.get() for _ in procesos]
+        for proceso in procesos:
+            proceso.join()
+        duracion = time.perf_counter() - inicio
+
+        latencias = [x for r in resultados for x in r[0]]
+        esperas = [x for r in resultados for x in r[1]]
+        errores = sum(r[2] for r in resultados)
+        imprimir_reporte('Pedidos concurrentes', [
+            ('trabajadores', args.trabajadores),
+            ('pedidos registrados', len(latencias)),
+            ('errores', errores),
+            ('pedidos/seg', len(latencias) / duracion),
+            ('latencia p50 (ms)', percentil(latencias, 50) * 1000),
+            ('latencia p99 (ms)', percentil(latencias, 99) * 1000),
+            ('espera de bloqueo p50 (ms)', percentil(esperas, 50) * 1000),
+            ('espera de bloqueo p99 (ms)', percentil(esperas, 99) * 1000),
+            ('espera de bloqueo total (s)', sum(esperas)),
+            ('artículos con stock inconsistente', verificar_stock()),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
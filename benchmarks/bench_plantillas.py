@@ -0,0 +1,151 @@
+"""
+Render de las tablas ver_proveedores, ver_inventario y ver_menu con N
+renglones (por defecto 10,000) cada una.
+
+Para cada página mide el tiempo por render (p50) y la memoria pico que asigna
+un render (tracemalloc), en cuatro modos:
+
+- sin caché: cargador sin caché (se lee y compila la plantilla cada vez) y
+  sin caché de fragmentos, como antes;
+- fragmentos fríos: cargador en caché, la caché de fragmentos vacía;
+- fragmentos calientes: la tabla completa sale de la caché;
+- un renglón cambiado: la tabla se arma con los renglones en caché y sólo
+  se renderiza el renglón que cambió.
+
+    python benchmarks/bench_plantillas.py --renglones 10000 --rondas 5
+"""
+import argparse
+import tracemalloc
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+PAGINAS = [
+    # (plantilla, variable de la tabla)
+    ('proveedores/ver_proveedores.html', 'proveedores'),
+    ('inventario/ver_inventario.html', 'articulos'),
+    ('menu/ver_menu.html', 'productos'),
+]
+
+
+def crear_datos(renglones):
+    from app_Pizzeria.models import Proveedores, Inventario, Menu
+
+    Proveedores.objects.bulk_create([
+        Proveedores(nombre_proveedor=f'Proveedor {i}', telefono_contacto='555-0100', rfc=f'RFC{i:08d}')
+        for i in range(renglones)
+    ], batch_size=1000)
+    proveedor = Proveedores.objects.first()
+    Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', stock=Decimal(i % 50), unidad='kg',
+                   stock_minimo=Decimal('5'), costo_unitario=Decimal('12.50'), proveedor=proveedor)
+        for i in range(renglones)
+    ], batch_size=1000)
+    Menu.objects.bulk_create([
+        Menu(nombre=f'Pizza {i}', precio=Decimal('150.00'), categoria='Pizza', tamaño='Grande')
+        for i in range(renglones)
+    ], batch_size=1000)
+
+
+def objetos(variable, renglones):
+    from app_Pizzeria.listados import LISTADO_PROVEEDORES, LISTADO_INVENTARIO, LISTADO_MENU
+
+    listado = {
+        'proveedores': LISTADO_PROVEEDORES, 'articulos': LISTADO_INVENTARIO, 'productos': LISTADO_MENU,
+    }[variable]
+    return list(listado.consulta().order_by('id')[:renglones])
+
+
+def renderizar(plantilla, variable, filas, request):
+    from django.template.loader import render_to_string
+    from app_Pizzeria import fragmentos
+
+    # Igual que la vista: las claves se calculan en cada petición
+    contexto = {variable: filas, 'pagina': filas, **fragmentos.preparar(filas)}
+    return render_to_string(plantilla, contexto, request)
+
+
+def medir(rondas, funcion):
+    """(p50 en ms, memoria pico en KB) de `rondas` llamadas a funcion()."""
+    tiempos = []
+    for _ in range(rondas):
+        with Cronometro() as c:
+            funcion()
+        tiempos.append(c.segundos)
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return percentil(tiempos, 50) * 1000, pico / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--renglones', type=int, default=10_000)
+    parser.add_argument('--rondas', type=int, default=5)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.conf import settings
+        from django.core.cache import caches
+        from django.test import RequestFactory, override_settings
+
+        crear_datos(args.renglones)
+        request = RequestFactory().get('/')
+        sin_cache = {
+            'TEMPLATES': [{
+                **settings.TEMPLATES[0],
+                'OPTIONS': {
+                    **settings.TEMPLATES[0]['OPTIONS'],
+                    'loaders': [
+                        'django.template.loaders.filesystem.Loader',
+                        'django.template.loaders.app_directories.Loader',
+                    ],
+                },
+            }],
+            'CACHES': {
+                **settings.CACHES,
+                'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            },
+        }
+
+        filas_reporte = []
+        for plantilla, variable in PAGINAS:
+            filas = objetos(variable, args.renglones)
+            nombre = plantilla.split('/')[-1].removesuffix('.html')
+
+            def render():
+                renderizar(plantilla, variable, filas, request)
+
+            def render_frio():
+                caches['template_fragments'].clear()
+                render()
+
+            def render_un_cambio():
+                filas[0].version += 1  # como si se hubiera editado un renglón
+                render()
+
+            with override_settings(**sin_cache):
+                render()  # calentamiento (URLs, etiquetas)
+                base = medir(args.rondas, render)
+            render()
+            frio = medir(args.rondas, render_frio)
+            render()
+            caliente = medir(args.rondas, render)
+            un_cambio = medir(args.rondas, render_un_cambio)
+
+            for modo, (ms, kb) in (('sin caché', base), ('fragmentos fríos', frio),
+                                   ('fragmentos calientes', caliente), ('un renglón cambiado', un_cambio)):
+                filas_reporte.append((f'{nombre}: {modo} (ms)', ms))
+                filas_reporte.append((f'{nombre}: {modo} (KB pico)', kb))
+
+        imprimir_reporte(f'Render de tablas con {args.renglones:,} renglones ({args.rondas} rondas)', filas_reporte)
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
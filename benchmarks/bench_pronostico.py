@@ -0,0 +1,92 @@
+"""
+Pronóstico de consumo y stock mínimo sugerido (app_Pizzeria/pronostico.py).
+
+Mide por separado:
+
+- el cálculo con NumPy sobre una matriz de consumo de N artículos x D días
+  (por defecto 100,000 x 365), en un proceso y con --procesos;
+- el proceso completo (leer la bitácora, calcular, escribir con bulk_update)
+  sobre una base con --articulos-bd artículos y un consumo por artículo y día.
+
+    pip install numpy
+    python benchmarks/bench_pronostico.py --articulos 100000 --dias 365 --procesos 4
+    python benchmarks/bench_pronostico.py --articulos-bd 20000
+"""
+import argparse
+import datetime
+
+from _entorno import preparar_django, borrar_bd, imprimir_reporte, Cronometro
+
+
+def crear_datos(num_articulos, dias, hasta):
+    from django.db import connection
+    from app_Pizzeria.models import Inventario, MovimientoInventario
+
+    Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', unidad='kg') for i in range(num_articulos)
+    ], batch_size=5000)
+    primero = Inventario.objects.order_by('id').values_list('id', flat=True).first()
+    inicio = datetime.datetime.combine(hasta - datetime.timedelta(days=dias), datetime.time(13))
+    # Un consumo por artículo y día, con más consumo en fin de semana; se
+    # genera dentro de SQLite (CTE recursiva) como en bench_movimientos.py
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < %s)
+            INSERT INTO {MovimientoInventario._meta.db_table} (inventario_id, fecha, tipo, cantidad)
+            SELECT %s + i %% %s,
+                   datetime(%s, '+' || (i / %s) || ' days'),
+                   %s,
+                   -(1 + (i * 7919) %% 5 + CASE WHEN (i / %s) %% 7 IN (4, 5) THEN 4 ELSE 0 END)
+            FROM n
+            """,
+            [num_articulos * dias - 1, primero, num_articulos, inicio.strftime('%Y-%m-%d %H:%M:%S'),
+             num_articulos, MovimientoInventario.CONSUMO, num_articulos],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articulos', type=int, default=100_000, help='renglones de la matriz')
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--procesos', type=int, default=4)
+    parser.add_argument('--articulos-bd', type=int, default=5_000, help='artículos en la base (0: omitir)')
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.utils import timezone
+        from app_Pizzeria import pronostico
+        import numpy as np
+
+        azar = np.random.default_rng(1)
+        consumo = azar.poisson(4, (args.articulos, args.dias)).astype(np.float64)
+        with Cronometro() as un_proceso:
+            pronostico.pronosticar(consumo, 0)
+        with Cronometro() as varios:
+            pronostico.pronosticar_en_paralelo(consumo, 0, args.procesos)
+        filas = [
+            (f'cálculo {args.articulos:,} x {args.dias} días, 1 proceso (s)', un_proceso.segundos),
+            (f'cálculo {args.articulos:,} x {args.dias} días, {args.procesos} procesos (s)', varios.segundos),
+        ]
+
+        if args.articulos_bd:
+            hasta = timezone.localdate()
+            crear_datos(args.articulos_bd, args.dias, hasta)
+            with Cronometro() as lectura:
+                ids, matriz, inicio = pronostico.historial(args.dias, hasta)
+            with Cronometro() as completo:
+                cambios = pronostico.sugerir_minimos(dias=args.dias, hasta=hasta)
+            filas += [
+                (f'leer bitácora ({len(ids):,} artículos x {args.dias} días) (s)', lectura.segundos),
+                ('leer + calcular + escribir (s)', completo.segundos),
+                ('stocks mínimos actualizados', len(cambios)),
+            ]
+
+        imprimir_reporte('Pronóstico de stock mínimo', filas)
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark de las sub-recetas y la receta expandida (recetas.py).
+
+Crea preparaciones en niveles (masas y salsas hechas de artículos, bases
+hechas de masas y salsas...) y un menú donde cada producto lleva unas
+cuantas preparaciones más algunos artículos directos. Mide:
+
+  - la reconstrucción completa (aplanar todas las preparaciones con memo y
+    expandir todos los productos en la base);
+  - aplanar las preparaciones sin memo (cada una recorre su gráfica completa);
+  - el cambio de un componente de una preparación de primer nivel, que
+    vuelve a aplanar sólo ella y las que la usan y expande sus productos;
+  - el consumo de un pedido leyendo RecetaExpandida contra recorrer la
+    gráfica de cada producto en cada pedido.
+
+Al final verifica que la receta expandida coincide con recorrer la gráfica.
+
+    python benchmarks/bench_recetas.py --productos 5000 --niveles 3
+"""
+import argparse
+import random
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+
+def crear_datos(num_productos, num_articulos, por_nivel, niveles, componentes):
+    from app_Pizzeria.models import (
+        ComponentePreparacion, Inventario, Menu, Preparacion, Receta, RecetaPreparacion,
+    )
+
+    azar = random.Random(1)
+    articulos = Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', stock=Decimal('100000'), unidad='kg',
+                   costo_unitario=Decimal('20.00'))
+        for i in range(num_articulos)
+    ])
+    # Nivel 0: sólo artículos; cada nivel siguiente usa preparaciones del anterior
+    capas, filas = [], []
+    for nivel in range(niveles):
+        capa = Preparacion.objects.bulk_create([
+            Preparacion(nombre=f'Preparación {nivel}-{i}', unidad='kg') for i in range(por_nivel)
+        ])
+        for preparacion in capa:
+            for articulo in azar.sample(articulos, componentes):
+                filas.append(ComponentePreparacion(
+                    preparacion=preparacion, articulo=articulo, cantidad=Decimal(azar.randrange(5, 50)) / 100,
+                ))
+            if capas:
+                for sub in azar.sample(capas[-1], min(componentes, len(capas[-1]))):
+                    filas.append(ComponentePreparacion(
+                        preparacion=preparacion, subpreparacion=sub, cantidad=Decimal(azar.randrange(10, 90)) / 100,
+                    ))
+        capas.append(capa)
+    ComponentePreparacion.objects.bulk_create(filas, batch_size=5000)
+
+    productos = Menu.objects.bulk_create([
+        Menu(nombre=f'Pizza {i}', precio=Decimal('150.00'), categoria='Pizza') for i in range(num_productos)
+    ])
+    todas = [p for capa in capas for p in capa]
+    recetas, usos = [], []
+    for producto in productos:
+        recetas.extend(
+            Receta(menu=producto, inventario=a, cantidad=Decimal('0.100')) for a in azar.sample(articulos, 2)
+        )
+        usos.extend(
+            RecetaPreparacion(menu=producto, preparacion=p, cantidad=Decimal('0.500')) for p in azar.sample(todas, 3)
+        )
+    Receta.objects.bulk_create(recetas, batch_size=5000)
+    RecetaPreparacion.objects.bulk_create(usos, batch_size=5000)
+    return [p.id for p in productos], capas
+
+
+def consumo_recorriendo(cantidades):
+    """Lo que haría cada pedido sin la expansión: leer y recorrer la gráfica."""
+    from app_Pizzeria import recetas
+    from app_Pizzeria.models import Receta, RecetaPreparacion
+
+    grafo = recetas._grafo()
+    consumo = defaultdict(Decimal)
+    for menu_id, inventario_id, cantidad in Receta.objects.filter(menu_id__in=cantidades).values_list(
+        'menu_id', 'inventario_id', 'cantidad'
+    ):
+        consumo[inventario_id] += cantidad * cantidades[menu_id]
+    for menu_id, preparacion_id, cantidad in RecetaPreparacion.objects.filter(menu_id__in=cantidades).values_list(
+        'menu_id', 'preparacion_id', 'cantidad'
+    ):
+        for inventario_id, por_unidad in recetas._aplanar(preparacion_id, grafo, {}).items():
+            consumo[inventario_id] += cantidad * por_unidad * cantidades[menu_id]
+    return consumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--productos', type=int, default=5_000)
+    parser.add_argument('--articulos', type=int, default=500)
+    parser.add_argument('--por-nivel', type=int, default=40, help='preparaciones por nivel')
+    parser.add_argument('--niveles', type=int, default=3)
+    parser.add_argument('--componentes', type=int, default=3, help='componentes por preparación')
+    parser.add_argument('--pedidos', type=int, default=200)
+    parser.add_argument('--cambios', type=int, default=20)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from app_Pizzeria import recetas
+        from app_Pizzeria.models import ComponentePreparacion, Preparacion, RecetaExpandida
+        from app_Pizzeria.pedidos import calcular_consumo
+
+        productos, capas = crear_datos(
+            args.productos, args.articulos, args.por_nivel, args.niveles, args.componentes,
+        )
+        with Cronometro() as completo:
+            renglones = recetas.reconstruir()
+
+        grafo = recetas._grafo()
+        ids = list(Preparacion.objects.values_list('id', flat=True))
+        with Cronometro() as con_memo:
+            memo = {}
+            for preparacion_id in ids:
+                recetas._aplanar(preparacion_id, grafo, memo)
+        with Cronometro() as sin_memo:
+            for preparacion_id in ids:
+                recetas._aplanar(preparacion_id, grafo, {})
+
+        # Cambios en un componente de una preparación de primer nivel
+        azar = random.Random(2)
+        cambios, expandidos = [], 0
+        for i in range(args.cambios):
+            componente = ComponentePreparacion.objects.filter(preparacion=azar.choice(capas[0])).first()
+            componente.cantidad = Decimal('0.200') + Decimal(i) / 1000
+            with Cronometro() as c:
+                componente.save()
+            cambios.append(c.segundos)
+            expandidos += len(recetas.expandir_preparaciones([componente.preparacion_id]))
+
+        # Consumo de pedidos: receta expandida contra recorrer la gráfica
+        expandida, recorriendo = [], []
+        for _ in range(args.pedidos):
+            cantidades = {azar.choice(productos): azar.randint(1, 3) for _ in range(3)}
+            with Cronometro() as c:
+                calcular_consumo(cantidades)
+            expandida.append(c.segundos)
+            with Cronometro() as c:
+                consumo_recorriendo(cantidades)
+            recorriendo.append(c.segundos)
+
+        # Verificación: la expansión guardada contra recorrer la gráfica
+        distintos = 0
+        guardada = defaultdict(dict)
+        for menu_id, inventario_id, cantidad in RecetaExpandida.objects.values_list(
+            'menu_id', 'inventario_id', 'cantidad'
+        ):
+            guardada[menu_id][inventario_id] = cantidad
+        cuanto = Decimal(1).scaleb(-recetas.DECIMALES)
+        for menu_id in productos[:500]:
+            # ROUND() de la base redondea los medios hacia arriba
+            calculada = {
+                i: c.quantize(cuanto, ROUND_HALF_UP) for i, c in consumo_recorriendo({menu_id: 1}).items()
+            }
+            if {i: c for i, c in calculada.items() if c} != guardada[menu_id]:
+                distintos += 1
+
+        imprimir_reporte(f'Sub-recetas con {args.productos:,} productos y {len(ids)} preparaciones', [
+            ('renglones de receta expandida', renglones),
+            ('reconstrucción completa (ms)', completo.segundos * 1000),
+            ('aplanar todas con memo (ms)', con_memo.segundos * 1000),
+            ('aplanar todas sin memo (ms)', sin_memo.segundos * 1000),
+            ('cambio de componente p50 (ms)', percentil(cambios, 50) * 1000),
+            ('productos por cambio (promedio)', expandidos / max(1, args.cambios)),
+            ('consumo expandido p50 (ms)', percentil(expandida, 50) * 1000),
+            ('consumo recorriendo p50 (ms)', percentil(recorriendo, 50) * 1000),
+            ('expansiones distintas (de 500)', distintos),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
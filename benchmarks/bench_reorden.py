@@ -0,0 +1,93 @@
+"""
+Benchmark del tablero de reorden con un inventario grande.
+
+Crea N artículos (por defecto 100,000) repartidos entre proveedores, con un
+pequeño porcentaje por debajo del mínimo, y mide resumen_reorden(),
+sugerencias_reorden() y la vista del tablero. También muestra el plan de consulta para confirmar que se
+usa el índice parcial inv_reorden_idx y no un recorrido de la tabla.
+
+    python benchmarks/bench_reorden.py --articulos 100000 --porcentaje 1
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+
+def crear_datos(num_articulos, num_proveedores, porcentaje):
+    from app_Pizzeria.models import Proveedores, Inventario
+
+    proveedores = Proveedores.objects.bulk_create([
+        Proveedores(nombre_proveedor=f'Proveedor {i}') for i in range(num_proveedores)
+    ])
+    azar = random.Random(1)
+    lote = []
+    for i in range(num_articulos):
+        bajo = azar.random() * 100 < porcentaje
+        lote.append(Inventario(
+            nombre_articulo=f'Artículo {i}',
+            stock=Decimal(azar.randint(0, 4) if bajo else azar.randint(10, 100)),
+            stock_minimo=Decimal('5'),
+            costo_unitario=Decimal('12.50'),
+            unidad='kg',
+            proveedor=azar.choice(proveedores),
+        ))
+        if len(lote) == 5000:
+            Inventario.objects.bulk_create(lote)
+            lote = []
+    Inventario.objects.bulk_create(lote)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articulos', type=int, default=100_000)
+    parser.add_argument('--proveedores', type=int, default=50)
+    parser.add_argument('--porcentaje', type=float, default=1.0, help='%% de artículos bajo el mínimo')
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.test import Client
+        from django.urls import reverse
+        from app_Pizzeria import sucursales
+        from app_Pizzeria.models import Inventario, SUCURSAL_PRINCIPAL
+        from app_Pizzeria.reorden import resumen_reorden, sugerencias_reorden
+
+        with Cronometro() as carga:
+            crear_datos(args.articulos, args.proveedores, args.porcentaje)
+
+        # Como en el tablero: filtrado por la sucursal de la petición
+        print(Inventario.objects.de_sucursal(SUCURSAL_PRINCIPAL).filter(bajo_minimo=True)
+              .order_by('proveedor_id', 'id').explain())
+
+        resumen, detalle, vista = [], [], []
+        cliente = Client()
+        url = reverse('reorden_inventario')
+        for _ in range(args.repeticiones):
+            with sucursales.activar('principal'), Cronometro() as c:
+                resumen_reorden()
+            resumen.append(c.segundos)
+            with sucursales.activar('principal'), Cronometro() as c:
+                grupos = sugerencias_reorden()
+            detalle.append(c.segundos)
+            with Cronometro() as c:
+                cliente.get(url)
+            vista.append(c.segundos)
+
+        imprimir_reporte(f'Reorden con {args.articulos:,} artículos', [
+            ('carga de datos (s)', carga.segundos),
+            ('artículos por reordenar', sum(len(g) for g in grupos)),
+            ('resumen p50 (ms)', percentil(resumen, 50) * 1000),
+            ('resumen p99 (ms)', percentil(resumen, 99) * 1000),
+            ('detalle completo p50 (ms)', percentil(detalle, 50) * 1000),
+            ('vista p50 (ms)', percentil(vista, 50) * 1000),
+            ('vista p99 (ms)', percentil(vista, 99) * 1000),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark de los reportes de ventas (reportes.py).
+
+Genera --lineas renglones de pedido (dos por pedido) y --consumos consumos de
+la bitácora repartidos en los últimos 12 meses, calcula los resúmenes con
+reportes.reconstruir() (que también compacta los días viejos en uno por día)
+y mide los reportes de los 12 meses leyendo sólo los resúmenes, contra la
+misma consulta de ventas por categoría y día sobre los pedidos. Verifica que
+los totales por categoría coincidan y mide lo que tarda registrar_pedido con
+sus resúmenes.
+
+    python benchmarks/bench_reportes.py --lineas 5000000 --consumos 2000000
+"""
+import argparse
+from datetime import timedelta
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+CATEGORIAS = ['Pizza', 'Pasta', 'Ensalada', 'Bebida', 'Postre', 'Entrada', 'Combo', 'Extra']
+
+
+def crear_datos(num_lineas, num_consumos, num_productos, num_articulos):
+    from django.db import connection
+    from django.utils import timezone
+
+    from app_Pizzeria.models import DetallePedido, Inventario, Menu, MovimientoInventario, Pedido, Proveedores
+
+    proveedores = Proveedores.objects.bulk_create([Proveedores(nombre_proveedor=f'Proveedor {i}') for i in range(20)])
+    Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i:04d}', unidad='kg', costo_unitario=Decimal(10 + i % 50),
+                   proveedor=proveedores[i % 20])
+        for i in range(num_articulos)
+    ])
+    Menu.objects.bulk_create([
+        Menu(nombre=f'Producto {i:04d}', precio=Decimal(100 + i % 20 * 10), categoria=CATEGORIAS[i % len(CATEGORIAS)])
+        for i in range(num_productos)
+    ])
+    articulo = Inventario.objects.order_by('id').values_list('id', flat=True).first()
+    producto = Menu.objects.order_by('id').values_list('id', flat=True).first()
+
+    # Dentro de SQLite (CTE recursiva), como en bench_movimientos.py
+    inicio = (timezone.now() - timedelta(days=365)).strftime('%Y-%m-%d %H:%M:%S')
+    num_pedidos = num_lineas // 2
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < %s)
+            INSERT INTO {Pedido._meta.db_table} (id, fecha, estado, total, sucursal_id)
+            SELECT i + 1, datetime(%s, '+' || CAST(i * %s AS INTEGER) || ' seconds'), 'entregado', 0, 1
+            FROM n
+            """,
+            [num_pedidos - 1, inicio, 365 * 86400 / num_pedidos],
+        )
+        # Dos renglones por pedido; el precio es el del producto (100 + k % 20 * 10)
+        cursor.execute(
+            f"""
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < %s)
+            INSERT INTO {DetallePedido._meta.db_table} (pedido_id, producto_id, cantidad, precio_unitario)
+            SELECT i / 2 + 1, %s + (i * 7919) %% %s, 1 + i %% 3, 100 + (i * 7919) %% %s %% 20 * 10
+            FROM n
+            """,
+            [num_pedidos * 2 - 1, producto, num_productos, num_productos],
+        )
+        cursor.execute(
+            f"""
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < %s)
+            INSERT INTO {MovimientoInventario._meta.db_table} (inventario_id, fecha, tipo, cantidad)
+            SELECT %s + (i * 7919) %% %s, datetime(%s, '+' || CAST(i * %s AS INTEGER) || ' seconds'), %s, -0.250
+            FROM n
+            """,
+            [num_consumos - 1, articulo, num_articulos, inicio, 365 * 86400 / num_consumos,
+             MovimientoInventario.CONSUMO],
+        )
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return num_pedidos * 2
+
+
+def por_categoria_desde_pedidos(desde, hasta):
+    """Lo mismo que reportes.ventas_por_categoria(por='dia'), recorriendo los renglones de los pedidos."""
+    from django.db.models import DecimalField, F, Sum
+    from django.db.models.functions import TruncDate
+
+    from app_Pizzeria.models import DetallePedido
+
+    return list(
+        DetallePedido.objects.filter(pedido__fecha__date__gte=desde, pedido__fecha__date__lte=hasta)
+        .values(dia=TruncDate('pedido__fecha'), categoria=F('producto__categoria'))
+        .annotate(piezas=Sum('cantidad'), importe=Sum(F('cantidad') * F('precio_unitario'),
+                                                       output_field=DecimalField(max_digits=14, decimal_places=2)))
+        .order_by('dia', 'categoria')
+    )
+
+
+def medir(funcion, repeticiones):
+    muestras = []
+    for _ in range(repeticiones):
+        with Cronometro() as c:
+            columnas, filas = funcion()
+            filas = list(filas)
+        muestras.append(c.segundos)
+    return percentil(muestras, 50) * 1000, filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lineas', type=int, default=5_000_000)
+    parser.add_argument('--consumos', type=int, default=2_000_000)
+    parser.add_argument('--productos', type=int, default=200)
+    parser.add_argument('--articulos', type=int, default=300)
+    parser.add_argument('--pedidos', type=int, default=300, help='pedidos registrados para medir registrar_venta')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.db import connection
+        from django.utils import timezone
+
+        from app_Pizzeria import pedidos, reportes
+        from app_Pizzeria.models import Inventario, Menu, Receta, ResumenCategoria, ResumenConsumo, ResumenVenta
+
+        with Cronometro() as carga:
+            lineas = crear_datos(args.lineas, args.consumos, args.productos, args.articulos)
+        with Cronometro() as reconstruccion:
+            reportes.reconstruir()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        hasta = timezone.localdate()
+        desde = hasta - timedelta(days=364)
+        medidas = [
+            ('ventas por categoría y día', lambda: reportes.ventas_por_categoria(desde, hasta, 'dia')),
+            ('ventas por categoría y hora', lambda: reportes.ventas_por_categoria(desde, hasta, 'hora')),
+            ('ventas por categoría (total)', lambda: reportes.ventas_por_categoria(desde, hasta, 'total')),
+            ('20 productos más vendidos', lambda: reportes.productos_mas_vendidos(desde, hasta, 20)),
+            ('consumo por proveedor', lambda: reportes.consumo_por_proveedor(desde, hasta)),
+            ('CSV por categoría y día', lambda: ([], reportes.a_csv(*reportes.ventas_por_categoria(desde, hasta)))),
+        ]
+        filas = [
+            ('renglones de pedido / consumos', f'{lineas:,} / {args.consumos:,}'),
+            ('renglones de resumen (producto / categoría / consumo)', ' / '.join(
+                f'{modelo.objects.count():,}' for modelo in (ResumenVenta, ResumenCategoria, ResumenConsumo)
+            )),
+            ('carga de los datos (s)', carga.segundos),
+            ('reconstruir y compactar los resúmenes (s)', reconstruccion.segundos),
+        ]
+        for nombre, funcion in medidas:
+            ms, resultado = medir(funcion, args.repeticiones)
+            filas.append((f'12 meses, {nombre} p50 (ms)', ms))
+            if nombre == 'ventas por categoría (total)':
+                por_categoria = {categoria: (piezas, importe) for _, categoria, piezas, importe in resultado}
+
+        with Cronometro() as sobre_pedidos:
+            crudo = por_categoria_desde_pedidos(desde, hasta)
+        filas.append(('12 meses por categoría y día desde los pedidos (ms)', sobre_pedidos.segundos * 1000))
+        calculado = {}
+        for fila in crudo:
+            piezas, importe = calculado.get(fila['categoria'], (0, Decimal(0)))
+            calculado[fila['categoria']] = (piezas + fila['piezas'], importe + Decimal(fila['importe']))
+        assert por_categoria == {c: (p, Decimal(i).quantize(Decimal('0.01'))) for c, (p, i) in calculado.items()}, \
+            (por_categoria, calculado)
+        filas.append(('totales por categoría iguales a los de los pedidos', 'sí'))
+
+        # registrar_pedido con sus resúmenes (tres INSERT ... ON CONFLICT)
+        producto = Menu.objects.order_by('id').first()
+        articulos = list(Inventario.objects.order_by('id').values_list('id', flat=True)[:5])
+        Receta.objects.bulk_create([Receta(menu=producto, inventario_id=i, cantidad=Decimal('0.1')) for i in articulos])
+        Inventario.objects.update(stock=Decimal(10_000_000))
+        tiempos = []
+        for _ in range(args.pedidos):
+            with Cronometro() as c:
+                pedidos.registrar_pedido([(producto.id, 1)])
+            tiempos.append(c.segundos)
+        filas.append(('registrar_pedido con sus resúmenes p50 (ms)', percentil(tiempos, 50) * 1000))
+        assert not reportes.diferencias(), reportes.diferencias()
+        imprimir_reporte(f'Reportes de 12 meses sobre {lineas:,} renglones de pedido', filas)
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Benchmark de la sincronización de terminales sin conexión (sincronizacion.py).
+
+Crea un inventario y un menú grandes, toma el seq actual (la terminal queda
+al día) y simula una caída de la red de unos minutos: pedidos, una compra y
+algunos cambios de precio. Compara lo que transfiere la terminal al volver:
+
+  - descargar todo de nuevo (todas las páginas de /api/inventario/ y
+    /api/menu/, con gzip);
+  - pedir sólo los cambios (/api/cambios/?desde=, con gzip, hasta 'mas' = false).
+
+También mide lo que cuestan los triggers de la bitácora en cada pedido
+(con y sin ellos) y verifica que los datos que quedan en la terminal después
+de aplicar los cambios son los mismos que los de la base.
+
+    python benchmarks/bench_sincronizacion.py --articulos 20000 --productos 2000 --pedidos 150
+"""
+import argparse
+import gzip
+import json
+import random
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+
+def crear_datos(num_articulos, num_productos, ingredientes):
+    from app_Pizzeria.models import Proveedores, Inventario, Menu, Receta
+    from app_Pizzeria.recetas import expandir_productos
+    from app_Pizzeria.costos import recalcular_costos
+
+    proveedor = Proveedores.objects.create(nombre_proveedor='Proveedor')
+    articulos = Inventario.objects.bulk_create([
+        Inventario(nombre_articulo=f'Artículo {i}', stock=Decimal('100000'), stock_minimo=Decimal(10),
+                   costo_unitario=Decimal('12.50'), unidad='kg', proveedor=proveedor)
+        for i in range(num_articulos)
+    ], batch_size=5000)
+    productos = Menu.objects.bulk_create([
+        Menu(nombre=f'Pizza {i}', descripcion='Masa delgada, salsa de la casa y queso', precio=Decimal('150.00'),
+             categoria='Pizza')
+        for i in range(num_productos)
+    ], batch_size=5000)
+    azar = random.Random(1)
+    Receta.objects.bulk_create([
+        Receta(menu=producto, inventario=articulo, cantidad=Decimal('0.250'))
+        for producto in productos for articulo in azar.sample(articulos, ingredientes)
+    ], batch_size=5000)
+    expandir_productos()
+    recalcular_costos()
+    return [p.id for p in productos], [a.id for a in articulos]
+
+
+def descargar(cliente, url, **parametros):
+    """Todas las páginas del listado: (filas por id, bytes transferidos, peticiones)."""
+    filas, transferidos, peticiones = {}, 0, 0
+    parametros = {'por_pagina': 500, **parametros}
+    while True:
+        respuesta = cliente.get(url, parametros, HTTP_ACCEPT_ENCODING='gzip')
+        transferidos += len(respuesta.content)
+        peticiones += 1
+        datos = json.loads(gzip.decompress(respuesta.content))
+        filas.update((fila['id'], fila) for fila in datos['resultados'])
+        if not datos['siguiente']:
+            return filas, transferidos, peticiones
+        parametros['despues'] = datos['siguiente']
+
+
+def sincronizar(cliente, url, copia, desde):
+    """Aplica /api/cambios/ a la copia de la terminal: (nuevo seq, bytes, peticiones)."""
+    transferidos, peticiones = 0, 0
+    while True:
+        respuesta = cliente.get(url, {'desde': desde, 'modelos': 'inventario,menu', 'limite': 2000},
+                                HTTP_ACCEPT_ENCODING='gzip')
+        assert respuesta.status_code == 200, respuesta.status_code
+        transferidos += len(respuesta.content)
+        peticiones += 1
+        contenido = respuesta.content
+        if respuesta.get('Content-Encoding') == 'gzip':
+            contenido = gzip.decompress(contenido)
+        datos = json.loads(contenido)
+        for modelo, filas in datos['cambios'].items():
+            copia[modelo].update((fila['id'], fila) for fila in filas)
+        for modelo, ids in datos['borrados'].items():
+            for i in ids:
+                copia[modelo].pop(i, None)
+        desde = datos['hasta']
+        if not datos['mas']:
+            return desde, transferidos, peticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articulos', type=int, default=20_000)
+    parser.add_argument('--productos', type=int, default=2_000)
+    parser.add_argument('--ingredientes', type=int, default=6)
+    parser.add_argument('--pedidos', type=int, default=150, help='pedidos durante la caída (~5 minutos)')
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.db import connection
+        from django.test import Client
+        from django.urls import reverse
+
+        from app_Pizzeria import movimientos, sincronizacion
+        from app_Pizzeria.models import CambioSincronizacion, Inventario, Menu
+        from app_Pizzeria.pedidos import registrar_pedido
+
+        productos, articulos = crear_datos(args.articulos, args.productos, args.ingredientes)
+        cliente = Client()
+        url_cambios = reverse('api_cambios')
+
+        # La terminal descarga todo y guarda el seq desde el que seguirá
+        desde = cliente.get(url_cambios).json()['detalles']['hasta']
+        with Cronometro() as completa:
+            inventario, bytes_inventario, pet_inventario = descargar(
+                cliente, reverse('api_listar', args=['inventario']))
+            menu, bytes_menu, pet_menu = descargar(cliente, reverse('api_listar', args=['menu']))
+        copia = {'inventario': inventario, 'menu': menu}
+
+        # La caída: pedidos, una compra, cambios de precio y un producto dado de baja
+        azar = random.Random(2)
+        con_triggers = []
+        for _ in range(args.pedidos):
+            lineas = [(azar.choice(productos), azar.randint(1, 3)) for _ in range(azar.randint(1, 4))]
+            with Cronometro() as c:
+                registrar_pedido(lineas)
+            con_triggers.append(c.segundos)
+        movimientos.registrar_compra(articulos[0], '50')
+        for producto_id in azar.sample(productos, 5):
+            Menu.objects.filter(id=producto_id).update(precio=Decimal('165.00'))
+        Menu.objects.get(id=productos[-1]).delete()
+
+        with Cronometro() as delta:
+            desde, bytes_delta, pet_delta = sincronizar(cliente, url_cambios, copia, desde)
+
+        # Verificación: la copia de la terminal contra una descarga nueva
+        distintos = sum(
+            copia[modelo] != descargar(cliente, reverse('api_listar', args=[modelo]))[0]
+            for modelo in ('inventario', 'menu')
+        )
+
+        # Lo que cuestan los triggers por pedido (SQLite: se quitan y se reinstalan)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'sincronizacion_%'")
+            for (nombre,) in cursor.fetchall():
+                cursor.execute(f'DROP TRIGGER {nombre}')
+        sin_triggers = []
+        for _ in range(args.pedidos):
+            lineas = [(azar.choice(productos[:-1]), azar.randint(1, 3)) for _ in range(azar.randint(1, 4))]
+            with Cronometro() as c:
+                registrar_pedido(lineas)
+            sin_triggers.append(c.segundos)
+        sincronizacion.instalar()
+
+        imprimir_reporte(f'Sincronización con {args.articulos:,} artículos y {args.productos:,} productos', [
+            ('descarga completa (KB)', (bytes_inventario + bytes_menu) / 1024),
+            ('descarga completa (peticiones)', pet_inventario + pet_menu),
+            ('descarga completa (ms)', completa.segundos * 1000),
+            (f'cambios tras {args.pedidos} pedidos (KB)', bytes_delta / 1024),
+            ('cambios (peticiones)', pet_delta),
+            ('cambios (ms)', delta.segundos * 1000),
+            ('renglones en la bitácora', CambioSincronizacion.objects.count()),
+            ('pedido con triggers p50 (ms)', percentil(con_triggers, 50) * 1000),
+            ('pedido sin triggers p50 (ms)', percentil(sin_triggers, 50) * 1000),
+            ('modelos distintos en la terminal', distintos),
+            ('artículos con stock cambiado', Inventario.objects.exclude(stock=Decimal('100000')).count()),
+        ])
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
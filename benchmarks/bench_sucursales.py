@@ -0,0 +1,115 @@
+"""
+Benchmark de los listados por sucursal (sucursales.py).
+
+Crea una sucursal chica y mide sus listados (inventario por nombre, por
+proveedor y por unidad; menú por precio en la API) con sólo sus datos en la
+base. Después carga una sucursal grande (--factor veces más artículos y
+productos) y vuelve a medir los mismos listados de la sucursal chica: con los
+índices (sucursal, ..., id) la latencia debe quedar igual, porque la consulta
+sólo lee la parte del índice de su sucursal. Muestra también el plan de las
+consultas.
+
+    python benchmarks/bench_sucursales.py --articulos 5000 --factor 40
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+
+def crear_sucursal(clave, num_articulos, num_productos, proveedores, semilla):
+    from app_Pizzeria import sucursales
+    from app_Pizzeria.models import Inventario, Menu, Sucursal
+
+    Sucursal.objects.create(nombre=clave.capitalize(), clave=clave)
+    azar = random.Random(semilla)
+    with sucursales.activar(clave):
+        # bulk_create toma la sucursal activa (default de models.sucursal_actual_id)
+        Inventario.objects.bulk_create([
+            Inventario(nombre_articulo=f'Artículo {clave} {i:07d}', stock=Decimal(azar.randint(0, 100)),
+                       stock_minimo=Decimal(10), unidad=azar.choice(['kg', 'litro', 'pieza']),
+                       proveedor=azar.choice(proveedores))
+            for i in range(num_articulos)
+        ], batch_size=5000)
+        Menu.objects.bulk_create([
+            Menu(nombre=f'Pizza {clave} {i:06d}', precio=Decimal(azar.randint(80, 300)), categoria='Pizza')
+            for i in range(num_productos)
+        ], batch_size=5000)
+
+
+def medir(cliente, urls, repeticiones):
+    """p50 (ms) de cada URL de la sucursal chica."""
+    tiempos = {}
+    for nombre, url, parametros in urls:
+        muestras = []
+        for _ in range(repeticiones):
+            with Cronometro() as c:
+                respuesta = cliente.get(url, parametros, HTTP_X_SUCURSAL='chica')
+            assert respuesta.status_code == 200, respuesta.status_code
+            muestras.append(c.segundos)
+        tiempos[nombre] = percentil(muestras, 50) * 1000
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articulos', type=int, default=5_000, help='artículos de la sucursal chica')
+    parser.add_argument('--productos', type=int, default=500, help='productos de la sucursal chica')
+    parser.add_argument('--factor', type=int, default=40, help='tamaño de la sucursal grande')
+    parser.add_argument('--repeticiones', type=int, default=30)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    try:
+        from django.core.cache import cache
+        from django.db import connection
+        from django.http import QueryDict
+        from django.test import Client
+        from django.urls import reverse
+
+        from app_Pizzeria import sucursales
+        from app_Pizzeria.listados import LISTADO_INVENTARIO, LISTADO_MENU
+        from app_Pizzeria.models import Inventario, Proveedores
+
+        proveedores = Proveedores.objects.bulk_create([
+            Proveedores(nombre_proveedor=f'Proveedor {i}') for i in range(20)
+        ])
+        crear_sucursal('chica', args.articulos, args.productos, proveedores, 1)
+
+        cliente = Client()
+        urls = [
+            ('inventario por nombre', reverse('ver_inventario'), {'orden': 'nombre'}),
+            ('inventario de un proveedor', reverse('ver_inventario'), {'proveedor': proveedores[3].id}),
+            ('inventario por unidad (API)', reverse('api_listar', args=['inventario']), {'unidad': 'kg'}),
+            ('menú por precio (API)', reverse('api_listar', args=['menu']), {'orden': '-precio'}),
+        ]
+        # Sin las páginas guardadas en caché: se mide la consulta
+        cache.clear()
+        solo_chica = medir(cliente, urls, args.repeticiones)
+
+        with Cronometro() as carga:
+            crear_sucursal('grande', args.articulos * args.factor, args.productos * args.factor, proveedores, 2)
+        # Las lecturas no tienen que buscar en un WAL recién llenado por la carga
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        cache.clear()
+        con_grande = medir(cliente, urls, args.repeticiones)
+
+        with sucursales.activar('chica'):
+            for listado, orden in ((LISTADO_INVENTARIO, 'nombre'), (LISTADO_MENU, '-precio')):
+                consulta, *_ = listado.preparar(QueryDict(f'orden={orden}'))
+                print(consulta.explain())
+
+        filas = [('artículos chica / grande', f'{args.articulos:,} / {Inventario.objects.count() - args.articulos:,}'),
+                 ('carga de la grande (s)', carga.segundos)]
+        for nombre in solo_chica:
+            filas.append((f'{nombre}: sola p50 (ms)', solo_chica[nombre]))
+            filas.append((f'{nombre}: con la grande p50 (ms)', con_grande[nombre]))
+        imprimir_reporte(f'Listados de una sucursal con otra {args.factor} veces más grande', filas)
+    finally:
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark de la cola de trabajos en segundo plano (trabajos.py).
+
+1. Lo que tarda la petición de importar un archivo de --filas artículos:
+   antes la vista importaba dentro de la petición; ahora guarda el archivo y
+   lo encola. Se mide también lo que tarda el trabajo en el trabajador.
+2. Cuántos trabajos por segundo atiende el comando `trabajador` con 1 hilo,
+   con --hilos hilos y con --procesos procesos. Cada trabajo espera --espera
+   ms (como uno que espera a la red o a la base) y escribe su resultado.
+   Verifica que cada trabajo se ejecutó exactamente una vez.
+
+    python benchmarks/bench_trabajos.py --filas 20000 --trabajos 400 --hilos 8 --procesos 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from _entorno import preparar_django, borrar_bd, percentil, imprimir_reporte, Cronometro
+
+
+def archivo_inventario(filas):
+    lineas = ['nombre_articulo,stock,unidad,stock_minimo,costo_unitario']
+    lineas += [f'Artículo {i:07d},{i % 100},kg,10,12.50' for i in range(filas)]
+    return ('\n'.join(lineas) + '\n').encode()
+
+
+def atender(trabajos, cantidad, hilos=1, procesos=0):
+    """Encola `cantidad` trabajos de espera y los atiende: (segundos, terminados, intentos)."""
+    from app_Pizzeria.models import Trabajo
+    from django.db.models import Sum
+
+    Trabajo.objects.bulk_create([
+        Trabajo(tipo='bench_espera', max_intentos=1, parametros={'n': i}) for i in range(cantidad)
+    ])
+    with Cronometro() as c:
+        trabajos.servir(hilos=hilos, procesos=procesos, espera=0.05, una_vez=True)
+    terminados = Trabajo.objects.filter(tipo='bench_espera', estado=Trabajo.TERMINADO)
+    resumen = (c.segundos, terminados.count(), terminados.aggregate(intentos=Sum('intentos'))['intentos'])
+    Trabajo.objects.filter(tipo='bench_espera').delete()
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, default=20_000)
+    parser.add_argument('--peticiones', type=int, default=10)
+    parser.add_argument('--trabajos', type=int, default=400)
+    parser.add_argument('--espera', type=float, default=20, help='ms que espera cada trabajo')
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--procesos', type=int, default=4)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    carpeta = tempfile.TemporaryDirectory(prefix='pizzeria_trabajos_')
+    try:
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import Client, override_settings
+        from django.urls import reverse
+
+        from app_Pizzeria import intercambio, trabajos
+        from app_Pizzeria.models import Inventario, Trabajo
+
+        @trabajos.tipo('bench_espera', 'Espera (benchmark)')
+        def esperar(n):
+            time.sleep(args.espera / 1000)
+            return {'n': n, 'pid': os.getpid()}
+
+        contenido = archivo_inventario(args.filas)
+        with override_settings(TRABAJOS_DIR=carpeta.name):
+            # 1. La petición: importar dentro de ella (como antes) contra encolar
+            dentro = []
+            for _ in range(3):
+                Inventario.objects.all().delete()
+                with Cronometro() as c:
+                    intercambio.importar('inventario', SimpleUploadedFile('a.csv', contenido).file, 'csv')
+                dentro.append(c.segundos)
+
+            cliente = Client()
+            url = reverse('importar_datos', args=['inventario'])
+            encolada = []
+            for _ in range(args.peticiones):
+                with Cronometro() as c:
+                    respuesta = cliente.post(url, {'archivo': SimpleUploadedFile('a.csv', contenido)})
+                assert respuesta.status_code == 302, respuesta.status_code
+                encolada.append(c.segundos)
+            Trabajo.objects.filter(tipo='importar').exclude(id=Trabajo.objects.latest('id').id).delete()
+            with Cronometro() as en_trabajador:
+                trabajos.procesar_pendientes()
+            importacion = Trabajo.objects.get(tipo='importar')
+            assert importacion.estado == Trabajo.TERMINADO, importacion.error
+
+        # 2. El trabajador
+        filas = [
+            (f'importar {args.filas:,} filas en la petición p50 (ms)', percentil(dentro, 50) * 1000),
+            ('petición que encola p50 (ms)', percentil(encolada, 50) * 1000),
+            ('la importación en el trabajador (ms)', en_trabajador.segundos * 1000),
+            ('filas guardadas por el trabajo', importacion.resultado['guardadas']),
+        ]
+        for nombre, hilos, procesos in (
+            ('1 hilo', 1, 0),
+            (f'{args.hilos} hilos', args.hilos, 0),
+            (f'{args.procesos} procesos x {args.hilos} hilos', args.hilos, args.procesos),
+        ):
+            segundos, terminados, intentos = atender(trabajos, args.trabajos, hilos, procesos)
+            filas.append((f'{nombre}: trabajos/s', terminados / segundos))
+            filas.append((f'{nombre}: terminados / intentos', f'{terminados} / {intentos}'))
+        imprimir_reporte(f'Cola de trabajos ({args.trabajos} trabajos de {args.espera:g} ms)', filas)
+    finally:
+        carpeta.cleanup()
+        borrar_bd(ruta)
+
+
+if __name__ == '__main__':
+    main()